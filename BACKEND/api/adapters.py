@@ -5,9 +5,9 @@ from allauth.socialaccount.adapter import DefaultSocialAccountAdapter
 from django.conf import settings
 from django.utils.text import slugify
 from urllib.parse import urlencode
-from rest_framework_simplejwt.tokens import RefreshToken
 import logging
 
+from .authentication import PlatformRefreshToken
 from .models import PlatformUser
 
 logger = logging.getLogger(__name__)
@@ -49,7 +49,7 @@ class CustomSocialAccountAdapter(DefaultSocialAccountAdapter):
         callback_path = "/google-auth-callback"
 
         user = socialaccount.user
-        refresh = RefreshToken.for_user(user)
+        refresh = PlatformRefreshToken.for_user(user)
         
         tokens = {
             'access': str(refresh.access_token),
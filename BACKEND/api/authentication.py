@@ -0,0 +1,82 @@
+"""JWT authentication that runs once per request.
+
+TemporaryPasswordMiddleware, DRF (REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'])
+and views that authenticate optionally all go through
+`RequestCachedJWTAuthentication`. It keeps the validated access token and
+the user on the underlying HttpRequest, so the token is decoded once and the
+user is fetched at most once however many of them ask.
+
+Tokens carry an `is_temporary_password` claim (set by `PlatformRefreshToken`
+and copied to access tokens on refresh). When the claim is false the
+temporary-password gate needs no database query. A true claim is confirmed
+against the user, because it stays in the token after the password is changed.
+"""
+
+from __future__ import annotations
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+TEMPORARY_PASSWORD_CLAIM = 'is_temporary_password'
+
+_UNSET = object()
+
+
+class PlatformRefreshToken(RefreshToken):
+    """Refresh token (and access tokens made from it) with the temporary-password claim."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TEMPORARY_PASSWORD_CLAIM] = bool(getattr(user, 'is_temporary_password', False))
+        return token
+
+
+class PlatformTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login serializer for simplejwt (TOKEN_OBTAIN_SERIALIZER) and dj-rest-auth (JWT_TOKEN_CLAIMS_SERIALIZER)."""
+
+    token_class = PlatformRefreshToken
+
+
+class RequestCachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication whose results are cached on the request.
+
+    Failures are cached too: a request with an invalid token fails the same
+    way in every caller without being decoded again.
+    """
+
+    def authenticate(self, request):
+        request = getattr(request, '_request', request)  # DRF Request -> HttpRequest
+        token = self.validated_token(request)
+        if token is None:
+            return None
+
+        user = getattr(request, '_jwt_user', _UNSET)
+        if user is _UNSET:
+            try:
+                user = self.get_user(token)
+            except AuthenticationFailed as e:
+                user = e
+            request._jwt_user = user
+        if isinstance(user, AuthenticationFailed):
+            raise user
+        return user, token
+
+    def validated_token(self, request):
+        """The request's validated access token (None without a JWT header); does not touch the database."""
+        request = getattr(request, '_request', request)
+        token = getattr(request, '_jwt_token', _UNSET)
+        if token is _UNSET:
+            header = self.get_header(request)
+            raw_token = self.get_raw_token(header) if header is not None else None
+            try:
+                token = self.get_validated_token(raw_token) if raw_token is not None else None
+            except AuthenticationFailed as e:
+                token = e
+            request._jwt_token = token
+        if isinstance(token, AuthenticationFailed):
+            raise token
+        return token
@@ -0,0 +1,188 @@
+"""Booking occupancy bookkeeping and the public booking path.
+
+`Event.booked_count` is a denormalized number of bookings. It is changed only
+with F() expressions inside the same transaction as the booking row, so
+concurrent requests never overwrite each other's updates and the capacity
+check never needs a COUNT query.
+
+Public bookings of one (site, slot, assignee) are serialized with a
+transaction-scoped lock, so a burst of requests creates the session event
+once and fills it exactly up to capacity; the rest get a clean conflict.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Booking, Event, Site
+from .slot_engine import UNLIMITED_CAPACITY
+
+logger = logging.getLogger(__name__)
+
+
+class EventFullError(Exception):
+    """Raised when an event has no free spots left."""
+
+
+class AlreadyBookedError(Exception):
+    """Raised when the guest already holds a booking for the slot."""
+
+    def __init__(self, booking: Booking):
+        super().__init__(f'Guest already booked event {booking.event_id}')
+        self.booking = booking
+
+
+def adjust_booked_count(event_id: int, delta: int) -> None:
+    """Atomically add `delta` to an event's booked_count (never below zero)."""
+    if delta > 0:
+        Event.objects.filter(pk=event_id).update(booked_count=F('booked_count') + delta)
+    elif delta < 0:
+        Event.objects.filter(pk=event_id, booked_count__gte=-delta).update(booked_count=F('booked_count') + delta)
+
+
+def create_booking(event: Event, **fields) -> Booking:
+    """
+    Reserve a spot on the event and create the booking in one transaction.
+
+    The conditional UPDATE doubles as the capacity check: it only matches while
+    booked_count is below capacity (or capacity is -1, unlimited), so two
+    requests cannot both take the last spot.
+    """
+    with transaction.atomic():
+        reserved = Event.objects.filter(
+            Q(capacity=UNLIMITED_CAPACITY) | Q(booked_count__lt=F('capacity')),
+            pk=event.pk,
+        ).update(booked_count=F('booked_count') + 1)
+        if not reserved:
+            raise EventFullError(f'Event {event.pk} is fully booked')
+        return Booking.objects.create(event=event, **fields)
+
+
+def delete_booking(booking: Booking) -> bool:
+    """Delete a booking and release its spot. Returns False if it was already gone."""
+    if booking.pk is None:
+        return False
+    with transaction.atomic():
+        # Filtering by pk makes a concurrent double cancel delete (and release) only once
+        _, deleted = Booking.objects.filter(pk=booking.pk).delete()
+        removed = deleted.get(Booking._meta.label, 0)
+        if removed:
+            adjust_booked_count(booking.event_id, -removed)
+    booking.pk = None
+    return bool(removed)
+
+
+def move_booking(booking: Booking, previous_event_id: Optional[int]) -> None:
+    """Transfer the booking's spot after its event changed (caller holds the transaction)."""
+    if previous_event_id == booking.event_id:
+        return
+    if previous_event_id is not None:
+        adjust_booked_count(previous_event_id, -1)
+    adjust_booked_count(booking.event_id, 1)
+
+
+def _slot_lock_key(site_id: int, start_time: datetime, assignee: tuple) -> int:
+    """Stable signed 64-bit key for pg_advisory_xact_lock."""
+    raw = f"{site_id}|{start_time.astimezone(dt_timezone.utc).isoformat()}|{assignee[0]}:{assignee[1]}"
+    return int.from_bytes(hashlib.blake2b(raw.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def lock_slot(site_id: int, start_time: datetime, assignee: tuple) -> None:
+    """Serialize bookings of one (site, slot, assignee) until the current transaction ends."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_slot_lock_key(site_id, start_time, assignee)])
+    else:
+        # Coarser but portable: lock the site row (SQLite serializes writers anyway)
+        list(Site.objects.select_for_update().filter(pk=site_id).values_list('pk', flat=True))
+
+
+def book_slot(
+    site: Site,
+    *,
+    start_time: datetime,
+    end_time: datetime,
+    assigned_to_owner=None,
+    assigned_to_team_member=None,
+    event_defaults: dict,
+    **booking_fields,
+) -> Booking:
+    """
+    Book a public slot, creating its session event on first use.
+
+    Raises EventFullError when the slot is full and AlreadyBookedError when the
+    guest (matched by guest_email) is already registered for it.
+    """
+    if assigned_to_team_member is not None:
+        assignee = ('team_member', assigned_to_team_member.pk)
+    else:
+        assignee = ('owner', assigned_to_owner.pk)
+
+    with transaction.atomic():
+        lock_slot(site.pk, start_time, assignee)
+
+        event = Event.objects.filter(
+            site=site,
+            start_time=start_time,
+            end_time=end_time,
+            assigned_to_team_member=assigned_to_team_member,
+            assigned_to_owner=assigned_to_owner,
+        ).order_by('pk').first()
+        if event is None:
+            event = Event.objects.create(
+                site=site,
+                start_time=start_time,
+                end_time=end_time,
+                assigned_to_team_member=assigned_to_team_member,
+                assigned_to_owner=assigned_to_owner,
+                **event_defaults,
+            )
+
+        guest_email = booking_fields.get('guest_email')
+        existing_booking = Booking.objects.filter(event=event, guest_email=guest_email).first() if guest_email else None
+        if existing_booking is not None:
+            raise AlreadyBookedError(existing_booking)
+
+        return create_booking(event, site=site, **booking_fields)
+
+
+def _actual_counts():
+    return Coalesce(
+        Subquery(
+            Booking.objects.filter(event=OuterRef('pk'))
+            .order_by()
+            .values('event')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def find_booked_count_drift(events=None) -> list[tuple[int, int, int]]:
+    """Return (event_id, stored, actual) for events whose booked_count is wrong."""
+    events = Event.objects.all() if events is None else events
+    return list(
+        events.annotate(actual_count=_actual_counts())
+        .exclude(booked_count=F('actual_count'))
+        .order_by('pk')
+        .values_list('pk', 'booked_count', 'actual_count')
+    )
+
+
+def reconcile_booked_counts(event_ids: Iterable[int]) -> int:
+    """Reset booked_count of the given events to their real number of bookings."""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return 0
+    with transaction.atomic():
+        updated = Event.objects.filter(pk__in=event_ids).update(booked_count=_actual_counts())
+    logger.info("Reconciled booked_count for %s events", updated)
+    return updated
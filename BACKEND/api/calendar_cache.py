@@ -0,0 +1,145 @@
+"""Versioned response cache for the public calendar endpoints.
+
+Every site has a "calendar version" counter in the cache. Cached responses are
+keyed by (endpoint, site, version, query params), so bumping the counter after
+an Event, Booking or AvailabilityBlock write invalidates every cached response
+of that site in O(1): stale entries are simply never read again and expire on
+their own TTL. Cache outages degrade to uncached responses.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Iterable, Mapping
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_HIT = 'HIT'
+CACHE_MISS = 'MISS'
+CACHE_BYPASS = 'BYPASS'
+
+_VERSION_KEY = 'calendar:version:{site_id}'
+_RESPONSE_KEY = 'calendar:response:{endpoint}:{site_id}:v{version}:{params}'
+_STATS_KEY = 'calendar:stats:{endpoint}:{outcome}'
+
+ENDPOINTS = ('availability', 'calendar_data')
+
+
+def _ttl() -> int:
+    return getattr(settings, 'CALENDAR_CACHE_TTL', 60)
+
+
+def _incr(key: str) -> int:
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: create it, tolerating a concurrent add
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_calendar_version(site_id: int) -> int:
+    """Current calendar version of a site, initialized on first use."""
+    key = _VERSION_KEY.format(site_id=site_id)
+    version = cache.get(key)
+    if version is None:
+        # Seeding with the clock keeps a re-created counter (e.g. after eviction)
+        # from ever matching a version that cached entries still carry
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_calendar_version(site_id: int) -> None:
+    """Invalidate all cached calendar responses of a site."""
+    key = _VERSION_KEY.format(site_id=site_id)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump calendar version for site {site_id}: {e}")
+
+
+def bump_calendar_versions(site_ids: Iterable[int]) -> None:
+    for site_id in set(site_ids):
+        bump_calendar_version(site_id)
+
+
+def _params_digest(params: Mapping[str, Any]) -> str:
+    items = sorted((key, str(params.get(key))) for key in params.keys())
+    return hashlib.md5(repr(items).encode('utf-8')).hexdigest()
+
+
+def _record(endpoint: str, outcome: str) -> None:
+    try:
+        _incr(_STATS_KEY.format(endpoint=endpoint, outcome=outcome))
+    except Exception:
+        pass
+
+
+def get_or_build(endpoint: str, site_id: int, params: Mapping[str, Any], build: Callable[[], Any]) -> tuple[Any, str]:
+    """
+    Return (data, cache_status) for a calendar response.
+
+    `build` must return picklable plain data (lists/dicts), not serializer
+    Return* containers, which would drag the serializer into the cache.
+    """
+    try:
+        key = _RESPONSE_KEY.format(
+            endpoint=endpoint,
+            site_id=site_id,
+            version=get_calendar_version(site_id),
+            params=_params_digest(params),
+        )
+        data = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Calendar cache unavailable, serving {endpoint} uncached: {e}")
+        return build(), CACHE_BYPASS
+
+    if data is not None:
+        _record(endpoint, 'hit')
+        return data, CACHE_HIT
+
+    _record(endpoint, 'miss')
+    data = build()
+    try:
+        cache.set(key, data, timeout=_ttl())
+    except Exception as e:
+        logger.warning(f"Could not store {endpoint} response for site {site_id}: {e}")
+    return data, CACHE_MISS
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters per endpoint, with the hit ratio."""
+    keys = {
+        (endpoint, outcome): _STATS_KEY.format(endpoint=endpoint, outcome=outcome)
+        for endpoint in ENDPOINTS
+        for outcome in ('hit', 'miss')
+    }
+    values = cache.get_many(list(keys.values()))
+    stats = {}
+    for endpoint in ENDPOINTS:
+        hits = values.get(keys[(endpoint, 'hit')], 0)
+        misses = values.get(keys[(endpoint, 'miss')], 0)
+        total = hits + misses
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_cache_stats() -> None:
+    cache.delete_many([
+        _STATS_KEY.format(endpoint=endpoint, outcome=outcome)
+        for endpoint in ENDPOINTS
+        for outcome in ('hit', 'miss')
+    ])
@@ -0,0 +1,167 @@
+"""Delta-compressed AI undo checkpoints (ConfigCheckpoint).
+
+A checkpoint stores an RFC 6902 patch from a full base copy to the
+checkpointed state. New checkpoints are diffed against the base of the
+newest checkpoint, so a write costs one diff-sized row; a fresh base is
+stored every CONFIG_CHECKPOINT_BASE_INTERVAL checkpoints, or when the delta
+grows past half of the full document. Checkpoints with the content of an
+already stored one reuse its base and delta. Restoring applies exactly one
+patch to one base, and listing reads metadata only.
+
+Checkpoints are scoped to a site (template_config) or to a BigEvent (its
+editable fields, see `big_event_state`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import uuid
+from decimal import Decimal
+from datetime import date
+from typing import Any, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+
+from .json_patch import apply_patch, make_patch
+from .models import BigEvent, ConfigCheckpoint, ConfigCheckpointBase, Site
+
+logger = logging.getLogger(__name__)
+
+BIG_EVENT_FIELDS = (
+    'title', 'description', 'location', 'start_date', 'end_date',
+    'max_participants', 'price', 'image_url', 'details',
+)
+
+
+def _limit() -> int:
+    return getattr(settings, 'CONFIG_CHECKPOINT_LIMIT', 20)
+
+
+def _base_interval() -> int:
+    return getattr(settings, 'CONFIG_CHECKPOINT_BASE_INTERVAL', 10)
+
+
+def _encode(config: Any) -> bytes:
+    return json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def content_hash(config: Any) -> str:
+    return hashlib.sha256(_encode(config)).hexdigest()
+
+
+def _scope(site: Site, big_event: Optional[BigEvent]):
+    return {'site': site, 'big_event': big_event}
+
+
+def big_event_state(event: BigEvent) -> dict:
+    """JSON-serializable snapshot of the BigEvent fields the AI may change."""
+    return {
+        'title': event.title,
+        'description': event.description,
+        'location': event.location,
+        'start_date': event.start_date.isoformat() if event.start_date else None,
+        'end_date': event.end_date.isoformat() if event.end_date else None,
+        'max_participants': event.max_participants,
+        'price': str(event.price),
+        'image_url': event.image_url,
+        'details': event.details,
+    }
+
+
+def apply_big_event_state(event: BigEvent, data: dict) -> None:
+    event.title = data['title']
+    event.description = data['description']
+    event.location = data['location']
+    event.start_date = date.fromisoformat(data['start_date']) if data['start_date'] else None
+    event.end_date = date.fromisoformat(data['end_date']) if data['end_date'] else None
+    event.max_participants = data['max_participants']
+    event.price = Decimal(data['price'])
+    event.image_url = data['image_url']
+    event.details = data['details']
+
+
+def create_checkpoint(
+    site: Site,
+    config: Any,
+    message: str = '',
+    *,
+    big_event: Optional[BigEvent] = None,
+    checkpoint_id: Optional[str] = None,
+) -> ConfigCheckpoint:
+    """Store `config` as the newest checkpoint of the site (or BigEvent) and prune old ones."""
+    scope = _scope(site, big_event)
+    digest = content_hash(config)
+
+    with transaction.atomic():
+        checkpoints = ConfigCheckpoint.objects.filter(**scope)
+        duplicate = checkpoints.filter(content_hash=digest).only('base_id', 'delta').first()
+        if duplicate is not None:
+            base_id, delta = duplicate.base_id, duplicate.delta
+        else:
+            base_id, delta = _delta_against_latest_base(checkpoints, config)
+            if base_id is None:
+                base = ConfigCheckpointBase.objects.filter(**scope, content_hash=digest).first()
+                if base is None:
+                    base = ConfigCheckpointBase.objects.create(**scope, content_hash=digest, config=config)
+                base_id, delta = base.id, []
+
+        checkpoint = ConfigCheckpoint.objects.create(
+            **scope,
+            checkpoint_id=checkpoint_id or str(uuid.uuid4()),
+            message=message,
+            content_hash=digest,
+            base_id=base_id,
+            delta=delta,
+        )
+        prune_checkpoints(site, big_event=big_event)
+    return checkpoint
+
+
+def _delta_against_latest_base(checkpoints, config):
+    """(base_id, delta) relative to the newest checkpoint's base, or (None, None) when a new base is due."""
+    latest = checkpoints.only('base_id').first()
+    if latest is None:
+        return None, None
+    if checkpoints.filter(base_id=latest.base_id).count() >= _base_interval():
+        return None, None
+
+    base_config = ConfigCheckpointBase.objects.filter(pk=latest.base_id).values_list('config', flat=True).first()
+    delta = make_patch(base_config, config)
+    if len(_encode(delta)) > len(_encode(config)) // 2:
+        return None, None
+    return latest.base_id, delta
+
+
+def prune_checkpoints(site: Site, *, big_event: Optional[BigEvent] = None) -> int:
+    """Keep the newest CONFIG_CHECKPOINT_LIMIT checkpoints and drop bases nobody refers to."""
+    scope = _scope(site, big_event)
+    checkpoints = ConfigCheckpoint.objects.filter(**scope)
+    keep = list(checkpoints.values_list('id', flat=True)[:_limit()])
+    removed, _ = checkpoints.exclude(id__in=keep).delete()
+    if removed:
+        ConfigCheckpointBase.objects.filter(**scope, checkpoints__isnull=True).delete()
+    return removed
+
+
+def list_checkpoints(site: Site, *, big_event: Optional[BigEvent] = None) -> List[dict]:
+    """Checkpoint metadata, newest first (configs are not loaded)."""
+    rows = ConfigCheckpoint.objects.filter(**_scope(site, big_event)).values('checkpoint_id', 'created_at', 'message')
+    return [
+        {'id': row['checkpoint_id'], 'timestamp': row['created_at'].isoformat(), 'message': row['message']}
+        for row in rows
+    ]
+
+
+def checkpoint_config(site: Site, checkpoint_id: str, *, big_event: Optional[BigEvent] = None) -> Optional[Any]:
+    """Reconstructed config of a checkpoint, or None if it does not exist in this scope."""
+    checkpoint = (
+        ConfigCheckpoint.objects.filter(**_scope(site, big_event), checkpoint_id=checkpoint_id)
+        .select_related('base')
+        .first()
+    )
+    if checkpoint is None:
+        return None
+    return apply_patch(checkpoint.base.config, checkpoint.delta, in_place=True)
@@ -0,0 +1,282 @@
+"""In-process mirror of blocked IPs and CIDR ranges for DDoSProtectionMiddleware.
+
+Blocked clients are rejected before the rate limiter runs, from a per-worker
+`NetworkSet`, so a flood from a blocked address costs no Redis round trip.
+`block()` records a block in the worker's mirror, in a Redis sorted set
+(network -> expiry), and publishes it on a pub/sub channel. Every other web
+worker adds it to its own mirror from there. A worker loads the sorted set
+when it (re)subscribes, so blocks made while it was starting or
+disconnected are not lost. Entries expire locally at the same wall-clock
+time as the block in Redis.
+
+The mirror only short-circuits: the limiter still checks the block flag in
+Redis, so a worker whose listener is down rejects the same clients one
+round trip later. `NetworkSet` also holds DDOS_WHITELIST and DDOS_BLOCKLIST.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import math
+import threading
+import time
+from typing import Iterable, Optional, Union
+
+from django.conf import settings
+
+from .rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+BLOCKLIST_CHANNEL = 'ddos:blocklist'
+# Rate limiter scope of DDoSProtectionMiddleware's per-IP block flags
+DDOS_SCOPE = 'ddos'
+_SNAPSHOT_KEY = 'ddos:blocklist'
+
+_BITS = {4: 32, 6: 128}
+
+
+def parse_ip(value) -> Optional[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    """The address of a client IP string (IPv4-mapped IPv6 as IPv4), or None when it is not an IP."""
+    if isinstance(value, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+        address = value
+    else:
+        try:
+            address = ipaddress.ip_address(str(value).strip())
+        except ValueError:
+            return None
+    if address.version == 6 and address.ipv4_mapped is not None:
+        return address.ipv4_mapped
+    return address
+
+
+class NetworkSet:
+    """
+    IP addresses and CIDR ranges, each with an optional expiry (epoch seconds).
+
+    Networks are kept in one hash table per (IP version, prefix length), keyed
+    by the network's prefix bits. A lookup shifts the address once per prefix
+    length in use, so it costs O(distinct prefix lengths), not O(entries).
+    Entries that are not IPs (e.g. 'localhost') are matched literally.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        # version -> ((prefix length, {prefix bits: expires_at or None}), ...), longest prefix first
+        self._tables = {4: (), 6: ()}
+        self._names = set()
+        self._lock = threading.Lock()
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: str, expires_at: Optional[float] = None) -> bool:
+        """Add an IP or CIDR (expiring at `expires_at`); False when `entry` is not an IP or network."""
+        try:
+            network = ipaddress.ip_network(str(entry).strip(), strict=False)
+        except ValueError:
+            if not entry:
+                return False
+            self._names.add(str(entry).strip())
+            return True
+
+        bits = _BITS[network.version]
+        key = int(network.network_address) >> (bits - network.prefixlen)
+        with self._lock:
+            tables = dict(self._tables[network.version])
+            table = tables.get(network.prefixlen)
+            if table is None:
+                # New prefix length: publish a new tuple, readers keep iterating the old one
+                table = {}
+                tables[network.prefixlen] = table
+                self._tables[network.version] = tuple(sorted(tables.items(), reverse=True))
+            current = table.get(key, 0)
+            if current is not None and (expires_at is None or expires_at > current):
+                table[key] = expires_at
+        return True
+
+    def discard(self, entry: str) -> None:
+        try:
+            network = ipaddress.ip_network(str(entry).strip(), strict=False)
+        except ValueError:
+            self._names.discard(str(entry).strip())
+            return
+        key = int(network.network_address) >> (_BITS[network.version] - network.prefixlen)
+        with self._lock:
+            for prefixlen, table in self._tables[network.version]:
+                if prefixlen == network.prefixlen:
+                    table.pop(key, None)
+
+    def expiry(self, value, now: Optional[float] = None) -> Optional[float]:
+        """When the entry covering `value` expires (inf when it does not), or None when nothing covers it."""
+        address = parse_ip(value)
+        if address is None:
+            return float('inf') if value in self._names else None
+
+        now = time.time() if now is None else now
+        number = int(address)
+        bits = _BITS[address.version]
+        for prefixlen, table in self._tables[address.version]:
+            key = number >> (bits - prefixlen)
+            if key not in table:
+                continue
+            expires_at = table.get(key, 0)
+            if expires_at is None:
+                return float('inf')
+            if expires_at > now:
+                return expires_at
+            table.pop(key, None)
+        return None
+
+    def __contains__(self, value) -> bool:
+        return self.expiry(value) is not None
+
+    def __len__(self):
+        return len(self._names) + sum(len(table) for tables in self._tables.values() for _, table in tables)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables = {4: (), 6: ()}
+            self._names = set()
+
+
+_mirror = NetworkSet()
+
+
+# ---------------------------------------------------------------------------
+# Cross-worker propagation (Redis pub/sub + sorted set snapshot)
+# ---------------------------------------------------------------------------
+
+_listener_lock = threading.Lock()
+_listener_state = {'thread': None, 'retry_at': 0.0}
+
+
+def _redis_client():
+    url = getattr(settings, 'DDOS_BLOCKLIST_PUBSUB_URL', '')
+    if not url:
+        return None
+    import redis
+    return redis.Redis.from_url(url, socket_connect_timeout=1)
+
+
+def _apply(entry: dict) -> None:
+    network = entry.get('network')
+    expires_at = float(entry.get('expires_at') or 0)
+    if not network:
+        return
+    if expires_at > time.time():
+        _mirror.add(network, expires_at)
+    else:
+        _mirror.discard(network)
+
+
+def _handle_message(message) -> None:
+    try:
+        _apply(json.loads(message['data']))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return
+
+
+def _load_snapshot(client) -> None:
+    now = time.time()
+    client.zremrangebyscore(_SNAPSHOT_KEY, '-inf', now)
+    for network, expires_at in client.zrangebyscore(_SNAPSHOT_KEY, now, '+inf', withscores=True):
+        _mirror.add(network.decode() if isinstance(network, bytes) else network, expires_at)
+
+
+def _ensure_listener() -> None:
+    """Subscribe this process to blocks (lazily, so it happens after the server forks)."""
+    thread = _listener_state['thread']
+    if (thread is not None and thread.is_alive()) or time.monotonic() < _listener_state['retry_at']:
+        return
+    with _listener_lock:
+        thread = _listener_state['thread']
+        if (thread is not None and thread.is_alive()) or time.monotonic() < _listener_state['retry_at']:
+            return
+        try:
+            client = _redis_client()
+            if client is None:
+                return
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{BLOCKLIST_CHANNEL: _handle_message})
+            # After subscribing, so a block published in between is not missed
+            _load_snapshot(client)
+            _listener_state['thread'] = pubsub.run_in_thread(
+                sleep_time=1,
+                daemon=True,
+                exception_handler=_listener_failed,
+            )
+        except Exception as e:
+            _listener_failed(e)
+
+
+def _listener_failed(exc, pubsub=None, thread=None) -> None:
+    # Mirrored blocks stay valid until they expire; the limiter still sees new ones in Redis
+    logger.warning(f"DDoS blocklist listener unavailable, relying on the rate limiter: {exc}")
+    _listener_state['retry_at'] = time.monotonic() + 30
+    if thread is not None:
+        thread.stop()
+        pubsub.close()
+
+
+def _broadcast(network: str, expires_at: float) -> None:
+    try:
+        client = _redis_client()
+        if client is None:
+            return
+        pipe = client.pipeline(transaction=False)
+        if expires_at > time.time():
+            pipe.zadd(_SNAPSHOT_KEY, {network: expires_at})
+        else:
+            pipe.zrem(_SNAPSHOT_KEY, network)
+        pipe.publish(BLOCKLIST_CHANNEL, json.dumps({'network': network, 'expires_at': expires_at}))
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not broadcast DDoS block of {network}: {e}")
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def blocked_for(ip) -> int:
+    """Seconds left on the mirrored block covering `ip` (0 when it is not blocked); no network I/O."""
+    _ensure_listener()
+    expires_at = _mirror.expiry(ip)
+    if expires_at is None:
+        return 0
+    return max(math.ceil(expires_at - time.time()), 1)
+
+
+def block(network: str, duration: int, *, broadcast: bool = True) -> str:
+    """
+    Block an IP or CIDR range for `duration` seconds in every worker (only in
+    this one without `broadcast`). Returns the normalized network; raises
+    ValueError when `network` is not an IP or CIDR.
+    """
+    network = str(ipaddress.ip_network(str(network).strip(), strict=False))
+    expires_at = time.time() + duration
+    _mirror.add(network, expires_at)
+    if broadcast:
+        _broadcast(network, expires_at)
+    return network
+
+
+def unblock(network: str) -> str:
+    """
+    Lift a block made with `block()` in every worker. For a single address
+    the rate limiter's block flag is cleared too; otherwise the next request
+    would find it and mirror the block again. Flags of addresses inside a
+    blocked range are not touched.
+    """
+    network = ipaddress.ip_network(str(network).strip(), strict=False)
+    if network.num_addresses == 1:
+        get_limiter().unblock(DDOS_SCOPE, str(network.network_address))
+    network = str(network)
+    _mirror.discard(network)
+    _broadcast(network, 0)
+    return network
+
+
+def clear_local_mirror() -> None:
+    _mirror.clear()
@@ -2,20 +2,22 @@
 DDoS Protection Middleware
 
 This middleware implements multiple layers of DDoS protection:
-1. IP-based rate limiting using Redis with burst allowance
+1. IP-based rate limiting using Redis with burst allowance (api/rate_limiter.py)
 2. Higher limits for authenticated users
 3. Request pattern analysis
 4. Automatic IP blocking for suspicious behavior
 5. Whitelist/blacklist management
 """
 
-import time
-import hashlib
 from django.core.cache import cache
 from django.http import JsonResponse
 from django.conf import settings
 import logging
 
+from . import ddos_blocklist
+from .ddos_blocklist import NetworkSet, parse_ip
+from .rate_limiter import Rate, RatePolicy, apply_headers, get_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -40,18 +42,22 @@ class DDoSProtectionMiddleware:
         self.BLOCK_DURATION = getattr(settings, 'DDOS_BLOCK_DURATION', 1800)  # 30 min
         self.SUSPICIOUS_THRESHOLD = getattr(settings, 'DDOS_SUSPICIOUS_THRESHOLD', 100)
         
-        # Burst allowance - allow short spikes without blocking
+        # Burst allowance - extra requests on top of the per-minute limit, refilled at the steady rate
         self.BURST_ALLOWANCE = getattr(settings, 'DDOS_BURST_ALLOWANCE', 30)
-        self.BURST_WINDOW = getattr(settings, 'DDOS_BURST_WINDOW', 10)  # seconds
         
         # Authenticated users get higher limits (2x)
         self.AUTH_MULTIPLIER = 2.0
         
-        # Whitelist (e.g., your own IPs, trusted services)
+        # Whitelist (e.g., your own IPs, trusted services); addresses or CIDR ranges
         self.WHITELIST = getattr(settings, 'DDOS_WHITELIST', [
             '127.0.0.1',
             'localhost',
         ])
+        self.whitelist = NetworkSet(self.WHITELIST)
+        
+        # Addresses or CIDR ranges that are always rejected
+        self.BLOCKLIST = getattr(settings, 'DDOS_BLOCKLIST', [])
+        self.blocklist = NetworkSet(self.BLOCKLIST)
         
         # Patterns that indicate DDoS attempts
         self.SUSPICIOUS_PATTERNS = [
@@ -81,35 +87,53 @@ class DDoSProtectionMiddleware:
         # Get client IP
         ip = self.get_client_ip(request)
         
+        # Parsed once for the whitelist, the blocklist and the mirror (names such as 'localhost' stay strings)
+        client = parse_ip(ip) or ip
+        
         # Check if IP is whitelisted
-        if ip in self.WHITELIST:
+        if client in self.whitelist:
             return self.get_response(request)
         
-        # Check if IP is blocked
-        if self.is_blocked(ip):
-            logger.warning(f"Blocked request from {ip} - IP is temporarily blocked")
-            return JsonResponse({
+        if client in self.blocklist:
+            return JsonResponse({'error': 'Access denied.'}, status=403)
+        
+        # Blocks mirrored in this worker (api/ddos_blocklist.py): rejected without a Redis round trip.
+        # Not logged per request, the block itself was.
+        remaining = ddos_blocklist.blocked_for(client)
+        if remaining:
+            response = JsonResponse({
                 'error': 'Too many requests. Your IP has been temporarily blocked.',
-                'retry_after': self.get_block_remaining_time(ip)
+                'retry_after': remaining
             }, status=429)
+            response['Retry-After'] = str(remaining)
+            return response
         
         # Determine if user is authenticated and get appropriate limits
         is_authenticated = hasattr(request, 'user') and request.user.is_authenticated
-        limits = self.get_limits_for_request(request, is_authenticated)
+        policy = self.get_limits_for_request(request, is_authenticated)
         
-        # Check rate limits with burst allowance
-        rate_check = self.check_rate_limit_with_burst(ip, limits, is_authenticated)
-        if not rate_check['allowed']:
-            if rate_check['should_block']:
+        # Block check, minute/burst and hour limits and blocking in one atomic step (api/rate_limiter.py)
+        try:
+            decision = get_limiter().check(ip, policy)
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request from {ip}: {e}")
+            return self.get_response(request)
+        if not decision.allowed:
+            if decision.blocked_now:
                 logger.warning(f"Rate limit exceeded for IP: {ip} - blocking")
-                self.block_ip(ip)
-            else:
-                logger.info(f"Rate limit soft exceeded for IP: {ip} - warning")
+                self.mirror_block(ip, decision.retry_after)
+                return apply_headers(JsonResponse({
+                    'error': 'Rate limit exceeded. Please try again later.',
+                    'retry_after': decision.retry_after
+                }, status=429), decision)
             
-            return JsonResponse({
-                'error': 'Rate limit exceeded. Please try again later.',
-                'retry_after': rate_check['retry_after']
-            }, status=429)
+            logger.warning(f"Blocked request from {ip} - IP is temporarily blocked")
+            # Blocked before this worker subscribed (or while its listener was down)
+            self.mirror_block(ip, decision.retry_after, broadcast=False)
+            return apply_headers(JsonResponse({
+                'error': 'Too many requests. Your IP has been temporarily blocked.',
+                'retry_after': decision.retry_after
+            }, status=429), decision)
         
         # Check for suspicious patterns
         if self.is_suspicious_request(request):
@@ -126,10 +150,13 @@ class DDoSProtectionMiddleware:
         # Process the request
         response = self.get_response(request)
         
+        # A view's own @rate_limit headers are more specific than the per-IP ones
+        if 'RateLimit-Limit' not in response:
+            apply_headers(response, decision)
         return response
     
     def get_limits_for_request(self, request, is_authenticated):
-        """Get rate limits based on endpoint type and authentication status."""
+        """Get the per-IP rate policy based on endpoint type and authentication status."""
         path = request.path
         
         # Base limits
@@ -148,66 +175,13 @@ class DDoSProtectionMiddleware:
             per_minute = int(per_minute * self.AUTH_MULTIPLIER)
             per_hour = int(per_hour * self.AUTH_MULTIPLIER)
         
-        return {
-            'per_minute': per_minute,
-            'per_hour': per_hour
-        }
-    
-    def check_rate_limit_with_burst(self, ip, limits, is_authenticated):
-        """Check rate limits with burst allowance."""
-        now = int(time.time())
-        
-        # Per-minute check
-        minute_key = f'ddos:minute:{ip}:{now // 60}'
-        minute_count = cache.get(minute_key, 0)
-        
-        # Per-hour check
-        hour_key = f'ddos:hour:{ip}:{now // 3600}'
-        hour_count = cache.get(hour_key, 0)
-        
-        # Burst tracking - allow short spikes
-        burst_key = f'ddos:burst:{ip}'
-        burst_data = cache.get(burst_key, {'count': 0, 'start': now})
-        
-        # Reset burst if window expired
-        if now - burst_data['start'] > self.BURST_WINDOW:
-            burst_data = {'count': 0, 'start': now}
-        
-        # Calculate effective limits with burst allowance
-        effective_minute_limit = limits['per_minute'] + self.BURST_ALLOWANCE
-        
-        # Check if within burst allowance
-        in_burst = minute_count >= limits['per_minute'] and minute_count < effective_minute_limit
-        
-        if minute_count >= effective_minute_limit:
-            # Hard limit exceeded - block
-            return {
-                'allowed': False,
-                'should_block': True,
-                'retry_after': 60 - (now % 60)
-            }
-        
-        if hour_count >= limits['per_hour']:
-            return {
-                'allowed': False,
-                'should_block': True,
-                'retry_after': 3600 - (now % 3600)
-            }
-        
-        # Increment counters
-        cache.set(minute_key, minute_count + 1, 60)
-        cache.set(hour_key, hour_count + 1, 3600)
-        
-        # Track burst usage
-        if in_burst:
-            burst_data['count'] += 1
-            cache.set(burst_key, burst_data, self.BURST_WINDOW)
-        
-        return {
-            'allowed': True,
-            'should_block': False,
-            'retry_after': 0
-        }
+        return RatePolicy(
+            name='ddos',
+            rates=(Rate(per_minute, 60, burst=self.BURST_ALLOWANCE), Rate(per_hour, 3600)),
+            strategy='token_bucket',
+            block_duration=self.BLOCK_DURATION,
+            scope=ddos_blocklist.DDOS_SCOPE,
+        )
     
     def get_client_ip(self, request):
         """Extract the client's IP address from the request."""
@@ -244,38 +218,25 @@ class DDoSProtectionMiddleware:
     
     def block_ip(self, ip):
         """Block an IP address for a specified duration."""
-        key = f'ddos:blocked:{ip}'
-        cache.set(key, int(time.time()), self.BLOCK_DURATION)
+        get_limiter().block(ddos_blocklist.DDOS_SCOPE, ip, self.BLOCK_DURATION)
+        self.mirror_block(ip, self.BLOCK_DURATION)
         logger.error(f"IP {ip} has been blocked for {self.BLOCK_DURATION} seconds")
     
+    def mirror_block(self, ip, duration, broadcast=True):
+        """Add a block to the in-process mirror of every worker (of this one only without `broadcast`)."""
+        try:
+            ddos_blocklist.block(ip, duration, broadcast=broadcast)
+        except ValueError:
+            # Not an IP address (e.g. a malformed X-Forwarded-For); the limiter's flag still applies
+            pass
+    
     def is_blocked(self, ip):
-        """Check if an IP is currently blocked."""
-        key = f'ddos:blocked:{ip}'
-        blocked_time = cache.get(key)
-        
-        if blocked_time is None:
-            return False
-        
-        # Check if block has expired
-        elapsed = int(time.time()) - blocked_time
-        if elapsed >= self.BLOCK_DURATION:
-            cache.delete(key)
-            return False
-        
-        return True
+        """Check if an IP is currently blocked (the rate check does this itself)."""
+        return ddos_blocklist.blocked_for(ip) > 0 or self.get_block_remaining_time(ip) > 0
     
     def get_block_remaining_time(self, ip):
         """Get the remaining time for a blocked IP."""
-        key = f'ddos:blocked:{ip}'
-        blocked_time = cache.get(key)
-        
-        if blocked_time is None:
-            return 0
-        
-        elapsed = int(time.time()) - blocked_time
-        remaining = self.BLOCK_DURATION - elapsed
-        
-        return max(0, remaining)
+        return get_limiter().block_remaining(ddos_blocklist.DDOS_SCOPE, ip)
 
 
 class RequestLoggingMiddleware:
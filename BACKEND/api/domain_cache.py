@@ -0,0 +1,310 @@
+"""Two-tier cache for custom-domain and site-identifier resolution.
+
+`resolve_domain` is hit by the Cloudflare worker on every request to a custom
+domain, and PublicSiteView falls back to domain lookups for proxied sites.
+Resolutions are kept in an in-process LRU in front of the shared cache
+(Redis), and unknown names are cached negatively so scanners cannot hammer the
+database. DomainOrder and Site saves invalidate both tiers; other web workers
+drop their LRU entries through a Redis pub/sub channel. The LRU entries also
+expire after DOMAIN_CACHE_LOCAL_TTL, which bounds staleness while a worker is
+not subscribed (e.g. Redis is restarting).
+
+The worker keeps its own copy of each resolution in Workers KV; hosts whose
+target, proxy mode or status change are evicted there through the worker's
+signed purge endpoint (`purge_worker_domain_config` task).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SITE_DOMAIN_SUFFIX = '.youreasysite.pl'
+INVALIDATION_CHANNEL = 'domain-cache:invalidate'
+
+_HOST_KEY = 'domain:resolve:host:{name}'
+_IDENTIFIER_KEY = 'domain:resolve:identifier:{name}'
+_MISSING = 'missing'
+
+
+@dataclass(frozen=True)
+class DomainResolution:
+    """Where a custom domain points (resolve_domain payload)."""
+    domain: str
+    target: Optional[str]
+    proxy_mode: bool
+    site_id: Optional[int]
+    site_name: Optional[str]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_host(hostname: str) -> str:
+    return (hostname or '').strip().lower().rstrip('.')
+
+
+class _LocalLRU:
+    """Thread-safe LRU with per-entry expiry (first tier, one per process)."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        ttl = min(ttl, _setting('DOMAIN_CACHE_LOCAL_TTL', 30))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > _setting('DOMAIN_CACHE_LOCAL_SIZE', 10000):
+                self._entries.popitem(last=False)
+
+    def discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LocalLRU()
+
+
+# ---------------------------------------------------------------------------
+# Cross-worker invalidation (Redis pub/sub)
+# ---------------------------------------------------------------------------
+
+_listener_lock = threading.Lock()
+_listener_state = {'thread': None, 'retry_at': 0.0}
+
+
+def _pubsub_client():
+    url = _setting('DOMAIN_CACHE_PUBSUB_URL', '')
+    if not url:
+        return None
+    import redis
+    return redis.Redis.from_url(url, socket_connect_timeout=1)
+
+
+def _handle_invalidation(message) -> None:
+    try:
+        keys = json.loads(message['data'])
+    except (KeyError, TypeError, ValueError):
+        return
+    _local.discard(keys)
+
+
+def _ensure_listener() -> None:
+    """Subscribe this process to invalidations (lazily, so it happens after the server forks)."""
+    thread = _listener_state['thread']
+    if (thread is not None and thread.is_alive()) or time.monotonic() < _listener_state['retry_at']:
+        return
+    with _listener_lock:
+        thread = _listener_state['thread']
+        if (thread is not None and thread.is_alive()) or time.monotonic() < _listener_state['retry_at']:
+            return
+        try:
+            client = _pubsub_client()
+            if client is None:
+                return
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation})
+            _listener_state['thread'] = pubsub.run_in_thread(
+                sleep_time=1,
+                daemon=True,
+                exception_handler=_listener_failed,
+            )
+        except Exception as e:
+            _listener_failed(e)
+
+
+def _listener_failed(exc, pubsub=None, thread=None) -> None:
+    logger.warning(f"Domain cache invalidation listener unavailable, relying on local TTL: {exc}")
+    # Entries received nothing while disconnected; do not trust them past this point
+    _local.clear()
+    _listener_state['retry_at'] = time.monotonic() + 30
+    if thread is not None:
+        thread.stop()
+        pubsub.close()
+
+
+def _publish(keys) -> None:
+    try:
+        client = _pubsub_client()
+        if client is not None:
+            client.publish(INVALIDATION_CHANNEL, json.dumps(sorted(keys)))
+    except Exception as e:
+        logger.warning(f"Could not broadcast domain cache invalidation: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+
+def _cached(key: str, load, serialize, deserialize):
+    """LRU -> shared cache -> `load()`; a `None` result is cached negatively."""
+    _ensure_listener()
+    value = _local.get(key)
+    if value is not None:
+        return None if value == _MISSING else value
+
+    try:
+        stored = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Domain cache unavailable: {e}")
+        stored = None
+
+    if stored is not None:
+        value = _MISSING if stored == _MISSING else deserialize(stored)
+        ttl = _setting('DOMAIN_CACHE_NEGATIVE_TTL', 60) if value == _MISSING else _setting('DOMAIN_CACHE_TTL', 3600)
+    else:
+        loaded = load()
+        value = _MISSING if loaded is None else loaded
+        ttl = _setting('DOMAIN_CACHE_NEGATIVE_TTL', 60) if loaded is None else _setting('DOMAIN_CACHE_TTL', 3600)
+        try:
+            cache.set(key, _MISSING if loaded is None else serialize(loaded), timeout=ttl)
+        except Exception as e:
+            logger.warning(f"Could not store domain resolution for {key}: {e}")
+
+    _local.set(key, value, ttl)
+    return None if value == _MISSING else value
+
+
+def _load_host(hostname: str) -> Optional[DomainResolution]:
+    from .models import DomainOrder
+
+    domain_order = DomainOrder.objects.filter(
+        domain_name=hostname,
+        status=DomainOrder.OrderStatus.ACTIVE
+    ).select_related('site').first()
+    if domain_order is None:
+        return None
+
+    site = domain_order.site
+    target = domain_order.target
+    if not target and site is not None:
+        # Default to site subdomain
+        target = f"{site.identifier}{SITE_DOMAIN_SUFFIX}"
+    return DomainResolution(
+        domain=hostname,
+        target=target,
+        proxy_mode=domain_order.proxy_mode,
+        site_id=site.id if site else None,
+        site_name=site.name if site else None,
+    )
+
+
+def _site_id_from_target(target: Optional[str]) -> Optional[int]:
+    from .models import Site
+
+    if not target:
+        return None
+    # e.g. "https://1-pokazowa.youreasysite.pl/" -> "1-pokazowa"
+    target = target.replace('https://', '').replace('http://', '').rstrip('/')
+    if not target.endswith(SITE_DOMAIN_SUFFIX):
+        return None
+    return Site.objects.filter(identifier=target[:-len(SITE_DOMAIN_SUFFIX)]).values_list('id', flat=True).first()
+
+
+def _load_identifier(identifier: str) -> Optional[int]:
+    """Site id for a site identifier, or for a custom domain proxied to a site."""
+    from .models import Site
+
+    site_id = Site.objects.filter(identifier=identifier).values_list('id', flat=True).first()
+    if site_id is not None:
+        return site_id
+
+    resolution = resolve_host(identifier)
+    if resolution is None:
+        return None
+    return resolution.site_id or _site_id_from_target(resolution.target)
+
+
+def resolve_host(hostname: str) -> Optional[DomainResolution]:
+    """Resolution of an active custom domain, or None when the domain is unknown."""
+    hostname = normalize_host(hostname)
+    return _cached(
+        _HOST_KEY.format(name=hostname),
+        lambda: _load_host(hostname),
+        asdict,
+        lambda data: DomainResolution(**data),
+    )
+
+
+def resolve_site_id(identifier: str) -> Optional[int]:
+    """Site id behind a public site identifier (site identifier or custom domain)."""
+    return _cached(
+        _IDENTIFIER_KEY.format(name=identifier),
+        lambda: _load_identifier(identifier),
+        lambda site_id: site_id,
+        lambda site_id: site_id,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+def invalidate(*, hosts: Iterable[str] = (), identifiers: Iterable[str] = ()) -> None:
+    """Drop resolutions from the shared cache and from every worker's LRU."""
+    keys = {_HOST_KEY.format(name=normalize_host(host)) for host in hosts if host}
+    keys |= {_IDENTIFIER_KEY.format(name=identifier) for identifier in identifiers if identifier}
+    # A custom domain is also a valid public identifier (PublicSiteView fallback)
+    keys |= {_IDENTIFIER_KEY.format(name=normalize_host(host)) for host in hosts if host}
+    if not keys:
+        return
+    _local.discard(keys)
+    try:
+        cache.delete_many(list(keys))
+    except Exception as e:
+        logger.warning(f"Could not drop domain resolutions {sorted(keys)}: {e}")
+    _publish(keys)
+
+
+def clear_local_cache() -> None:
+    _local.clear()
+
+
+# ---------------------------------------------------------------------------
+# Cloudflare worker purge
+# ---------------------------------------------------------------------------
+
+def sign_worker_purge(body: bytes, secret: str) -> str:
+    """Hex HMAC-SHA256 of the raw request body (`X-Purge-Signature`, checked by the worker)."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def worker_purge_body(hostnames: Iterable[str], timestamp: Optional[float] = None) -> bytes:
+    """Purge request body; the worker rejects timestamps more than five minutes off."""
+    payload = {
+        'hostnames': sorted({normalize_host(host) for host in hostnames if host}),
+        'timestamp': int(time.time() if timestamp is None else timestamp),
+    }
+    return json.dumps(payload, separators=(',', ':')).encode()
@@ -0,0 +1,209 @@
+"""Minimal RFC 6902 JSON Patch: diffing two JSON documents and applying patches.
+
+Used to store AI undo checkpoints and site versions as deltas
+(api.checkpoints, api.site_versions) and for incremental template_config
+edits (api.site_config), which also accept RFC 7396 merge patches. Documents are
+plain JSON values (dict / list / str / int / float / bool / None); patches are
+lists of operation dicts such as `{"op": "replace", "path": "/a/0", "value": 1}`.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, List
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch is malformed or cannot be applied to the document."""
+
+
+def escape_token(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape_token(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    if pointer == '':
+        return []
+    if not isinstance(pointer, str) or not pointer.startswith('/'):
+        raise JsonPatchError(f'Invalid JSON pointer: {pointer!r}')
+    return [unescape_token(token) for token in pointer[1:].split('/')]
+
+
+def _pointer(tokens) -> str:
+    return ''.join(f'/{escape_token(token)}' for token in tokens)
+
+
+# ---------------------------------------------------------------------------
+# Diff
+# ---------------------------------------------------------------------------
+
+def _same(a, b) -> bool:
+    # 1 == True and 1 == 1.0 in Python, but they are different JSON values
+    return type(a) is type(b) and a == b
+
+
+def _diff(src, dst, path, ops) -> None:
+    if _same(src, dst):
+        return
+    if isinstance(src, dict) and isinstance(dst, dict):
+        for key in src:
+            if key not in dst:
+                ops.append({'op': 'remove', 'path': _pointer(path + [key])})
+        for key, value in dst.items():
+            if key in src:
+                _diff(src[key], value, path + [key], ops)
+            else:
+                ops.append({'op': 'add', 'path': _pointer(path + [key]), 'value': copy.deepcopy(value)})
+        return
+    if isinstance(src, list) and isinstance(dst, list):
+        common = min(len(src), len(dst))
+        for index in range(common):
+            _diff(src[index], dst[index], path + [index], ops)
+        # Remove from the end so earlier indexes stay valid
+        for index in range(len(src) - 1, common - 1, -1):
+            ops.append({'op': 'remove', 'path': _pointer(path + [index])})
+        for index in range(common, len(dst)):
+            ops.append({'op': 'add', 'path': _pointer(path + ['-']), 'value': copy.deepcopy(dst[index])})
+        return
+    ops.append({'op': 'replace', 'path': _pointer(path), 'value': copy.deepcopy(dst)})
+
+
+def make_patch(src: Any, dst: Any) -> List[dict]:
+    """Operations turning `src` into `dst` (add / remove / replace only)."""
+    ops: List[dict] = []
+    _diff(src, dst, [], ops)
+    return ops
+
+
+# ---------------------------------------------------------------------------
+# Apply
+# ---------------------------------------------------------------------------
+
+def _list_index(container: list, token: str, *, allow_end: bool) -> int:
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f'Invalid array index: {token!r}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f'Array index out of range: {index}')
+    return index
+
+
+def _resolve(doc, tokens):
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise JsonPatchError(f'Path not found: {_pointer(tokens)}')
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_list_index(doc, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f'Path not found: {_pointer(tokens)}')
+    return doc
+
+
+def _add(doc, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f'Cannot add to {_pointer(tokens)}')
+    return doc
+
+
+def _remove(doc, tokens):
+    if not tokens:
+        raise JsonPatchError('Cannot remove the document root')
+    parent = _resolve(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f'Path not found: {_pointer(tokens)}')
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_list_index(parent, key, allow_end=False))
+    raise JsonPatchError(f'Path not found: {_pointer(tokens)}')
+
+
+def apply_patch(doc: Any, patch: List[dict], *, in_place: bool = False) -> Any:
+    """Return `doc` with `patch` applied; the input is left untouched unless `in_place`."""
+    if not isinstance(patch, list):
+        raise JsonPatchError('A JSON patch must be a list of operations')
+    if not in_place:
+        doc = copy.deepcopy(doc)
+
+    for operation in patch:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f'Invalid operation: {operation!r}')
+        op = operation['op']
+        tokens = parse_pointer(operation['path'])
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f'Operation {op!r} requires a value')
+
+        if op == 'add':
+            doc = _add(doc, tokens, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            _remove(doc, tokens)
+        elif op == 'replace':
+            _resolve(doc, tokens)
+            if not tokens:
+                doc = copy.deepcopy(operation['value'])
+            else:
+                _remove(doc, tokens)
+                doc = _add(doc, tokens, copy.deepcopy(operation['value']))
+        elif op in ('move', 'copy'):
+            if 'from' not in operation:
+                raise JsonPatchError(f'Operation {op!r} requires "from"')
+            source = parse_pointer(operation['from'])
+            if op == 'move':
+                if tokens[:len(source)] == source and tokens != source:
+                    raise JsonPatchError('Cannot move a value into one of its children')
+                value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_resolve(doc, source))
+            doc = _add(doc, tokens, value)
+        elif op == 'test':
+            if not _equal(_resolve(doc, tokens), operation['value']):
+                raise JsonPatchError(f'Test failed at {operation["path"]}')
+        else:
+            raise JsonPatchError(f'Unknown operation: {op!r}')
+    return doc
+
+
+def _equal(a, b) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_equal(a[key], b[key]) for key in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+def _merge(target, patch):
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = _merge(target.get(key), value)
+    return target
+
+
+def apply_merge_patch(doc: Any, patch: Any) -> Any:
+    """Return `doc` with an RFC 7396 merge patch applied (`null` deletes a key); the input is left untouched."""
+    return _merge(copy.deepcopy(doc), patch)
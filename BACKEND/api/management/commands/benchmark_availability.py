@@ -0,0 +1,191 @@
+# api/management/commands/benchmark_availability.py
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.models import AvailabilityBlock, Booking, Event, Site, TeamMember
+from api.signals import suppress_signal_logging
+from api.slot_engine import compute_site_slots, get_assignee_info
+
+User = get_user_model()
+
+
+def legacy_slots(site, start_date, end_date):
+    """Pre-engine PublicAvailabilityView algorithm, kept as the benchmark baseline."""
+    existing_events = list(
+        Event.objects.filter(
+            site=site,
+            start_time__date__gte=start_date,
+            start_time__date__lte=end_date
+        ).select_related('site', 'site__owner', 'creator').prefetch_related('bookings', 'bookings__client')
+    )
+    availability_blocks = list(
+        AvailabilityBlock.objects.filter(
+            site=site,
+            date__gte=start_date,
+            date__lte=end_date
+        ).select_related('site', 'site__owner', 'creator')
+    )
+
+    booked_slots = {e.start_time for e in existing_events if e.bookings.count() >= e.capacity}
+    slot_map = {}
+    tz = timezone.get_current_timezone()
+
+    for block in availability_blocks:
+        meeting_length = block.meeting_length
+        current_time = timezone.make_aware(datetime.combine(block.date, block.start_time), tz)
+        end_time = timezone.make_aware(datetime.combine(block.date, block.end_time), tz)
+        assignee_info = get_assignee_info(block)
+        while current_time + timedelta(minutes=meeting_length) <= end_time:
+            slot_start = current_time
+            slot_end = slot_start + timedelta(minutes=meeting_length)
+            slot_key = f"{slot_start.isoformat()}|{assignee_info['type']}:{assignee_info['id']}"
+            matching_event = next(
+                (e for e in existing_events if e.start_time == slot_start and e.end_time == slot_end),
+                None
+            )
+            if slot_start not in booked_slots:
+                is_conflicting = any(
+                    (e.start_time < slot_end and e.end_time > slot_start)
+                    for e in existing_events if e.bookings.count() >= e.capacity
+                )
+                if not is_conflicting and slot_key not in slot_map:
+                    slot_map[slot_key] = {
+                        'start': slot_start.isoformat(),
+                        'event_id': matching_event.id if matching_event else None,
+                    }
+            current_time += timedelta(minutes=block.time_snapping)
+
+    for event in existing_events:
+        if event.capacity - event.bookings.count() <= 0:
+            continue
+        info = get_assignee_info(event)
+        slot_map.setdefault(
+            f"{event.start_time.isoformat()}|{info['type']}:{info['id']}",
+            {'start': event.start_time.isoformat(), 'event_id': event.id},
+        )
+
+    return sorted(slot_map.values(), key=lambda x: x['start'])
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks public availability slot computation (legacy scan vs interval engine) '
+        'on a synthetic multi-assignee site. All seeded data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Number of days in the calendar window')
+        parser.add_argument('--assignees', type=int, default=10, help='Owner plus team members with availability')
+        parser.add_argument('--events-per-day', type=int, default=2, help='Booked sessions per assignee per day')
+        parser.add_argument('--runs', type=int, default=3, help='Timed runs per implementation (best is reported)')
+        parser.add_argument('--skip-legacy', action='store_true', help='Only time the interval engine')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        assignees = max(options['assignees'], 1)
+
+        with transaction.atomic(), suppress_signal_logging():
+            site = self._seed(days, assignees, options['events_per_day'])
+            start_date = timezone.localdate() + timedelta(days=1)
+            end_date = start_date + timedelta(days=days - 1)
+
+            self.stdout.write(
+                f"Seeded site {site.id}: {days} days, {assignees} assignees, "
+                f"{Event.objects.filter(site=site).count()} events, "
+                f"{AvailabilityBlock.objects.filter(site=site).count()} availability blocks"
+            )
+
+            engine_time, engine_queries, slots = self._measure(
+                compute_site_slots, site, start_date, end_date, options['runs']
+            )
+            self.stdout.write(
+                f"engine: {engine_time * 1000:.1f} ms, {engine_queries} queries, {len(slots)} slots"
+            )
+
+            if not options['skip_legacy']:
+                legacy_time, legacy_queries, legacy = self._measure(
+                    legacy_slots, site, start_date, end_date, 1
+                )
+                self.stdout.write(
+                    f"legacy: {legacy_time * 1000:.1f} ms, {legacy_queries} queries, {len(legacy)} slots"
+                )
+                self.stdout.write(self.style.SUCCESS(f"speedup: {legacy_time / engine_time:.1f}x"))
+
+            transaction.set_rollback(True)
+
+    def _measure(self, func, site, start_date, end_date, runs):
+        best = None
+        for _ in range(max(runs, 1)):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                result = func(site, start_date, end_date)
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(ctx.captured_queries), result
+
+    def _seed(self, days, assignees, events_per_day):
+        owner = User.objects.create_user(
+            email=f'benchmark-{int(time.time() * 1000)}@example.com',
+            first_name='Benchmark',
+            last_name='Owner',
+        )
+        site = Site.objects.create(owner=owner, name='Availability Benchmark', is_mock=True)
+        members = TeamMember.objects.bulk_create([
+            TeamMember(
+                site=site,
+                name=f'Instructor {index}',
+                invitation_status=TeamMember.InvitationStatus.MOCK,
+            )
+            for index in range(1, assignees)
+        ])
+        hosts = [{'assigned_to_owner': owner}] + [{'assigned_to_team_member': m} for m in members]
+
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localdate() + timedelta(days=1)
+        blocks = []
+        events = []
+        for day_offset in range(days):
+            day = first_day + timedelta(days=day_offset)
+            for host_index, host in enumerate(hosts):
+                blocks.append(AvailabilityBlock(
+                    site=site,
+                    creator=owner,
+                    date=day,
+                    start_time=dt_time(8, 0),
+                    end_time=dt_time(16, 0),
+                    meeting_length=60,
+                    time_snapping=30,
+                    **host,
+                ))
+                for session in range(events_per_day):
+                    start = timezone.make_aware(
+                        datetime.combine(day, dt_time(8 + (host_index + session * 3) % 8, 0)), tz
+                    )
+                    events.append(Event(
+                        site=site,
+                        creator=owner,
+                        title=f'Session {session}',
+                        start_time=start,
+                        end_time=start + timedelta(hours=1),
+                        capacity=1 if session % 2 == 0 else 4,
+                        booked_count=1,
+                        event_type='individual' if session % 2 == 0 else 'group',
+                        **host,
+                    ))
+
+        AvailabilityBlock.objects.bulk_create(blocks, batch_size=1000)
+        events = Event.objects.bulk_create(events, batch_size=1000)
+        Booking.objects.bulk_create(
+            [
+                Booking(site=site, event=event, guest_email=f'guest{event.pk}@example.com', guest_name='Guest')
+                for event in events
+            ],
+            batch_size=1000,
+        )
+        return site
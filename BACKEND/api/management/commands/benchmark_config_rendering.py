@@ -0,0 +1,108 @@
+# api/management/commands/benchmark_config_rendering.py
+import json
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api import renderers
+from api.models import Site
+from api.renderers import FastJSONRenderer
+from api.signals import suppress_signal_logging
+from api.views import SiteViewSet
+
+User = get_user_model()
+
+TEMPLATE_PATH = Path(__file__).resolve().parent / 'YourEasySite_Demo.json'
+
+# mode -> (renderer, read template_config as raw text)
+MODES = {
+    'legacy': (JSONRenderer, False),
+    'fast': (FastJSONRenderer, False),
+    'raw': (FastJSONRenderer, True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures CPU time and peak Python memory of GET /api/v1/sites/<id>/ for a large '
+        'template_config: DRF JSONRenderer (legacy), FastJSONRenderer on the decoded dict (fast) '
+        'and FastJSONRenderer with the config passed through as raw JSON text (raw). '
+        'All seeded data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, nargs='+', default=[1, 5],
+                            help='template_config sizes to test, in MiB of JSON')
+        parser.add_argument('--runs', type=int, default=5, help='Requests per size and mode (median CPU is reported)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        encoder = 'orjson' if renderers.orjson is not None else 'stdlib json (orjson not installed)'
+        self.stdout.write(f"FastJSONRenderer backend: {encoder}")
+
+        overrides = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        with overrides, transaction.atomic(), suppress_signal_logging():
+            for size_mb in options['size_mb']:
+                site = self._seed(size_mb)
+                content_size = len(json.dumps(site.template_config).encode())
+                self.stdout.write(f"\ntemplate_config = {content_size / 1024 / 1024:.2f} MiB of JSON")
+
+                for mode in MODES:
+                    cpu_times = []
+                    for _ in range(max(options['runs'], 1)):
+                        started = time.process_time()
+                        status_code, body_size = self._retrieve(factory, site, mode)
+                        cpu_times.append(time.process_time() - started)
+                    tracemalloc.start()
+                    self._retrieve(factory, site, mode)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+
+                    cpu_times.sort()
+                    self.stdout.write(
+                        f"{mode:7} HTTP {status_code}: {cpu_times[len(cpu_times) // 2] * 1000:7.1f} ms CPU, "
+                        f"{peak / 1024 / 1024:7.1f} MiB peak, {body_size / 1024 / 1024:.2f} MiB body"
+                    )
+
+            transaction.set_rollback(True)
+
+    def _seed(self, size_mb):
+        owner = User.objects.create_user(
+            email=f'benchmark-{int(time.time() * 1000)}@example.com',
+            first_name='Benchmark',
+            last_name='Owner',
+        )
+        template = json.loads(TEMPLATE_PATH.read_text(encoding='utf-8'))
+        pages = template.get('site', {}).get('pages') or template.get('pages') or [template]
+        page_size = len(json.dumps(pages).encode())
+        copies = max(int(size_mb * 1024 * 1024 / max(page_size, 1)), 1)
+        return Site.objects.create(
+            owner=owner,
+            name='Config Rendering Benchmark',
+            is_mock=True,
+            template_config=dict(template, pages=pages * copies),
+        )
+
+    def _retrieve(self, factory, site, mode):
+        renderer, raw = MODES[mode]
+        request = factory.get(f'/api/v1/sites/{site.id}/')
+        force_authenticate(request, user=site.owner)
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.object(SiteViewSet, 'renderer_classes', [renderer]))
+            if not raw:
+                stack.enter_context(mock.patch.object(SiteViewSet, 'raw_content_actions', set()))
+                stack.enter_context(mock.patch.object(SiteViewSet, 'content_actions', {'retrieve'}))
+            response = SiteViewSet.as_view({'get': 'retrieve'})(request, pk=site.id)
+            response.render()
+        return response.status_code, len(response.content)
@@ -0,0 +1,112 @@
+# api/management/commands/benchmark_ddos_limiter.py
+import statistics
+import time
+
+from django.core.cache import cache, caches
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from api.rate_limiter import Rate, RatePolicy, get_limiter
+from api import ddos_blocklist
+from api.ddos_middleware import DDoSProtectionMiddleware
+
+
+def _legacy_check(ip, per_minute=10 ** 6, per_hour=10 ** 6, burst_allowance=30, burst_window=10):
+    """The previous middleware path: block get, three gets and up to three sets, not atomic."""
+    now = int(time.time())
+    if cache.get(f'ddos:blocked:{ip}') is not None:
+        return False
+    minute_key = f'ddos:minute:{ip}:{now // 60}'
+    hour_key = f'ddos:hour:{ip}:{now // 3600}'
+    burst_key = f'ddos:burst:{ip}'
+    minute_count = cache.get(minute_key, 0)
+    hour_count = cache.get(hour_key, 0)
+    burst_data = cache.get(burst_key, {'count': 0, 'start': now})
+    if now - burst_data['start'] > burst_window:
+        burst_data = {'count': 0, 'start': now}
+    if minute_count >= per_minute + burst_allowance or hour_count >= per_hour:
+        return False
+    cache.set(minute_key, minute_count + 1, 60)
+    cache.set(hour_key, hour_count + 1, 3600)
+    if per_minute <= minute_count:
+        burst_data['count'] += 1
+        cache.set(burst_key, burst_data, burst_window)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the latency DDoSProtectionMiddleware adds per request: the previous get/set '
+        'sequence (legacy) against the single atomic token-bucket step (script), plus the '
+        'sliding-window strategy used by the @rate_limit decorators (window) and a request from an '
+        'IP held in the in-process blocklist mirror (blocked). Uses the configured '
+        'cache, or a Redis server given with --redis-url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per mode')
+        parser.add_argument('--ips', type=int, default=500, help='Distinct client IPs to rotate through')
+        parser.add_argument('--redis-url', default='', help='e.g. redis://127.0.0.1:6379/15 (default: settings.CACHES)')
+
+    def handle(self, *args, **options):
+        redis_caches = None
+        if options['redis_url']:
+            redis_caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': options['redis_url']}}
+        overrides = {
+            'DDOS_REQUESTS_PER_MINUTE': 10 ** 6,
+            'DDOS_REQUESTS_PER_HOUR': 10 ** 6,
+            'DDOS_WHITELIST': [],
+            'DDOS_BLOCKLIST_PUBSUB_URL': '',
+        }
+        if redis_caches:
+            overrides['CACHES'] = redis_caches
+
+        with override_settings(**overrides):
+            self.stdout.write(f"Cache backend: {caches['default'].__class__.__name__}, limiter: {'Redis script/pipeline' if get_limiter().redis else 'cache API'}")
+            factory = RequestFactory()
+            requests = [
+                factory.get('/api/v1/public-sites/', REMOTE_ADDR=f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}')
+                for index in range(max(options['ips'], 1))
+            ]
+            middleware = DDoSProtectionMiddleware(lambda request: HttpResponse())
+
+            def legacy(request):
+                _legacy_check(middleware.get_client_ip(request))
+                return HttpResponse()
+
+            window_policy = RatePolicy(name='benchmark', rates=(Rate(10 ** 6, 60),), strategy='sliding_window')
+
+            def window(request):
+                get_limiter().check(middleware.get_client_ip(request), window_policy)
+                return HttpResponse()
+
+            modes = {
+                'baseline': lambda request: HttpResponse(),
+                'legacy': legacy,
+                'script': middleware,
+                'window': window,
+                'blocked': middleware,
+            }
+            timings = {}
+            for mode, handler in modes.items():
+                if mode == 'blocked':
+                    for request in requests:
+                        ddos_blocklist.block(middleware.get_client_ip(request), 3600, broadcast=False)
+                samples = []
+                for index in range(max(options['requests'], 1)):
+                    request = requests[index % len(requests)]
+                    started = time.perf_counter()
+                    handler(request)
+                    samples.append(time.perf_counter() - started)
+                samples.sort()
+                timings[mode] = samples
+                self.stdout.write(
+                    f"{mode:9} median {statistics.median(samples) * 1e6:8.1f} us, "
+                    f"p99 {samples[int(len(samples) * 0.99) - 1] * 1e6:8.1f} us"
+                )
+
+            ddos_blocklist.clear_local_mirror()
+            baseline = statistics.median(timings['baseline'])
+            for mode in ('legacy', 'script', 'window', 'blocked'):
+                self.stdout.write(f"Added per request ({mode}): {(statistics.median(timings[mode]) - baseline) * 1e6:.1f} us")
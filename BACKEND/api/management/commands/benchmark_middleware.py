@@ -0,0 +1,101 @@
+# api/management/commands/benchmark_middleware.py
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+# settings.MIDDLEWARE before PathScopedMiddleware: every middleware on every path
+LEGACY_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.TemporaryPasswordMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'allauth.account.middleware.AccountMiddleware',
+    'api.ddos_middleware.DDoSProtectionMiddleware',
+    'axes.middleware.AxesMiddleware',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the per-request cost of the middleware stack before (legacy: sessions, CSRF, auth '
+        'and messages on every path) and after path scoping (scoped: skipped for /api/v1/), with and '
+        'without a session cookie. Seeded data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per path, stack and cookie')
+        parser.add_argument('--paths', nargs='+', default=['/api/v1/health/', '/admin/login/'])
+
+    def handle(self, *args, **options):
+        overrides = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ALLOWED_HOSTS=['testserver'],
+            DDOS_WHITELIST=[],
+            DDOS_REQUESTS_PER_MINUTE=10 ** 6,
+            DDOS_REQUESTS_PER_HOUR=10 ** 6,
+            DDOS_SUSPICIOUS_THRESHOLD=10 ** 9,  # /admin/ counts as a suspicious pattern
+            DDOS_BLOCKLIST_PUBSUB_URL='',
+        )
+        with overrides, transaction.atomic():
+            cookies = {'no cookie': {}, 'session cookie': {settings.SESSION_COOKIE_NAME: self._session_key()}}
+            stacks = {'legacy': LEGACY_MIDDLEWARE, 'scoped': list(settings.MIDDLEWARE)}
+            handlers = {name: self._handler(middleware) for name, middleware in stacks.items()}
+            factory = RequestFactory()
+
+            for path in options['paths']:
+                for cookie_name, cookie in cookies.items():
+                    self.stdout.write(f"\n{path} ({cookie_name})")
+                    medians = {}
+                    for name, handler in handlers.items():
+                        samples = []
+                        for _ in range(max(options['requests'], 1)):
+                            request = factory.get(path, REMOTE_ADDR='10.0.0.1')
+                            request.COOKIES.update(cookie)
+                            started = time.perf_counter()
+                            handler.get_response(request)
+                            samples.append(time.perf_counter() - started)
+                        # The log is capped (and fills up when DEBUG is on), which would hide new queries
+                        connection.queries_log.clear()
+                        with CaptureQueriesContext(connection) as queries:
+                            request = factory.get(path, REMOTE_ADDR='10.0.0.1')
+                            request.COOKIES.update(cookie)
+                            status_code = handler.get_response(request).status_code
+                        medians[name] = statistics.median(samples)
+                        self.stdout.write(
+                            f"  {name:7} HTTP {status_code}: median {medians[name] * 1e6:8.1f} us, "
+                            f"{len(queries)} queries"
+                        )
+                    self.stdout.write(f"  Saved per request: {(medians['legacy'] - medians['scoped']) * 1e6:.1f} us")
+
+            transaction.set_rollback(True)
+
+    def _handler(self, middleware):
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+        return handler
+
+    def _session_key(self):
+        user = User.objects.create_user(email=f'benchmark-{int(time.time() * 1000)}@example.com', password='benchmark')
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session.session_key
@@ -0,0 +1,175 @@
+# api/management/commands/benchmark_site_reads.py
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Site, SiteManager
+from api.signals import suppress_signal_logging
+from api.views import FileUploadView, PublicBookingView
+
+User = get_user_model()
+
+TEMPLATE_PATH = Path(__file__).resolve().parent / 'YourEasySite_Demo.json'
+
+
+def _value_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bool, int, float)):
+        return 8
+    return len(str(value).encode())
+
+
+class _CountingCursor:
+    """DB-API cursor proxy adding the size of every fetched value to `stats['bytes']`."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def _count(self, rows):
+        for row in rows:
+            self._stats['bytes'] += sum(_value_size(value) for value in row)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count([row])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count([row])
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def count_bytes_read():
+    """Counts queries and bytes of result rows returned by the database inside the block."""
+    stats = {'queries': 0, 'bytes': 0}
+
+    def wrapper(execute, sql, params, many, context):
+        stats['queries'] += 1
+        result = execute(sql, params, many, context)
+        cursor = context['cursor']
+        if not isinstance(cursor.cursor, _CountingCursor):
+            cursor.cursor = _CountingCursor(cursor.cursor, stats)
+        return result
+
+    with connection.execute_wrapper(wrapper):
+        yield stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures bytes read from the database per request on the public booking and media '
+        'upload paths, with Site.template_config loaded (legacy) and deferred (current). '
+        'All seeded data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config-copies', type=int, default=100,
+                            help='Times the demo page list is repeated in template_config (site size)')
+        parser.add_argument('--runs', type=int, default=3, help='Requests per path and mode (last is reported)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        overrides = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            SUPABASE_URL=None,
+        )
+
+        with overrides, transaction.atomic(), suppress_signal_logging(), \
+                mock.patch('api.tasks.send_booking_confirmation_emails.delay'):
+            site = self._seed(options['config_copies'])
+            content_size = len(json.dumps(site.template_config).encode())
+            self.stdout.write(f"Seeded site {site.id}: template_config = {content_size / 1024:.0f} KiB of JSON")
+
+            results = {}
+            counter = iter(range(10_000))
+            for mode, deferred in (('legacy', ()), ('deferred', SiteManager.deferred_fields)):
+                with mock.patch.object(SiteManager, 'deferred_fields', deferred):
+                    for path, request_path in (('booking', self._book), ('upload', self._upload)):
+                        for _ in range(max(options['runs'], 1)):
+                            with count_bytes_read() as stats:
+                                started = time.perf_counter()
+                                status_code = request_path(factory, site, next(counter))
+                                elapsed = time.perf_counter() - started
+                        results[(path, mode)] = (stats, elapsed, status_code)
+
+            for path in ('booking', 'upload'):
+                for mode in ('legacy', 'deferred'):
+                    stats, elapsed, status_code = results[(path, mode)]
+                    self.stdout.write(
+                        f"{path:8} {mode:9} HTTP {status_code}: {stats['queries']} queries, "
+                        f"{stats['bytes'] / 1024:.1f} KiB read, {elapsed * 1000:.1f} ms"
+                    )
+                before = results[(path, 'legacy')][0]['bytes']
+                after = results[(path, 'deferred')][0]['bytes']
+                self.stdout.write(self.style.SUCCESS(
+                    f"{path}: {before / max(after, 1):.0f}x fewer bytes read per request"
+                ))
+
+            transaction.set_rollback(True)
+
+    def _seed(self, config_copies):
+        owner = User.objects.create_user(
+            email=f'benchmark-{int(time.time() * 1000)}@example.com',
+            first_name='Benchmark',
+            last_name='Owner',
+        )
+        template = json.loads(TEMPLATE_PATH.read_text(encoding='utf-8'))
+        pages = template.get('site', {}).get('pages') or template.get('pages') or [template]
+        config = dict(template, pages=pages * max(config_copies, 1))
+        return Site.objects.create(
+            owner=owner,
+            name='Site Reads Benchmark',
+            is_mock=True,
+            template_config=config,
+        )
+
+    def _book(self, factory, site, index):
+        day = timezone.localdate() + timedelta(days=7 + index)
+        start = timezone.make_aware(datetime.combine(day, dt_time(10, 0)))
+        request = factory.post(f'/api/v1/public-sites/{site.id}/bookings/', {
+            'start_time': start.isoformat(),
+            'duration': 60,
+            'guest_name': 'Benchmark Guest',
+            'guest_email': f'guest{index}@example.com',
+        }, format='json')
+        return PublicBookingView.as_view()(request, site_id=site.id).status_code
+
+    def _upload(self, factory, site, index):
+        upload = SimpleUploadedFile(f'benchmark-{index}.webp', f'RIFF{index}WEBP'.encode(), content_type='image/webp')
+        request = factory.post('/api/v1/upload/', {'file': upload, 'site_id': site.id}, format='multipart')
+        force_authenticate(request, user=site.owner)
+        return FileUploadView.as_view()(request).status_code
@@ -0,0 +1,20 @@
+# api/management/commands/calendar_cache_stats.py
+from django.core.management.base import BaseCommand
+
+from api.calendar_cache import get_cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hit/miss counters of the public calendar response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        for endpoint, stats in get_cache_stats().items():
+            ratio = f"{stats['hit_ratio']:.1%}" if stats['hit_ratio'] is not None else 'n/a'
+            self.stdout.write(f"{endpoint}: {stats['hits']} hits, {stats['misses']} misses, hit ratio {ratio}")
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Calendar cache counters reset.'))
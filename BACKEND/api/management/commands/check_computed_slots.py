@@ -0,0 +1,55 @@
+# api/management/commands/check_computed_slots.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Site
+from api.slot_engine import check_computed_slots, rebuild_computed_slots
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the materialized public availability slots with on-the-fly computation '
+        'and reports (or repairs) sites that drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Site ID (repeatable, default: all)')
+        parser.add_argument('--days', type=int, default=90, help='Number of days to compare, starting today')
+        parser.add_argument('--fix', action='store_true', help='Rebuild sites whose slots drifted')
+        parser.add_argument('--verbose-keys', type=int, default=5, help='How many drifted slots to print per site')
+
+    def handle(self, *args, **options):
+        sites = Site.objects.all()
+        if options['site_ids']:
+            sites = sites.filter(pk__in=options['site_ids'])
+
+        now = timezone.now()
+        start_date = timezone.localdate(now)
+        end_date = start_date + timedelta(days=max(options['days'], 1) - 1)
+        limit = options['verbose_keys']
+
+        drifted = []
+        for site in sites.order_by('pk').iterator():
+            drift = check_computed_slots(site, start_date, end_date, now=now)
+            if drift.ok:
+                continue
+            drifted.append(site.pk)
+            self.stdout.write(self.style.WARNING(
+                f"Site {site.pk} ({site.name}): {len(drift.missing)} missing, "
+                f"{len(drift.unexpected)} unexpected, {len(drift.changed)} changed"
+            ))
+            for label, keys in (('missing', drift.missing), ('unexpected', drift.unexpected), ('changed', drift.changed)):
+                for start, assignee_type, assignee_id in keys[:limit]:
+                    self.stdout.write(f"  {label}: {start.isoformat()} {assignee_type}:{assignee_id}")
+            if options['fix']:
+                count = rebuild_computed_slots(site)
+                self.stdout.write(f"  rebuilt: {count} slots")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Computed slots are consistent.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drifted)} drifted site(s).'))
+        else:
+            raise CommandError(f"Computed slots drifted for site(s): {', '.join(map(str, drifted))}")
@@ -0,0 +1,31 @@
+# api/management/commands/ddos_block.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ddos_blocklist
+
+
+class Command(BaseCommand):
+    help = (
+        'Blocks IP addresses or CIDR ranges in DDoSProtectionMiddleware of every web worker '
+        '(through the blocklist pub/sub channel), or lifts such blocks with --unblock (for a single '
+        'address also the rate limiter\'s block flag).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('networks', nargs='+', help='e.g. 203.0.113.7 or 198.51.100.0/24')
+        parser.add_argument('--duration', type=int, default=None, help='Seconds (default: DDOS_BLOCK_DURATION)')
+        parser.add_argument('--unblock', action='store_true', help='Lift the blocks instead')
+
+    def handle(self, *args, **options):
+        duration = options['duration'] or getattr(settings, 'DDOS_BLOCK_DURATION', 1800)
+        for network in options['networks']:
+            try:
+                if options['unblock']:
+                    network = ddos_blocklist.unblock(network)
+                    self.stdout.write(self.style.SUCCESS(f'Unblocked {network}'))
+                else:
+                    network = ddos_blocklist.block(network, duration)
+                    self.stdout.write(self.style.SUCCESS(f'Blocked {network} for {duration}s'))
+            except ValueError as e:
+                raise CommandError(f'Not an IP address or CIDR range: {network} ({e})')
@@ -0,0 +1,44 @@
+# api/management/commands/export_site_bundles.py
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Site
+from api.site_export import export_enabled, export_site
+from api.tasks import export_site_bundle
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the static bundles of published sites (api/site_export.py). By default only sites '
+        'without a bundle are exported, e.g. the ones published before SITE_EXPORT_ENABLED was turned on.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument('--site', type=int, action='append', dest='site_ids', help='Site ID (repeatable)')
+        target.add_argument('--all', action='store_true', help='Every published site, also the ones with a bundle')
+        parser.add_argument('--enqueue', action='store_true', help='Schedule Celery tasks instead of exporting here')
+
+    def handle(self, *args, **options):
+        if not export_enabled():
+            raise CommandError('SITE_EXPORT_ENABLED is off.')
+
+        sites = Site.objects.filter(is_published=True)
+        if options['site_ids']:
+            sites = sites.filter(pk__in=options['site_ids'])
+            missing = set(options['site_ids']) - set(sites.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Published site(s) not found: {', '.join(str(pk) for pk in sorted(missing))}")
+        elif not options['all']:
+            sites = sites.filter(static_bundle_key__isnull=True)
+
+        total = 0
+        for site_id in sites.order_by('pk').values_list('pk', flat=True).iterator():
+            total += 1
+            if options['enqueue']:
+                export_site_bundle.delay(site_id)
+                self.stdout.write(f"Site {site_id}: scheduled")
+                continue
+            result = export_site(site_id)
+            self.stdout.write(f"Site {site_id}: {result.key} ({'written' if result.changed else 'unchanged'})")
+
+        self.stdout.write(self.style.SUCCESS(f'Site bundles {"scheduled" if options["enqueue"] else "exported"}: {total}.'))
@@ -0,0 +1,335 @@
+# api/management/commands/generate_load_tenants.py
+import json
+import random
+import time
+import uuid
+from datetime import datetime, time as dt_time, timedelta
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import (
+    Agent,
+    AvailabilityBlock,
+    Booking,
+    ChatHistory,
+    Client,
+    Event,
+    MediaAsset,
+    MediaUsage,
+    NewsletterSubscription,
+    Site,
+    TeamMember,
+    Testimonial,
+)
+from api.signals import suppress_calendar_signals, suppress_signal_logging
+from api.slot_engine import rebuild_computed_slots
+from api.utils import generate_site_identifier
+
+User = get_user_model()
+
+EMAIL_PREFIX = 'loadgen-{seed}-'
+TEMPLATE_FILES = ('mock_pracownia_jogi_new.json', 'mock_studio_oddechu_new.json', 'mock_gabinet_psychoterapii.json')
+SITE_NAMES = ('Pracownia Jogi', 'Studio Oddechu', 'Gabinet Psychoterapii', 'Studio Pilates', 'Szkoła Tańca', 'Centrum Coachingu')
+FIRST_NAMES = ('Anna', 'Jan', 'Maria', 'Piotr', 'Katarzyna', 'Tomasz', 'Magdalena', 'Paweł', 'Agnieszka', 'Michał')
+LAST_NAMES = ('Nowak', 'Kowalski', 'Wiśniewska', 'Wójcik', 'Kamińska', 'Lewandowski', 'Zielińska', 'Szymański')
+EVENT_TITLES = ('Joga poranna', 'Konsultacja', 'Pilates', 'Medytacja', 'Warsztaty oddechowe', 'Sesja indywidualna')
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic tenants for performance testing: sites with team members, events, bookings, '
+        'clients, availability, testimonials, newsletter subscribers, media assets and chat history. '
+        'Uses bulk_create only, so signals do not fire; output is deterministic for a given --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sites', type=int, default=10, help='Number of sites to generate')
+        parser.add_argument('--team-members', type=int, default=3, help='Linked team members per site')
+        parser.add_argument('--days', type=int, default=60, help='Calendar window in days, centered on today')
+        parser.add_argument('--events-per-day', type=int, default=4, help='Events per site per day')
+        parser.add_argument('--bookings-per-event', type=int, default=3, help='Maximum bookings per event')
+        parser.add_argument('--clients', type=int, default=200, help='Clients per site')
+        parser.add_argument('--testimonials', type=int, default=30, help='Testimonials per site')
+        parser.add_argument('--subscribers', type=int, default=300, help='Newsletter subscribers per site')
+        parser.add_argument('--media', type=int, default=20, help='Media assets per site')
+        parser.add_argument('--chat-messages', type=int, default=50, help='AI chat history messages per site')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (also namespaces generated accounts)')
+        parser.add_argument('--chunk', type=int, default=100, help='Sites generated per transaction')
+        parser.add_argument('--batch-size', type=int, default=2000, help='bulk_create batch size')
+        parser.add_argument('--with-slots', action='store_true', help='Materialize ComputedSlot rows for generated sites')
+        parser.add_argument('--clear', action='store_true', help='Delete tenants previously generated with this seed first')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.batch_size = max(options['batch_size'], 1)
+        self.rng = random.Random(options['seed'])
+        self.email_prefix = EMAIL_PREFIX.format(seed=options['seed'])
+        self.password = make_password(None)
+        self.templates = self._load_templates()
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.today = timezone.localdate()
+
+        existing = User.objects.filter(email__startswith=self.email_prefix)
+        if existing.exists():
+            if not options['clear']:
+                raise CommandError(f'Tenants for seed {options["seed"]} already exist. Use --clear or another --seed.')
+            self._clear(existing)
+
+        total_sites = max(options['sites'], 0)
+        chunk = max(options['chunk'], 1)
+        self.counts = {}
+        started = time.perf_counter()
+
+        for offset in range(0, total_sites, chunk):
+            size = min(chunk, total_sites - offset)
+            with transaction.atomic(), suppress_signal_logging(), suppress_calendar_signals():
+                sites = self._generate_chunk(offset, size)
+            if options['with_slots']:
+                for site in sites:
+                    rebuild_computed_slots(site)
+            self.stdout.write(f'{offset + size}/{total_sites} sites ({time.perf_counter() - started:.1f}s)')
+
+        elapsed = time.perf_counter() - started
+        rows = sum(self.counts.values())
+        self.stdout.write(', '.join(f'{name}={count}' for name, count in self.counts.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:.0f} rows/s).'
+        ))
+        if not options['with_slots'] and total_sites:
+            self.stdout.write('Public availability is not materialized yet: run rebuild_computed_slots --all.')
+
+    def _load_templates(self):
+        current_dir = Path(__file__).parent
+        templates = []
+        for file_name in TEMPLATE_FILES:
+            with open(current_dir / file_name, 'r', encoding='utf-8') as f:
+                templates.append(json.load(f))
+        return templates
+
+    def _clear(self, users):
+        started = time.perf_counter()
+        site_ids = list(Site.objects.filter(owner__in=users).values_list('id', flat=True))
+        chunk = max(self.options['chunk'], 1)
+        with suppress_signal_logging(), suppress_calendar_signals():
+            for offset in range(0, len(site_ids), chunk):
+                with transaction.atomic():
+                    Site.objects.filter(id__in=site_ids[offset:offset + chunk]).delete()
+            deleted, _ = users.delete()
+        self.stdout.write(f'Cleared {len(site_ids)} generated sites ({deleted} accounts) in {time.perf_counter() - started:.1f}s')
+
+    def _create(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _token(self):
+        return f'{self.rng.getrandbits(256):064x}'
+
+    def _person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def _generate_chunk(self, offset, size):
+        options = self.options
+        rng = self.rng
+        members_per_site = max(options['team_members'], 0)
+
+        owners = []
+        member_users = []
+        for index in range(offset, offset + size):
+            first_name, last_name = self._person()
+            owners.append(User(
+                email=f'{self.email_prefix}{index}@example.com',
+                password=self.password,
+                first_name=first_name,
+                last_name=last_name,
+            ))
+            for member_index in range(members_per_site):
+                first_name, last_name = self._person()
+                member_users.append(User(
+                    email=f'{self.email_prefix}{index}-team{member_index}@example.com',
+                    password=self.password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    source_tag=User.SourceTag.TEAM_INVITATION,
+                ))
+        owners = self._create(User, owners)
+        member_users = self._create(User, member_users)
+
+        sites = self._create(Site, [
+            Site(
+                owner=owner,
+                name=f'{rng.choice(SITE_NAMES)} {offset + position}',
+                color_index=rng.randrange(12),
+                team_size=members_per_site + 1,
+                is_published=rng.random() < 0.7,
+                template_config=rng.choice(self.templates),
+            )
+            for position, owner in enumerate(owners)
+        ])
+        # Site.save() derives the identifier from the primary key, which bulk_create only now provides
+        for site in sites:
+            site.identifier = generate_site_identifier(site.pk, site.name, site.owner.first_name, site.owner.last_name)
+            site.subdomain = f'{site.identifier}.youreasysite.pl'
+        Site.objects.bulk_update(sites, ['identifier', 'subdomain'], batch_size=self.batch_size)
+
+        members = self._create(TeamMember, [
+            TeamMember(
+                site=site,
+                name=user.get_full_name(),
+                email=user.email,
+                linked_user=user,
+                invitation_status=TeamMember.InvitationStatus.LINKED,
+                invitation_token=self._uuid(),
+                permission_role=rng.choice(TeamMember.PermissionRole.values),
+                role_description='Instruktor',
+            )
+            for position, site in enumerate(sites)
+            for user in member_users[position * members_per_site:(position + 1) * members_per_site]
+        ])
+        members_by_site = {}
+        for member in members:
+            members_by_site.setdefault(member.site_id, []).append(member)
+
+        for site in sites:
+            self._generate_site(site, members_by_site.get(site.pk, []))
+        return sites
+
+    def _generate_site(self, site, members):
+        options = self.options
+        rng = self.rng
+        owner = site.owner
+        hosts = [{'assigned_to_owner': owner}] + [{'assigned_to_team_member': member} for member in members]
+
+        clients = self._create(Client, [
+            Client(site=site, email=f'client{index}@site{site.pk}.example.com', name=' '.join(self._person()))
+            for index in range(max(options['clients'], 0))
+        ])
+
+        days = max(options['days'], 1)
+        first_day = self.today - timedelta(days=days // 2)
+        tz = timezone.get_current_timezone()
+        events = []
+        planned_bookings = []
+        for day_offset in range(days):
+            day = first_day + timedelta(days=day_offset)
+            for _ in range(max(options['events_per_day'], 0)):
+                start = timezone.make_aware(datetime.combine(day, dt_time(rng.randint(7, 19), rng.choice((0, 30)))), tz)
+                is_group = rng.random() < 0.4
+                capacity = rng.randint(4, 12) if is_group else 1
+                booked = min(capacity, rng.randint(0, max(options['bookings_per_event'], 0)), len(clients))
+                events.append(Event(
+                    site=site,
+                    creator=owner,
+                    title=rng.choice(EVENT_TITLES),
+                    start_time=start,
+                    end_time=start + timedelta(minutes=rng.choice((45, 60, 90))),
+                    capacity=capacity,
+                    booked_count=booked,
+                    event_type=Event.EventType.GROUP if is_group else Event.EventType.INDIVIDUAL,
+                    **rng.choice(hosts)
+                ))
+                planned_bookings.append(rng.sample(clients, booked) if booked else [])
+        events = self._create(Event, events)
+
+        bookings = []
+        attendees = []
+        for event, event_clients in zip(events, planned_bookings):
+            for client in event_clients:
+                bookings.append(Booking(
+                    site=site,
+                    event=event,
+                    client=client,
+                    guest_email=client.email,
+                    guest_name=client.name,
+                ))
+                attendees.append(Event.attendees.through(event_id=event.pk, client_id=client.pk))
+        self._create(Booking, bookings)
+        self._create(Event.attendees.through, attendees)
+
+        self._create(AvailabilityBlock, [
+            AvailabilityBlock(
+                site=site,
+                creator=owner,
+                date=first_day + timedelta(days=day_offset),
+                start_time=dt_time(8, 0),
+                end_time=dt_time(16, 0),
+                meeting_length=rng.choice((30, 60, 90)),
+                time_snapping=30,
+                **host
+            )
+            for day_offset in range(days)
+            if (first_day + timedelta(days=day_offset)).weekday() < 5
+            for host in hosts
+        ])
+
+        self._create(Testimonial, [
+            Testimonial(
+                site=site,
+                author_name=' '.join(self._person()),
+                author_email=f'author{index}@site{site.pk}.example.com',
+                rating=rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 8, 12))[0],
+                content='Bardzo polecam, świetna atmosfera i profesjonalne podejście.',
+                is_approved=rng.random() < 0.8,
+            )
+            for index in range(max(options['testimonials'], 0))
+        ])
+
+        subscriptions = []
+        for index in range(max(options['subscribers'], 0)):
+            is_confirmed = rng.random() < 0.85
+            sent = rng.randint(0, 40)
+            opened = rng.randint(0, sent)
+            subscriptions.append(NewsletterSubscription(
+                site=site,
+                email=f'reader{index}@site{site.pk}.example.com',
+                is_active=rng.random() < 0.95,
+                is_confirmed=is_confirmed,
+                confirmation_token=None if is_confirmed else self._token(),
+                unsubscribe_token=self._token(),
+                confirmed_at=self.now if is_confirmed else None,
+                emails_sent=sent,
+                emails_opened=opened,
+                emails_clicked=rng.randint(0, opened),
+            ))
+        self._create(NewsletterSubscription, subscriptions)
+
+        assets = []
+        for index in range(max(options['media'], 0)):
+            path = f'loadgen/site{site.pk}/image{index}.webp'
+            assets.append(MediaAsset(
+                file_name=f'image{index}.webp',
+                storage_path=path,
+                file_url=f'/media/{path}',
+                file_hash=self._token(),
+                media_type=MediaAsset.MediaType.IMAGE,
+                file_size=rng.randint(20_000, 2_000_000),
+                uploaded_by=owner,
+            ))
+        assets = self._create(MediaAsset, assets)
+        self._create(MediaUsage, [
+            MediaUsage(asset=asset, site=site, usage_type=MediaUsage.UsageType.SITE_CONTENT)
+            for asset in assets
+        ])
+
+        chat_messages = max(options['chat_messages'], 0)
+        if chat_messages:
+            agent = self._create(Agent, [Agent(id=self._uuid(), user=owner, site=site, name='Asystent #1')])[0]
+            self._create(ChatHistory, [
+                ChatHistory(
+                    agent=agent,
+                    user=owner,
+                    site=site,
+                    context_type=agent.context_type,
+                    user_message=f'Zmień nagłówek strony głównej (wersja {index})',
+                    ai_response='Gotowe, zaktualizowałem nagłówek.',
+                )
+                for index in range(chat_messages)
+            ])
@@ -0,0 +1,132 @@
+# api/management/commands/load_test_booking.py
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from api.booking_service import AlreadyBookedError, EventFullError, book_slot
+from api.models import Booking, Client, Event, Site
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires simultaneous public bookings at a single group slot and verifies that the session '
+        'event is created once and capacity is never exceeded. Reports throughput and latency. '
+        'Run against PostgreSQL; SQLite serializes writers and reports lock errors instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Number of booking attempts')
+        parser.add_argument('--capacity', type=int, default=20, help='Capacity of the contested slot')
+        parser.add_argument('--workers', type=int, default=50, help='Concurrent threads (one DB connection each)')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded site instead of deleting it')
+
+    def handle(self, *args, **options):
+        requests_total = max(options['requests'], 1)
+        capacity = max(options['capacity'], 1)
+        workers = max(options['workers'], 1)
+
+        owner = User.objects.create_user(
+            email=f'loadtest-{int(time.time() * 1000)}@example.com',
+            first_name='Load',
+            last_name='Test',
+        )
+        site = Site.objects.create(owner=owner, name='Booking Load Test', is_mock=True)
+        start_time = (timezone.now() + timedelta(days=7)).replace(second=0, microsecond=0)
+        end_time = start_time + timedelta(hours=1)
+        event_defaults = {
+            'creator': owner,
+            'title': 'Load test class',
+            'capacity': capacity,
+            'event_type': Event.EventType.GROUP,
+        }
+
+        gate = threading.Event()
+
+        def attempt(index):
+            gate.wait()
+            started = time.perf_counter()
+            try:
+                email = f'guest{index}@example.com'
+                client, _ = Client.objects.get_or_create(site=site, email=email, defaults={'name': f'Guest {index}'})
+                book_slot(
+                    site,
+                    start_time=start_time,
+                    end_time=end_time,
+                    assigned_to_owner=owner,
+                    event_defaults=event_defaults,
+                    client=client,
+                    guest_name=f'Guest {index}',
+                    guest_email=email,
+                )
+                outcome = 'booked'
+            except EventFullError:
+                outcome = 'full'
+            except AlreadyBookedError:
+                outcome = 'duplicate'
+            except Exception as exc:
+                outcome = f'error: {exc.__class__.__name__}: {exc}'
+            finally:
+                connection.close()
+            return outcome, time.perf_counter() - started
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(attempt, index) for index in range(requests_total)]
+                started = time.perf_counter()
+                gate.set()
+                results = [future.result() for future in futures]
+                wall_time = time.perf_counter() - started
+
+            self._report(results, wall_time, workers)
+            self._verify(site, capacity, requests_total, results)
+        finally:
+            if not options['keep']:
+                site.delete()
+                owner.delete()
+
+    def _report(self, results, wall_time, workers):
+        outcomes = {}
+        for outcome, _ in results:
+            key = 'error' if outcome.startswith('error') else outcome
+            outcomes[key] = outcomes.get(key, 0) + 1
+        latencies = sorted(elapsed * 1000 for _, elapsed in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+        self.stdout.write(
+            f"{len(results)} requests, {workers} workers, {connection.vendor}: "
+            + ", ".join(f"{key}={count}" for key, count in sorted(outcomes.items()))
+        )
+        self.stdout.write(
+            f"throughput: {len(results) / wall_time:.1f} req/s, "
+            f"latency p50={statistics.median(latencies):.1f} ms p95={p95:.1f} ms max={latencies[-1]:.1f} ms"
+        )
+        errors = [outcome for outcome, _ in results if outcome.startswith('error')]
+        if errors:
+            self.stdout.write(self.style.WARNING(f"first error: {errors[0]}"))
+
+    def _verify(self, site, capacity, requests_total, results):
+        events = list(Event.objects.filter(site=site))
+        if len(events) != 1:
+            raise CommandError(f'Expected exactly one session event, found {len(events)}')
+
+        event = events[0]
+        bookings = Booking.objects.filter(event=event).count()
+        booked = sum(1 for outcome, _ in results if outcome == 'booked')
+        if bookings > capacity or event.booked_count != bookings or booked != bookings:
+            raise CommandError(
+                f'Capacity violated: capacity={capacity}, bookings={bookings}, '
+                f'booked_count={event.booked_count}, successful responses={booked}'
+            )
+        if not any(outcome.startswith('error') for outcome, _ in results) and bookings != min(capacity, requests_total):
+            raise CommandError(f'Slot not filled: expected {min(capacity, requests_total)} bookings, got {bookings}')
+
+        self.stdout.write(self.style.SUCCESS(f'OK: {bookings}/{capacity} spots taken, no overbooking.'))
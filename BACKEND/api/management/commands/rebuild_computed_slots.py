@@ -0,0 +1,29 @@
+# api/management/commands/rebuild_computed_slots.py
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Site
+from api.slot_engine import rebuild_computed_slots
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the materialized public availability slots (ComputedSlot) of one or all sites.'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--site', type=int, action='append', dest='site_ids', help='Site ID (repeatable)')
+        target.add_argument('--all', action='store_true', help='Rebuild every site')
+
+    def handle(self, *args, **options):
+        sites = Site.objects.all() if options['all'] else Site.objects.filter(pk__in=options['site_ids'])
+        if not options['all']:
+            missing = set(options['site_ids']) - set(sites.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Site(s) not found: {', '.join(str(pk) for pk in sorted(missing))}")
+
+        total = 0
+        for site in sites.order_by('pk').iterator():
+            count = rebuild_computed_slots(site)
+            total += count
+            self.stdout.write(f"Site {site.pk} ({site.name}): {count} slots")
+
+        self.stdout.write(self.style.SUCCESS(f'Computed slots rebuilt: {total} rows.'))
@@ -0,0 +1,45 @@
+# api/management/commands/reconcile_booked_counts.py
+from django.core.management.base import BaseCommand
+
+from api.booking_service import find_booked_count_drift, reconcile_booked_counts
+from api.calendar_cache import bump_calendar_versions
+from api.models import Event
+from api.slot_engine import event_slot_scopes, refresh_computed_slots
+
+
+class Command(BaseCommand):
+    help = 'Finds events whose denormalized booked_count differs from their bookings and fixes them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--site', type=int, action='append', dest='site_ids', help='Site ID (repeatable, default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted events')
+
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if options['site_ids']:
+            events = events.filter(site_id__in=options['site_ids'])
+
+        drift = find_booked_count_drift(events)
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All booked_count values are consistent.'))
+            return
+
+        for event_id, stored, actual in drift:
+            self.stdout.write(self.style.WARNING(f"Event {event_id}: booked_count={stored}, bookings={actual}"))
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(drift)} event(s) drifted (dry run, nothing changed).")
+            return
+
+        drifted_ids = [event_id for event_id, _, _ in drift]
+        updated = reconcile_booked_counts(drifted_ids)
+
+        # Queryset updates bypass signals, so refresh the affected availability by hand
+        scopes = set()
+        for event in Event.objects.filter(pk__in=drifted_ids):
+            scopes |= event_slot_scopes(event)
+        for site_id, day, assignee in sorted(scopes, key=lambda scope: (scope[0], scope[1])):
+            refresh_computed_slots(site_id, day, assignee)
+        bump_calendar_versions(site_id for site_id, _, _ in scopes)
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled booked_count for {updated} event(s).'))
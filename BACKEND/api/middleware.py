@@ -1,10 +1,15 @@
 """Custom middleware for the API."""
 
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.utils.module_loading import import_string
 from rest_framework.exceptions import AuthenticationFailed
 
+from .authentication import TEMPORARY_PASSWORD_CLAIM, RequestCachedJWTAuthentication
+
 
 class TemporaryPasswordMiddleware(MiddlewareMixin):
     """
@@ -34,13 +39,14 @@ class TemporaryPasswordMiddleware(MiddlewareMixin):
         if any(path.startswith(allowed) for allowed in self.ALLOWED_PATHS):
             return None
         
-        # Try to get user from JWT token
+        # Try to get user from JWT token (cached on the request for DRF, see api/authentication.py)
         try:
-            jwt_auth = JWTAuthentication()
-            auth_result = jwt_auth.authenticate(request)
-            
-            if auth_result is not None:
-                user, _ = auth_result
+            jwt_auth = RequestCachedJWTAuthentication()
+            token = jwt_auth.validated_token(request)
+
+            # A token issued without a temporary password needs no user lookup
+            if token is not None and token.get(TEMPORARY_PASSWORD_CLAIM) is not False:
+                user, _ = jwt_auth.authenticate(request)
                 
                 # Check if user has temporary password
                 if hasattr(user, 'is_temporary_password') and user.is_temporary_password:
@@ -56,3 +62,76 @@ class TemporaryPasswordMiddleware(MiddlewareMixin):
             pass
         
         return None
+
+
+class PathScopedMiddleware:
+    """
+    Runs settings.SESSION_MIDDLEWARE (sessions, CSRF, auth, messages) only
+    where it is needed.
+
+    The API authenticates with JWT, so paths in SESSION_MIDDLEWARE_EXEMPT_PATHS
+    (/api/v1/) skip loading the session and the session user. Paths in
+    SESSION_MIDDLEWARE_REQUIRED_PATHS (the API views that run allauth flows,
+    which need a session and messages) and everything else (/admin/,
+    /accounts/) get the whole group, in the listed order. The group's
+    process_view/process_exception/process_template_response hooks are
+    forwarded only for requests that went through it.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.exempt_paths = tuple(getattr(settings, 'SESSION_MIDDLEWARE_EXEMPT_PATHS', ()))
+        self.required_paths = tuple(getattr(settings, 'SESSION_MIDDLEWARE_REQUIRED_PATHS', ()))
+
+        # Same chaining as BaseHandler.load_middleware
+        self.scoped_middleware = []
+        handler = get_response
+        for middleware_path in reversed(getattr(settings, 'SESSION_MIDDLEWARE', [])):
+            try:
+                instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            self.scoped_middleware.insert(0, instance)
+            handler = convert_exception_to_response(instance)
+        self.scoped_handler = handler
+
+    def uses_session_middleware(self, request):
+        path = request.path
+        return path.startswith(self.required_paths) or not path.startswith(self.exempt_paths)
+
+    def __call__(self, request):
+        if self.uses_session_middleware(request):
+            request._session_middleware = True
+            return self.scoped_handler(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(request, '_session_middleware', False):
+            return None
+        for instance in self.scoped_middleware:
+            if hasattr(instance, 'process_view'):
+                response = instance.process_view(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+        return None
+
+    def process_exception(self, request, exception):
+        if not getattr(request, '_session_middleware', False):
+            return None
+        for instance in reversed(self.scoped_middleware):
+            if hasattr(instance, 'process_exception'):
+                response = instance.process_exception(request, exception)
+                if response is not None:
+                    return response
+        return None
+
+    def process_template_response(self, request, response):
+        if not getattr(request, '_session_middleware', False):
+            return response
+        for instance in reversed(self.scoped_middleware):
+            if hasattr(instance, 'process_template_response'):
+                response = instance.process_template_response(request, response)
+        return response
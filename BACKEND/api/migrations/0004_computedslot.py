@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_domainorder_domain_expiration_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComputedSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Local calendar day the slot belongs to')),
+                ('assignee_type', models.CharField(choices=[('owner', 'Owner'), ('team_member', 'Team Member')], max_length=20)),
+                ('assignee_id', models.BigIntegerField(blank=True, null=True)),
+                ('assignee_name', models.CharField(blank=True, max_length=255)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('duration', models.PositiveIntegerField(help_text='Slot length in minutes')),
+                ('capacity', models.IntegerField(default=1)),
+                ('available_spots', models.IntegerField(default=1)),
+                ('event_type', models.CharField(default='individual', max_length=20)),
+                ('event_id', models.BigIntegerField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='computed_slots', to='api.site')),
+            ],
+            options={
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['site', 'date', 'start_time'], name='api_compute_site_id_74554e_idx'), models.Index(fields=['site', 'date', 'assignee_type', 'assignee_id'], name='api_compute_site_id_9f7a1e_idx')],
+            },
+        ),
+    ]
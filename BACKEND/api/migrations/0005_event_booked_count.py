@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_booked_count(apps, schema_editor):
+    Event = apps.get_model('api', 'Event')
+    Booking = apps.get_model('api', 'Booking')
+    counts = (
+        Booking.objects.filter(event=OuterRef('pk'))
+        .order_by()
+        .values('event')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Event.objects.update(booked_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_computedslot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, help_text='Denormalized number of bookings, maintained by api.booking_service'),
+        ),
+        migrations.RunPython(backfill_booked_count, migrations.RunPython.noop),
+    ]
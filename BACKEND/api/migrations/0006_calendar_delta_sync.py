@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_event_booked_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('event', 'Event'), ('availability_block', 'Availability Block')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='availabilityblock',
+            index=models.Index(fields=['site', 'updated_at'], name='api_availab_site_id_a875c0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['site', 'updated_at'], name='api_event_site_id_e83316_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendartombstone',
+            index=models.Index(fields=['site_id', 'deleted_at'], name='api_calenda_site_id_1bfa2d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendartombstone',
+            index=models.Index(fields=['deleted_at'], name='api_calenda_deleted_4d839d_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_calendar_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabilityblock',
+            index=models.Index(fields=['site', 'date'], name='api_availab_site_id_c1e324_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['site', 'start_time'], name='api_event_site_id_99e052_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['site', 'assigned_to_team_member', 'start_time'], name='api_event_site_id_6defa2_idx'),
+        ),
+    ]
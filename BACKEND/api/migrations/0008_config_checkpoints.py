@@ -0,0 +1,199 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:51
+
+import copy
+import hashlib
+import json
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+# Frozen copies of the api.json_patch helpers this migration needs, so later
+# changes to that module cannot alter what the migration does. make_patch only
+# emits add / remove / replace, which is all apply_patch has to handle.
+
+def _pointer(tokens):
+    return ''.join('/' + str(token).replace('~', '~0').replace('/', '~1') for token in tokens)
+
+
+def _diff(src, dst, path, ops):
+    if type(src) is type(dst) and src == dst:
+        return
+    if isinstance(src, dict) and isinstance(dst, dict):
+        for key in src:
+            if key not in dst:
+                ops.append({'op': 'remove', 'path': _pointer(path + [key])})
+        for key, value in dst.items():
+            if key in src:
+                _diff(src[key], value, path + [key], ops)
+            else:
+                ops.append({'op': 'add', 'path': _pointer(path + [key]), 'value': copy.deepcopy(value)})
+        return
+    if isinstance(src, list) and isinstance(dst, list):
+        common = min(len(src), len(dst))
+        for index in range(common):
+            _diff(src[index], dst[index], path + [index], ops)
+        for index in range(len(src) - 1, common - 1, -1):
+            ops.append({'op': 'remove', 'path': _pointer(path + [index])})
+        for index in range(common, len(dst)):
+            ops.append({'op': 'add', 'path': _pointer(path + ['-']), 'value': copy.deepcopy(dst[index])})
+        return
+    ops.append({'op': 'replace', 'path': _pointer(path), 'value': copy.deepcopy(dst)})
+
+
+def make_patch(src, dst):
+    ops = []
+    _diff(src, dst, [], ops)
+    return ops
+
+
+def apply_patch(doc, patch):
+    doc = copy.deepcopy(doc)
+    for operation in patch:
+        tokens = [
+            token.replace('~1', '/').replace('~0', '~')
+            for token in operation['path'].split('/')[1:]
+        ] if operation['path'] else []
+        if not tokens:
+            doc = copy.deepcopy(operation.get('value'))
+            continue
+        parent = doc
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        key = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if key == '-' else int(key)
+            if operation['op'] in ('remove', 'replace'):
+                parent.pop(index)
+            if operation['op'] in ('add', 'replace'):
+                parent.insert(index, copy.deepcopy(operation['value']))
+        else:
+            if operation['op'] == 'remove':
+                parent.pop(key)
+            else:
+                parent[key] = copy.deepcopy(operation['value'])
+    return doc
+
+
+def _content_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()).hexdigest()
+
+
+def _import_list(ConfigCheckpoint, ConfigCheckpointBase, site_id, big_event_id, entries, key):
+    """Stores a legacy newest-first checkpoint list as deltas against its oldest entry (malformed entries are skipped)."""
+    entries = [
+        entry for entry in entries or []
+        if isinstance(entry, dict) and entry.get('id') and entry.get(key) is not None
+    ][:20]
+    if not entries:
+        return
+    scope = {'site_id': site_id, 'big_event_id': big_event_id}
+    base_config = entries[-1].get(key)
+    base = ConfigCheckpointBase.objects.create(**scope, content_hash=_content_hash(base_config), config=base_config)
+    ConfigCheckpoint.objects.bulk_create([
+        ConfigCheckpoint(
+            **scope,
+            checkpoint_id=entry['id'],
+            message=entry.get('message', ''),
+            content_hash=_content_hash(entry.get(key)),
+            base=base,
+            delta=make_patch(base_config, entry.get(key)),
+            created_at=parse_datetime(entry.get('timestamp') or '') or timezone.now(),
+        )
+        for entry in entries
+    ], ignore_conflicts=True)
+
+
+def move_checkpoints_to_table(apps, schema_editor):
+    Site = apps.get_model('api', 'Site')
+    BigEvent = apps.get_model('api', 'BigEvent')
+    ConfigCheckpoint = apps.get_model('api', 'ConfigCheckpoint')
+    ConfigCheckpointBase = apps.get_model('api', 'ConfigCheckpointBase')
+
+    for site_id, entries in Site.objects.values_list('id', 'ai_checkpoints').iterator():
+        _import_list(ConfigCheckpoint, ConfigCheckpointBase, site_id, None, entries, 'config')
+    for event_id, site_id, entries in BigEvent.objects.values_list('id', 'site_id', 'ai_checkpoints').iterator():
+        _import_list(ConfigCheckpoint, ConfigCheckpointBase, site_id, event_id, entries, 'data')
+
+
+def move_checkpoints_to_lists(apps, schema_editor):
+    Site = apps.get_model('api', 'Site')
+    BigEvent = apps.get_model('api', 'BigEvent')
+    ConfigCheckpoint = apps.get_model('api', 'ConfigCheckpoint')
+
+    lists = {}
+    for checkpoint in ConfigCheckpoint.objects.select_related('base').order_by('-created_at', '-id').iterator():
+        key = 'data' if checkpoint.big_event_id else 'config'
+        lists.setdefault((checkpoint.site_id, checkpoint.big_event_id), []).append({
+            'id': checkpoint.checkpoint_id,
+            'timestamp': checkpoint.created_at.isoformat(),
+            key: apply_patch(checkpoint.base.config, checkpoint.delta),
+            'message': checkpoint.message,
+        })
+    for (site_id, big_event_id), entries in lists.items():
+        if big_event_id:
+            BigEvent.objects.filter(pk=big_event_id).update(ai_checkpoints=entries[:20])
+        else:
+            Site.objects.filter(pk=site_id).update(ai_checkpoints=entries[:20])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_calendar_window_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigCheckpointBase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('config', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('big_event', models.ForeignKey(blank=True, help_text='Set for BigEvent checkpoints; empty for site template_config checkpoints', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_bases', to='api.bigevent')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoint_bases', to='api.site')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConfigCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkpoint_id', models.CharField(help_text='Public id used by the undo API', max_length=64, unique=True)),
+                ('message', models.TextField(blank=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('delta', models.JSONField(blank=True, default=list, help_text='JSON patch from base.config to this checkpoint')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('big_event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='config_checkpoints', to='api.bigevent')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_checkpoints', to='api.site')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='api.configcheckpointbase')),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='configcheckpointbase',
+            index=models.Index(fields=['site', 'big_event', 'content_hash'], name='api_configc_site_id_06021c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='configcheckpoint',
+            index=models.Index(fields=['site', 'big_event', '-created_at'], name='api_configc_site_id_686775_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='configcheckpoint',
+            index=models.Index(fields=['site', 'big_event', 'content_hash'], name='api_configc_site_id_12131d_idx'),
+        ),
+        migrations.RunPython(move_checkpoints_to_table, move_checkpoints_to_lists),
+        migrations.RemoveField(
+            model_name='bigevent',
+            name='ai_checkpoints',
+        ),
+        migrations.RemoveField(
+            model_name='site',
+            name='ai_checkpoints',
+        ),
+    ]
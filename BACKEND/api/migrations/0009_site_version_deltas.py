@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+from api.json_patch import apply_patch, make_patch
+
+KEYFRAME_INTERVAL = 5
+
+
+def _versions_by_site(SiteVersion):
+    versions = {}
+    for version in SiteVersion.objects.order_by('site_id', 'version_number').iterator():
+        versions.setdefault(version.site_id, []).append(version)
+    return versions.values()
+
+
+def encode_versions(apps, schema_editor):
+    """Turns existing full snapshots into keyframes every KEYFRAME_INTERVAL versions plus deltas."""
+    SiteVersion = apps.get_model('api', 'SiteVersion')
+    for versions in _versions_by_site(SiteVersion):
+        previous = None
+        for position, version in enumerate(versions):
+            config = version.template_config
+            if position % KEYFRAME_INTERVAL:
+                version.delta = make_patch(previous, config)
+                version.template_config = None
+                version.save(update_fields=['template_config', 'delta'])
+            previous = config
+
+
+def decode_versions(apps, schema_editor):
+    """Stores the full config on every version again."""
+    SiteVersion = apps.get_model('api', 'SiteVersion')
+    for versions in _versions_by_site(SiteVersion):
+        config = {}
+        for version in versions:
+            if version.delta is None:
+                config = version.template_config if version.template_config is not None else {}
+            else:
+                config = apply_patch(config, version.delta)
+                version.template_config = config
+                version.delta = None
+                version.save(update_fields=['template_config', 'delta'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_config_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteversion',
+            name='delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='siteversion',
+            name='template_config',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(encode_versions, decode_versions),
+    ]
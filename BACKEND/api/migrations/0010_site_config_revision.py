@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_site_version_deltas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='site',
+            name='config_revision',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every template_config change; used for optimistic concurrency of config patches'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_site_config_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='site',
+            name='static_bundle_key',
+            field=models.CharField(blank=True, help_text='Storage key of the exported public bundle (content-hashed, see api/site_export.py)', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='static_bundle_url',
+            field=models.CharField(blank=True, help_text='Public URL of the exported bundle', max_length=500, null=True),
+        ),
+    ]
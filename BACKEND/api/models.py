@@ -1,6 +1,7 @@
 import uuid
 
 from django.db import models
+from django.db.models.functions import Cast
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 from django.utils.crypto import get_random_string
@@ -278,6 +279,48 @@ class ChatHistory(models.Model):
         return f"Chat {self.id}: {self.user.email} @ Agent {self.agent.name} ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
 
 
+class SiteQuerySet(models.QuerySet):
+    def with_content(self):
+        """Also load the site configuration (template_config)."""
+        return self.defer(None)
+
+    def with_raw_content(self):
+        """
+        Load template_config as JSON text (`template_config_json`) instead of decoding it.
+
+        For read-only responses: the site serializers pass the text through as
+        a pre-encoded fragment (see api/renderers.py).
+        """
+        return self.defer('template_config').annotate(
+            template_config_json=Cast('template_config', models.TextField())
+        )
+
+    def with_latest_version(self):
+        """
+        Prefetch the newest SiteVersion of every site into `prefetched_latest_versions`.
+
+        One extra query for the whole list (a correlated subquery picks the
+        newest version per site); version configs are not loaded.
+        """
+        return self.prefetch_related(latest_version_prefetch())
+
+
+class SiteManager(models.Manager.from_queryset(SiteQuerySet)):
+    """
+    Defers the large JSON column by default.
+
+    template_config can weigh megabytes; permission checks, bookings and
+    uploads only need the scalar columns. Endpoints that serialize or edit the configuration call
+    `.with_content()`. Accessing a deferred field still works (one extra query).
+    Related access (`booking.site`, `select_related('site')`) goes through the
+    base manager and loads the full row.
+    """
+    deferred_fields = ('template_config',)
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.deferred_fields)
+
+
 class Site(models.Model):
     """
     Represents a personal website in the platform.
@@ -316,14 +359,27 @@ class Site(models.Model):
     team_size = models.IntegerField(default=1, help_text='Cached count of team members for calendar optimization')
     is_mock = models.BooleanField(default=False, help_text='Flag indicating if this is a mock/demo site for testing (includes showcase)')
     template_config = models.JSONField(default=dict, blank=True)
-    ai_checkpoints = models.JSONField(
-        default=list, 
+    config_revision = models.PositiveIntegerField(
+        default=0,
+        help_text='Incremented on every template_config change; used for optimistic concurrency of config patches'
+    )
+    static_bundle_key = models.CharField(
+        max_length=255,
         blank=True,
-        help_text='List of AI checkpoints with {id, timestamp, config, message} for undo functionality'
+        null=True,
+        help_text='Storage key of the exported public bundle (content-hashed, see api/site_export.py)'
+    )
+    static_bundle_url = models.CharField(
+        max_length=500,
+        blank=True,
+        null=True,
+        help_text='Public URL of the exported bundle'
     )
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SiteManager()
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
         owner = getattr(self, 'owner', None)
@@ -351,10 +407,18 @@ class Site(models.Model):
 
 
 class SiteVersion(models.Model):
+    """
+    Saved snapshot of a site's template_config.
+
+    Versions are delta-encoded (see api/site_versions.py): keyframes store
+    the full config in `template_config` and have `delta=None`; every other
+    version stores only a JSON patch against its predecessor in `delta`.
+    """
     site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='versions')
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     version_number = models.PositiveIntegerField()
-    template_config = models.JSONField(default=dict, blank=True)
+    template_config = models.JSONField(blank=True, null=True)
+    delta = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     created_by = models.ForeignKey(
         PlatformUser,
@@ -372,10 +436,24 @@ class SiteVersion(models.Model):
             models.UniqueConstraint(fields=('site', 'version_number'), name='unique_site_version_per_site')
         ]
 
+    @property
+    def is_keyframe(self):
+        return self.delta is None
+
     def __str__(self):
         return f"{self.site.identifier} v{self.version_number}"
 
 
+def latest_version_prefetch(lookup='versions'):
+    """Prefetch of the newest SiteVersion per site, stored as `prefetched_latest_versions` (metadata only)."""
+    newest = SiteVersion.objects.filter(site=models.OuterRef('site')).order_by('-version_number').values('id')[:1]
+    return models.Prefetch(
+        lookup,
+        queryset=SiteVersion.objects.filter(id=models.Subquery(newest)).defer('template_config', 'delta'),
+        to_attr='prefetched_latest_versions',
+    )
+
+
 class Template(models.Model):
     owner = models.ForeignKey(PlatformUser, on_delete=models.CASCADE, related_name='calendar_templates')
     name = models.CharField(max_length=100)
@@ -492,6 +570,10 @@ class Event(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     capacity = models.IntegerField(default=1, help_text='Maximum capacity. Use -1 for unlimited participants.')
+    booked_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Denormalized number of bookings, maintained by api.booking_service'
+    )
     event_type = models.CharField(max_length=32, choices=EventType.choices, default=EventType.INDIVIDUAL)
     attendees = models.ManyToManyField(Client, related_name='events', blank=True)
     show_host = models.BooleanField(default=False, help_text='Whether to display the host/assigned person publicly')
@@ -500,6 +582,13 @@ class Event(models.Model):
 
     class Meta:
         ordering = ['start_time']
+        indexes = [
+            # Calendar windows: start_time >= day start AND start_time < day after end
+            models.Index(fields=['site', 'start_time']),
+            models.Index(fields=['site', 'assigned_to_team_member', 'start_time']),
+            # Delta sync of the Studio calendar (calendar_data?since=)
+            models.Index(fields=['site', 'updated_at']),
+        ]
         constraints = [
             models.CheckConstraint(check=models.Q(end_time__gt=models.F('start_time')), name='event_end_after_start'),
             models.CheckConstraint(check=models.Q(capacity__gte=1) | models.Q(capacity=-1), name='event_capacity_positive_or_unlimited'),
@@ -565,6 +654,11 @@ class AvailabilityBlock(models.Model):
 
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['site', 'date']),
+            # Delta sync of the Studio calendar (calendar_data?since=)
+            models.Index(fields=['site', 'updated_at']),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(end_time__gt=models.F('start_time')),
@@ -605,6 +699,68 @@ class Booking(models.Model):
         subject = self.client.email if self.client else self.guest_email or 'Guest'
         return f"Booking for {subject} on event {self.event_id}"
 
+
+class ComputedSlot(models.Model):
+    """
+    Materialized public availability slot.
+    Rows are recomputed per (site, day, assignee) whenever an event, booking or
+    availability block of that day changes, so the public calendar is a plain range read.
+    """
+    class AssigneeType(models.TextChoices):
+        OWNER = 'owner', 'Owner'
+        TEAM_MEMBER = 'team_member', 'Team Member'
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='computed_slots')
+    date = models.DateField(help_text='Local calendar day the slot belongs to')
+    assignee_type = models.CharField(max_length=20, choices=AssigneeType.choices)
+    assignee_id = models.BigIntegerField(null=True, blank=True)
+    assignee_name = models.CharField(max_length=255, blank=True)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    duration = models.PositiveIntegerField(help_text='Slot length in minutes')
+    capacity = models.IntegerField(default=1)
+    available_spots = models.IntegerField(default=1)
+    event_type = models.CharField(max_length=20, default='individual')
+    # Plain id instead of a FK: rows are rebuilt from scratch, never cascaded
+    event_id = models.BigIntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['site', 'date', 'start_time']),
+            models.Index(fields=['site', 'date', 'assignee_type', 'assignee_id']),
+        ]
+
+    def __str__(self):
+        return f"Slot {self.start_time} ({self.assignee_type}:{self.assignee_id}) on site {self.site_id}"
+
+
+class CalendarTombstone(models.Model):
+    """
+    Record of a deleted event or availability block, so delta-syncing calendar
+    clients (calendar_data?since=) can drop it. Pruned after
+    CALENDAR_TOMBSTONE_RETENTION_DAYS.
+    """
+    class Kind(models.TextChoices):
+        EVENT = 'event', 'Event'
+        AVAILABILITY_BLOCK = 'availability_block', 'Availability Block'
+
+    # Plain ids: tombstones must survive (and never block) the deletion of their site
+    site_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site_id', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id} (site {self.site_id})"
+
 class AttendedSessionManager(models.Manager):
     def sync_for_site(self, site, until=None) -> int:
         """Snapshot finished events into attendance table (idempotent)."""
@@ -1376,13 +1532,6 @@ class BigEvent(models.Model):
     image_url = models.CharField(max_length=500, blank=True, null=True, help_text='Event cover image')
     details = models.JSONField(default=dict, blank=True, help_text='Additional event details (schedule, requirements, etc.)')
     
-    # AI checkpoints for reverting changes
-    ai_checkpoints = models.JSONField(
-        default=list,
-        blank=True,
-        help_text='List of AI checkpoints (max 20, newest first). Each checkpoint stores event state before AI changes.'
-    )
-    
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(blank=True, null=True)
@@ -1398,6 +1547,57 @@ class BigEvent(models.Model):
         return f"{self.title} ({self.site.identifier}) - {self.get_status_display()}"
 
 
+class ConfigCheckpointBase(models.Model):
+    """
+    Full copy of a site configuration (or BigEvent data) that AI undo
+    checkpoints are stored as deltas against. See api/checkpoints.py.
+    """
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='checkpoint_bases')
+    big_event = models.ForeignKey(
+        BigEvent, on_delete=models.CASCADE, null=True, blank=True, related_name='checkpoint_bases',
+        help_text='Set for BigEvent checkpoints; empty for site template_config checkpoints'
+    )
+    content_hash = models.CharField(max_length=64)
+    config = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'big_event', 'content_hash']),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint base {self.content_hash[:12]} (site {self.site_id})"
+
+
+class ConfigCheckpoint(models.Model):
+    """
+    AI undo checkpoint: an RFC 6902 patch from its base to the checkpointed state.
+
+    Restoring applies one patch to one base; listing reads only metadata.
+    """
+    site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='config_checkpoints')
+    big_event = models.ForeignKey(
+        BigEvent, on_delete=models.CASCADE, null=True, blank=True, related_name='config_checkpoints'
+    )
+    checkpoint_id = models.CharField(max_length=64, unique=True, help_text='Public id used by the undo API')
+    message = models.TextField(blank=True)
+    content_hash = models.CharField(max_length=64)
+    base = models.ForeignKey(ConfigCheckpointBase, on_delete=models.CASCADE, related_name='checkpoints')
+    delta = models.JSONField(default=list, blank=True, help_text='JSON patch from base.config to this checkpoint')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['site', 'big_event', '-created_at']),
+            models.Index(fields=['site', 'big_event', 'content_hash']),
+        ]
+
+    def __str__(self):
+        return f"Checkpoint {self.checkpoint_id} (site {self.site_id})"
+
+
 class GoogleCalendarIntegration(models.Model):
     """
     Stores Google Calendar OAuth credentials and sync settings for a Site.
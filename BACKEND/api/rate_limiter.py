@@ -0,0 +1,426 @@
+"""Shared rate-limit engine for DDoSProtectionMiddleware and the @rate_limit decorators.
+
+A `RatePolicy` is one or more `Rate`s (limit per window, optional burst)
+applied with a pluggable strategy:
+
+- `token_bucket` uses GCRA (generic cell rate algorithm). Each rate keeps a
+  single "theoretical arrival time" per client. A request is allowed when
+  that time is at most the burst tolerance ahead of now. Allowing it moves
+  the time forward by one emission interval (window / limit), so capacity
+  refills at the steady rate. On Redis the block check, every rate and
+  setting the block flag run in one Lua script (one EVALSHA round trip).
+- `sliding_window` weights the previous fixed window by how much of it
+  still overlaps the sliding window. On Redis, INCR + EXPIRE of the current
+  window and GET of the previous one are pipelined (one round trip).
+  Rejected requests are counted too, so a client retrying blindly stays
+  limited until it backs off.
+
+Other cache backends (LocMem in development and tests) run the same
+algorithms with the Django cache API. A policy with `block_duration` blocks
+the client for that long once any rate is exceeded. Decisions carry the
+values for the `RateLimit-*` and `Retry-After` headers (`apply_headers`).
+
+Named policies are declared in settings.RATE_LIMIT_POLICIES (see
+`get_policy`). New strategies are added with `register_strategy`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from redis.exceptions import NoScriptError
+except ImportError:  # pragma: no cover - optional dependency
+    NoScriptError = None
+
+logger = logging.getLogger(__name__)
+
+# Decision statuses
+ALLOWED, ALREADY_BLOCKED, BLOCKED_NOW, LIMITED = 0, 1, 2, 3
+
+_RATE_SPEC = re.compile(r'^(\d+)/(\d*)([smhd]?)(?:\+(\d+))?$')
+_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: block flag, then one TAT (theoretical arrival time, ms) per rate
+# ARGV: now (ms), block duration (ms, 0 = no block), then interval and tolerance (ms) per rate
+# Returns {status, retry after (ms), rate index (1-based), remaining, reset (ms)}
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local block_ms = tonumber(ARGV[2])
+if block_ms > 0 then
+  local blocked = redis.call('PTTL', KEYS[1])
+  if blocked > 0 then
+    return {1, blocked, 1, 0, blocked}
+  end
+end
+local tats = {}
+local tight, tight_remaining, tight_reset = 1, -1, 0
+for i = 2, #KEYS do
+  local interval = tonumber(ARGV[2 * i - 1])
+  local tolerance = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  if tat - now > tolerance then
+    if block_ms > 0 then
+      redis.call('SET', KEYS[1], now, 'PX', block_ms)
+      return {2, block_ms, i - 1, 0, block_ms}
+    end
+    return {3, tat - now - tolerance, i - 1, 0, tat - now}
+  end
+  tats[i] = tat + interval
+  local remaining = math.floor((tolerance - (tat - now)) / interval)
+  if tight_remaining < 0 or remaining < tight_remaining then
+    tight, tight_remaining, tight_reset = i - 1, remaining, tats[i] - now
+  end
+end
+for i = 2, #KEYS do
+  redis.call('SET', KEYS[i], tats[i], 'PX', tats[i] - now)
+end
+return {0, 0, tight, tight_remaining, tight_reset}
+"""
+TOKEN_BUCKET_SCRIPT_SHA = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class Rate:
+    limit: int
+    window: int  # seconds
+    burst: int = 0
+
+    @classmethod
+    def parse(cls, spec) -> 'Rate':
+        """'<limit>/<window>[+<burst>]', the window in seconds or s/m/h/d (e.g. '10/m', '100/15m', '120/60+30')."""
+        if isinstance(spec, Rate):
+            return spec
+        match = _RATE_SPEC.match(str(spec).replace(' ', ''))
+        if not match or not (match.group(2) or match.group(3)):
+            raise ImproperlyConfigured(f'Invalid rate: {spec!r}')
+        limit, count, unit, burst = match.groups()
+        rate = cls(limit=int(limit), window=int(count or 1) * _UNITS[unit], burst=int(burst or 0))
+        if rate.limit < 1 or rate.window < 1:
+            raise ImproperlyConfigured(f'Invalid rate: {spec!r}')
+        return rate
+
+    @property
+    def capacity(self) -> int:
+        return self.limit + self.burst
+
+    def gcra(self) -> Tuple[int, int]:
+        """(emission interval, burst tolerance) in whole milliseconds."""
+        interval = math.ceil(self.window * 1000 / max(self.limit, 1))
+        return interval, interval * max(self.capacity - 1, 0)
+
+    def __str__(self):
+        # RateLimit-Policy item
+        return f'{self.limit};w={self.window}' + (f';burst={self.burst}' if self.burst else '')
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    rates: Tuple[Rate, ...]
+    strategy: str = 'token_bucket'
+    block_duration: int = 0  # seconds; 0 rejects only while a rate is exceeded
+    scope: str = ''  # cache key namespace, `rl:<name>` by default
+
+    @property
+    def key_scope(self) -> str:
+        return self.scope or f'rl:{self.name}'
+
+    @classmethod
+    def from_spec(cls, name: str, spec, *, scope: str = '', strategy: str = 'token_bucket') -> 'RatePolicy':
+        """A policy from a settings entry: a rate string, or a dict with rates, strategy, block_duration and scope."""
+        if not isinstance(spec, dict):
+            spec = {'rates': [spec]}
+        rates = spec.get('rates') or []
+        if isinstance(rates, (str, Rate)):
+            rates = [rates]
+        policy = cls(
+            name=name,
+            rates=tuple(Rate.parse(rate) for rate in rates),
+            strategy=spec.get('strategy', strategy),
+            block_duration=int(spec.get('block_duration', 0)),
+            scope=spec.get('scope', scope),
+        )
+        if not policy.rates:
+            raise ImproperlyConfigured(f'Rate limit policy {name!r} has no rates')
+        if policy.strategy not in STRATEGIES:
+            raise ImproperlyConfigured(f'Unknown rate limit strategy {policy.strategy!r} in policy {name!r}')
+        return policy
+
+
+def get_policy(*names: Optional[str], scope: str = '', default: Optional[RatePolicy] = None) -> Optional[RatePolicy]:
+    """The first of `names` declared in settings.RATE_LIMIT_POLICIES (route names come before preset names)."""
+    declared = getattr(settings, 'RATE_LIMIT_POLICIES', {})
+    for name in names:
+        if name and name in declared:
+            return RatePolicy.from_spec(name, declared[name], scope=scope, strategy=default_strategy())
+    return default
+
+
+def default_strategy() -> str:
+    return getattr(settings, 'RATE_LIMIT_STRATEGY', 'sliding_window')
+
+
+@dataclass(frozen=True)
+class RateDecision:
+    status: int
+    retry_after: int  # seconds
+    rate: Optional[Rate] = None  # the rate closest to exhaustion, reported in the headers
+    remaining: int = 0
+    reset: int = 0  # seconds until `rate` has its full capacity again
+    policy: Optional[RatePolicy] = None
+
+    @property
+    def allowed(self) -> bool:
+        return self.status == ALLOWED
+
+    @property
+    def blocked_now(self) -> bool:
+        """This request exceeded a rate and blocked the client."""
+        return self.status == BLOCKED_NOW
+
+    def headers(self) -> Dict[str, str]:
+        """`RateLimit-*` headers (IETF httpapi draft), and `Retry-After` on a rejection."""
+        headers = {}
+        if self.policy is not None:
+            headers['RateLimit-Policy'] = ', '.join(str(rate) for rate in self.policy.rates)
+        if self.rate is not None:
+            headers['RateLimit-Limit'] = str(self.rate.capacity)
+            headers['RateLimit-Remaining'] = str(max(self.remaining, 0))
+            headers['RateLimit-Reset'] = str(self.reset)
+        if not self.allowed:
+            headers['Retry-After'] = str(max(self.retry_after, 1))
+        return headers
+
+
+def apply_headers(response, decision: RateDecision):
+    for name, value in decision.headers().items():
+        response[name] = value
+    return response
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _seconds(ms) -> int:
+    return math.ceil(int(ms) / 1000)
+
+
+def _decision(policy: RatePolicy, status: int, retry_ms: int, index: int = 1, remaining: int = 0, reset_ms: int = 0) -> RateDecision:
+    return RateDecision(
+        status=int(status),
+        retry_after=_seconds(retry_ms),
+        rate=policy.rates[max(int(index), 1) - 1],
+        remaining=int(remaining),
+        reset=_seconds(reset_ms),
+        policy=policy,
+    )
+
+
+# ----------------------------------------------------------------------------
+# Strategies
+# ----------------------------------------------------------------------------
+
+STRATEGIES: Dict[str, object] = {}
+
+
+def register_strategy(cls):
+    """Class decorator: make a strategy available to policies under `cls.name`."""
+    STRATEGIES[cls.name] = cls()
+    return cls
+
+
+@register_strategy
+class TokenBucket:
+    """GCRA: one EVALSHA on Redis, the same steps under a process-wide lock elsewhere."""
+
+    name = 'token_bucket'
+    _lock = threading.Lock()
+
+    def check(self, limiter: 'RateLimiter', policy: RatePolicy, identity: str, now: int) -> RateDecision:
+        block_key = limiter.key(policy.key_scope, 'blocked', identity)
+        rate_keys = [limiter.key(policy.key_scope, f'tb:{rate.window}', identity) for rate in policy.rates]
+        if limiter.redis:
+            args = [now, policy.block_duration * 1000]
+            for rate in policy.rates:
+                args.extend(rate.gcra())
+            result = limiter.eval_script(TOKEN_BUCKET_SCRIPT, TOKEN_BUCKET_SCRIPT_SHA, [block_key, *rate_keys], args)
+            return _decision(policy, *result)
+
+        backend = limiter.backend
+        with self._lock:
+            stored = backend.get_many([block_key, *rate_keys])
+            blocked_ms = limiter.blocked_ms(stored.get(block_key), now) if policy.block_duration else 0
+            if blocked_ms:
+                return _decision(policy, ALREADY_BLOCKED, blocked_ms, reset_ms=blocked_ms)
+
+            updates, tight = {}, None
+            for index, (key, rate) in enumerate(zip(rate_keys, policy.rates), 1):
+                interval, tolerance = rate.gcra()
+                tat = max(stored.get(key, now), now)
+                if tat - now > tolerance:
+                    return limiter.exceeded(policy, identity, now, index, tat - now - tolerance, tat - now)
+                updates[key] = tat + interval
+                remaining = (tolerance - (tat - now)) // interval
+                if tight is None or remaining < tight[1]:
+                    tight = (index, remaining, tat + interval - now)
+            for key, tat in updates.items():
+                backend.set(key, tat, timeout=_seconds(tat - now))
+        return _decision(policy, ALLOWED, 0, *tight)
+
+
+@register_strategy
+class SlidingWindow:
+    """Sliding-window counter: the current window plus the overlapping share of the previous one."""
+
+    name = 'sliding_window'
+
+    def check(self, limiter: 'RateLimiter', policy: RatePolicy, identity: str, now: int) -> RateDecision:
+        block_key = limiter.key(policy.key_scope, 'blocked', identity)
+        windows = []
+        for rate in policy.rates:
+            window_ms = rate.window * 1000
+            current = now // window_ms
+            windows.append((
+                rate,
+                limiter.key(policy.key_scope, f'sw:{rate.window}:{current}', identity),
+                limiter.key(policy.key_scope, f'sw:{rate.window}:{current - 1}', identity),
+                now - current * window_ms,
+            ))
+
+        counter = self._redis_counts if limiter.redis else self._cache_counts
+        blocked_ms, counts = counter(limiter, policy, block_key, windows, now)
+        if blocked_ms:
+            return _decision(policy, ALREADY_BLOCKED, blocked_ms, reset_ms=blocked_ms)
+
+        tight = None
+        for index, ((rate, _, _, elapsed), (current, previous)) in enumerate(zip(windows, counts), 1):
+            window_ms = rate.window * 1000
+            used = current + int(previous * (window_ms - elapsed) / window_ms)
+            if used > rate.capacity:
+                if current >= rate.capacity:
+                    retry_ms = window_ms - elapsed
+                else:
+                    # Until the previous window's weight leaves room for one more request
+                    retry_ms = math.ceil(window_ms * (1 - (rate.capacity - current) / previous)) - elapsed
+                return limiter.exceeded(policy, identity, now, index, max(retry_ms, 1), window_ms - elapsed)
+            remaining = rate.capacity - used
+            if tight is None or remaining < tight[1]:
+                tight = (index, remaining, window_ms - elapsed)
+        return _decision(policy, ALLOWED, 0, *tight)
+
+    def _redis_counts(self, limiter, policy, block_key, windows, now):
+        pipe = limiter.client().pipeline(transaction=False)
+        if policy.block_duration:
+            pipe.pttl(block_key)
+        for rate, current_key, previous_key, _ in windows:
+            pipe.incr(current_key)
+            pipe.expire(current_key, rate.window * 2)
+            pipe.get(previous_key)
+        results = pipe.execute()
+
+        blocked_ms = max(int(results.pop(0)), 0) if policy.block_duration else 0
+        counts = [(int(results[i]), int(results[i + 2] or 0)) for i in range(0, len(results), 3)]
+        return blocked_ms, counts
+
+    def _cache_counts(self, limiter, policy, block_key, windows, now):
+        backend = limiter.backend
+        currents = []
+        for rate, current_key, _, _ in windows:
+            backend.add(current_key, 0, timeout=rate.window * 2)
+            try:
+                currents.append(backend.incr(current_key))
+            except ValueError:
+                # Expired between add() and incr()
+                backend.set(current_key, 1, timeout=rate.window * 2)
+                currents.append(1)
+        stored = backend.get_many([block_key, *(previous_key for _, _, previous_key, _ in windows)])
+
+        blocked_ms = limiter.blocked_ms(stored.get(block_key), now) if policy.block_duration else 0
+        counts = [(current, stored.get(previous_key, 0)) for current, (_, _, previous_key, _) in zip(currents, windows)]
+        return blocked_ms, counts
+
+
+# ----------------------------------------------------------------------------
+# Limiter
+# ----------------------------------------------------------------------------
+
+class RateLimiter:
+    """Applies policies on one cache backend: scripts and pipelines on Redis, the Django cache API elsewhere."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.redis = NoScriptError is not None and isinstance(backend, RedisCache)
+
+    def client(self):
+        # The primary server holds every key, so a script sees all of them
+        return self.backend._cache.get_client(write=True)
+
+    def key(self, scope: str, part: str, identity: str) -> str:
+        key = f'{scope}:{part}:{identity}'
+        # Raw Redis commands skip the cache's own key prefixing
+        return self.backend.make_key(key) if self.redis else key
+
+    def eval_script(self, source: str, sha: str, keys, args):
+        client = self.client()
+        try:
+            return client.evalsha(sha, len(keys), *keys, *args)
+        except NoScriptError:
+            return client.eval(source, len(keys), *keys, *args)
+
+    def check(self, identity, policy: RatePolicy, now_ms: Optional[int] = None) -> RateDecision:
+        strategy = STRATEGIES[policy.strategy]
+        return strategy.check(self, policy, str(identity), now_ms if now_ms is not None else _now_ms())
+
+    def exceeded(self, policy: RatePolicy, identity: str, now: int, index: int, retry_ms: int, reset_ms: int) -> RateDecision:
+        """Decision for a request over `policy.rates[index - 1]`; blocks the client if the policy says so."""
+        if policy.block_duration:
+            self._set_block(policy.key_scope, identity, now, policy.block_duration * 1000)
+            return _decision(policy, BLOCKED_NOW, policy.block_duration * 1000, index, 0, policy.block_duration * 1000)
+        return _decision(policy, LIMITED, retry_ms, index, 0, reset_ms)
+
+    def blocked_ms(self, blocked_until, now: int) -> int:
+        """Remaining block of a cache-backend block flag (which stores the end timestamp)."""
+        return max(blocked_until - now, 0) if blocked_until is not None else 0
+
+    def block(self, scope: str, identity, duration: int) -> None:
+        self._set_block(scope, str(identity), _now_ms(), duration * 1000)
+
+    def unblock(self, scope: str, identity) -> None:
+        key = self.key(scope, 'blocked', str(identity))
+        if self.redis:
+            self.client().delete(key)
+        else:
+            self.backend.delete(key)
+
+    def block_remaining(self, scope: str, identity) -> int:
+        key = self.key(scope, 'blocked', str(identity))
+        if self.redis:
+            remaining = self.client().pttl(key)
+            return _seconds(remaining) if remaining and remaining > 0 else 0
+        return _seconds(self.blocked_ms(self.backend.get(key), _now_ms()))
+
+    def _set_block(self, scope: str, identity: str, now: int, duration_ms: int) -> None:
+        key = self.key(scope, 'blocked', identity)
+        if self.redis:
+            self.client().set(key, now, px=duration_ms)
+        else:
+            self.backend.set(key, now + duration_ms, timeout=_seconds(duration_ms))
+
+
+def get_limiter(alias: str = 'default') -> RateLimiter:
+    return RateLimiter(caches[alias])
@@ -3,6 +3,8 @@ Rate limiting decorators for API views.
 
 This module provides decorators to apply rate limiting to specific API endpoints,
 particularly those that are computationally expensive or security-sensitive.
+Limits are checked by the shared engine in api/rate_limiter.py (the same one
+DDoSProtectionMiddleware uses) with policies from settings.RATE_LIMIT_POLICIES.
 
 Also includes CAPTCHA requirement helpers for progressive security.
 """
@@ -12,10 +14,11 @@ from django.core.cache import cache
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
-import time
 import logging
 import requests as http_requests
 
+from .rate_limiter import Rate, RatePolicy, apply_headers, default_strategy, get_limiter, get_policy
+
 logger = logging.getLogger(__name__)
 
 
@@ -98,7 +101,68 @@ def get_captcha_status(identifier, action='login'):
 # Rate Limiting Decorators
 # ============================================
 
-def rate_limit(requests=10, window=60, key_prefix='api'):
+def _limited_view(func, requests, window, key_prefix, policy, identify):
+    """
+    Wrap a view (function or class-based method) with a policy of the shared engine.
+
+    The policy is looked up at request time in settings.RATE_LIMIT_POLICIES:
+    first under the route (`func.__qualname__`, e.g. 'RequestMagicLinkView.post'),
+    then under `policy`; otherwise `requests` per `window` seconds is used.
+    Counters are kept per route and identifier.
+    """
+    route = func.__qualname__
+    scope = f'{key_prefix}:{route}'
+
+    @wraps(func)
+    def wrapper(first_arg, *args, **kwargs):
+        # Handle both function-based views and class-based view methods
+        # If first_arg has META attribute, it's the request object
+        # Otherwise, it's self and request is the first element of args
+        if hasattr(first_arg, 'META'):
+            request = first_arg
+        else:
+            # Class-based view method: first_arg is self, args[0] is request
+            request = args[0] if args else None
+
+        if request is None:
+            logger.error("Rate limit decorator: could not find request object")
+            return func(first_arg, *args, **kwargs)
+
+        identifier = identify(request)
+        route_policy = get_policy(route, policy, scope=scope) or RatePolicy(
+            name=policy or route,
+            rates=(Rate(requests, window),),
+            strategy=default_strategy(),
+            scope=scope,
+        )
+        try:
+            decision = get_limiter().check(identifier, route_policy)
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing {route} for {identifier}: {e}")
+            return func(first_arg, *args, **kwargs)
+
+        if not decision.allowed:
+            logger.warning(
+                f"Rate limit exceeded for {route} by {identifier}: "
+                f"policy {route_policy.name} ({route_policy.strategy})"
+            )
+            response = Response(
+                {
+                    'error': 'Rate limit exceeded',
+                    'detail': f'Maximum {decision.rate.limit} requests per {decision.rate.window} seconds allowed',
+                    'retry_after': decision.retry_after
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            return apply_headers(response, decision)
+
+        # Process request with original arguments
+        return apply_headers(func(first_arg, *args, **kwargs), decision)
+
+    return wrapper
+
+
+def rate_limit(requests=10, window=60, key_prefix='api', policy=None):
     """
     Rate limit decorator for API views.
     
@@ -106,6 +170,9 @@ def rate_limit(requests=10, window=60, key_prefix='api'):
         requests: Maximum number of requests allowed in the time window
         window: Time window in seconds
         key_prefix: Prefix for the cache key
+        policy: Name of a settings.RATE_LIMIT_POLICIES entry that overrides requests/window
+    
+    Responses carry RateLimit-* headers, and Retry-After when rejected.
     
     Usage:
         @rate_limit(requests=5, window=60)  # 5 requests per minute
@@ -119,58 +186,11 @@ def rate_limit(requests=10, window=60, key_prefix='api'):
             ...
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(first_arg, *args, **kwargs):
-            # Handle both function-based views and class-based view methods
-            # If first_arg has META attribute, it's the request object
-            # Otherwise, it's self and request is the first element of args
-            if hasattr(first_arg, 'META'):
-                request = first_arg
-                actual_args = args
-            else:
-                # Class-based view method: first_arg is self, args[0] is request
-                request = args[0] if args else None
-                actual_args = args[1:] if len(args) > 1 else ()
-                
-            if request is None:
-                logger.error("Rate limit decorator: could not find request object")
-                return func(first_arg, *args, **kwargs)
-            
-            # Get client IP
-            ip = get_client_ip(request)
-            
-            # Create cache key
-            now = int(time.time())
-            window_key = f'{key_prefix}:{func.__name__}:{ip}:{now // window}'
-            
-            # Get current count
-            count = cache.get(window_key, 0)
-            
-            if count >= requests:
-                logger.warning(
-                    f"Rate limit exceeded for {func.__name__} from IP {ip}: "
-                    f"{count} requests in {window}s window"
-                )
-                return Response(
-                    {
-                        'error': 'Rate limit exceeded',
-                        'detail': f'Maximum {requests} requests per {window} seconds allowed',
-                        'retry_after': window - (now % window)
-                    },
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
-            
-            # Increment counter
-            cache.set(window_key, count + 1, window)
-            
-            # Process request with original arguments
-            return func(first_arg, *args, **kwargs)
-        
-        return wrapper
+        return _limited_view(func, requests, window, key_prefix, policy, get_client_ip)
     return decorator
 
 
-def authenticated_rate_limit(requests=20, window=60, key_prefix='auth_api'):
+def authenticated_rate_limit(requests=20, window=60, key_prefix='auth_api', policy=None):
     """
     Rate limit decorator that uses user ID instead of IP for authenticated requests.
     Falls back to IP-based limiting for unauthenticated requests.
@@ -179,57 +199,16 @@ def authenticated_rate_limit(requests=20, window=60, key_prefix='auth_api'):
         requests: Maximum number of requests allowed in the time window
         window: Time window in seconds
         key_prefix: Prefix for the cache key
+        policy: Name of a settings.RATE_LIMIT_POLICIES entry that overrides requests/window
     """
+    def identify(request):
+        # Determine identifier (user ID or IP)
+        if hasattr(request, 'user') and request.user.is_authenticated:
+            return f'user_{request.user.id}'
+        return f'ip_{get_client_ip(request)}'
+
     def decorator(func):
-        @wraps(func)
-        def wrapper(first_arg, *args, **kwargs):
-            # Handle both function-based views and class-based view methods
-            if hasattr(first_arg, 'META'):
-                request = first_arg
-                actual_args = args
-            else:
-                # Class-based view method: first_arg is self, args[0] is request
-                request = args[0] if args else None
-                actual_args = args[1:] if len(args) > 1 else ()
-                
-            if request is None:
-                logger.error("Authenticated rate limit decorator: could not find request object")
-                return func(first_arg, *args, **kwargs)
-            
-            # Determine identifier (user ID or IP)
-            if hasattr(request, 'user') and request.user.is_authenticated:
-                identifier = f'user_{request.user.id}'
-            else:
-                identifier = f'ip_{get_client_ip(request)}'
-            
-            # Create cache key
-            now = int(time.time())
-            window_key = f'{key_prefix}:{func.__name__}:{identifier}:{now // window}'
-            
-            # Get current count
-            count = cache.get(window_key, 0)
-            
-            if count >= requests:
-                logger.warning(
-                    f"Rate limit exceeded for {func.__name__} by {identifier}: "
-                    f"{count} requests in {window}s window"
-                )
-                return Response(
-                    {
-                        'error': 'Rate limit exceeded',
-                        'detail': f'Maximum {requests} requests per {window} seconds allowed',
-                        'retry_after': window - (now % window)
-                    },
-                    status=status.HTTP_429_TOO_MANY_REQUESTS
-                )
-            
-            # Increment counter
-            cache.set(window_key, count + 1, window)
-            
-            # Process request with original arguments
-            return func(first_arg, *args, **kwargs)
-        
-        return wrapper
+        return _limited_view(func, requests, window, key_prefix, policy, identify)
     return decorator
 
 
@@ -245,11 +224,11 @@ def get_client_ip(request):
 
 # Preset decorators for common use cases
 # Public endpoints - stricter limits
-rate_limit_strict = rate_limit(requests=10, window=60)  # 10 requests per minute (increased from 5)
-rate_limit_moderate = rate_limit(requests=30, window=60)  # 30 requests per minute
-rate_limit_relaxed = rate_limit(requests=120, window=60)  # 120 requests per minute
+rate_limit_strict = rate_limit(requests=10, window=60, policy='strict')  # 10 requests per minute (increased from 5)
+rate_limit_moderate = rate_limit(requests=30, window=60, policy='moderate')  # 30 requests per minute
+rate_limit_relaxed = rate_limit(requests=120, window=60, policy='relaxed')  # 120 requests per minute
 
 # For authenticated endpoints - higher limits
-auth_rate_limit_strict = authenticated_rate_limit(requests=20, window=60)  # 2x for auth users
-auth_rate_limit_moderate = authenticated_rate_limit(requests=60, window=60)
-auth_rate_limit_relaxed = authenticated_rate_limit(requests=240, window=60)
+auth_rate_limit_strict = authenticated_rate_limit(requests=20, window=60, policy='auth_strict')  # 2x for auth users
+auth_rate_limit_moderate = authenticated_rate_limit(requests=60, window=60, policy='auth_moderate')
+auth_rate_limit_relaxed = authenticated_rate_limit(requests=240, window=60, policy='auth_relaxed')
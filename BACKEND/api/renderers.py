@@ -0,0 +1,125 @@
+"""Fast JSON rendering with pre-encoded fragments.
+
+`FastJSONRenderer` encodes responses with orjson (pinned in
+requirements.txt) and falls back to the standard library where it is not
+installed, e.g. in a bare dev environment. The fallback produces the same
+bytes as DRF's JSONRenderer.
+
+Large JSON columns do not have to be decoded just to be encoded again. A
+queryset can select the column as text (`SiteQuerySet.with_raw_content`,
+which reads `template_config::text`), and the serializer then returns a
+`RawJSON` fragment. `dumps` splices that text into the body as it is, so
+the Python object is never built.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from typing import Any, Union
+
+from rest_framework.compat import INDENT_SEPARATORS, LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None and not hasattr(orjson, 'Fragment'):  # pragma: no cover - orjson < 3.9
+    orjson = None
+
+
+class RawJSON:
+    """A JSON value that is already encoded (e.g. a jsonb column read as text)."""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: Union[str, bytes]):
+        self.text = text
+
+    def __repr__(self):
+        return f'RawJSON({len(self.text)} chars)'
+
+    def decode(self) -> Any:
+        return json.loads(self.text)
+
+
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else 0
+)
+
+
+def _orjson_default(value):
+    if isinstance(value, RawJSON):
+        return orjson.Fragment(value.text)
+    # Same representation as DRF for datetimes, Decimals, lazy strings, querysets...
+    return JSONEncoder().default(value)
+
+
+class _FragmentEncoder(JSONEncoder):
+    """Encodes RawJSON as a unique placeholder string that `_stdlib_dumps` replaces with the fragment."""
+
+    def __init__(self, *args, fragments, token, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = fragments
+        self.token = token
+
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            self.fragments.append(obj.text)
+            return f'{self.token}{len(self.fragments) - 1}'
+        return super().default(obj)
+
+
+def _stdlib_dumps(data: Any, *, indent=None, separators=SHORT_SEPARATORS, ensure_ascii=False, allow_nan=False) -> bytes:
+    fragments = []
+    token = f'raw-json-{uuid.uuid4().hex}-'
+    text = json.dumps(
+        data,
+        cls=_FragmentEncoder,
+        fragments=fragments,
+        token=token,
+        indent=indent,
+        ensure_ascii=ensure_ascii,
+        allow_nan=allow_nan,
+        separators=separators,
+    )
+    for index, fragment in enumerate(fragments):
+        if isinstance(fragment, bytes):
+            fragment = fragment.decode()
+        text = text.replace(f'"{token}{index}"', fragment, 1)
+    # Same escaping as DRF's JSONRenderer (U+2028/2029 break JavaScript string literals)
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON of `data`; RawJSON fragments are inserted verbatim."""
+    if orjson is not None:
+        body = orjson.dumps(data, default=_orjson_default, option=_ORJSON_OPTIONS)
+        # Same escaping as DRF's JSONRenderer; orjson writes U+2028/2029 unescaped
+        if b'\xe2\x80\xa8' in body or b'\xe2\x80\xa9' in body:
+            body = body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return body
+    return _stdlib_dumps(data, ensure_ascii=not api_settings.UNICODE_JSON, allow_nan=not api_settings.STRICT_JSON)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using `dumps` (orjson when available, RawJSON fragments spliced in)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact:
+            return dumps(data)
+        return _stdlib_dumps(
+            data,
+            indent=indent,
+            separators=INDENT_SEPARATORS if indent is not None else LONG_SEPARATORS,
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+        )
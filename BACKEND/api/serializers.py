@@ -1,12 +1,16 @@
 """Serializers for the multi-tenant Personal Site Generator backend."""
 
+import copy
 import logging
+from functools import cached_property
+
+from django.core.exceptions import FieldDoesNotExist
 from django.utils.text import slugify
 from django.utils import timezone
 from rest_framework import serializers
 
-from django.db import ProgrammingError, OperationalError
-from django.db.models import Q
+from django.db import ProgrammingError, OperationalError, transaction
+from django.db.models import F, Prefetch, Q
 
 from .models import (
     PlatformUser,
@@ -35,10 +39,161 @@ from .models import (
     GoogleCalendarIntegration,
 )
 from .media_helpers import cleanup_asset_if_unused, get_asset_by_path_or_url
+from .renderers import RawJSON
+from .site_versions import version_config
 
 logger = logging.getLogger(__name__)
 
 
+class EagerLoadingMixin:
+    """
+    Serializer-declared relation requirements.
+
+    `select_related_fields` and `prefetch_related_fields` list every relation the
+    serializer (including its method fields) dereferences. Views call
+    `setup_eager_loading` on their querysets, so serializing N objects costs a
+    constant number of queries.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+def _field_list(request, name):
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+    raw = params.get(name)
+    if not raw:
+        return None
+    return {item.strip() for item in raw.split(',') if item.strip()}
+
+
+def _select_related_paths(tree, base=''):
+    for name, children in tree.items():
+        if children:
+            yield from _select_related_paths(children, f'{base}{name}__')
+        else:
+            yield f'{base}{name}'
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets: `?fields=id,name` keeps only the listed top-level fields
+    and `?omit=template_config` drops fields. The `fields=` / `omit=`
+    serializer kwargs take precedence over the query string, which is read by
+    the root serializer only (nested serializers have no context of their
+    own). Only the representation is trimmed; writable fields stay in place.
+
+    `restrict_queryset` trims the queryset to match: model columns read only by
+    dropped fields are deferred, and select/prefetch lookups used only by them
+    are removed. Method fields declare what they read in `sparse_field_sources`;
+    columns read regardless of the selected fields (e.g. in `to_representation`)
+    are listed in `sparse_always_load` and never deferred.
+    """
+    sparse_always_fields = ('id',)
+    sparse_always_load = ()
+    sparse_field_sources = {}
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and omit is None:
+            request = self._context.get('request')
+            fields, omit = _field_list(request, 'fields'), _field_list(request, 'omit')
+        self._sparse_fieldset = (fields, omit)
+
+    @cached_property
+    def sparse_field_names(self):
+        """Names of the top-level fields kept in the representation (None: all of them)."""
+        fields, omit = self._sparse_fieldset
+        if fields is None and not omit:
+            return None
+        always = set(self.sparse_always_fields)
+        names = set(self.fields)
+        kept = names & (set(fields) | always) if fields is not None else names
+        return kept - (set(omit or ()) - always)
+
+    @property
+    def _readable_fields(self):
+        kept = self.sparse_field_names
+        for field in super()._readable_fields:
+            if kept is None or field.field_name in kept:
+                yield field
+
+    def _sources(self, name, field):
+        if name in self.sparse_field_sources:
+            return set(self.sparse_field_sources[name])
+        if field.source == '*':
+            return set()
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # Reads the foreign key column only, not the related row
+            return {f'{field.source}_id'}
+        return {field.source.split('.')[0]}
+
+    @classmethod
+    def restrict_queryset(cls, queryset, request=None, *, fields=None, omit=None, prefix=''):
+        """
+        Trim `queryset` to the fields selected for `request`.
+
+        `prefix` is the lookup path from the queryset's model to the
+        serializer's (e.g. 'site__' for TeamMember rows serialized as sites).
+        """
+        serializer = cls(fields=fields, omit=omit, context={'request': request})
+        kept = serializer.sparse_field_names
+        if kept is None:
+            return queryset
+
+        kept_sources, dropped_sources = set(), set()
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            (kept_sources if name in kept else dropped_sources).update(serializer._sources(name, field))
+        unused = dropped_sources - kept_sources - set(cls.sparse_always_load)
+        if not unused:
+            return queryset
+
+        opts = cls.Meta.model._meta
+        deferred = []
+        for name in sorted(unused):
+            try:
+                model_field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.is_relation and not model_field.primary_key:
+                deferred.append(f'{prefix}{name}')
+
+        select_related = queryset.query.select_related
+        if isinstance(select_related, dict):
+            tree = copy.deepcopy(select_related)
+            node = tree
+            for part in filter(None, prefix.split('__')):
+                node = node.get(part) or {}
+            for name in unused:
+                node.pop(name, None)
+            queryset = queryset.select_related(None)
+            paths = list(_select_related_paths(tree))
+            if paths:
+                queryset = queryset.select_related(*paths)
+
+        lookups = []
+        for lookup in queryset._prefetch_related_lookups:
+            path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+            if path.startswith(prefix) and path[len(prefix):].split('__')[0] in unused:
+                continue
+            lookups.append(lookup)
+        if len(lookups) != len(queryset._prefetch_related_lookups):
+            queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+
+        return queryset.defer(*deferred) if deferred else queryset
+
+
 class CustomRegisterSerializer(serializers.ModelSerializer):
     password2 = serializers.CharField(style={'input_type': 'password'}, write_only=True)
     accept_terms = serializers.BooleanField(write_only=True)
@@ -180,46 +335,97 @@ class UserSummarySerializer(serializers.ModelSerializer):
         return get_avatar_letter(obj.first_name)
 
 
-class SiteSerializer(serializers.ModelSerializer):
+class TemplateConfigField(serializers.JSONField):
+    """
+    template_config that is passed through as raw JSON when the site was
+    loaded with `Site.objects.with_raw_content()` (see api/renderers.py).
+    """
+
+    def get_attribute(self, instance):
+        raw = instance.__dict__.get('template_config_json')
+        if raw is not None and 'template_config' not in instance.__dict__:
+            return RawJSON(raw)
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        if isinstance(value, RawJSON):
+            return value
+        return super().to_representation(value)
+
+
+def latest_version_data(site):
+    """
+    Metadata of the site's newest version.
+
+    Uses `prefetched_latest_versions` (see SiteQuerySet.with_latest_version)
+    when the list view prefetched it, otherwise runs one query.
+    """
+    if hasattr(site, 'prefetched_latest_versions'):
+        latest = site.prefetched_latest_versions[0] if site.prefetched_latest_versions else None
+    else:
+        try:
+            latest = site.versions.order_by('-version_number').defer('template_config', 'delta').first()
+        except (ProgrammingError, OperationalError):
+            logger.warning(
+                "SiteVersion table unavailable while fetching latest version for site %s", site.pk,
+                exc_info=True,
+            )
+            return None
+
+    if not latest:
+        return None
+    return {
+        'id': str(latest.id),
+        'version_number': latest.version_number,
+        'created_at': latest.created_at,
+        'created_by': latest.created_by_id,
+        'notes': latest.notes,
+        'change_summary': latest.change_summary
+    }
+
+
+class SiteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner = PlatformUserSerializer(read_only=True)
+    template_config = TemplateConfigField(required=False)
     latest_version = serializers.SerializerMethodField()
 
+    sparse_field_sources = {'latest_version': ('versions',)}
+
     class Meta:
         model = Site
         fields = [
             'id', 'owner', 'name', 'identifier', 'subdomain', 'is_published', 
             'published_at', 'color_index', 'team_size', 'is_mock', 
-            'template_config', 'created_at', 'updated_at', 'latest_version'
+            'template_config', 'config_revision', 'static_bundle_url', 'created_at', 'updated_at', 'latest_version'
+        ]
+        read_only_fields = [
+            'identifier', 'subdomain', 'published_at', 'created_at', 'updated_at', 'owner', 'team_size', 'is_mock',
+            'config_revision', 'static_bundle_url',
         ]
-        read_only_fields = ['identifier', 'subdomain', 'published_at', 'created_at', 'updated_at', 'owner', 'team_size', 'is_mock']
         extra_kwargs = {
             'color_index': {'required': False},
             'is_published': {'required': False}
         }
 
-    def get_latest_version(self, obj):
-        try:
-            latest = obj.versions.order_by('-version_number').first()
-        except (ProgrammingError, OperationalError):
-            logger.warning(
-                "SiteVersion table unavailable while fetching latest version for site %s", obj.pk,
-                exc_info=True,
-            )
-            return None
+    def update(self, instance, validated_data):
+        if 'template_config' not in validated_data:
+            return super().update(instance, validated_data)
+        # Full-config saves also move the revision so pending config patches detect them. The row is
+        # locked and bumped in the database like site_config.patch_site_config, so a concurrent patch
+        # is never overwritten under the same revision.
+        with transaction.atomic():
+            Site.objects.select_for_update().only('pk').get(pk=instance.pk)
+            validated_data['config_revision'] = F('config_revision') + 1
+            instance = super().update(instance, validated_data)
+            instance.refresh_from_db(fields=['config_revision'])
+        return instance
 
-        if not latest:
-            return None
-        return {
-            'id': str(latest.id),
-            'version_number': latest.version_number,
-            'created_at': latest.created_at,
-            'created_by': latest.created_by_id,
-            'notes': latest.notes,
-            'change_summary': latest.change_summary
-        }
+    def get_latest_version(self, obj):
+        return latest_version_data(obj)
 
 
 class SiteVersionSerializer(serializers.ModelSerializer):
+    template_config = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -230,6 +436,12 @@ class SiteVersionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'site', 'version_number', 'created_at', 'created_by', 'created_by_name']
 
+    def get_template_config(self, obj):
+        # Delta versions only store a patch; site_versions fills in the full config
+        if hasattr(obj, 'resolved_config'):
+            return obj.resolved_config
+        return version_config(obj)
+
     def get_created_by_name(self, obj):
         if not obj.created_by:
             return None
@@ -237,7 +449,12 @@ class SiteVersionSerializer(serializers.ModelSerializer):
         return full_name or obj.created_by.email
 
 
-class PublicSiteSerializer(serializers.ModelSerializer):
+class PublicSiteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    template_config = TemplateConfigField(read_only=True)
+
+    # to_representation checks is_published for every row
+    sparse_always_load = ('is_published',)
+
     class Meta:
         model = Site
         fields = ['id', 'identifier', 'name', 'subdomain', 'is_published', 'template_config', 'updated_at']
@@ -269,22 +486,25 @@ class ClientSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     attendees = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
     bookings = serializers.SerializerMethodField()
     assignment_type = serializers.SerializerMethodField()
     assignment_label = serializers.SerializerMethodField()
+
+    select_related_fields = ('assigned_to_owner', 'assigned_to_team_member__linked_user')
+    prefetch_related_fields = ('attendees', 'bookings__client')
     
     class Meta:
         model = Event
         fields = [
             'id', 'site', 'creator', 'title', 'description',
-            'start_time', 'end_time', 'capacity', 'event_type',
+            'start_time', 'end_time', 'capacity', 'booked_count', 'event_type',
             'attendees', 'bookings', 'created_at', 'updated_at',
             'assigned_to_owner', 'assigned_to_team_member',
             'assignment_type', 'assignment_label', 'show_host'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'attendees', 'creator', 'bookings', 'assignment_type', 'assignment_label']
+        read_only_fields = ['created_at', 'updated_at', 'attendees', 'creator', 'booked_count', 'bookings', 'assignment_type', 'assignment_label']
 
     def get_bookings(self, obj):
         """Return booking information including client/guest details"""
@@ -345,10 +565,17 @@ class EventSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
     client_name = serializers.SerializerMethodField()
     client_email = serializers.SerializerMethodField()
     event_details = serializers.SerializerMethodField()
+
+    select_related_fields = ('client', 'event')
+    sparse_field_sources = {
+        'client_name': ('client', 'guest_name'),
+        'client_email': ('client', 'guest_email'),
+        'event_details': ('event',),
+    }
     
     class Meta:
         model = Booking
@@ -413,9 +640,11 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'message', 'is_read', 'created_at', 'notification_type']
 
 
-class AvailabilityBlockSerializer(serializers.ModelSerializer):
+class AvailabilityBlockSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     assignment_type = serializers.SerializerMethodField()
     assignment_label = serializers.SerializerMethodField()
+
+    select_related_fields = ('assigned_to_owner', 'assigned_to_team_member__linked_user')
     
     class Meta:
         model = AvailabilityBlock
@@ -552,10 +781,17 @@ class BaseTemplatedEmailSerializer(serializers.Serializer):
 
 
 # Team Member Serializers
-class TeamMemberSerializer(serializers.ModelSerializer):
+class TeamMemberSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for TeamMember with avatar generation support."""
     avatar_color = serializers.SerializerMethodField()
     avatar_letter = serializers.SerializerMethodField()
+
+    # Linked members show their account's avatar and name (see to_representation)
+    sparse_field_sources = {
+        'avatar_url': ('avatar_url', 'linked_user'),
+        'avatar_color': ('name', 'linked_user'),
+        'avatar_letter': ('name', 'linked_user'),
+    }
     
     class Meta:
         model = TeamMember
@@ -576,14 +812,17 @@ class TeamMemberSerializer(serializers.ModelSerializer):
         """Override to return linked user's avatar if connected."""
         data = super().to_representation(instance)
         
-        # If linked to a user, use their avatar
-        if instance.linked_user:
-            data['avatar_url'] = instance.linked_user.avatar_url or ''
-            # Also update name and color/letter from linked user
-            user_name = f"{instance.linked_user.first_name} {instance.linked_user.last_name}".strip() or instance.linked_user.email
+        # If linked to a user, use their avatar (unless ?fields= / ?omit= left the avatar fields out)
+        if {'avatar_url', 'avatar_color', 'avatar_letter'} & data.keys() and instance.linked_user:
             from .utils import get_avatar_color, get_avatar_letter
-            data['avatar_color'] = get_avatar_color(user_name)
-            data['avatar_letter'] = get_avatar_letter(instance.linked_user.first_name or instance.linked_user.email)
+            user_name = f"{instance.linked_user.first_name} {instance.linked_user.last_name}".strip() or instance.linked_user.email
+            overrides = {
+                'avatar_url': instance.linked_user.avatar_url or '',
+                # Also update name and color/letter from linked user
+                'avatar_color': get_avatar_color(user_name),
+                'avatar_letter': get_avatar_letter(instance.linked_user.first_name or instance.linked_user.email),
+            }
+            data.update({key: value for key, value in overrides.items() if key in data})
         
         return data
     
@@ -692,8 +931,10 @@ class PublicTeamMemberSerializer(serializers.ModelSerializer):
         return get_avatar_letter(name)
 
 
-class AttendedSessionSerializer(serializers.ModelSerializer):
+class AttendedSessionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for attendance report rows."""
+    select_related_fields = ('host_user', 'host_team_member')
+
     host_display_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -712,12 +953,15 @@ class AttendedSessionSerializer(serializers.ModelSerializer):
         return ''
 
 
-class SiteWithTeamSerializer(serializers.ModelSerializer):
+class SiteWithTeamSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Extended Site serializer that includes team member info."""
     owner = PlatformUserSerializer(read_only=True)
+    template_config = TemplateConfigField(required=False)
     latest_version = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
     team_member_info = serializers.SerializerMethodField()
+
+    sparse_field_sources = {'latest_version': ('versions',), 'team_member_info': ('team_members',)}
     
     class Meta:
         model = Site
@@ -729,25 +973,7 @@ class SiteWithTeamSerializer(serializers.ModelSerializer):
         read_only_fields = ['identifier', 'created_at', 'updated_at', 'owner', 'team_size']
     
     def get_latest_version(self, obj):
-        try:
-            latest = obj.versions.order_by('-version_number').first()
-        except (ProgrammingError, OperationalError):
-            logger.warning(
-                "SiteVersion table unavailable while fetching latest version for site %s", obj.pk,
-                exc_info=True,
-            )
-            return None
-
-        if not latest:
-            return None
-        return {
-            'id': str(latest.id),
-            'version_number': latest.version_number,
-            'created_at': latest.created_at,
-            'created_by': latest.created_by_id,
-            'notes': latest.notes,
-            'change_summary': latest.change_summary
-        }
+        return latest_version_data(obj)
     
     def get_is_owner(self, obj):
         """Check if current user is the site owner."""
@@ -762,6 +988,11 @@ class SiteWithTeamSerializer(serializers.ModelSerializer):
         if not request or not request.user.is_authenticated:
             return None
         
+        # Prefetched by SiteViewSet.list for the whole page
+        if hasattr(obj, 'viewer_memberships'):
+            team_member = obj.viewer_memberships[0] if obj.viewer_memberships else None
+            return TeamMemberInfoSerializer(team_member).data if team_member else None
+
         # Check if user is a team member of this site
         from .models import TeamMember
         team_member = TeamMember.objects.filter(
@@ -1,13 +1,39 @@
-from django.db.models.signals import pre_delete, post_delete, post_save
+from django.db import transaction
+from django.db.models.signals import pre_delete, pre_save, post_delete, post_save
+from django.db.models import Q
 from django.dispatch import receiver
 from django.conf import settings
+from django.utils import timezone
 import os
 import logging
 import threading
 from contextlib import contextmanager
 
+from .calendar_cache import bump_calendar_version, bump_calendar_versions
+from .calendar_sync import record_tombstone
+from .domain_cache import invalidate as invalidate_domain_cache
 from .media_helpers import cleanup_asset_if_unused
-from .models import Booking, MediaUsage, LegalDocument, Event, GoogleCalendarIntegration, GoogleCalendarEvent
+from .site_export import drop_sections, export_enabled, mark_sections_dirty, schedule_bundle_deletion
+from .site_snapshots import delete_site_snapshot, refresh_site_snapshot
+from .models import (
+    AvailabilityBlock,
+    BigEvent,
+    Booking,
+    CalendarTombstone,
+    ComputedSlot,
+    DomainOrder,
+    Event,
+    GoogleCalendarEvent,
+    GoogleCalendarIntegration,
+    LegalDocument,
+    MediaUsage,
+    PlatformUser,
+    Site,
+    TeamMember,
+    Testimonial,
+    TestimonialSummary,
+)
+from .slot_engine import block_slot_scopes, event_slot_scopes, refresh_computed_slots, team_member_display_name
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +54,23 @@ def _should_log():
     return not getattr(_signal_state, 'suppress_logging', False)
 
 
+@contextmanager
+def suppress_calendar_signals():
+    """
+    Skip calendar bookkeeping (slot materialization, tombstones, event touches) during bulk
+    operations. The caller is responsible for running `rebuild_computed_slots` afterwards.
+    """
+    previous = getattr(_signal_state, 'suppress_calendar', False)
+    _signal_state.suppress_calendar = True
+    try:
+        yield
+    finally:
+        _signal_state.suppress_calendar = previous
+
+def _calendar_signals_enabled():
+    return not getattr(_signal_state, 'suppress_calendar', False)
+
+
 @receiver(post_save, sender=Booking)
 def ensure_attendee_on_booking_save(sender, instance: Booking, created: bool, **kwargs):
     """Ensure the client is attached to the event attendee list whenever a booking exists."""
@@ -192,4 +235,310 @@ def sync_event_to_google_calendar_on_delete(sender, instance: Event, **kwargs):
             logger.error(f"✗ Failed to delete Google Calendar event {google_event_id} for Event {instance.id}")
         
     except Exception as e:
-        logger.error(f"Exception deleting Event {instance.id} from Google Calendar: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Exception deleting Event {instance.id} from Google Calendar: {e}", exc_info=True)
+
+
+# ============================================================================
+# MATERIALIZED AVAILABILITY (ComputedSlot)
+# ============================================================================
+
+# Scopes waiting for the surrounding transaction to commit; a set so that e.g.
+# deleting an event with many bookings refreshes its day only once. Every write
+# registers its own on_commit callback and the first one to run refreshes all
+# pending scopes, so a callback discarded by a rollback never strands a scope
+# (a rolled-back scope is just refreshed once more by the next commit). After
+# the slots are refreshed the site's calendar version is bumped, which
+# invalidates cached public calendar responses (see api.calendar_cache).
+_slot_refresh_state = threading.local()
+
+
+def _schedule_slot_refresh(scopes):
+    scopes = set(scopes)
+    if not scopes or not _calendar_signals_enabled():
+        return
+    pending = getattr(_slot_refresh_state, 'pending', None)
+    if pending is None:
+        pending = _slot_refresh_state.pending = set()
+    pending.update(scopes)
+    transaction.on_commit(_flush_slot_refresh)
+
+
+def _flush_slot_refresh():
+    pending = getattr(_slot_refresh_state, 'pending', None)
+    if not pending:
+        return
+    _slot_refresh_state.pending = set()
+    for site_id, day, assignee in sorted(pending, key=lambda scope: (scope[0], scope[1])):
+        try:
+            refresh_computed_slots(site_id, day, assignee)
+        except Exception as e:
+            logger.error(f"Failed to refresh computed slots for site {site_id} on {day} ({assignee}): {e}", exc_info=True)
+    bump_calendar_versions(site_id for site_id, _, _ in pending)
+
+
+def _stash_previous_scopes(model, instance, scopes_for, fields):
+    """Remember the scopes an existing row covered before it is moved or reassigned."""
+    instance._previous_slot_scopes = set()
+    if instance.pk is None or not _calendar_signals_enabled():
+        return
+    previous = model.objects.filter(pk=instance.pk).only(
+        'site_id', 'creator_id', 'assigned_to_owner_id', 'assigned_to_team_member_id',
+        *fields,
+    ).first()
+    if previous is not None:
+        instance._previous_slot_scopes = scopes_for(previous)
+
+
+@receiver(pre_save, sender=Event)
+def remember_event_slot_scopes(sender, instance: Event, **kwargs):
+    _stash_previous_scopes(Event, instance, event_slot_scopes, ('start_time', 'end_time'))
+
+
+@receiver(pre_save, sender=AvailabilityBlock)
+def remember_block_slot_scopes(sender, instance: AvailabilityBlock, **kwargs):
+    _stash_previous_scopes(AvailabilityBlock, instance, block_slot_scopes, ('date',))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def refresh_slots_on_event_change(sender, instance: Event, **kwargs):
+    _schedule_slot_refresh(event_slot_scopes(instance) | getattr(instance, '_previous_slot_scopes', set()))
+
+
+@receiver(post_save, sender=AvailabilityBlock)
+@receiver(post_delete, sender=AvailabilityBlock)
+def refresh_slots_on_block_change(sender, instance: AvailabilityBlock, **kwargs):
+    _schedule_slot_refresh(block_slot_scopes(instance) | getattr(instance, '_previous_slot_scopes', set()))
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def refresh_slots_on_booking_change(sender, instance: Booking, **kwargs):
+    """Booking counts change available spots of the event's day."""
+    if not _calendar_signals_enabled():
+        return
+    event = Event.objects.filter(pk=instance.event_id).only(
+        'site_id', 'creator_id', 'assigned_to_owner_id', 'assigned_to_team_member_id', 'start_time', 'end_time',
+    ).first()
+    if event is not None:
+        _schedule_slot_refresh(event_slot_scopes(event))
+
+
+@receiver(post_save, sender=TeamMember)
+def rename_team_member_slots(sender, instance: TeamMember, created: bool, **kwargs):
+    """Keep the stored host label in sync with the team member's display name."""
+    if created:
+        return
+    try:
+        ComputedSlot.objects.filter(
+            site_id=instance.site_id,
+            assignee_type=ComputedSlot.AssigneeType.TEAM_MEMBER,
+            assignee_id=instance.pk,
+        ).exclude(
+            assignee_name=team_member_display_name(instance),
+        ).update(assignee_name=team_member_display_name(instance))
+        transaction.on_commit(lambda: bump_calendar_version(instance.site_id))
+    except Exception as e:
+        logger.error(f"Failed to rename computed slots for team member {instance.pk}: {e}", exc_info=True)
+
+
+# ============================================================================
+# DELTA SYNC KALENDARZA (calendar_data?since=)
+# ============================================================================
+
+@receiver(post_delete, sender=Event)
+def record_event_tombstone(sender, instance: Event, **kwargs):
+    """Let delta-syncing calendar clients know the event is gone."""
+    if not _calendar_signals_enabled():
+        return
+    try:
+        record_tombstone(CalendarTombstone.Kind.EVENT, instance.site_id, instance.pk)
+    except Exception as e:
+        logger.error(f"Failed to record tombstone for Event {instance.pk}: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=AvailabilityBlock)
+def record_block_tombstone(sender, instance: AvailabilityBlock, **kwargs):
+    if not _calendar_signals_enabled():
+        return
+    try:
+        record_tombstone(CalendarTombstone.Kind.AVAILABILITY_BLOCK, instance.site_id, instance.pk)
+    except Exception as e:
+        logger.error(f"Failed to record tombstone for AvailabilityBlock {instance.pk}: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def touch_event_on_booking_change(sender, instance: Booking, **kwargs):
+    """Bookings are nested in the event payload, so a booking change must re-send its event."""
+    if not _calendar_signals_enabled():
+        return
+    Event.objects.filter(pk=instance.event_id).update(updated_at=timezone.now())
+
+
+# ============================================================================
+# SNAPSHOTY PUBLICZNYCH STRON (PublicSiteView)
+# ============================================================================
+
+@receiver(post_save, sender=Site)
+def refresh_public_snapshot_on_site_save(sender, instance: Site, **kwargs):
+    """Re-encode the public payload once the save (and Site.save's identifier update) is committed."""
+    site_id = instance.pk
+    transaction.on_commit(lambda: refresh_site_snapshot(site_id))
+
+
+@receiver(post_delete, sender=Site)
+def drop_public_snapshot_on_site_delete(sender, instance: Site, **kwargs):
+    site_id, identifier = instance.pk, instance.identifier
+    transaction.on_commit(lambda: delete_site_snapshot(site_id, identifier))
+
+
+# ============================================================================
+# STATYCZNY EKSPORT OPUBLIKOWANYCH STRON (api/site_export.py)
+# ============================================================================
+
+# PlatformUser fields shown in the team section (owner card, linked members)
+PUBLIC_PROFILE_FIELDS = ('email', 'first_name', 'last_name', 'role_description', 'public_image_url', 'avatar_url')
+
+
+@receiver(post_save, sender=Site)
+def export_bundle_on_site_save(sender, instance: Site, **kwargs):
+    """Publishing exports the site, unpublishing drops its bundle; drafts that were never exported are skipped."""
+    if instance.is_published or instance.static_bundle_key:
+        mark_sections_dirty([instance.pk], ['site'])
+
+
+@receiver(post_delete, sender=Site)
+def drop_bundle_on_site_delete(sender, instance: Site, **kwargs):
+    site_id, key = instance.pk, instance.static_bundle_key
+
+    def drop():
+        drop_sections(site_id)
+        if key:
+            schedule_bundle_deletion(key)
+
+    transaction.on_commit(drop)
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def export_bundle_on_team_change(sender, instance: TeamMember, **kwargs):
+    mark_sections_dirty([instance.site_id], ['team'])
+
+
+@receiver(post_save, sender=BigEvent)
+@receiver(post_delete, sender=BigEvent)
+def export_bundle_on_big_event_change(sender, instance: BigEvent, **kwargs):
+    mark_sections_dirty([instance.site_id], ['events'])
+
+
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_save, sender=TestimonialSummary)
+@receiver(post_delete, sender=TestimonialSummary)
+def export_bundle_on_testimonial_change(sender, instance, **kwargs):
+    mark_sections_dirty([instance.site_id], ['testimonials'])
+
+
+@receiver(pre_save, sender=PlatformUser)
+def remember_public_profile(sender, instance: PlatformUser, update_fields=None, **kwargs):
+    # Logins only write last_login; they must not cost a query here
+    if not export_enabled() or not instance.pk or (update_fields is not None and not set(update_fields) & set(PUBLIC_PROFILE_FIELDS)):
+        return
+    instance._previous_public_profile = (
+        PlatformUser.objects.filter(pk=instance.pk).values(*PUBLIC_PROFILE_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=PlatformUser)
+def export_bundles_on_profile_change(sender, instance: PlatformUser, created: bool, **kwargs):
+    """Owners and linked team members appear in the team section of every published site they belong to."""
+    previous = getattr(instance, '_previous_public_profile', None)
+    if created or previous is None:
+        return
+    if all(previous[field] == getattr(instance, field) for field in PUBLIC_PROFILE_FIELDS):
+        return
+    site_ids = Site.objects.filter(
+        Q(owner=instance) | Q(team_members__linked_user=instance),
+        is_published=True,
+    ).values_list('pk', flat=True).distinct()
+    mark_sections_dirty(list(site_ids), ['team'])
+
+
+# ============================================================================
+# CACHE ROZWIĄZYWANIA DOMEN (resolve_domain / PublicSiteView)
+# ============================================================================
+
+# Fields that end up in the resolve_domain payload cached by the Cloudflare worker
+EDGE_CONFIG_FIELDS = ('domain_name', 'target', 'proxy_mode', 'status', 'site_id')
+
+
+@receiver(pre_save, sender=DomainOrder)
+def remember_previous_domain_name(sender, instance: DomainOrder, **kwargs):
+    instance._previous_domain_name = None
+    instance._previous_edge_config = None
+    if instance.pk is not None:
+        previous = DomainOrder.objects.filter(pk=instance.pk).values(*EDGE_CONFIG_FIELDS).first()
+        if previous is not None:
+            instance._previous_domain_name = previous['domain_name']
+            instance._previous_edge_config = previous
+
+
+@receiver(post_save, sender=DomainOrder)
+@receiver(post_delete, sender=DomainOrder)
+def invalidate_domain_resolution(sender, instance: DomainOrder, **kwargs):
+    """Target, proxy mode, status or site changes must reach the Cloudflare worker's next lookup."""
+    hosts = {instance.domain_name, getattr(instance, '_previous_domain_name', None)} - {None}
+    transaction.on_commit(lambda: invalidate_domain_cache(hosts=hosts))
+
+
+def _schedule_worker_purge(hosts) -> None:
+    from .tasks import purge_worker_domain_config
+
+    hosts = sorted(set(hosts) - {None, ''})
+    if not hosts or not getattr(settings, 'CLOUDFLARE_WORKER_PURGE_URL', ''):
+        return
+
+    def enqueue():
+        try:
+            purge_worker_domain_config.delay(hosts)
+        except Exception as e:
+            # The worker's CONFIG_TTL still bounds how long the old config is served
+            logger.warning(f"Could not schedule worker purge for {hosts}: {e}")
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=DomainOrder)
+def purge_worker_config_on_domain_change(sender, instance: DomainOrder, created: bool, **kwargs):
+    """Evict the worker's edge copy only when a field of the resolved config changed (not on e.g. error_message)."""
+    previous = getattr(instance, '_previous_edge_config', None)
+    if not created and previous is not None:
+        current = {field: getattr(instance, field) for field in EDGE_CONFIG_FIELDS}
+        if current == previous:
+            return
+    # New orders may still sit in the worker's negative cache
+    _schedule_worker_purge({instance.domain_name, getattr(instance, '_previous_domain_name', None)})
+
+
+@receiver(post_delete, sender=DomainOrder)
+def purge_worker_config_on_domain_delete(sender, instance: DomainOrder, **kwargs):
+    _schedule_worker_purge({instance.domain_name})
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def invalidate_site_resolution(sender, instance: Site, **kwargs):
+    """Site.save() rewrites the identifier after post_save, so both the old and the new one are dropped."""
+    previous_identifier = instance.identifier
+    site_id = instance.pk
+
+    def invalidate():
+        orders = list(DomainOrder.objects.filter(site_id=site_id).values_list('domain_name', 'target'))
+        hosts = [domain_name for domain_name, _ in orders]
+        invalidate_domain_cache(hosts=hosts, identifiers={previous_identifier, instance.identifier})
+        if previous_identifier != instance.identifier:
+            # Domains without an explicit target resolve to the (renamed) site subdomain
+            _schedule_worker_purge({domain_name for domain_name, target in orders if not target})
+
+    transaction.on_commit(invalidate)
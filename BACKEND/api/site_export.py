@@ -0,0 +1,348 @@
+"""Static export of published sites to object storage (one JSON bundle per site).
+
+A bundle holds everything a public page needs: the public site payload, the
+team, the published big events and the approved testimonials with their
+summary. It is written through `get_media_storage()` under a content-hashed
+key (`site-bundles/<site_id>/<hash>.json`), and the key is recorded on the
+site, so the frontend and the worker can load a site with a single CDN
+fetch. Keys are immutable and can be cached forever.
+
+Each section is encoded on its own and kept in the Django cache under a
+per-(site, section) generation. A change to a contributing model bumps only
+its section's generation (`mark_sections_dirty`) and schedules
+`tasks.export_site_bundle`, which rebuilds the sections missing at the
+current generation and splices the cached ones into the bundle without
+decoding them. An export that read the database before the change stores
+its section under the old generation, where nothing reads it again. When
+the bundle hash is unchanged nothing is uploaded. A replaced bundle is
+deleted after SITE_EXPORT_RETENTION seconds, so readers holding the old key
+can still fetch it. Sites published before the export was enabled are
+backfilled with `manage.py export_site_bundles`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import renderers
+from .media_storage import StorageError, StorageSaveResult, get_media_storage
+from .models import BigEvent, Site, TeamMember, Testimonial, TestimonialSummary
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+SECTIONS = ('site', 'team', 'events', 'testimonials')
+
+_SECTION_KEY = 'site:export:section:{site_id}:{section}:{generation}'
+_GENERATION_KEY = 'site:export:generation:{site_id}:{section}'
+_BUNDLE_PATH = 'site-bundles/{site_id}/{content_hash}.json'
+
+
+@dataclass(frozen=True)
+class BundleExportResult:
+    site_id: int
+    key: Optional[str]
+    url: Optional[str]
+    changed: bool
+    rebuilt_sections: tuple = ()
+
+
+def export_enabled() -> bool:
+    return getattr(settings, 'SITE_EXPORT_ENABLED', False)
+
+
+def _section_ttl() -> int:
+    return getattr(settings, 'SITE_EXPORT_SECTION_TTL', 7 * 24 * 3600)
+
+
+def _bucket() -> str:
+    return getattr(settings, 'SUPABASE_STORAGE_BUCKET_MAP', {}).get('other') or ''
+
+
+# ----------------------------------------------------------------------------
+# Public payloads (shared with PublicTeamView and public_big_events)
+# ----------------------------------------------------------------------------
+
+def public_team_payload(site: Site) -> List[dict]:
+    """Active team members with the site owner first, as shown on the public team page."""
+    from .serializers import PublicTeamMemberSerializer
+
+    # Mock, invited and pending members are shown too, so the page is complete before invitations are accepted
+    team_members = TeamMember.objects.filter(site=site, is_active=True).select_related('linked_user').order_by('created_at')
+    members_data = list(PublicTeamMemberSerializer(team_members, many=True).data)
+
+    owner = site.owner
+    members_data.insert(0, {
+        'id': f'owner-{owner.id}',
+        'name': f'{owner.first_name} {owner.last_name}' if owner.first_name or owner.last_name else owner.email,
+        'first_name': owner.first_name or '',
+        'last_name': owner.last_name or '',
+        'role': owner.role_description or 'Właściciel',
+        'image': owner.public_image_url or owner.avatar_url or '',
+        'is_owner': True
+    })
+    return members_data
+
+
+def public_events_payload(site: Site) -> List[dict]:
+    """Published big events of the site, soonest first."""
+    events = BigEvent.objects.filter(site=site, status=BigEvent.Status.PUBLISHED).order_by('start_date', '-created_at')
+
+    payload = []
+    for event in events:
+        details = event.details or {}
+        gallery = details.get('images') or []
+        if event.image_url and event.image_url not in gallery:
+            gallery = [*gallery, event.image_url]
+
+        payload.append({
+            'id': event.id,
+            'title': event.title,
+            'summary': details.get('summary') or event.description,
+            'description': event.description,
+            'location': event.location,
+            'start_date': event.start_date,
+            'end_date': event.end_date,
+            'tag': details.get('tag') or details.get('category'),
+            'price': str(event.price),
+            'image_url': event.image_url,
+            'gallery': gallery,
+            'full_description': details.get('full_description') or event.description,
+            'cta_label': details.get('cta_label'),
+            'cta_url': details.get('cta_url'),
+            'max_participants': event.max_participants,
+            'current_participants': event.current_participants,
+            'published_at': event.published_at,
+        })
+    return payload
+
+
+def public_testimonials_payload(site: Site) -> dict:
+    """Approved testimonials (newest first, without author e-mails) and the AI summary."""
+    from .serializers import TestimonialSerializer, TestimonialSummarySerializer
+
+    testimonials = Testimonial.objects.filter(site=site, is_approved=True).order_by('-created_at')
+    items = []
+    for item in TestimonialSerializer(testimonials, many=True).data:
+        item.pop('author_email', None)
+        items.append(item)
+    summary = TestimonialSummary.objects.filter(site=site).first()
+    return {
+        'items': items,
+        'summary': TestimonialSummarySerializer(summary).data if summary is not None else None,
+    }
+
+
+def _build_section(site: Site, section: str) -> bytes:
+    from .serializers import PublicSiteSerializer
+
+    if section == 'site':
+        data = PublicSiteSerializer(site).data
+    elif section == 'team':
+        data = public_team_payload(site)
+    elif section == 'events':
+        data = public_events_payload(site)
+    elif section == 'testimonials':
+        data = public_testimonials_payload(site)
+    else:
+        raise ValueError(f'Unknown bundle section: {section}')
+    return renderers.dumps(data)
+
+
+# ----------------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------------
+
+def _new_generation() -> int:
+    # Unlike a counter restarting at 0, a lost generation key never brings back sections cached under it
+    return time.time_ns()
+
+
+def section_generations(site_id: int) -> Dict[str, Optional[int]]:
+    """
+    Current generation of each section (None when the cache is unavailable).
+
+    Read before the site's data, so a section built from data older than a
+    concurrent change is stored under a generation the change has replaced.
+    """
+    keys = {section: _GENERATION_KEY.format(site_id=site_id, section=section) for section in SECTIONS}
+    try:
+        current = cache.get_many(list(keys.values()))
+        for key in keys.values():
+            if key not in current:
+                cache.add(key, _new_generation(), timeout=None)
+                current[key] = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Site export cache unavailable: {e}")
+        current = {}
+    return {section: current.get(key) for section, key in keys.items()}
+
+
+def _section_bodies(site: Site, generations: Dict[str, Optional[int]]) -> tuple:
+    """Encoded sections keyed by name, and the names that had to be rebuilt."""
+    keys = {
+        section: _SECTION_KEY.format(site_id=site.pk, section=section, generation=generations[section])
+        for section in SECTIONS
+        if generations.get(section) is not None
+    }
+    try:
+        cached = cache.get_many(list(keys.values())) if keys else {}
+    except Exception as e:
+        logger.warning(f"Site export cache unavailable: {e}")
+        cached = {}
+
+    bodies: Dict[str, bytes] = {}
+    rebuilt = []
+    to_cache = {}
+    for section in SECTIONS:
+        key = keys.get(section)
+        body = cached.get(key) if key else None
+        if body is None:
+            body = _build_section(site, section)
+            rebuilt.append(section)
+            if key:
+                to_cache[key] = body
+        bodies[section] = body
+    if to_cache:
+        try:
+            cache.set_many(to_cache, timeout=_section_ttl())
+        except Exception as e:
+            logger.warning(f"Could not cache export sections of site {site.pk}: {e}")
+    return bodies, tuple(rebuilt)
+
+
+def build_bundle(site: Site, generations: Optional[Dict[str, Optional[int]]] = None) -> tuple:
+    """(body, rebuilt section names) of the site's bundle."""
+    if generations is None:
+        generations = section_generations(site.pk)
+    bodies, rebuilt = _section_bodies(site, generations)
+    body = renderers.dumps({
+        'format': BUNDLE_FORMAT,
+        'site_id': site.pk,
+        **{section: renderers.RawJSON(bodies[section]) for section in SECTIONS},
+    })
+    return body, rebuilt
+
+
+def export_site(site_id: int) -> BundleExportResult:
+    """
+    Write the current bundle of a published site and record its key on the site.
+
+    Unpublished (or deleted) sites lose their bundle instead. Storage errors
+    propagate, so the Celery task can retry.
+    """
+    generations = section_generations(site_id)
+    site = Site.objects.filter(pk=site_id).select_related('owner').with_raw_content().first()
+    if site is None or not site.is_published:
+        removed = remove_site_bundle(site_id, site)
+        return BundleExportResult(site_id=site_id, key=None, url=None, changed=removed)
+
+    body, rebuilt = build_bundle(site, generations)
+    content_hash = hashlib.sha256(body).hexdigest()[:32]
+    path = _BUNDLE_PATH.format(site_id=site_id, content_hash=content_hash)
+    if _content_hash(site.static_bundle_key) == content_hash:
+        return BundleExportResult(site_id=site_id, key=path, url=site.static_bundle_url, changed=False, rebuilt_sections=rebuilt)
+
+    storage = get_media_storage()
+    bucket = _bucket()
+    # Plain JSON only: the storage cannot set Content-Encoding on an object, and the CDN compresses JSON itself
+    saved = _save(storage, bucket, path, body, 'application/json')
+
+    previous_key = site.static_bundle_key
+    # update() keeps the Site post_save signals (and another export) from firing
+    Site.objects.filter(pk=site_id).update(static_bundle_key=saved.path, static_bundle_url=saved.url)
+    if previous_key and previous_key != saved.path:
+        schedule_bundle_deletion(previous_key)
+
+    logger.info("[SiteExport] Site %s bundle %s (%d bytes, rebuilt: %s)", site_id, saved.path, len(body), ', '.join(rebuilt) or '-')
+    return BundleExportResult(site_id=site_id, key=saved.path, url=saved.url, changed=True, rebuilt_sections=rebuilt)
+
+
+def _content_hash(key: Optional[str]) -> Optional[str]:
+    if not key:
+        return None
+    return key.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+def _save(storage, bucket: str, path: str, data: bytes, content_type: str) -> StorageSaveResult:
+    try:
+        return storage.save(bucket, path, data, content_type)
+    except StorageError as e:
+        # Keys are content hashes, so an existing object already holds these bytes
+        if 'exist' not in str(e).lower() and 'duplicate' not in str(e).lower():
+            raise
+        return StorageSaveResult(bucket=bucket, path=path, url=storage.build_url(bucket, path))
+
+
+def remove_site_bundle(site_id: int, site: Optional[Site] = None) -> bool:
+    """Forget the bundle of an unpublished or deleted site; its objects are deleted after the retention period."""
+    drop_sections(site_id)
+    if site is None or not site.static_bundle_key:
+        return False
+    Site.objects.filter(pk=site_id).update(static_bundle_key=None, static_bundle_url=None)
+    schedule_bundle_deletion(site.static_bundle_key)
+    return True
+
+
+def delete_bundle(key: str) -> bool:
+    """Delete a replaced bundle unless a site points at it again (its content came back)."""
+    if Site.objects.filter(static_bundle_key=key).exists():
+        return False
+    get_media_storage().delete(_bucket(), key)
+    return True
+
+
+def drop_sections(site_id: int, sections: Iterable[str] = SECTIONS) -> None:
+    """Move the sections to a new generation; the cached bodies are never read again and expire."""
+    for section in sections:
+        key = _GENERATION_KEY.format(site_id=site_id, section=section)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Never read (or evicted): any fresh generation will do
+                cache.add(key, _new_generation(), timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not drop export section {section} of site {site_id}: {e}")
+
+
+# ----------------------------------------------------------------------------
+# Scheduling (signals, publish_site)
+# ----------------------------------------------------------------------------
+
+def schedule_bundle_deletion(key: str) -> None:
+    from .tasks import delete_site_bundle
+
+    try:
+        delete_site_bundle.apply_async(args=[key], countdown=getattr(settings, 'SITE_EXPORT_RETENTION', 3600))
+    except Exception as e:
+        logger.warning(f"Could not schedule deletion of site bundle {key}: {e}")
+
+
+def mark_sections_dirty(site_ids: Iterable[int], sections: Iterable[str]) -> None:
+    """After the transaction commits, invalidate the given sections and re-export the sites."""
+    from .tasks import export_site_bundle
+
+    site_ids = sorted(set(site_ids) - {None})
+    sections = tuple(sections)
+    if not site_ids or not export_enabled():
+        return
+
+    def enqueue():
+        for site_id in site_ids:
+            drop_sections(site_id, sections)
+            try:
+                export_site_bundle.delay(site_id)
+            except Exception as e:
+                # The bundle stays at its previous content until the next change
+                logger.warning(f"Could not schedule export of site {site_id}: {e}")
+
+    transaction.on_commit(enqueue)
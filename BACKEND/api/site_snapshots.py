@@ -0,0 +1,239 @@
+"""Pre-encoded snapshots of public site payloads (PublicSiteView / PublicSiteByIdView).
+
+A snapshot is the exact JSON body of the public site endpoint, encoded once
+when the site is saved or published, together with its gzip (and, when the
+optional `brotli` package is installed, brotli) variants. Bodies are immutable
+and keyed by site and content hash; small pointer keys map a site id and its
+identifier to the current hash. Serving a snapshot costs two cache reads and
+no database queries, and a matching `If-None-Match` costs one.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+from . import renderers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+_POINTER_BY_ID_KEY = 'site:snapshot:id:{site_id}'
+_POINTER_BY_IDENTIFIER_KEY = 'site:snapshot:identifier:{identifier}'
+_BODY_KEY = 'site:snapshot:body:{site_id}:{content_hash}'
+
+
+@dataclass(frozen=True)
+class SnapshotPointer:
+    site_id: int
+    identifier: Optional[str]
+    content_hash: str
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        """Strong ETag; every content coding is a distinct representation, so it gets its own tag."""
+        return f'"{self.content_hash}-{encoding}"' if encoding else f'"{self.content_hash}"'
+
+
+@dataclass(frozen=True)
+class SiteSnapshot:
+    pointer: SnapshotPointer
+    body: bytes
+    gzip_body: bytes
+    brotli_body: Optional[bytes] = None
+
+
+def _ttl() -> int:
+    return getattr(settings, 'SITE_SNAPSHOT_TTL', 7 * 24 * 3600)
+
+
+def build_snapshot(site) -> SiteSnapshot:
+    """
+    Encode the public payload of a site as the API renderer would.
+
+    Sites loaded with `with_raw_content()` have their template_config text
+    spliced in without decoding it.
+    """
+    from .serializers import PublicSiteSerializer
+
+    body = renderers.dumps(PublicSiteSerializer(site).data)
+    pointer = SnapshotPointer(
+        site_id=site.pk,
+        identifier=site.identifier,
+        content_hash=hashlib.sha256(body).hexdigest()[:32],
+    )
+    return SiteSnapshot(
+        pointer=pointer,
+        body=body,
+        gzip_body=gzip.compress(body, mtime=0),
+        brotli_body=brotli.compress(body) if brotli is not None else None,
+    )
+
+
+def store_snapshot(snapshot: SiteSnapshot, *, overwrite: bool = True) -> None:
+    """
+    Store the body and point the site id and identifier at it.
+
+    With `overwrite=False` existing pointers are kept, so a request that read
+    the site before a concurrent save cannot replace the newer snapshot.
+    """
+    pointer = snapshot.pointer
+    previous = cache.get(_POINTER_BY_ID_KEY.format(site_id=pointer.site_id))
+    cache.set(_BODY_KEY.format(site_id=pointer.site_id, content_hash=pointer.content_hash), snapshot, timeout=_ttl())
+    keys = {_POINTER_BY_ID_KEY.format(site_id=pointer.site_id): pointer}
+    if pointer.identifier:
+        keys[_POINTER_BY_IDENTIFIER_KEY.format(identifier=pointer.identifier)] = pointer
+    if not overwrite:
+        for key, value in keys.items():
+            cache.add(key, value, timeout=_ttl())
+        return
+    cache.set_many(keys, timeout=_ttl())
+    # A renamed site must stop answering under its old identifier
+    if previous is not None and previous.identifier and previous.identifier != pointer.identifier:
+        cache.delete(_POINTER_BY_IDENTIFIER_KEY.format(identifier=previous.identifier))
+
+
+def refresh_site_snapshot(site_id: int) -> Optional[SiteSnapshot]:
+    """Rebuild and store the snapshot of a site after it was saved (drops it if the site is gone)."""
+    from .models import Site
+
+    site = Site.objects.filter(pk=site_id).select_related('owner').with_raw_content().first()
+    if site is None:
+        delete_site_snapshot(site_id)
+        return None
+    try:
+        snapshot = build_snapshot(site)
+        store_snapshot(snapshot)
+        return snapshot
+    except Exception as e:
+        logger.warning(f"Could not store public snapshot for site {site_id}: {e}")
+        delete_site_snapshot(site_id)
+        return None
+
+
+def snapshot_for_site(site) -> SiteSnapshot:
+    """Snapshot of a site loaded by a view on a cache miss; cache outages only cost the store."""
+    snapshot = build_snapshot(site)
+    try:
+        store_snapshot(snapshot, overwrite=False)
+    except Exception as e:
+        logger.warning(f"Could not store public snapshot for site {site.pk}: {e}")
+    return snapshot
+
+
+def delete_site_snapshot(site_id: int, identifier: Optional[str] = None) -> None:
+    try:
+        key = _POINTER_BY_ID_KEY.format(site_id=site_id)
+        previous = cache.get(key)
+        keys = [key]
+        for stale in {identifier, getattr(previous, 'identifier', None)} - {None}:
+            keys.append(_POINTER_BY_IDENTIFIER_KEY.format(identifier=stale))
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning(f"Could not drop public snapshot for site {site_id}: {e}")
+
+
+def get_pointer(*, site_id: Optional[int] = None, identifier: Optional[str] = None) -> Optional[SnapshotPointer]:
+    if site_id is not None:
+        key = _POINTER_BY_ID_KEY.format(site_id=site_id)
+    else:
+        key = _POINTER_BY_IDENTIFIER_KEY.format(identifier=identifier)
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Site snapshot cache unavailable: {e}")
+        return None
+
+
+def get_snapshot(pointer: SnapshotPointer) -> Optional[SiteSnapshot]:
+    try:
+        return cache.get(_BODY_KEY.format(site_id=pointer.site_id, content_hash=pointer.content_hash))
+    except Exception as e:
+        logger.warning(f"Site snapshot cache unavailable: {e}")
+        return None
+
+
+def _etag_matches(request, pointer: SnapshotPointer) -> bool:
+    """True when `If-None-Match` names the current content in any of its codings."""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    for candidate in header.split(','):
+        # Proxies that re-compress responses weaken the tag (W/"...")
+        tag = candidate.strip().removeprefix('W/').strip('"')
+        if tag == '*' or tag.split('-', 1)[0] == pointer.content_hash:
+            return True
+    return False
+
+
+def _accepted_encodings(request) -> set:
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _with_validators(response, etag: str):
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def _preferred_encoding(request) -> Optional[str]:
+    accepted = _accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def serve_snapshot(request, *, site_id: Optional[int] = None, identifier: Optional[str] = None):
+    """
+    Response for a cached snapshot, or None when the view has to fall back to the ORM.
+
+    Answers `If-None-Match` with 304 from the pointer alone and picks the
+    pre-compressed body matching `Accept-Encoding`.
+    """
+    pointer = get_pointer(site_id=site_id, identifier=identifier)
+    if pointer is None:
+        return None
+    if _etag_matches(request, pointer):
+        return _not_modified(request, pointer)
+
+    snapshot = get_snapshot(pointer)
+    if snapshot is None:
+        return None
+    return snapshot_response(request, snapshot)
+
+
+def _not_modified(request, pointer: SnapshotPointer):
+    return _with_validators(HttpResponseNotModified(), pointer.etag(_preferred_encoding(request)))
+
+
+def snapshot_response(request, snapshot: SiteSnapshot):
+    if _etag_matches(request, snapshot.pointer):
+        return _not_modified(request, snapshot.pointer)
+
+    encoding = _preferred_encoding(request)
+    if encoding == 'br' and snapshot.brotli_body is None:
+        # Built by a worker without brotli installed
+        encoding = 'gzip' if 'gzip' in _accepted_encodings(request) else None
+    body = {'br': snapshot.brotli_body, 'gzip': snapshot.gzip_body}.get(encoding, snapshot.body)
+    response = HttpResponse(body, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return _with_validators(response, snapshot.pointer.etag(encoding))
@@ -0,0 +1,151 @@
+"""Delta-encoded site version history (SiteVersion).
+
+Every SITE_VERSION_KEYFRAME_INTERVAL-th version is a keyframe holding the
+full template_config; the versions in between store a JSON patch against
+their predecessor. A keyframe is also written whenever the patch would be
+larger than half of the full config. Reconstructing any version therefore
+reads at most one keyframe plus KEYFRAME_INTERVAL - 1 small patches.
+
+Only the newest SITE_VERSION_LIMIT versions are kept; before older ones are
+deleted, the oldest surviving version is turned into a keyframe so the
+chain stays complete.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .json_patch import apply_patch, make_patch
+from .models import PlatformUser, Site, SiteVersion
+
+logger = logging.getLogger(__name__)
+
+SITE_VERSION_LIMIT = 10
+
+
+def _keyframe_interval() -> int:
+    return max(getattr(settings, 'SITE_VERSION_KEYFRAME_INTERVAL', 5), 1)
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode())
+
+
+def _roll_forward(versions: List[SiteVersion]) -> Dict[Any, Any]:
+    """Configs of `versions` (ascending, starting at a keyframe) keyed by version id."""
+    configs = {}
+    config = None
+    for version in versions:
+        if version.is_keyframe:
+            config = version.template_config
+        elif config is None:
+            logger.error("SiteVersion %s has no keyframe before it", version.pk)
+            continue
+        else:
+            config = apply_patch(config, version.delta)
+        configs[version.pk] = config
+    return configs
+
+
+def _chain(site, up_to: Optional[int] = None) -> List[SiteVersion]:
+    """Versions from the newest keyframe at or before `up_to` (default: latest) onward, ascending."""
+    versions = SiteVersion.objects.filter(site=site)
+    if up_to is not None:
+        versions = versions.filter(version_number__lte=up_to)
+    keyframe_number = (
+        versions.filter(delta__isnull=True).order_by('-version_number').values_list('version_number', flat=True).first()
+    )
+    if keyframe_number is None:
+        return []
+    return list(versions.filter(version_number__gte=keyframe_number).order_by('version_number'))
+
+
+def version_config(version: SiteVersion) -> Any:
+    """Full template_config of a single version."""
+    if version.is_keyframe:
+        return version.template_config
+    chain = _chain(version.site_id, up_to=version.version_number)
+    return _roll_forward(chain).get(version.pk)
+
+
+def list_versions(site: Site) -> List[SiteVersion]:
+    """All versions of the site, newest first, with the full config in `resolved_config`."""
+    versions = list(SiteVersion.objects.filter(site=site).select_related('created_by').order_by('version_number'))
+    configs = _roll_forward(versions)
+    for version in versions:
+        version.resolved_config = configs.get(version.pk)
+    versions.reverse()
+    return versions
+
+
+def create_version(
+    site: Site,
+    template_config: Any,
+    *,
+    notes: str = '',
+    change_summary: str = '',
+    created_by: Optional[PlatformUser] = None,
+    diff: Optional[Tuple[Any, List[dict]]] = None,
+) -> SiteVersion:
+    """
+    Append a version to the site's history and enforce SITE_VERSION_LIMIT.
+
+    `diff` is an optional (previous_config, patch) pair from a caller that
+    already knows the change (api.site_config); the patch is stored as the
+    delta when previous_config is the latest version's config.
+    """
+    with transaction.atomic():
+        chain = _chain(site)
+        last_number = (
+            SiteVersion.objects.filter(site=site).order_by('-version_number')
+            .values_list('version_number', flat=True).first()
+        )
+        next_number = (last_number or 0) + 1
+
+        delta = None
+        if chain and len(chain) < _keyframe_interval():
+            previous_config = _roll_forward(chain)[chain[-1].pk]
+            if diff is not None and diff[0] == previous_config:
+                delta = diff[1]
+            else:
+                delta = make_patch(previous_config, template_config)
+            if _size(delta) > _size(template_config) // 2:
+                delta = None
+
+        version = SiteVersion.objects.create(
+            site=site,
+            version_number=next_number,
+            template_config=template_config if delta is None else None,
+            delta=delta,
+            notes=notes,
+            change_summary=change_summary,
+            created_by=created_by,
+        )
+        prune_versions(site)
+    version.resolved_config = template_config
+    return version
+
+
+def prune_versions(site: Site) -> int:
+    """Delete versions beyond SITE_VERSION_LIMIT, re-keyframing the oldest survivor first."""
+    numbers = list(
+        SiteVersion.objects.filter(site=site).order_by('-version_number').values_list('version_number', flat=True)
+    )
+    if len(numbers) <= SITE_VERSION_LIMIT:
+        return 0
+
+    oldest_kept = numbers[SITE_VERSION_LIMIT - 1]
+    chain = _chain(site, up_to=oldest_kept)
+    if chain and not chain[-1].is_keyframe:
+        survivor = chain[-1]
+        survivor.template_config = _roll_forward(chain)[survivor.pk]
+        survivor.delta = None
+        survivor.save(update_fields=['template_config', 'delta'])
+
+    removed, _ = SiteVersion.objects.filter(site=site, version_number__lt=oldest_kept).delete()
+    return removed
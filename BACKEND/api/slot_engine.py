@@ -0,0 +1,501 @@
+"""Interval-based computation of public booking slots.
+
+The engine loads a site's events and availability blocks once, indexes the
+fully booked events per assignee and then sweeps every availability block,
+resolving conflicts with binary search instead of rescanning all events for
+every candidate slot.
+
+Results are materialized in ComputedSlot per (site, day, assignee); signals
+refresh only the scopes touched by a write, so public reads are range scans.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import accumulate
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .calendar_cache import bump_calendar_version
+from .models import AvailabilityBlock, ComputedSlot, Event
+
+logger = logging.getLogger(__name__)
+
+# Safety guard for a single availability block (max minutes per day)
+MAX_SLOTS_PER_BLOCK = 1440
+
+# Event.capacity of an event without a participant limit
+UNLIMITED_CAPACITY = -1
+
+
+def team_member_display_name(member) -> str:
+    """Public label of a team member (linked account name wins over the roster name)."""
+    # TeamMember doesn't have first_name/last_name, use name or linked_user
+    if member.linked_user:
+        return member.linked_user.get_full_name() or member.linked_user.email
+    return member.name or member.email or 'Członek zespołu'
+
+
+def get_assignee_info(obj) -> dict:
+    """Extract assignee information from an Event or AvailabilityBlock."""
+    if getattr(obj, 'assigned_to_team_member', None):
+        member = obj.assigned_to_team_member
+        return {
+            'type': 'team_member',
+            'id': member.id,
+            'name': team_member_display_name(member)
+        }
+    if getattr(obj, 'assigned_to_owner', None):
+        owner = obj.assigned_to_owner
+        return {
+            'type': 'owner',
+            'id': owner.id,
+            'name': owner.get_full_name() or owner.email
+        }
+    # Fallback to creator or site owner
+    creator = getattr(obj, 'creator', None) or obj.site.owner
+    return {
+        'type': 'owner',
+        'id': creator.id if creator else None,
+        'name': creator.get_full_name() if creator else 'Instruktor'
+    }
+
+
+def _assignee_key(info: dict) -> tuple:
+    return info['type'], info['id']
+
+
+def _is_full(event) -> bool:
+    # capacity -1 means unlimited (see Event.capacity)
+    return event.capacity != UNLIMITED_CAPACITY and event.booked_count >= event.capacity
+
+
+def _available_spots(event) -> int:
+    """Free spots left on the event; -1, like its capacity, when it is unlimited."""
+    if event.capacity == UNLIMITED_CAPACITY:
+        return UNLIMITED_CAPACITY
+    return max(event.capacity - event.booked_count, 0)
+
+
+class BusyIntervals:
+    """Sorted busy intervals of a single assignee with a running max of end times."""
+
+    __slots__ = ('starts', 'max_ends')
+
+    def __init__(self, intervals: Iterable[tuple[datetime, datetime]]):
+        ordered = sorted(intervals)
+        self.starts = [start for start, _ in ordered]
+        self.max_ends = list(accumulate((end for _, end in ordered), max))
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Return True if any interval intersects the half-open range [start, end)."""
+        # Only intervals starting before `end` can intersect; among them the
+        # one reaching furthest decides whether `start` is covered.
+        idx = bisect.bisect_left(self.starts, end)
+        return idx > 0 and self.max_ends[idx - 1] > start
+
+
+def _build_slot(start, end, duration, capacity, available_spots, event_type, event_id, assignee) -> dict:
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'duration': duration,
+        'capacity': capacity,
+        'available_spots': available_spots,
+        'event_type': event_type,
+        'event_id': event_id,
+        'assignee_type': assignee['type'],
+        'assignee_id': assignee['id'],
+        'assignee_name': assignee['name'],
+    }
+
+
+def get_assignee_key(obj) -> tuple:
+    """Return the (type, id) assignee key of an Event or AvailabilityBlock without loading relations."""
+    if obj.assigned_to_team_member_id:
+        return 'team_member', obj.assigned_to_team_member_id
+    if obj.assigned_to_owner_id:
+        return 'owner', obj.assigned_to_owner_id
+    return 'owner', obj.creator_id
+
+
+def _assignee_filter(assignee: tuple, *, allow_unassigned: bool) -> Q:
+    assignee_type, assignee_id = assignee
+    if assignee_type == 'team_member':
+        return Q(assigned_to_team_member_id=assignee_id)
+    condition = Q(assigned_to_owner_id=assignee_id)
+    if allow_unassigned:
+        # Unassigned availability blocks belong to their creator
+        condition |= Q(assigned_to_owner__isnull=True, assigned_to_team_member__isnull=True, creator_id=assignee_id)
+    return condition
+
+
+def day_window(start_date: date, end_date: date) -> tuple[datetime, datetime]:
+    """
+    Half-open [start, end) datetime window covering whole local days.
+
+    Filtering `start_time >= start AND start_time < end` keeps the column bare,
+    so the (site, start_time) index is usable - unlike `start_time__date`.
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, dt_time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), dt_time.min), tz)
+    return start, end
+
+
+def load_events(site, start_date: date, end_date: date, *, assignee: Optional[tuple] = None) -> list:
+    """Fetch events in the date range; occupancy comes from the denormalized booked_count."""
+    window_start, window_end = day_window(start_date, end_date)
+    qs = Event.objects.filter(
+        site=site,
+        start_time__gte=window_start,
+        start_time__lt=window_end,
+    )
+    if assignee is not None:
+        qs = qs.filter(_assignee_filter(assignee, allow_unassigned=False))
+    return list(
+        qs.select_related('site__owner', 'creator', 'assigned_to_owner', 'assigned_to_team_member__linked_user')
+        .order_by('start_time')
+    )
+
+
+def load_blocks(site, start_date: date, end_date: date, *, assignee: Optional[tuple] = None) -> list:
+    """Fetch availability blocks in the date range with assignee relations joined."""
+    qs = AvailabilityBlock.objects.filter(
+        site=site,
+        date__gte=start_date,
+        date__lte=end_date,
+    )
+    if assignee is not None:
+        qs = qs.filter(_assignee_filter(assignee, allow_unassigned=True))
+    return list(
+        qs.select_related('site__owner', 'creator', 'assigned_to_owner', 'assigned_to_team_member__linked_user')
+        .order_by('date', 'start_time')
+    )
+
+
+def compute_slots(events: list, blocks: list, *, now: Optional[datetime] = None) -> list[dict]:
+    """
+    Compute bookable slots from preloaded events and availability blocks.
+
+    Occupancy is read from the denormalized `Event.booked_count`. A slot
+    generated from a block is hidden when it overlaps a fully booked event of
+    the same assignee; events with free spots are always offered.
+    """
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+
+    events = sorted(events, key=lambda e: e.start_time)
+    event_assignees = {}
+    exact_matches = {}
+    busy = defaultdict(list)
+    for event in events:
+        info = get_assignee_info(event)
+        key = _assignee_key(info)
+        event_assignees[event.pk] = info
+        exact_matches.setdefault((key, event.start_time, event.end_time), event)
+        if _is_full(event):
+            busy[key].append((event.start_time, event.end_time))
+    busy_index = {key: BusyIntervals(intervals) for key, intervals in busy.items()}
+
+    slot_map = {}
+    slot_ends = {}
+
+    # Generuj sloty na podstawie bloków dostępności
+    for block in blocks:
+        meeting_length = block.meeting_length or 0
+        if meeting_length <= 0:
+            logger.warning(
+                "Skipping availability block %s (site=%s) due to invalid meeting_length=%s",
+                block.id,
+                block.site_id,
+                meeting_length,
+            )
+            continue
+
+        snapping_interval = block.time_snapping or 0
+        if snapping_interval <= 0:
+            logger.warning(
+                "Falling back to meeting_length for time_snapping in block %s (site=%s); time_snapping=%s",
+                block.id,
+                block.site_id,
+                block.time_snapping,
+            )
+            snapping_interval = meeting_length
+
+        assignee_info = get_assignee_info(block)
+        key = _assignee_key(assignee_info)
+        assignee_busy = busy_index.get(key)
+
+        length = timedelta(minutes=meeting_length)
+        step = timedelta(minutes=snapping_interval)
+        current_time = timezone.make_aware(datetime.combine(block.date, block.start_time), tz)
+        end_time = timezone.make_aware(datetime.combine(block.date, block.end_time), tz)
+
+        iterations = 0
+        while current_time + length <= end_time:
+            iterations += 1
+            if iterations > MAX_SLOTS_PER_BLOCK:
+                logger.warning(
+                    "Breaking availability block %s (site=%s) due to iteration guard",
+                    block.id,
+                    block.site_id,
+                )
+                break
+
+            slot_start = current_time
+            slot_end = slot_start + length
+            current_time += step
+
+            if assignee_busy is not None and assignee_busy.overlaps(slot_start, slot_end):
+                continue
+
+            # Aware datetimes hash by instant, so UTC event times and local block times share keys
+            slot_key = (slot_start, key)
+            if slot_key in slot_map:
+                continue
+
+            slot_ends[slot_key] = slot_end
+            matching_event = exact_matches.get((key, slot_start, slot_end))
+            if matching_event is not None:
+                slot_map[slot_key] = _build_slot(
+                    slot_start, slot_end, meeting_length,
+                    matching_event.capacity,
+                    _available_spots(matching_event),
+                    matching_event.event_type,
+                    matching_event.id,
+                    event_assignees[matching_event.pk],
+                )
+            else:
+                slot_map[slot_key] = _build_slot(
+                    slot_start, slot_end, meeting_length, 1, 1, 'individual', None, assignee_info,
+                )
+
+    # Dodaj istniejące wydarzenia, które nie były objęte blokami dostępności
+    for event in events:
+        if _is_full(event):
+            continue
+        available_spots = _available_spots(event)
+
+        info = event_assignees[event.pk]
+        slot_key = (event.start_time, _assignee_key(info))
+        existing_slot = slot_map.get(slot_key)
+        if existing_slot is None:
+            slot_ends[slot_key] = event.end_time
+            slot_map[slot_key] = _build_slot(
+                event.start_time,
+                event.end_time,
+                int((event.end_time - event.start_time).total_seconds() // 60),
+                event.capacity,
+                available_spots,
+                event.event_type,
+                event.id,
+                info,
+            )
+        else:
+            # Upewnij się, że dane eventu mają pierwszeństwo (np. większa pojemność)
+            if UNLIMITED_CAPACITY in (existing_slot['capacity'], event.capacity):
+                existing_slot['capacity'] = UNLIMITED_CAPACITY
+            else:
+                existing_slot['capacity'] = max(existing_slot['capacity'], event.capacity)
+            existing_slot['available_spots'] = available_spots
+            existing_slot['event_type'] = event.event_type
+            existing_slot['event_id'] = event.id
+            existing_slot['assignee_type'] = info['type']
+            existing_slot['assignee_id'] = info['id']
+            existing_slot['assignee_name'] = info['name']
+
+    # Filter out slots that have already ended, ordered by start instant
+    return [
+        slot_map[slot_key]
+        for slot_key in sorted(slot_map, key=lambda k: k[0])
+        if slot_ends[slot_key] > now
+    ]
+
+
+def _slot_day(slot: dict) -> date:
+    return timezone.localdate(datetime.fromisoformat(slot['start']))
+
+
+def compute_site_slots(
+    site,
+    start_date: date,
+    end_date: date,
+    *,
+    now: Optional[datetime] = None,
+    assignee: Optional[tuple] = None,
+) -> list[dict]:
+    """Load calendar data for a site and compute its bookable slots (two queries)."""
+    # Events from the previous day may run past midnight and block the first slots
+    events = load_events(site, start_date - timedelta(days=1), end_date, assignee=assignee)
+    blocks = load_blocks(site, start_date, end_date, assignee=assignee)
+    return [
+        slot for slot in compute_slots(events, blocks, now=now)
+        if start_date <= _slot_day(slot) <= end_date
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Materialized slots (ComputedSlot)
+# ---------------------------------------------------------------------------
+
+SLOT_BULK_BATCH_SIZE = 1000
+
+
+def event_slot_scopes(event) -> set[tuple]:
+    """Return the (site_id, day, assignee) scopes whose slots depend on the given event."""
+    if not event.start_time or not event.end_time:
+        return set()
+    assignee = get_assignee_key(event)
+    day = timezone.localdate(event.start_time)
+    last_day = max(timezone.localdate(event.end_time), day)
+    scopes = set()
+    while day <= last_day:
+        scopes.add((event.site_id, day, assignee))
+        day += timedelta(days=1)
+    return scopes
+
+
+def block_slot_scopes(block) -> set[tuple]:
+    """Return the (site_id, day, assignee) scope of an availability block."""
+    return {(block.site_id, block.date, get_assignee_key(block))}
+
+
+def _slot_row(site_id: int, slot: dict, computed_at: datetime):
+    start = datetime.fromisoformat(slot['start'])
+    return ComputedSlot(
+        site_id=site_id,
+        date=timezone.localdate(start),
+        assignee_type=slot['assignee_type'],
+        assignee_id=slot['assignee_id'],
+        assignee_name=slot['assignee_name'] or '',
+        start_time=start,
+        end_time=datetime.fromisoformat(slot['end']),
+        duration=slot['duration'],
+        capacity=slot['capacity'],
+        available_spots=slot['available_spots'],
+        event_type=slot['event_type'],
+        event_id=slot['event_id'],
+        computed_at=computed_at,
+    )
+
+
+def refresh_computed_slots(site_id: int, day: date, assignee: tuple, *, now: Optional[datetime] = None) -> int:
+    """Recompute the stored slots of one assignee on one day. Returns the number of rows written."""
+    now = now or timezone.now()
+    slots = compute_site_slots(site_id, day, day, now=now, assignee=assignee)
+    rows = [_slot_row(site_id, slot, now) for slot in slots]
+    assignee_type, assignee_id = assignee
+    with transaction.atomic():
+        ComputedSlot.objects.filter(
+            site_id=site_id,
+            date=day,
+            assignee_type=assignee_type,
+            assignee_id=assignee_id,
+        ).delete()
+        ComputedSlot.objects.bulk_create(rows, batch_size=SLOT_BULK_BATCH_SIZE)
+    return len(rows)
+
+
+def _calendar_horizon(site) -> Optional[date]:
+    """Last day with an availability block or an event for the site."""
+    last_block = AvailabilityBlock.objects.filter(site=site).aggregate(last=Max('date'))['last']
+    last_event = Event.objects.filter(site=site).aggregate(last=Max('end_time'))['last']
+    candidates = [d for d in (last_block, last_event and timezone.localdate(last_event)) if d]
+    return max(candidates) if candidates else None
+
+
+def rebuild_computed_slots(site, *, now: Optional[datetime] = None) -> int:
+    """Drop and recompute every stored slot of a site from today onwards."""
+    now = now or timezone.now()
+    start_date = timezone.localdate(now)
+    end_date = _calendar_horizon(site)
+    slots = compute_site_slots(site, start_date, end_date, now=now) if end_date and end_date >= start_date else []
+    rows = [_slot_row(site.pk, slot, now) for slot in slots]
+    with transaction.atomic():
+        ComputedSlot.objects.filter(site=site).delete()
+        ComputedSlot.objects.bulk_create(rows, batch_size=SLOT_BULK_BATCH_SIZE)
+        transaction.on_commit(lambda: bump_calendar_version(site.pk))
+    return len(rows)
+
+
+def read_computed_slots(site, start_date: date, end_date: date, *, now: Optional[datetime] = None) -> list[dict]:
+    """Return stored slots of a site in the date range, in the public availability format."""
+    now = now or timezone.now()
+    rows = (
+        ComputedSlot.objects.filter(
+            site=site,
+            date__gte=start_date,
+            date__lte=end_date,
+            end_time__gt=now,
+        )
+        .order_by('start_time', 'id')
+        .values_list(
+            'start_time', 'end_time', 'duration', 'capacity', 'available_spots', 'event_type',
+            'event_id', 'assignee_type', 'assignee_id', 'assignee_name',
+        )
+    )
+    return [
+        {
+            'start': timezone.localtime(start).isoformat(),
+            'end': timezone.localtime(end).isoformat(),
+            'duration': duration,
+            'capacity': capacity,
+            'available_spots': available_spots,
+            'event_type': event_type,
+            'event_id': event_id,
+            'assignee_type': assignee_type,
+            'assignee_id': assignee_id,
+            'assignee_name': assignee_name,
+        }
+        for (start, end, duration, capacity, available_spots, event_type,
+             event_id, assignee_type, assignee_id, assignee_name) in rows
+    ]
+
+
+@dataclass(frozen=True)
+class SlotDrift:
+    """Differences between stored and freshly computed slots, keyed by (start, assignee_type, assignee_id)."""
+
+    missing: list
+    unexpected: list
+    changed: list
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.unexpected or self.changed)
+
+
+def _index_slots(slots: list[dict]) -> dict:
+    index = {}
+    for slot in slots:
+        start = datetime.fromisoformat(slot['start'])
+        index[(start, slot['assignee_type'], slot['assignee_id'])] = (
+            datetime.fromisoformat(slot['end']),
+            slot['duration'],
+            slot['capacity'],
+            slot['available_spots'],
+            slot['event_type'],
+            slot['event_id'],
+            slot['assignee_name'] or '',
+        )
+    return index
+
+
+def check_computed_slots(site, start_date: date, end_date: date, *, now: Optional[datetime] = None) -> SlotDrift:
+    """Compare stored slots of a site with on-the-fly computation over the date range."""
+    now = now or timezone.now()
+    stored = _index_slots(read_computed_slots(site, start_date, end_date, now=now))
+    expected = _index_slots(compute_site_slots(site, start_date, end_date, now=now))
+    return SlotDrift(
+        missing=sorted(key for key in expected if key not in stored),
+        unexpected=sorted(key for key in stored if key not in expected),
+        changed=sorted(key for key in expected if key in stored and stored[key] != expected[key]),
+    )
@@ -205,6 +205,27 @@ def cleanup_unused_media(self, older_than_hours: int = 24):
         raise self.retry(exc=exc)
 
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def cleanup_calendar_tombstones(self):
+    """
+    Remove calendar delta-sync tombstones older than CALENDAR_TOMBSTONE_RETENTION_DAYS.
+    
+    Clients holding an older cursor receive a full calendar snapshot instead.
+    
+    Returns:
+        dict: Cleanup statistics
+    """
+    from .calendar_sync import prune_tombstones
+    
+    try:
+        removed = prune_tombstones()
+        logger.info(f"[Celery] Removed {removed} calendar tombstones")
+        return {'status': 'success', 'removed': removed}
+    except Exception as exc:
+        logger.exception(f"[Celery] Calendar tombstone cleanup failed: {exc}")
+        raise self.retry(exc=exc)
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
 def send_custom_email_task_async(
     self,
@@ -505,23 +526,9 @@ def execute_complex_ai_task(self, user_prompt: str, site_config: dict, user_id:
             
             # CREATE CHECKPOINT before AI changes (only for site editor)
             if site:
-                import uuid
-                checkpoint_id = str(uuid.uuid4())
-                checkpoint = {
-                    'id': checkpoint_id,
-                    'timestamp': timezone.now().isoformat(),
-                    'config': site.template_config,
-                    'message': f'Przed zmianą: {user_prompt[:100]}'
-                }
-                
-                # Get existing checkpoints
-                checkpoints = site.ai_checkpoints or []
-                checkpoints.insert(0, checkpoint)
-                checkpoints = checkpoints[:20]  # Keep only last 20
-                
-                site.ai_checkpoints = checkpoints
-                site.save(update_fields=['ai_checkpoints'])
-                logger.info(f"[Celery] Created checkpoint {checkpoint_id} before AI changes")
+                from .checkpoints import create_checkpoint
+                checkpoint = create_checkpoint(site, site.template_config, f'Przed zmianą: {user_prompt[:100]}')
+                logger.info(f"[Celery] Created checkpoint {checkpoint.checkpoint_id} before AI changes")
             
             agent_service = get_site_editor_agent()
             result = agent_service.process_task(user_prompt, site_config, context, chat_history=chat_history_list)
@@ -646,6 +653,13 @@ def execute_complex_ai_task(self, user_prompt: str, site_config: dict, user_id:
             'agent_id': str(agent.id),
             'chat_history_id': chat_entry.id
         }
+
+        # Changed paths only, so the editor can save them via PATCH /sites/<id>/config/
+        if isinstance(site_config, dict) and isinstance(result.get('site'), dict):
+            from .json_patch import make_patch
+            result_data['patch'] = make_patch(site_config, result['site'])
+            if site:
+                result_data['config_revision'] = site.config_revision
         
         cache.set(cache_key, json.dumps(result_data), timeout=300)
         logger.info(f"[Celery] Result stored in cache with key: {cache_key}")
@@ -1551,6 +1565,114 @@ def purge_cloudflare_cache(self, domain_name: str):
         }
 
 
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def purge_worker_domain_config(self, hostnames):
+    """
+    Evict domain configs from the Cloudflare worker's edge cache (Workers KV).
+
+    Called when a DomainOrder's target, proxy_mode or status changes so the
+    worker stops redirecting to the old target before its CONFIG_TTL runs out.
+    The request body is signed with CLOUDFLARE_WORKER_PURGE_SECRET and carries
+    a timestamp, so retries always build a fresh body.
+
+    Args:
+        self: Celery task instance
+        hostnames: Domain names to evict (a single name is accepted too)
+
+    Returns:
+        dict: Purge result with status
+    """
+    import requests
+    from .domain_cache import sign_worker_purge, worker_purge_body
+
+    if isinstance(hostnames, str):
+        hostnames = [hostnames]
+
+    purge_url = getattr(settings, 'CLOUDFLARE_WORKER_PURGE_URL', '')
+    secret = getattr(settings, 'CLOUDFLARE_WORKER_PURGE_SECRET', '')
+    if not purge_url or not secret:
+        logger.warning(f"[Celery] Worker purge endpoint not configured - skipping purge of {hostnames}")
+        return {
+            "status": "skipped",
+            "message": "Worker purge endpoint not configured"
+        }
+
+    body = worker_purge_body(hostnames)
+    try:
+        response = requests.post(
+            purge_url,
+            data=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Purge-Signature": sign_worker_purge(body, secret),
+            },
+            timeout=10,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.error(f"[Celery] Failed to purge worker domain config for {hostnames}: {e}")
+        raise self.retry(exc=e)
+
+    logger.info(f"[Celery] Purged worker domain config for {hostnames}")
+    return {
+        "status": "success",
+        "hostnames": sorted(hostnames),
+    }
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def export_site_bundle(self, site_id: int):
+    """
+    Write the static bundle of a published site to object storage.
+
+    Scheduled by api.site_export.mark_sections_dirty whenever a model that
+    contributes to the public page changes; only the dropped sections are
+    rebuilt. Unpublished sites lose their bundle.
+
+    Args:
+        self: Celery task instance
+        site_id: ID of the site to export
+
+    Returns:
+        dict: Export result with status
+    """
+    from .media_storage import StorageError
+    from .site_export import export_site
+
+    try:
+        result = export_site(site_id)
+    except StorageError as e:
+        logger.error(f"[Celery] Failed to export bundle of site {site_id}: {e}")
+        raise self.retry(exc=e)
+
+    return {
+        "status": "success" if result.changed else "unchanged",
+        "site_id": site_id,
+        "key": result.key,
+        "rebuilt_sections": list(result.rebuilt_sections),
+    }
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def delete_site_bundle(self, key: str):
+    """
+    Delete a replaced site bundle from object storage.
+
+    Args:
+        self: Celery task instance
+        key: Storage key of the replaced bundle
+
+    Returns:
+        dict: Deletion result with status
+    """
+    from .site_export import delete_bundle
+
+    if not delete_bundle(key):
+        return {"status": "skipped", "message": "Bundle is current again", "key": key}
+    logger.info(f"[Celery] Deleted site bundle {key}")
+    return {"status": "success", "key": key}
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def regenerate_testimonial_summary(self, site_id: int):
     """
@@ -8,14 +8,35 @@ Te testy pokrywają reprezentatywne elementy platformy:
 - Widoki API: uprawnienia oparte na rolach, logika biznesowa
 """
 
+import copy
+import hashlib
+import hmac
+import json
+import time as time_module
+import uuid
+from contextlib import contextmanager
 from datetime import date, time, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase, RequestFactory
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
 from django.utils import timezone
-from django.db import IntegrityError
-from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed, ValidationError as DRFValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 
@@ -31,6 +52,11 @@ from .models import (
     TeamMember,
     Testimonial,
     BigEvent,
+    CalendarTombstone,
+    ComputedSlot,
+    ConfigCheckpoint,
+    ConfigCheckpointBase,
+    DomainOrder,
 )
 from .serializers import (
     CustomRegisterSerializer,
@@ -40,8 +66,28 @@ from .serializers import (
     AvailabilityBlockSerializer,
     TeamMemberSerializer,
     TestimonialSerializer,
+    PublicSiteSerializer,
 )
+from .booking_service import (
+    AlreadyBookedError,
+    EventFullError,
+    book_slot,
+    create_booking,
+    delete_booking,
+    find_booked_count_drift,
+)
+from . import calendar_cache, checkpoints, ddos_blocklist, domain_cache, rate_limiter, renderers, site_config, site_export, site_versions
+from .ddos_blocklist import NetworkSet
+from .ddos_middleware import DDoSProtectionMiddleware
+from .authentication import TEMPORARY_PASSWORD_CLAIM, PlatformRefreshToken, RequestCachedJWTAuthentication
+from .middleware import PathScopedMiddleware, TemporaryPasswordMiddleware
+from .json_patch import JsonPatchError, apply_patch, make_patch
+from .rate_limiter import Rate, RatePolicy, get_limiter
+from .renderers import FastJSONRenderer, RawJSON
+from .signals import suppress_calendar_signals
+from .slot_engine import check_computed_slots, day_window
 from .utils import generate_site_identifier, get_avatar_color, get_avatar_letter
+from .views import SiteViewSet
 
 
 # =============================================================================
@@ -1014,7 +1060,7 @@ class PublicSiteAPITests(APITestCase):
         """
         response = self.client.get(f'/api/v1/public-sites/{self.site.identifier}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data['name'], 'Public Site')
+        self.assertEqual(response.json()['name'], 'Public Site')
 
     def test_unpublished_site_hides_config(self):
         """
@@ -1027,7 +1073,7 @@ class PublicSiteAPITests(APITestCase):
         
         response = self.client.get(f'/api/v1/public-sites/{self.site.identifier}/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertNotIn('template_config', response.data)
+        self.assertNotIn('template_config', response.json())
 
 
 class AuthAPITests(APITestCase):
@@ -1350,6 +1396,2630 @@ class RoleBasedPermissionTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+# =============================================================================
+# TESTY SILNIKA SLOTÓW (DOSTĘPNOŚĆ PUBLICZNA)
+# =============================================================================
+
+# Cache w pamięci procesu, aby testy nie zależały od Redisa ani od jego stanu
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SlotCalendarTestCase(TestCase):
+    """Wspólne dane testowe kalendarza: właściciel, instruktor i bloki 10:00-12:00 na jutro."""
+
+    def setUp(self):
+        """Tworzy stronę z właścicielem, instruktorem i blokami 10:00-12:00 na jutro."""
+        cache.clear()
+        self.owner = PlatformUser.objects.create_user(
+            email="owner@example.com",
+            password="pass123",
+            first_name="Owner"
+        )
+        self.site = Site.objects.create(owner=self.owner, name="Slots Site")
+        self.member = TeamMember.objects.create(site=self.site, name="Anna Instruktor")
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.blocks = []
+        # Sloty są materializowane po commicie transakcji (transaction.on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            for assignment in ({'assigned_to_owner': self.owner}, {'assigned_to_team_member': self.member}):
+                self.blocks.append(AvailabilityBlock.objects.create(
+                    site=self.site,
+                    creator=self.owner,
+                    date=self.day,
+                    start_time=time(10, 0),
+                    end_time=time(12, 0),
+                    meeting_length=60,
+                    time_snapping=30,
+                    **assignment
+                ))
+
+    def _local(self, hour, minute=0):
+        from datetime import datetime
+        return timezone.make_aware(datetime.combine(self.day, time(hour, minute)))
+
+
+class SlotEngineTests(SlotCalendarTestCase):
+    """
+    Testy silnika wyliczającego wolne sloty (api.slot_engine).
+    
+    Silnik wczytuje wydarzenia i bloki dostępności jednorazowo, a konflikty
+    z pełnymi wydarzeniami sprawdza osobno dla każdej prowadzącej osoby.
+    """
+
+    def _slots(self):
+        from .slot_engine import compute_site_slots
+        return compute_site_slots(self.site, self.day, self.day)
+
+    def test_full_event_blocks_only_its_assignee(self):
+        """
+        Sprawdza czy pełne wydarzenie właściciela blokuje tylko jego sloty.
+        Sloty 10:00 i 10:30 właściciela nachodzą na sesję 10:00-11:00,
+        a instruktor zachowuje wszystkie trzy sloty.
+        """
+        event = Event.objects.create(
+            site=self.site,
+            creator=self.owner,
+            title="Sesja",
+            start_time=self._local(10),
+            end_time=self._local(11),
+            capacity=1,
+            assigned_to_owner=self.owner
+        )
+        create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+
+        slots = self._slots()
+        owner_starts = [s['start'] for s in slots if s['assignee_type'] == 'owner']
+        member_starts = [s['start'] for s in slots if s['assignee_type'] == 'team_member']
+
+        self.assertEqual(owner_starts, [self._local(11).isoformat()])
+        self.assertEqual(len(member_starts), 3)
+
+    def test_unlimited_event_is_never_full(self):
+        """Sprawdza czy wydarzenie bez limitu (capacity=-1) nie blokuje slotów i ma -1 wolnych miejsc."""
+        event = Event.objects.create(
+            site=self.site,
+            creator=self.owner,
+            title="Otwarte zajęcia",
+            start_time=self._local(10),
+            end_time=self._local(11),
+            capacity=-1,
+            assigned_to_owner=self.owner
+        )
+        for index in range(3):
+            create_booking(event, site=self.site, guest_email=f"g{index}@example.com", guest_name="Gość")
+
+        event.refresh_from_db()
+        self.assertEqual(event.booked_count, 3)
+        slots = self._slots()
+        owner_slots = [s for s in slots if s['assignee_type'] == 'owner']
+        self.assertEqual(len(owner_slots), 3)
+        event_slot = next(s for s in owner_slots if s['event_id'] == event.id)
+        self.assertEqual((event_slot['capacity'], event_slot['available_spots']), (-1, -1))
+
+    def test_group_event_reports_available_spots(self):
+        """
+        Sprawdza czy wydarzenie grupowe z wolnymi miejscami zastępuje slot bloku.
+        Slot powinien mieć pojemność i liczbę wolnych miejsc z wydarzenia.
+        """
+        event = Event.objects.create(
+            site=self.site,
+            creator=self.owner,
+            title="Joga grupowa",
+            start_time=self._local(10),
+            end_time=self._local(11),
+            capacity=5,
+            event_type=Event.EventType.GROUP,
+            assigned_to_team_member=self.member
+        )
+        create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+
+        slot = next(
+            s for s in self._slots()
+            if s['assignee_type'] == 'team_member' and s['event_id'] == event.id
+        )
+        self.assertEqual(slot['capacity'], 5)
+        self.assertEqual(slot['available_spots'], 4)
+        self.assertEqual(slot['event_type'], 'group')
+
+    def test_query_count_is_constant(self):
+        """
+        Sprawdza czy liczba zapytań nie zależy od liczby wydarzeń.
+        Liczba rezerwacji pochodzi z kolumny booked_count, więc wystarczą 2 zapytania.
+        """
+        for hour in (10, 11):
+            event = Event.objects.create(
+                site=self.site,
+                creator=self.owner,
+                title="Sesja",
+                start_time=self._local(hour),
+                end_time=self._local(hour + 1),
+                capacity=2,
+                assigned_to_team_member=self.member
+            )
+            create_booking(event, site=self.site, guest_email=f"{hour}@example.com")
+
+        with self.assertNumQueries(2):
+            self._slots()
+
+    def test_public_availability_endpoint(self):
+        """
+        Sprawdza publiczny endpoint dostępności oparty na silniku slotów.
+        Bez parametrów dat zwraca 400, z parametrami listę slotów.
+        """
+        url = f'/api/v1/public-sites/{self.site.id}/availability/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(url, {'start_date': self.day.isoformat(), 'end_date': self.day.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 6)
+
+
+class ComputedSlotTests(SlotCalendarTestCase):
+    """
+    Testy zmaterializowanej tabeli slotów (ComputedSlot).
+    
+    Zapis wydarzenia, rezerwacji lub bloku przelicza tylko dotknięty dzień
+    i osobę prowadzącą; publiczny endpoint jedynie odczytuje tabelę.
+    """
+
+    def _stored(self, **filters):
+        return ComputedSlot.objects.filter(site=self.site, **filters)
+
+    def test_blocks_are_materialized(self):
+        """Sprawdza czy bloki dostępności zapisały sloty obu prowadzących."""
+        self.assertEqual(self._stored(assignee_type='owner').count(), 3)
+        self.assertEqual(self._stored(assignee_type='team_member').count(), 3)
+        self.assertTrue(check_computed_slots(self.site, self.day, self.day).ok)
+
+    def test_booking_refreshes_only_affected_assignee(self):
+        """
+        Sprawdza czy rezerwacja pełnego wydarzenia przelicza tylko sloty właściciela.
+        Wiersze instruktora pozostają nietknięte (te same klucze główne).
+        """
+        member_ids = set(self._stored(assignee_type='team_member').values_list('pk', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            event = Event.objects.create(
+                site=self.site,
+                creator=self.owner,
+                title="Sesja",
+                start_time=self._local(10),
+                end_time=self._local(11),
+                capacity=1,
+                assigned_to_owner=self.owner
+            )
+            create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+
+        self.assertEqual(list(self._stored(assignee_type='owner').values_list('start_time', flat=True)), [self._local(11)])
+        self.assertEqual(set(self._stored(assignee_type='team_member').values_list('pk', flat=True)), member_ids)
+        self.assertTrue(check_computed_slots(self.site, self.day, self.day).ok)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for booking in event.bookings.all():
+                delete_booking(booking)
+        self.assertEqual(self._stored(assignee_type='owner').count(), 3)
+        self.assertEqual(self._stored(assignee_type='owner', start_time=self._local(10)).get().event_id, event.id)
+
+    def test_rolled_back_write_does_not_swallow_refresh(self):
+        """
+        Sprawdza czy zapis wycofany razem z transakcją nie blokuje późniejszego
+        przeliczenia tego samego dnia i prowadzącego.
+        """
+        def create_full_event():
+            event = Event.objects.create(
+                site=self.site,
+                creator=self.owner,
+                title="Sesja",
+                start_time=self._local(10),
+                end_time=self._local(11),
+                capacity=1,
+                assigned_to_owner=self.owner
+            )
+            create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    create_full_event()
+                    raise RuntimeError('rollback')
+        self.assertEqual(self._stored(assignee_type='owner').count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_full_event()
+        self.assertEqual(list(self._stored(assignee_type='owner').values_list('start_time', flat=True)), [self._local(11)])
+
+    def test_nested_suppression_stays_active_until_outer_exit(self):
+        """Sprawdza czy zagnieżdżone suppress_calendar_signals nie wyłącza tłumienia zewnętrznego bloku."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with suppress_calendar_signals():
+                with suppress_calendar_signals():
+                    pass
+                event = Event.objects.create(
+                    site=self.site,
+                    creator=self.owner,
+                    title="Sesja",
+                    start_time=self._local(10),
+                    end_time=self._local(11),
+                    capacity=1,
+                    assigned_to_owner=self.owner
+                )
+                create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+        self.assertEqual(self._stored(assignee_type='owner').count(), 3)
+
+    def test_moving_block_clears_previous_day(self):
+        """Sprawdza czy przeniesienie bloku na inny dzień usuwa sloty ze starego dnia."""
+        block = self.blocks[1]
+        block.date = self.day + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            block.save()
+
+        self.assertFalse(self._stored(assignee_type='team_member', date=self.day).exists())
+        self.assertEqual(self._stored(assignee_type='team_member', date=block.date).count(), 3)
+
+    def test_endpoint_reads_table(self):
+        """Sprawdza czy endpoint publiczny wykonuje tylko odczyt strony i zakresu slotów."""
+        url = f'/api/v1/public-sites/{self.site.id}/availability/'
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'start_date': self.day.isoformat(), 'end_date': self.day.isoformat()})
+        self.assertEqual([s['start'] for s in response.json()][:2], [self._local(10).isoformat()] * 2)
+
+    def test_check_and_rebuild_commands(self):
+        """
+        Sprawdza komendy check_computed_slots i rebuild_computed_slots.
+        Ręcznie usunięte wiersze są wykrywane, a --fix je odtwarza.
+        """
+        self._stored(assignee_type='owner').delete()
+        with self.assertRaises(CommandError):
+            call_command('check_computed_slots', site_ids=[self.site.id], stdout=StringIO())
+
+        call_command('check_computed_slots', site_ids=[self.site.id], fix=True, stdout=StringIO())
+        self.assertEqual(self._stored().count(), 6)
+
+        ComputedSlot.objects.all().delete()
+        call_command('rebuild_computed_slots', site_ids=[self.site.id], stdout=StringIO())
+        self.assertTrue(check_computed_slots(self.site, self.day, self.day).ok)
+
+
+class CalendarCacheTests(SlotCalendarTestCase):
+    """
+    Testy wersjonowanego cache odpowiedzi kalendarza (api.calendar_cache).
+    
+    Każdy zapis wydarzenia, rezerwacji lub bloku podbija wersję kalendarza
+    strony, więc stare odpowiedzi przestają być odczytywane bez skanowania kluczy.
+    """
+
+    def _get(self):
+        return self.client.get(
+            f'/api/v1/public-sites/{self.site.id}/availability/',
+            {'start_date': self.day.isoformat(), 'end_date': self.day.isoformat()}
+        )
+
+    def test_second_request_is_served_from_cache(self):
+        """Sprawdza czy druga identyczna odpowiedź pochodzi z cache bez zapytań o sloty."""
+        self.assertEqual(self._get()['X-Cache'], calendar_cache.CACHE_MISS)
+        with self.assertNumQueries(1):
+            response = self._get()
+        self.assertEqual(response['X-Cache'], calendar_cache.CACHE_HIT)
+        self.assertEqual(len(response.json()), 6)
+
+    def test_write_bumps_version_and_invalidates(self):
+        """Sprawdza czy nowy blok dostępności unieważnia zapisaną odpowiedź."""
+        self._get()
+        version = calendar_cache.get_calendar_version(self.site.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailabilityBlock.objects.create(
+                site=self.site,
+                creator=self.owner,
+                date=self.day,
+                start_time=time(14, 0),
+                end_time=time(15, 0),
+                meeting_length=60,
+                time_snapping=60,
+                assigned_to_owner=self.owner
+            )
+
+        self.assertGreater(calendar_cache.get_calendar_version(self.site.id), version)
+        response = self._get()
+        self.assertEqual(response['X-Cache'], calendar_cache.CACHE_MISS)
+        self.assertEqual(len(response.json()), 7)
+
+    def test_hit_and_miss_counters(self):
+        """Sprawdza liczniki trafień i chybień cache."""
+        self._get()
+        self._get()
+        self._get()
+        stats = calendar_cache.get_cache_stats()['availability']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3, places=3)
+
+
+class CalendarDeltaSyncTests(SlotCalendarTestCase):
+    """
+    Testy trybu delta kalendarza (calendar_data?since=<cursor>).
+    
+    Odpowiedź przyrostowa zawiera tylko zmienione wiersze, identyfikatory
+    usuniętych wydarzeń i bloków (tombstones) oraz nowy kursor.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.owner)
+        self.url = f'/api/v1/sites/{self.site.id}/calendar-data/'
+
+    def _get(self, **params):
+        response = self.api.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_full_snapshot_returns_cursor(self):
+        """Sprawdza czy pełna odpowiedź zawiera kursor i flagę full."""
+        data = self._get()
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['availability_blocks']), 2)
+        self.assertTrue(data['cursor'].isdigit())
+
+    def test_delta_returns_changes_and_tombstones(self):
+        """
+        Sprawdza czy delta zwraca zmieniony blok i identyfikator usuniętego bloku.
+        Cursor z przeszłości (poza oknem nakładania) wyklucza niezmienione wiersze.
+        """
+        with override_settings(CALENDAR_SYNC_OVERLAP_SECONDS=0):
+            cursor = self._get()['cursor']
+            changed, removed = self.blocks
+            changed.title = "Zmieniony"
+            changed.save()
+            removed_id = removed.pk
+            removed.delete()
+
+            delta = self._get(since=cursor)
+
+        self.assertFalse(delta['full'])
+        self.assertEqual([b['id'] for b in delta['availability_blocks']], [changed.pk])
+        self.assertEqual(delta['events'], [])
+        self.assertEqual(delta['deleted']['availability_blocks'], [removed_id])
+
+    def test_booking_change_resends_event(self):
+        """Sprawdza czy nowa rezerwacja powoduje ponowne wysłanie jej wydarzenia."""
+        event = Event.objects.create(
+            site=self.site,
+            creator=self.owner,
+            title="Sesja",
+            start_time=self._local(10),
+            end_time=self._local(11),
+            capacity=3,
+            assigned_to_owner=self.owner
+        )
+        with override_settings(CALENDAR_SYNC_OVERLAP_SECONDS=0):
+            cursor = self._get()['cursor']
+            create_booking(event, site=self.site, guest_email="g@example.com", guest_name="Gość")
+            delta = self._get(since=cursor)
+
+        self.assertEqual([e['id'] for e in delta['events']], [event.pk])
+        self.assertEqual(delta['events'][0]['booked_count'], 1)
+
+    def test_invalid_cursor_is_rejected(self):
+        """Sprawdza czy niepoprawny kursor zwraca 400."""
+        response = self.api.get(self.url, {'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarIndexUsageTests(TestCase):
+    """
+    Testy planów zapytań kalendarza (EXPLAIN).
+    
+    Okna dat są półotwarte na samej kolumnie start_time, więc baza może użyć
+    indeksów złożonych zamiast skanować całą tabelę wydarzeń.
+    """
+
+    def setUp(self):
+        """Tworzy 3 strony po 150 wydarzeń i bloków dostępności."""
+        from datetime import datetime
+        self.owner = PlatformUser.objects.create_user(email="owner@example.com", password="pass123")
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localdate()
+        events, blocks = [], []
+        for index in range(3):
+            site = Site.objects.create(owner=self.owner, name=f"Index Site {index}")
+            member = TeamMember.objects.create(site=site, name=f"Instruktor {index}")
+            for offset in range(150):
+                day = first_day + timedelta(days=offset)
+                start = timezone.make_aware(datetime.combine(day, time(9, 0)), tz)
+                host = {'assigned_to_team_member': member} if offset % 2 else {'assigned_to_owner': self.owner}
+                events.append(Event(
+                    site=site, creator=self.owner, title="Sesja",
+                    start_time=start, end_time=start + timedelta(hours=1), **host
+                ))
+                blocks.append(AvailabilityBlock(
+                    site=site, creator=self.owner, date=day,
+                    start_time=time(8, 0), end_time=time(16, 0), **host
+                ))
+            self.site, self.member = site, member
+        Event.objects.bulk_create(events)
+        AvailabilityBlock.objects.bulk_create(blocks)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_event')
+                cursor.execute('ANALYZE api_availabilityblock')
+        self.start_date = first_day + timedelta(days=10)
+        self.end_date = first_day + timedelta(days=16)
+
+    def _index_name(self, model, fields):
+        return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+    def test_event_window_uses_site_start_index(self):
+        """Sprawdza czy okno dat wydarzeń korzysta z indeksu (site, start_time)."""
+        window_start, window_end = day_window(self.start_date, self.end_date)
+        plan = Event.objects.filter(
+            site=self.site, start_time__gte=window_start, start_time__lt=window_end
+        ).explain()
+        self.assertIn(self._index_name(Event, ['site', 'start_time']), plan)
+
+    def test_assignee_window_uses_team_member_index(self):
+        """Sprawdza czy okno dat instruktora korzysta z indeksu (site, assigned_to_team_member, start_time)."""
+        window_start, window_end = day_window(self.start_date, self.end_date)
+        plan = Event.objects.filter(
+            site=self.site, assigned_to_team_member=self.member,
+            start_time__gte=window_start, start_time__lt=window_end
+        ).explain()
+        self.assertIn(self._index_name(Event, ['site', 'assigned_to_team_member', 'start_time']), plan)
+
+    def test_block_range_uses_site_date_index(self):
+        """Sprawdza czy zakres dni bloków dostępności korzysta z indeksu (site, date)."""
+        plan = AvailabilityBlock.objects.filter(
+            site=self.site, date__gte=self.start_date, date__lte=self.end_date
+        ).explain()
+        self.assertIn(self._index_name(AvailabilityBlock, ['site', 'date']), plan)
+
+    def test_calendar_data_window_is_half_open(self):
+        """
+        Sprawdza filtrowanie calendar_data po dniach lokalnych.
+        Zakres 10-16 dnia zwraca 7 wydarzeń; niepoprawna data daje 400.
+        """
+        api = APIClient()
+        api.force_authenticate(user=self.owner)
+        url = f'/api/v1/sites/{self.site.id}/calendar-data/'
+        with override_settings(CACHES=LOCMEM_CACHES):
+            response = api.get(url, {'start_date': self.start_date.isoformat(), 'end_date': self.end_date.isoformat()})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['events']), 7)
+            self.assertEqual(len(response.json()['availability_blocks']), 7)
+
+            response = api.get(url, {'start_date': '2025-13-01'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarDataQueryCountTests(SlotCalendarTestCase):
+    """
+    Testy liczby zapytań calendar_data (brak N+1).
+    
+    Serializery deklarują potrzebne relacje (EagerLoadingMixin), więc liczba
+    zapytań nie zależy od liczby wydarzeń, rezerwacji ani przypisań.
+    """
+
+    CALENDAR_DATA_QUERIES = 6
+
+    def setUp(self):
+        super().setUp()
+        self.member.linked_user = PlatformUser.objects.create_user(email="anna@example.com", password="pass123")
+        self.member.save()
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.owner)
+
+    def _add_events(self, count):
+        first = Event.objects.filter(site=self.site).count()
+        for index in range(first, first + count):
+            host = {'assigned_to_team_member': self.member} if index % 2 else {'assigned_to_owner': self.owner}
+            event = Event.objects.create(
+                site=self.site,
+                creator=self.owner,
+                title=f"Sesja {index}",
+                start_time=self._local(13) + timedelta(days=index),
+                end_time=self._local(14) + timedelta(days=index),
+                capacity=3,
+                **host
+            )
+            client = Client.objects.create(site=self.site, email=f"c{index}@example.com", name="Klient")
+            create_booking(event, site=self.site, client=client, guest_email=client.email)
+            event.attendees.add(client)
+
+    def _calendar_data(self):
+        cache.clear()
+        response = self.api.get(f'/api/v1/sites/{self.site.id}/calendar-data/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_query_count_is_constant(self):
+        """Sprawdza czy 2 i 12 wydarzeń z rezerwacjami kosztuje tyle samo zapytań."""
+        self._add_events(2)
+        with self.assertNumQueries(self.CALENDAR_DATA_QUERIES):
+            data = self._calendar_data()
+        self.assertEqual(len(data['events']), 2)
+
+        self._add_events(10)
+        with self.assertNumQueries(self.CALENDAR_DATA_QUERIES):
+            data = self._calendar_data()
+        self.assertEqual(len(data['events']), 12)
+        self.assertTrue(all(event['bookings'][0]['client_email'] for event in data['events']))
+
+
+# =============================================================================
+# TESTY LICZNIKA REZERWACJI (Event.booked_count)
+# =============================================================================
+
+class BookedCountTests(TestCase):
+    """
+    Testy zdenormalizowanego licznika rezerwacji (api.booking_service).
+    
+    Licznik jest zmieniany wyrażeniami F() w tej samej transakcji co rezerwacja,
+    a warunkowy UPDATE pełni rolę sprawdzenia pojemności.
+    """
+
+    def setUp(self):
+        """Tworzy stronę i wydarzenie z dwoma miejscami."""
+        self.owner = PlatformUser.objects.create_user(email="owner@example.com", password="pass123")
+        self.site = Site.objects.create(owner=self.owner, name="Counter Site")
+        start = timezone.now() + timedelta(days=1)
+        self.event = Event.objects.create(
+            site=self.site,
+            creator=self.owner,
+            title="Warsztaty",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            capacity=2,
+            assigned_to_owner=self.owner
+        )
+
+    def _book(self, email):
+        return create_booking(self.event, site=self.site, guest_email=email, guest_name="Gość")
+
+    def test_create_and_delete_adjust_counter(self):
+        """Sprawdza czy rezerwacja zwiększa, a odwołanie zmniejsza booked_count."""
+        first = self._book("a@example.com")
+        self._book("b@example.com")
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 2)
+
+        self.assertTrue(delete_booking(first))
+        self.assertFalse(delete_booking(first))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+
+    def test_full_event_rejects_booking_without_count_query(self):
+        """
+        Sprawdza czy pełne wydarzenie odrzuca rezerwację.
+        Sprawdzenie pojemności to jeden warunkowy UPDATE, bez zapytania COUNT.
+        """
+        self._book("a@example.com")
+        self._book("b@example.com")
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.assertRaises(EventFullError):
+                self._book("c@example.com")
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in ctx.captured_queries))
+        self.assertEqual(self.event.bookings.count(), 2)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Sprawdza czy komenda reconcile_booked_counts naprawia rozjechany licznik."""
+        self._book("a@example.com")
+        Event.objects.filter(pk=self.event.pk).update(booked_count=5)
+
+        call_command('reconcile_booked_counts', dry_run=True, stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 5)
+
+        call_command('reconcile_booked_counts', stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.booked_count, 1)
+        self.assertEqual(find_booked_count_drift(), [])
+
+
+# =============================================================================
+# TESTY WSPÓŁBIEŻNYCH REZERWACJI PUBLICZNYCH
+# =============================================================================
+
+class BookSlotTests(TestCase):
+    """
+    Testy ścieżki rezerwacji publicznej (booking_service.book_slot).
+    
+    Slot (strona, termin, prowadzący) jest blokowany na czas transakcji,
+    więc wydarzenie powstaje raz, a pojemność nigdy nie jest przekroczona.
+    """
+
+    def setUp(self):
+        """Tworzy stronę i termin zajęć grupowych na 2 miejsca."""
+        self.owner = PlatformUser.objects.create_user(email="owner@example.com", password="pass123")
+        self.site = Site.objects.create(owner=self.owner, name="Booking Site")
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+
+    def _book(self, email):
+        return book_slot(
+            self.site,
+            start_time=self.start,
+            end_time=self.start + timedelta(hours=1),
+            assigned_to_owner=self.owner,
+            event_defaults={'creator': self.owner, 'title': 'Joga', 'capacity': 2, 'event_type': 'group'},
+            guest_email=email,
+            guest_name="Gość"
+        )
+
+    def test_event_created_once_and_capacity_enforced(self):
+        """
+        Sprawdza czy kolejne rezerwacje trafiają do jednego wydarzenia.
+        Trzecia rezerwacja na 2 miejsca kończy się EventFullError.
+        """
+        first = self._book("a@example.com")
+        second = self._book("b@example.com")
+        self.assertEqual(first.event_id, second.event_id)
+
+        with self.assertRaises(EventFullError):
+            self._book("c@example.com")
+
+        event = Event.objects.get(site=self.site)
+        self.assertEqual(event.booked_count, 2)
+        self.assertEqual(event.bookings.count(), 2)
+
+    def test_duplicate_guest_is_rejected(self):
+        """Sprawdza czy ponowna rezerwacja tego samego gościa zwraca istniejącą rezerwację."""
+        booking = self._book("a@example.com")
+        with self.assertRaises(AlreadyBookedError) as ctx:
+            self._book("a@example.com")
+        self.assertEqual(ctx.exception.booking.pk, booking.pk)
+
+
+class BookingLoadTestCommandTests(TransactionTestCase):
+    """Testy komendy load_test_booking (rezerwacje z wielu połączeń do bazy)."""
+
+    def test_sequential_run_fills_slot_exactly(self):
+        """Sprawdza czy przy jednym wątku slot zapełnia się dokładnie do pojemności."""
+        out = StringIO()
+        call_command('load_test_booking', requests=12, capacity=5, workers=1, stdout=out)
+        self.assertIn('booked=5, full=7', out.getvalue())
+        self.assertFalse(Site.objects.filter(name='Booking Load Test').exists())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Współbieżne blokady wymagają PostgreSQL')
+    def test_concurrent_burst_never_overbooks(self):
+        """Sprawdza czy 200 równoległych rezerwacji nie przekracza pojemności 20."""
+        out = StringIO()
+        call_command('load_test_booking', requests=200, capacity=20, workers=40, stdout=out)
+        self.assertIn('OK: 20/20', out.getvalue())
+
+
+class GenerateLoadTenantsCommandTests(TestCase):
+    """Testy komendy generate_load_tenants (syntetyczne dane do testów wydajności)."""
+
+    OPTIONS = dict(
+        sites=2, team_members=2, days=4, events_per_day=3, bookings_per_event=2, clients=10,
+        testimonials=3, subscribers=5, media=2, chat_messages=2, stdout=StringIO(),
+    )
+
+    def _snapshot(self):
+        return list(Event.objects.filter(site__owner__email__startswith='loadgen-7-').order_by('id').values_list(
+            'title', 'start_time', 'capacity', 'booked_count'
+        ))
+
+    def test_generates_consistent_tenants(self):
+        """Sprawdza liczności, identyfikatory stron i zgodność booked_count z rezerwacjami."""
+        call_command('generate_load_tenants', seed=7, with_slots=True, **self.OPTIONS)
+
+        sites = Site.objects.filter(owner__email__startswith='loadgen-7-')
+        self.assertEqual(sites.count(), 2)
+        for site in sites:
+            self.assertEqual(site.identifier, generate_site_identifier(site.pk, site.name, site.owner.first_name, site.owner.last_name))
+            self.assertEqual(site.team_members.filter(invitation_status='linked').count(), 2)
+            self.assertEqual(site.events.count(), 12)
+            self.assertTrue(ComputedSlot.objects.filter(site=site).exists())
+        self.assertEqual(find_booked_count_drift(Event.objects.filter(site__in=sites)), [])
+
+    def test_same_seed_is_deterministic(self):
+        """Sprawdza czy ponowne wygenerowanie z tym samym ziarnem (--clear) daje te same dane."""
+        call_command('generate_load_tenants', seed=7, **self.OPTIONS)
+        first = self._snapshot()
+
+        with self.assertRaises(CommandError):
+            call_command('generate_load_tenants', seed=7, **self.OPTIONS)
+
+        call_command('generate_load_tenants', seed=7, clear=True, **self.OPTIONS)
+        self.assertEqual(self._snapshot(), first)
+        self.assertEqual(Site.objects.filter(owner__email__startswith='loadgen-7-').count(), 2)
+        self.assertFalse(CalendarTombstone.objects.exists())
+
+
+# =============================================================================
+# ODROCZONA KOLUMNA KONFIGURACJI STRONY (template_config)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='')
+class SiteContentDeferralTests(APITestCase):
+    """
+    Testy domyślnego odraczania dużej kolumny JSON strony (SiteManager).
+
+    Site.objects nie czyta template_config; endpointy, które go potrzebują,
+    używają .with_content().
+    """
+
+    def setUp(self):
+        """Tworzy stronę z dużą konfiguracją."""
+        self.user = PlatformUser.objects.create_user(email="user@example.com", password="pass123", first_name="User")
+        self.config = {'pages': [{'id': 'home', 'modules': ['hero'] * 50}]}
+        self.site = Site.objects.create(
+            owner=self.user,
+            name="Heavy Site",
+            is_published=True,
+            template_config=self.config,
+        )
+
+    def _site_columns_read(self, ctx):
+        return [q['sql'] for q in ctx.captured_queries if '"api_site"."template_config"' in q['sql']]
+
+    def test_default_manager_defers_content(self):
+        """Sprawdza czy domyślny manager odracza JSON, a with_content() go wczytuje."""
+        self.assertEqual(Site.objects.get(pk=self.site.pk).get_deferred_fields(), {'template_config'})
+        self.assertEqual(Site.objects.with_content().get(pk=self.site.pk).get_deferred_fields(), set())
+        # Odroczone pole nadal jest dostępne (jedno dodatkowe zapytanie)
+        site = Site.objects.get(pk=self.site.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(site.template_config, self.config)
+
+    def test_save_of_deferred_instance_keeps_content(self):
+        """Sprawdza czy zapis strony wczytanej bez JSON nie nadpisuje konfiguracji."""
+        site = Site.objects.get(pk=self.site.pk)
+        site.color_index = 5
+        site.save()
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.color_index, 5)
+        self.assertEqual(self.site.template_config, self.config)
+
+    @patch('api.tasks.send_booking_confirmation_emails.delay')
+    def test_public_booking_does_not_read_content(self, mock_delay):
+        """Sprawdza czy ścieżka rezerwacji nie czyta konfiguracji strony."""
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=7)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/api/v1/public-sites/{self.site.id}/bookings/', {
+                'start_time': start.isoformat(),
+                'duration': 60,
+                'guest_name': "Gość",
+                'guest_email': "guest@example.com",
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._site_columns_read(ctx), [])
+
+    def test_config_endpoints_load_content_in_one_query(self):
+        """Sprawdza czy endpointy zwracające konfigurację nie doczytują jej osobno."""
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/sites/{self.site.id}/')
+        self.assertEqual(response.json()['template_config'], self.config)
+        self.assertEqual(len(self._site_columns_read(ctx)), 1)
+
+        response = self.client.post(f'/api/v1/sites/{self.site.id}/checkpoints/', {'message': 'Przed zmianą'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(checkpoints.checkpoint_config(self.site, response.data['checkpoint_id']), self.config)
+
+    def test_benchmark_command(self):
+        """Sprawdza czy benchmark odczytów strony raportuje obie ścieżki i niczego nie zostawia."""
+        out = StringIO()
+        sites_before = Site.objects.count()
+        call_command('benchmark_site_reads', config_copies=1, runs=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('booking  deferred  HTTP 201', output)
+        self.assertIn('upload   deferred  HTTP 201', output)
+        self.assertEqual(Site.objects.count(), sites_before)
+
+
+# =============================================================================
+# TESTY SNAPSHOTÓW PUBLICZNYCH STRON (ETag / 304)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='')
+class SiteSnapshotTests(APITestCase):
+    """
+    Testy wstępnie zakodowanych odpowiedzi PublicSiteView (api.site_snapshots).
+    
+    Zapis strony koduje payload raz po commicie; trafienie w cache nie dotyka
+    bazy, a zgodny If-None-Match kończy się odpowiedzią 304.
+    """
+
+    def setUp(self):
+        """Tworzy opublikowaną stronę i zapisuje jej snapshot."""
+        cache.clear()
+        domain_cache.clear_local_cache()
+        self.user = PlatformUser.objects.create_user(email="user@example.com", password="pass123", first_name="User")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site = Site.objects.create(
+                owner=self.user,
+                name="Snapshot Site",
+                is_published=True,
+                template_config={'pages': [{'id': 'home', 'title': 'Zażółć'}]}
+            )
+        self.site.refresh_from_db()
+        self.url = f'/api/v1/public-sites/{self.site.identifier}/'
+
+    def test_hit_serves_bytes_without_queries(self):
+        """Sprawdza czy trafienie nie wykonuje zapytań i zwraca ten sam JSON co serializer."""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # template_config is spliced in as stored text, so compare the decoded documents
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(PublicSiteSerializer(self.site).data)))
+        self.assertTrue(response['ETag'].startswith('"'))
+
+        with self.assertNumQueries(0):
+            by_id = self.client.get(f'/api/v1/public-sites/by-id/{self.site.id}/')
+        self.assertEqual(by_id['ETag'], response['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        """Sprawdza czy zgodny ETag daje 304 bez treści, a nieaktualny pełną odpowiedź."""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_gzip_variant(self):
+        """Sprawdza czy klient akceptujący gzip dostaje wstępnie skompresowane bajty."""
+        import gzip
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.client.get(self.url).content)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        plain = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertNotEqual(plain['ETag'], response['ETag'])
+
+    def test_save_replaces_snapshot(self):
+        """Sprawdza czy zapis strony zmienia ETag, a zmiana nazwy wyłącza stary identyfikator."""
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site.name = "Renamed Site"
+            self.site.save()
+        self.site.refresh_from_db()
+
+        response = self.client.get(f'/api/v1/public-sites/{self.site.identifier}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], "Renamed Site")
+
+        # Stary identyfikator nie jest już w cache; widok szuka go w bazie i zwraca 404
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_miss_rebuilds_snapshot(self):
+        """Sprawdza czy po utracie cache pierwsze żądanie odbudowuje snapshot."""
+        cache.clear()
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+
+# =============================================================================
+# TESTY CACHE ROZWIĄZYWANIA DOMEN
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='')
+class DomainCacheTests(APITestCase):
+    """
+    Testy dwupoziomowego cache domen (api.domain_cache).
+    
+    resolve_domain i fallback domenowy PublicSiteView trafiają do bazy tylko
+    przy pierwszym zapytaniu; nieznane hosty są cache'owane negatywnie, a zapis
+    DomainOrder/Site unieważnia wpisy po commicie.
+    """
+
+    def setUp(self):
+        """Tworzy stronę i aktywną domenę w trybie proxy."""
+        cache.clear()
+        domain_cache.clear_local_cache()
+        self.user = PlatformUser.objects.create_user(email="user@example.com", password="pass123", first_name="User")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site = Site.objects.create(owner=self.user, name="Domain Site", is_published=True)
+            self.order = DomainOrder.objects.create(
+                user=self.user,
+                site=self.site,
+                domain_name="example-studio.pl",
+                status=DomainOrder.OrderStatus.ACTIVE,
+                proxy_mode=True,
+            )
+        self.site.refresh_from_db()
+
+    def _resolve(self, host):
+        return self.client.get(f'/api/v1/domains/resolve/{host}/')
+
+    def test_resolution_is_cached(self):
+        """Sprawdza czy drugie rozwiązanie domeny nie wykonuje zapytań."""
+        response = self._resolve("example-studio.pl")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['target'], f"{self.site.identifier}.youreasysite.pl")
+        self.assertEqual(response.data['site_id'], self.site.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._resolve("example-studio.pl").data['site_id'], self.site.id)
+
+        # Drugi poziom (wspólny cache) obsługuje worker z pustym LRU
+        domain_cache.clear_local_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._resolve("example-studio.pl").status_code, status.HTTP_200_OK)
+
+    def test_unknown_host_is_cached_negatively(self):
+        """Sprawdza czy nieznany host trafia do bazy raz, a utworzenie domeny go odblokowuje."""
+        self.assertEqual(self._resolve("scanner.example").status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._resolve("scanner.example").status_code, status.HTTP_404_NOT_FOUND)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DomainOrder.objects.create(
+                user=self.user,
+                domain_name="scanner.example",
+                status=DomainOrder.OrderStatus.ACTIVE,
+                target="youtube.com",
+            )
+        self.assertEqual(self._resolve("scanner.example").data['target'], "youtube.com")
+
+    def test_target_change_invalidates(self):
+        """Sprawdza czy zmiana target/statusu domeny jest widoczna od razu."""
+        self._resolve("example-studio.pl")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.target = "https://other.example"
+            self.order.save()
+        self.assertEqual(self._resolve("example-studio.pl").data['target'], "https://other.example")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.status = DomainOrder.OrderStatus.EXPIRED
+            self.order.save()
+        self.assertEqual(self._resolve("example-studio.pl").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_public_site_domain_fallback(self):
+        """Sprawdza czy PublicSiteView rozwiązuje domenę własną do strony bez zapytań o DomainOrder."""
+        response = self.client.get('/api/v1/public-sites/example-studio.pl/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], self.site.id)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/public-sites/example-studio.pl/')
+        self.assertFalse([q for q in ctx.captured_queries if 'api_domainorder' in q['sql']])
+
+        self.assertEqual(self.client.get('/api/v1/public-sites/unknown.example/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/v1/public-sites/unknown.example/').status_code, 404)
+
+    def test_pubsub_message_drops_local_entries(self):
+        """Sprawdza czy komunikat unieważnienia od innego workera czyści lokalny LRU."""
+        self._resolve("example-studio.pl")
+        cache.clear()  # inny worker już usunął wpis ze wspólnego cache
+        domain_cache._handle_invalidation({'data': json.dumps(['domain:resolve:host:example-studio.pl'])})
+        with self.assertNumQueries(1):
+            self._resolve("example-studio.pl")
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DOMAIN_CACHE_PUBSUB_URL='',
+    CLOUDFLARE_WORKER_PURGE_URL='https://proxy.example.workers.dev/__domain-cache/purge',
+    CLOUDFLARE_WORKER_PURGE_SECRET='edge-secret',
+)
+class WorkerDomainPurgeTests(TestCase):
+    """
+    Testy unieważniania cache konfiguracji domen w workerze Cloudflare.
+
+    Zmiana target/proxy_mode/statusu domeny (albo identyfikatora strony, gdy
+    domena nie ma własnego targetu) zleca zadanie purge_worker_domain_config,
+    które wysyła podpisane HMAC żądanie do endpointu purge workera.
+    """
+
+    def setUp(self):
+        """Tworzy stronę i aktywną domenę bez własnego targetu."""
+        self.user = PlatformUser.objects.create_user(email="user@example.com", password="pass123", first_name="User")
+        self.site = Site.objects.create(owner=self.user, name="Edge Site", is_published=True)
+        self.order = DomainOrder.objects.create(
+            user=self.user,
+            site=self.site,
+            domain_name="edge-studio.pl",
+            status=DomainOrder.OrderStatus.ACTIVE,
+        )
+
+    def _save(self, **changes):
+        for field, value in changes.items():
+            setattr(self.order, field, value)
+        with patch('api.tasks.purge_worker_domain_config.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.save()
+        return delay
+
+    def test_config_change_schedules_purge(self):
+        """Sprawdza czy zmiana target, proxy_mode i statusu zleca purge hosta."""
+        self._save(target="youtube.com").assert_called_once_with(["edge-studio.pl"])
+        self._save(proxy_mode=True).assert_called_once_with(["edge-studio.pl"])
+        self._save(status=DomainOrder.OrderStatus.EXPIRED).assert_called_once_with(["edge-studio.pl"])
+
+    def test_unrelated_change_does_not_purge(self):
+        """Sprawdza czy zapis pól spoza konfiguracji (np. error_message) nie czyści cache workera."""
+        self._save(error_message="DNS timeout").assert_not_called()
+
+    def test_renamed_domain_purges_both_hosts(self):
+        """Sprawdza czy zmiana nazwy domeny czyści starą i nową nazwę."""
+        self._save(domain_name="edge-studio.com").assert_called_once_with(["edge-studio.com", "edge-studio.pl"])
+
+    def test_site_rename_purges_domains_without_target(self):
+        """Sprawdza czy zmiana identyfikatora strony czyści domeny kierujące na jej subdomenę."""
+        DomainOrder.objects.create(
+            user=self.user, site=self.site, domain_name="explicit.pl",
+            status=DomainOrder.OrderStatus.ACTIVE, target="youtube.com",
+        )
+        with patch('api.tasks.purge_worker_domain_config.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.site.name = "Renamed Edge Site"
+                self.site.save()
+        delay.assert_called_once_with(["edge-studio.pl"])
+
+    def test_delete_schedules_purge(self):
+        """Sprawdza czy usunięcie zamówienia domeny czyści cache workera."""
+        with patch('api.tasks.purge_worker_domain_config.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.delete()
+        delay.assert_called_once_with(["edge-studio.pl"])
+
+    def test_task_sends_signed_request(self):
+        """Sprawdza czy zadanie podpisuje ciało żądania sekretem współdzielonym z workerem."""
+        from .tasks import purge_worker_domain_config
+
+        with patch('requests.post') as post:
+            post.return_value.raise_for_status.return_value = None
+            result = purge_worker_domain_config("Edge-Studio.pl")
+
+        self.assertEqual(result['status'], 'success')
+        args, kwargs = post.call_args
+        self.assertEqual(args[0], 'https://proxy.example.workers.dev/__domain-cache/purge')
+        payload = json.loads(kwargs['data'])
+        self.assertEqual(payload['hostnames'], ["edge-studio.pl"])
+        self.assertLess(abs(payload['timestamp'] - time_module.time()), 5)
+        expected = hmac.new(b'edge-secret', kwargs['data'], hashlib.sha256).hexdigest()
+        self.assertEqual(kwargs['headers']['X-Purge-Signature'], expected)
+
+    @override_settings(CLOUDFLARE_WORKER_PURGE_SECRET='')
+    def test_task_skips_when_not_configured(self):
+        """Sprawdza czy bez URL/sekretu zadanie nic nie wysyła."""
+        from .tasks import purge_worker_domain_config
+
+        with patch('requests.post') as post:
+            result = purge_worker_domain_config(["edge-studio.pl"])
+        self.assertEqual(result['status'], 'skipped')
+        post.assert_not_called()
+
+
+# =============================================================================
+# CHECKPOINTY AI (DELTY JSON PATCH)
+# =============================================================================
+
+class JsonPatchTests(TestCase):
+    """Testy modułu api.json_patch (RFC 6902)."""
+
+    def test_diff_roundtrip(self):
+        """Sprawdza czy make_patch + apply_patch odtwarzają dokument docelowy."""
+        src = {'a': 1, 'b': [1, 2, 3], 'c': {'x': True, 'y/z': 'old'}, 'gone': None}
+        dst = {'a': 1.5, 'b': [1, 5], 'c': {'x': 1, 'y/z': 'new', 'w~': []}, 'added': {'k': 'v'}}
+        patch = make_patch(src, dst)
+        self.assertEqual(apply_patch(src, patch), dst)
+        self.assertEqual(src['b'], [1, 2, 3])  # wejście nie jest modyfikowane
+        self.assertEqual(make_patch(dst, dst), [])
+
+    def test_all_operations(self):
+        """Sprawdza operacje add, remove, replace, move, copy i test."""
+        doc = {'items': ['a', 'b'], 'meta': {'n': 1}}
+        result = apply_patch(doc, [
+            {'op': 'test', 'path': '/meta/n', 'value': 1},
+            {'op': 'add', 'path': '/items/1', 'value': 'x'},
+            {'op': 'add', 'path': '/items/-', 'value': 'z'},
+            {'op': 'remove', 'path': '/items/0'},
+            {'op': 'replace', 'path': '/meta/n', 'value': 2},
+            {'op': 'copy', 'from': '/meta', 'path': '/meta_copy'},
+            {'op': 'move', 'from': '/meta_copy/n', 'path': '/count'},
+        ])
+        self.assertEqual(result, {'items': ['x', 'b', 'z'], 'meta': {'n': 2}, 'meta_copy': {}, 'count': 2})
+
+    def test_invalid_patches(self):
+        """Sprawdza czy błędne ścieżki i nieudany test zgłaszają JsonPatchError."""
+        doc = {'items': [1]}
+        for ops in (
+            [{'op': 'remove', 'path': '/missing'}],
+            [{'op': 'add', 'path': '/items/5', 'value': 1}],
+            [{'op': 'replace', 'path': 'items', 'value': 1}],
+            [{'op': 'test', 'path': '/items/0', 'value': True}],
+            [{'op': 'move', 'from': '/items', 'path': '/items/0'}],
+            [{'op': 'unknown', 'path': '/items'}],
+            {'op': 'add'},
+        ):
+            with self.assertRaises(JsonPatchError, msg=ops):
+                apply_patch(doc, ops)
+
+
+@override_settings(CONFIG_CHECKPOINT_LIMIT=5, CONFIG_CHECKPOINT_BASE_INTERVAL=3)
+class ConfigCheckpointTests(APITestCase):
+    """
+    Testy checkpointów AI przechowywanych jako delty (api.checkpoints).
+
+    Checkpoint to łatka JSON względem pełnej bazy; przywrócenie nakłada jedną
+    łatkę, a lista nie wczytuje konfiguracji.
+    """
+
+    def setUp(self):
+        """Tworzy stronę z rozbudowaną konfiguracją."""
+        self.user = PlatformUser.objects.create_user(email="user@example.com", password="pass123", first_name="User")
+        self.config = {
+            'pages': [
+                {'id': f'page-{index}', 'title': f'Strona {index}', 'modules': [{'type': 'text', 'body': 'x' * 500}]}
+                for index in range(20)
+            ],
+        }
+        self.site = Site.objects.create(owner=self.user, name="Checkpoint Site", template_config=self.config)
+        self.client.force_authenticate(user=self.user)
+
+    def _edited(self, index):
+        config = copy.deepcopy(self.config)
+        config['pages'][0]['title'] = f'Wersja {index}'
+        return config
+
+    def test_checkpoints_are_stored_as_deltas(self):
+        """Sprawdza czy kolejne checkpointy zapisują tylko różnicę względem bazy."""
+        first = checkpoints.create_checkpoint(self.site, self.config, 'pierwszy')
+        second = checkpoints.create_checkpoint(self.site, self._edited(1), 'drugi')
+
+        self.assertEqual(first.delta, [])
+        self.assertEqual(second.base_id, first.base_id)
+        self.assertEqual(second.delta, [{'op': 'replace', 'path': '/pages/0/title', 'value': 'Wersja 1'}])
+        self.assertEqual(ConfigCheckpointBase.objects.count(), 1)
+        self.assertEqual(checkpoints.checkpoint_config(self.site, first.checkpoint_id), self.config)
+        self.assertEqual(checkpoints.checkpoint_config(self.site, second.checkpoint_id), self._edited(1))
+
+    def test_new_base_every_interval_and_on_large_delta(self):
+        """Sprawdza czy co CONFIG_CHECKPOINT_BASE_INTERVAL checkpointów (lub przy dużej delcie) powstaje nowa baza."""
+        created = [checkpoints.create_checkpoint(self.site, self._edited(index)) for index in range(4)]
+        self.assertEqual(len({checkpoint.base_id for checkpoint in created[:3]}), 1)
+        self.assertNotEqual(created[3].base_id, created[0].base_id)
+
+        rewritten = {'pages': [{'id': 'new', 'title': 'Nowa strona'}]}
+        checkpoint = checkpoints.create_checkpoint(self.site, rewritten)
+        self.assertEqual(checkpoint.delta, [])
+        self.assertEqual(checkpoint.base.config, rewritten)
+
+    def test_identical_content_is_deduplicated(self):
+        """Sprawdza czy checkpoint o tej samej treści reużywa bazy i delty."""
+        original = checkpoints.create_checkpoint(self.site, self._edited(1))
+        checkpoints.create_checkpoint(self.site, self._edited(2))
+        duplicate = checkpoints.create_checkpoint(self.site, self._edited(1))
+        self.assertEqual((duplicate.base_id, duplicate.delta), (original.base_id, original.delta))
+        self.assertNotEqual(duplicate.checkpoint_id, original.checkpoint_id)
+
+    def test_pruning_keeps_limit_and_drops_unused_bases(self):
+        """Sprawdza czy zostaje CONFIG_CHECKPOINT_LIMIT najnowszych checkpointów i używane bazy."""
+        created = [checkpoints.create_checkpoint(self.site, self._edited(index)) for index in range(12)]
+        remaining = ConfigCheckpoint.objects.filter(site=self.site)
+        self.assertEqual(
+            list(remaining.values_list('checkpoint_id', flat=True)),
+            [checkpoint.checkpoint_id for checkpoint in reversed(created[-5:])],
+        )
+        self.assertEqual(
+            set(ConfigCheckpointBase.objects.values_list('id', flat=True)),
+            set(remaining.values_list('base_id', flat=True)),
+        )
+        self.assertEqual(checkpoints.checkpoint_config(self.site, created[-5].checkpoint_id), self._edited(7))
+
+    def test_site_checkpoint_api(self):
+        """Sprawdza tworzenie, listowanie (bez konfiguracji) i przywracanie przez API."""
+        response = self.client.post(f'/api/v1/sites/{self.site.id}/checkpoints/', {'message': 'Przed AI'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        checkpoint_id = response.data['checkpoint_id']
+
+        self.site.template_config = self._edited(1)
+        self.site.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/sites/{self.site.id}/checkpoints/list/')
+        self.assertEqual([c['id'] for c in response.data['checkpoints']], [checkpoint_id])
+        self.assertEqual(response.data['checkpoints'][0]['message'], 'Przed AI')
+        for query in ctx.captured_queries:
+            self.assertNotIn('"config"', query['sql'])
+            self.assertNotIn('"delta"', query['sql'])
+            self.assertNotIn('"template_config"', query['sql'])
+
+        response = self.client.post(f'/api/v1/sites/{self.site.id}/checkpoints/restore/{checkpoint_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['site']['template_config'], self.config)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.template_config, self.config)
+
+        response = self.client.post(f'/api/v1/sites/{self.site.id}/checkpoints/restore/missing/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_restore_bumps_current_revision(self):
+        """Sprawdza czy przywrócenie podbija config_revision zapisane w bazie, a nie wczytane wcześniej."""
+        checkpoint_id = checkpoints.create_checkpoint(self.site, self.config).checkpoint_id
+        self.site.template_config = self._edited(1)
+        self.site.save()
+        revision = Site.objects.get(pk=self.site.pk).config_revision
+        checkpoint_config = checkpoints.checkpoint_config
+
+        def concurrent_edit(site, checkpoint):
+            # Równoległa edycja zapisana po wczytaniu strony przez widok
+            Site.objects.filter(pk=site.pk).update(config_revision=F('config_revision') + 1)
+            return checkpoint_config(site, checkpoint)
+
+        with patch('api.checkpoints.checkpoint_config', side_effect=concurrent_edit):
+            response = self.client.post(f'/api/v1/sites/{self.site.id}/checkpoints/restore/{checkpoint_id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['site']['config_revision'], revision + 2)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.config_revision, revision + 2)
+        self.assertEqual(self.site.template_config, self.config)
+
+    def test_big_event_checkpoint_api(self):
+        """Sprawdza checkpointy BigEvent: zapis stanu, lista i przywrócenie."""
+        event = BigEvent.objects.create(
+            site=self.site,
+            creator=self.user,
+            title='Warsztaty',
+            start_date=date.today() + timedelta(days=30),
+            max_participants=10,
+            price=Decimal('99.00'),
+        )
+        response = self.client.post(f'/api/v1/big-events/{event.id}/checkpoints/', {'message': 'Przed AI'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        checkpoint_id = response.data['checkpoint_id']
+
+        self.client.patch(f'/api/v1/big-events/{event.id}/', {'title': 'Zmienione', 'price': '120.00'}, format='json')
+        event.refresh_from_db()
+        self.assertEqual(event.title, 'Zmienione')
+
+        listed = self.client.get(f'/api/v1/big-events/{event.id}/checkpoints/list/').data['checkpoints']
+        self.assertEqual(len(listed), 2)  # perform_update zapisuje checkpoint przed zmianą
+        self.assertFalse(ConfigCheckpoint.objects.filter(site=self.site, big_event__isnull=True).exists())
+
+        response = self.client.post(f'/api/v1/big-events/{event.id}/checkpoints/restore/{checkpoint_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event.refresh_from_db()
+        self.assertEqual((event.title, event.price), ('Warsztaty', Decimal('99.00')))
+
+    def test_owners_with_checkpoints_can_be_deleted(self):
+        """Sprawdza czy usunięcie strony, wydarzenia i użytkownika usuwa też ich checkpointy i bazy."""
+        event = BigEvent.objects.create(
+            site=self.site,
+            creator=self.user,
+            title='Warsztaty',
+            start_date=date.today() + timedelta(days=30),
+            max_participants=10,
+            price=Decimal('99.00'),
+        )
+        checkpoints.create_checkpoint(self.site, checkpoints.big_event_state(event), big_event=event)
+        event.delete()
+        self.assertFalse(ConfigCheckpointBase.objects.filter(big_event__isnull=False).exists())
+
+        site = Site.objects.create(owner=self.user, name="Druga strona", template_config=self.config)
+        checkpoints.create_checkpoint(site, self.config)
+        checkpoints.create_checkpoint(site, self._edited(1))
+        response = self.client.delete(f'/api/v1/sites/{site.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ConfigCheckpoint.objects.filter(site_id=site.id).exists())
+        self.assertFalse(ConfigCheckpointBase.objects.filter(site_id=site.id).exists())
+
+        checkpoints.create_checkpoint(self.site, self.config)
+        self.user.delete()
+        self.assertFalse(Site.objects.filter(pk=self.site.pk).exists())
+        self.assertFalse(ConfigCheckpoint.objects.exists())
+        self.assertFalse(ConfigCheckpointBase.objects.exists())
+
+
+# =============================================================================
+# HISTORIA WERSJI STRON (DELTY)
+# =============================================================================
+
+@override_settings(SITE_VERSION_KEYFRAME_INTERVAL=3)
+class SiteVersionHistoryTests(APITestCase):
+    """
+    Testy historii wersji przechowywanej jako klatki kluczowe + delty
+    (api.site_versions) oraz metadanych latest_version na liście stron.
+    """
+
+    def setUp(self):
+        """Tworzy właściciela i stronę z rozbudowaną konfiguracją."""
+        self.user = PlatformUser.objects.create_user(email="owner@example.com", password="pass123", first_name="Owner")
+        self.config = {
+            'pages': [{'id': f'page-{index}', 'title': f'Strona {index}', 'body': 'x' * 300} for index in range(10)],
+        }
+        self.site = Site.objects.create(owner=self.user, name="Versioned Site", template_config=self.config)
+        self.client.force_authenticate(user=self.user)
+
+    def _config(self, index):
+        config = copy.deepcopy(self.config)
+        config['pages'][index % 10]['title'] = f'Wersja {index}'
+        return config
+
+    def _save_version(self, index):
+        response = self.client.post(
+            f'/api/v1/sites/{self.site.id}/versions/',
+            {'template_config': self._config(index), 'notes': f'v{index}'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['template_config'], self._config(index))
+        return response.data
+
+    def test_versions_are_delta_encoded_with_keyframes(self):
+        """Sprawdza czy co SITE_VERSION_KEYFRAME_INTERVAL wersji powstaje pełna kopia, a pozostałe są deltami."""
+        for index in range(1, 8):
+            self._save_version(index)
+
+        stored = SiteVersion.objects.filter(site=self.site).order_by('version_number')
+        self.assertEqual([version.is_keyframe for version in stored], [True, False, False, True, False, False, True])
+        delta_version = stored[1]
+        self.assertIsNone(delta_version.template_config)
+        self.assertLess(len(json.dumps(delta_version.delta)), len(json.dumps(self.config)) // 10)
+
+        response = self.client.get(f'/api/v1/sites/{self.site.id}/versions/')
+        self.assertEqual([version['version_number'] for version in response.data], list(range(7, 0, -1)))
+        for version in response.data:
+            self.assertEqual(version['template_config'], self._config(version['version_number']))
+
+    def test_large_change_forces_keyframe(self):
+        """Sprawdza czy delta większa niż połowa konfiguracji jest zapisywana jako pełna kopia."""
+        self._save_version(1)
+        response = self.client.post(
+            f'/api/v1/sites/{self.site.id}/versions/',
+            {'template_config': {'pages': [{'id': 'new'}]}},
+            format='json',
+        )
+        self.assertTrue(SiteVersion.objects.get(pk=response.data['id']).is_keyframe)
+
+    def test_retention_keeps_chain_reconstructible(self):
+        """Sprawdza czy po przycięciu do 10 wersji najstarsza pozostała wersja staje się klatką kluczową."""
+        for index in range(1, 15):
+            self._save_version(index)
+
+        stored = list(SiteVersion.objects.filter(site=self.site).order_by('version_number'))
+        self.assertEqual([version.version_number for version in stored], list(range(5, 15)))
+        self.assertTrue(stored[0].is_keyframe)
+        for version in stored:
+            self.assertEqual(site_versions.version_config(version), self._config(version.version_number))
+
+    def test_site_list_query_count_is_constant(self):
+        """Sprawdza czy lista stron z latest_version wykonuje stałą liczbę zapytań."""
+        other_owner = PlatformUser.objects.create_user(email="other@example.com", password="pass123", first_name="Other")
+
+        def add_sites(count):
+            for _ in range(count):
+                owned = Site.objects.create(owner=self.user, name="Owned", template_config={})
+                site_versions.create_version(owned, {'v': 1}, notes='first')
+                site_versions.create_version(owned, {'v': 2}, notes='second')
+                shared = Site.objects.create(owner=other_owner, name="Shared", template_config={})
+                site_versions.create_version(shared, {'v': 1}, notes='shared')
+                TeamMember.objects.create(
+                    site=shared, name="Owner", email=self.user.email,
+                    linked_user=self.user, invitation_status='linked',
+                )
+
+        add_sites(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/v1/sites/')
+        add_sites(10)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/v1/sites/')
+
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+        owned = [site for site in response.data['owned_sites'] if site['name'] == 'Owned']
+        self.assertEqual(len(owned), 12)
+        self.assertTrue(all(site['latest_version']['notes'] == 'second' for site in owned))
+        self.assertTrue(all(site['latest_version']['version_number'] == 2 for site in owned))
+        self.assertEqual(len(response.data['team_member_sites']), 12)
+        for site in response.data['team_member_sites']:
+            self.assertEqual(site['latest_version']['notes'], 'shared')
+            self.assertIsNotNone(site['team_member_info'])
+        for query in large.captured_queries:
+            self.assertNotIn('"api_siteversion"."template_config"', query['sql'])
+
+
+# =============================================================================
+# PRZYROSTOWA EDYCJA KONFIGURACJI (JSON PATCH + REWIZJA)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='')
+class SiteConfigPatchTests(APITestCase):
+    """
+    Testy akcji PATCH /sites/<id>/config/ (api.site_config): łatki RFC 6902
+    i RFC 7396 z optymistyczną kontrolą współbieżności przez config_revision.
+    """
+
+    def setUp(self):
+        """Tworzy opublikowaną stronę z kilkoma sekcjami."""
+        cache.clear()
+        self.user = PlatformUser.objects.create_user(email="owner@example.com", password="pass123", first_name="Owner")
+        self.config = {'pages': [{'id': 'home', 'title': 'Start', 'sections': [{'type': 'hero', 'text': 'Witaj'}]}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site = Site.objects.create(
+                owner=self.user, name="Patch Site", is_published=True, template_config=self.config,
+            )
+        self.site.refresh_from_db()
+        self.url = f'/api/v1/sites/{self.site.id}/config/'
+        self.client.force_authenticate(user=self.user)
+
+    def _patch(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(self.url, body, format='json')
+
+    def test_json_patch_applies_and_bumps_revision(self):
+        """Sprawdza czy łatka zmienia tylko wskazane ścieżki, podbija rewizję i odświeża snapshot."""
+        response = self._patch({'revision': 0, 'patch': [
+            {'op': 'replace', 'path': '/pages/0/title', 'value': 'Strona główna'},
+            {'op': 'add', 'path': '/pages/0/sections/-', 'value': {'type': 'contact'}},
+        ]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['config_revision'], response.data['applied']), (1, 2))
+        self.assertNotIn('template_config', response.data)
+
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.config_revision, 1)
+        self.assertEqual(self.site.template_config['pages'][0]['title'], 'Strona główna')
+        self.assertEqual(self.site.template_config['pages'][0]['sections'][1], {'type': 'contact'})
+
+        public = self.client.get(f'/api/v1/public-sites/{self.site.identifier}/')
+        self.assertEqual(public.json()['template_config']['pages'][0]['title'], 'Strona główna')
+
+    def test_stale_revision_is_rejected(self):
+        """Sprawdza czy łatka do nieaktualnej rewizji zwraca 409 i nie nadpisuje zmian."""
+        self._patch({'revision': 0, 'patch': [{'op': 'replace', 'path': '/pages/0/title', 'value': 'A'}]})
+        response = self._patch({'revision': 0, 'patch': [{'op': 'replace', 'path': '/pages/0/title', 'value': 'B'}]})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['config_revision'], 1)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.template_config['pages'][0]['title'], 'A')
+
+    def test_full_update_moves_revision(self):
+        """Sprawdza czy zapis całej konfiguracji przez PATCH /sites/<id>/ też podbija rewizję."""
+        response = self.client.patch(
+            f'/api/v1/sites/{self.site.id}/', {'template_config': {'pages': []}}, format='json',
+        )
+        self.assertEqual(response.data['config_revision'], 1)
+        response = self.client.patch(f'/api/v1/sites/{self.site.id}/', {'name': 'Nowa nazwa'}, format='json')
+        self.assertEqual(response.data['config_revision'], 1)
+        response = self._patch({'revision': 0, 'patch': [{'op': 'remove', 'path': '/pages'}]})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_full_update_racing_patch_moves_revision_past_it(self):
+        """
+        Sprawdza czy zapis całej konfiguracji, który ściga się z łatką, podbija
+        rewizję zapisaną w bazie, więc klient łatki dostaje potem 409.
+        """
+        perform_update = SiteViewSet.perform_update
+
+        def concurrent_patch(viewset, serializer):
+            # Łatka zapisana po wczytaniu strony przez PUT, a przed jego zapisem
+            site_config.patch_site_config(
+                self.site.id, 0, patch=[{'op': 'replace', 'path': '/pages/0/title', 'value': 'Łatka'}],
+            )
+            perform_update(viewset, serializer)
+
+        with patch.object(SiteViewSet, 'perform_update', concurrent_patch):
+            response = self.client.put(
+                f'/api/v1/sites/{self.site.id}/', {'name': 'Patch Site', 'template_config': {'pages': []}}, format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['config_revision'], 2)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.config_revision, 2)
+
+        response = self._patch({'revision': 1, 'patch': [{'op': 'replace', 'path': '/pages', 'value': []}]})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_merge_patch(self):
+        """Sprawdza łatkę RFC 7396 (null usuwa klucz)."""
+        response = self._patch({'revision': 0, 'merge_patch': {'theme': {'color': 'red'}, 'pages': None}})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.template_config, {'theme': {'color': 'red'}})
+
+    def test_invalid_requests(self):
+        """Sprawdza czy błędna łatka lub brak rewizji zwraca 400 bez zmian w konfiguracji."""
+        for body in (
+            {'revision': 0, 'patch': [{'op': 'remove', 'path': '/missing'}]},
+            {'revision': 0, 'patch': [{'op': 'replace', 'path': '', 'value': []}]},
+            {'patch': [{'op': 'remove', 'path': '/pages'}]},
+            {'revision': 0},
+            {'revision': 0, 'patch': [], 'merge_patch': {}},
+        ):
+            self.assertEqual(self._patch(body).status_code, status.HTTP_400_BAD_REQUEST, body)
+        self.site.refresh_from_db()
+        self.assertEqual((self.site.template_config, self.site.config_revision), (self.config, 0))
+
+    def test_noop_patch_keeps_revision(self):
+        """Sprawdza czy łatka bez zmian (np. same testy) nie zapisuje strony."""
+        response = self._patch({'revision': 0, 'patch': [{'op': 'test', 'path': '/pages/0/id', 'value': 'home'}]})
+        self.assertEqual((response.data['config_revision'], response.data['applied']), (0, 0))
+
+    def test_version_stores_client_patch_as_delta(self):
+        """Sprawdza czy wersja zapisana razem z łatką używa jej jako delty."""
+        config = dict(self.config, footer='x' * 500)
+        Site.objects.filter(pk=self.site.pk).update(template_config=config)
+        site_versions.create_version(self.site, config, notes='bazowa')
+        operations = [{'op': 'replace', 'path': '/pages/0/sections/0/text', 'value': 'Dzień dobry'}]
+        response = self._patch({'revision': 0, 'patch': operations, 'version': {'notes': 'po łatce'}})
+
+        self.assertEqual(response.data['version']['version_number'], 2)
+        self.assertEqual(response.data['version']['template_config']['pages'][0]['sections'][0]['text'], 'Dzień dobry')
+        self.assertEqual(SiteVersion.objects.get(site=self.site, version_number=2).delta, operations)
+
+    def test_viewer_cannot_patch(self):
+        """Sprawdza czy członek zespołu bez roli managera dostaje 403."""
+        viewer = PlatformUser.objects.create_user(email="viewer@example.com", password="pass123", first_name="Viewer")
+        TeamMember.objects.create(
+            site=self.site, name="Viewer", email=viewer.email, linked_user=viewer,
+            invitation_status='linked', permission_role='viewer',
+        )
+        self.client.force_authenticate(user=viewer)
+        response = self._patch({'revision': 0, 'patch': [{'op': 'remove', 'path': '/pages'}]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# =============================================================================
+# RENDEROWANIE JSON (FastJSONRenderer / RawJSON)
+# =============================================================================
+
+class FastJSONRendererTests(APITestCase):
+    """Testy api.renderers: zgodność z JSONRenderer i wklejanie surowego JSON-a z bazy."""
+
+    def setUp(self):
+        """Tworzy stronę z konfiguracją zawierającą znaki spoza ASCII."""
+        self.user = PlatformUser.objects.create_user(email="owner@example.com", password="pass123", first_name="Owner")
+        self.config = {'pages': [{'id': 'home', 'title': 'Zażółć gęślą jaźń', 'items': [1, 2.5, True, None]}]}
+        self.site = Site.objects.create(
+            owner=self.user, name="Render Site", is_published=True, template_config=self.config,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_matches_drf_renderer(self):
+        """Sprawdza czy wynik jest bajtowo zgodny z JSONRenderer (daty, Decimal, UUID, U+2028)."""
+        data = {
+            'when': timezone.now(),
+            'day': date(2026, 1, 2),
+            'price': Decimal('12.50'),
+            'id': uuid.uuid4(),
+            'text': 'linia\u2028druga ż',
+            7: ['a', {'b': None}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_raw_fragments_are_spliced_verbatim(self):
+        """Sprawdza czy RawJSON trafia do odpowiedzi bez dekodowania."""
+        body = renderers.dumps({'a': RawJSON('{"x": [1, 2]}'), 'b': [RawJSON(b'"tekst"'), 'raw-json-']})
+        self.assertEqual(json.loads(body), {'a': {'x': [1, 2]}, 'b': ['tekst', 'raw-json-']})
+        self.assertIn(b'{"x": [1, 2]}', body)
+
+    def test_site_retrieve_passes_config_text_through(self):
+        """Sprawdza czy GET /sites/<id>/ czyta template_config jako tekst i nie tworzy obiektu Pythona."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/sites/{self.site.id}/')
+        self.assertIsInstance(response.data['template_config'], RawJSON)
+        self.assertEqual(response.json()['template_config'], self.config)
+        self.assertTrue(any('CAST("api_site"."template_config"' in q['sql'] for q in ctx.captured_queries))
+
+        sites = self.client.get('/api/v1/sites/').json()['owned_sites']
+        self.assertEqual(sites[0]['template_config'], self.config)
+
+    def test_updates_return_the_decoded_config(self):
+        """Sprawdza czy po zapisie odpowiedź zawiera nową konfigurację, a nie tekst sprzed zapisu."""
+        response = self.client.patch(
+            f'/api/v1/sites/{self.site.id}/', {'template_config': {'pages': []}}, format='json',
+        )
+        self.assertEqual(response.json()['template_config'], {'pages': []})
+
+        response = self.client.patch(f'/api/v1/sites/{self.site.id}/update_color/', {'color_index': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['template_config'], {'pages': []})
+
+    def test_public_serializer_hides_unpublished_raw_config(self):
+        """Sprawdza czy nieopublikowana strona nie ujawnia konfiguracji także w trybie surowym."""
+        Site.objects.filter(pk=self.site.pk).update(is_published=False)
+        site = Site.objects.with_raw_content().get(pk=self.site.pk)
+        self.assertNotIn('template_config', PublicSiteSerializer(site).data)
+
+    def test_benchmark_command(self):
+        """Sprawdza czy benchmark_config_rendering działa i wycofuje dane."""
+        out = StringIO()
+        sites_before = Site.objects.count()
+        call_command('benchmark_config_rendering', size_mb=[0.05], runs=1, stdout=out)
+        output = out.getvalue()
+        for mode in ('legacy', 'fast', 'raw'):
+            self.assertIn(f'{mode:7} HTTP 200', output)
+        self.assertEqual(Site.objects.count(), sites_before)
+
+
+# =============================================================================
+# STATYCZNY EKSPORT OPUBLIKOWANYCH STRON (BUNDLE W OBJECT STORAGE)
+# =============================================================================
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DOMAIN_CACHE_PUBSUB_URL='',
+    SITE_EXPORT_ENABLED=True,
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+class SiteExportTests(TestCase):
+    """
+    Testy eksportu opublikowanej strony do jednego pliku JSON (api.site_export):
+    klucz z hashem treści i przyrostowa przebudowa sekcji.
+    """
+
+    def setUp(self):
+        """Tworzy opublikowaną stronę z członkiem zespołu, wydarzeniem i opinią; zadania Celery działają synchronicznie."""
+        cache.clear()
+        self.exports = patch('api.tasks.export_site_bundle.delay', side_effect=site_export.export_site)
+        self.deletions = patch('api.tasks.delete_site_bundle.apply_async')
+        self.export_delay = self.exports.start()
+        self.delete_async = self.deletions.start()
+        self.addCleanup(self.exports.stop)
+        self.addCleanup(self.deletions.stop)
+
+        self.owner = PlatformUser.objects.create_user(
+            email="owner@example.com", password="pass123", first_name="Anna", last_name="Nowak",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site = Site.objects.create(
+                owner=self.owner, name="Export Site", is_published=True,
+                template_config={'pages': [{'id': 'home', 'title': 'Start'}]},
+            )
+            TeamMember.objects.create(site=self.site, name="Jan Kowalski", email="jan@example.com", role_description="Trener")
+            BigEvent.objects.create(site=self.site, creator=self.owner, title="Warsztaty", status=BigEvent.Status.PUBLISHED,
+                start_date=date(2030, 5, 1), max_participants=10,
+            )
+            Testimonial.objects.create(site=self.site, author_name="Ola", author_email="ola@example.com", rating=5, content="Super")
+        self.site.refresh_from_db()
+
+    def _bundle(self, key):
+        with default_storage.open(key) as handle:
+            return json.loads(handle.read())
+
+    def test_publish_writes_content_hashed_bundle(self):
+        """Sprawdza czy bundle zawiera wszystkie sekcje publicznej strony i jest zapisany pod kluczem z hashem."""
+        key = self.site.static_bundle_key
+        self.assertRegex(key, rf'^site-bundles/{self.site.id}/[0-9a-f]{{32}}\.json$')
+        self.assertTrue(self.site.static_bundle_url)
+
+        bundle = self._bundle(key)
+        self.assertEqual((bundle['format'], bundle['site_id']), (site_export.BUNDLE_FORMAT, self.site.id))
+        self.assertEqual(bundle['site']['template_config'], {'pages': [{'id': 'home', 'title': 'Start'}]})
+        self.assertEqual([member['name'] for member in bundle['team']], ['Anna Nowak', 'Jan Kowalski'])
+        self.assertEqual([event['title'] for event in bundle['events']], ['Warsztaty'])
+        self.assertEqual(bundle['testimonials']['items'][0]['content'], 'Super')
+        self.assertNotIn('author_email', bundle['testimonials']['items'][0])
+
+    def test_change_rebuilds_only_dirty_section(self):
+        """Sprawdza czy zmiana wydarzenia przebudowuje tylko sekcję events, a stary bundle jest usuwany z opóźnieniem."""
+        previous_key = self.site.static_bundle_key
+        self.export_delay.reset_mock()
+        with patch('api.site_export._build_section', wraps=site_export._build_section) as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                BigEvent.objects.create(site=self.site, creator=self.owner, title="Obóz", status=BigEvent.Status.PUBLISHED,
+                    start_date=date(2030, 7, 1), max_participants=20,
+                )
+        self.assertEqual([call.args[1] for call in build.call_args_list], ['events'])
+
+        self.site.refresh_from_db()
+        self.assertNotEqual(self.site.static_bundle_key, previous_key)
+        self.assertEqual(len(self._bundle(self.site.static_bundle_key)['events']), 2)
+        self.delete_async.assert_called_once()
+        self.assertEqual(self.delete_async.call_args.kwargs['args'], [previous_key])
+
+    def test_section_built_before_concurrent_change_is_not_reused(self):
+        """
+        Sprawdza czy sekcja zbudowana z danych sprzed równoległej zmiany
+        (unieważnionej w trakcie eksportu) nie jest użyta przez kolejny eksport.
+        """
+        build_section = site_export._build_section
+        site_export.drop_sections(self.site.id, ['events'])
+
+        def build_during_change(site, section):
+            body = build_section(site, section)
+            if section == 'events':
+                site_export.drop_sections(site.pk, ['events'])
+            return body
+
+        with patch('api.site_export._build_section', side_effect=build_during_change):
+            site_export.export_site(self.site.id)
+        with patch('api.site_export._build_section', wraps=build_section) as build:
+            site_export.export_site(self.site.id)
+        self.assertEqual([call.args[1] for call in build.call_args_list], ['events'])
+
+    def test_unchanged_content_is_not_uploaded_again(self):
+        """Sprawdza czy zapis bez zmian treści publicznej nie tworzy nowego pliku."""
+        result = site_export.export_site(self.site.id)
+        self.assertFalse(result.changed)
+        self.assertEqual(result.key, self.site.static_bundle_key)
+        self.delete_async.assert_not_called()
+
+    def test_owner_profile_change_refreshes_team_section(self):
+        """Sprawdza czy zmiana nazwiska właściciela trafia do sekcji team, a samo logowanie nie uruchamia eksportu."""
+        self.export_delay.reset_mock()
+        self.owner.last_login = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.save(update_fields=['last_login'])
+        self.export_delay.assert_not_called()
+
+        self.owner.last_name = "Kowalczyk"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.save()
+        self.site.refresh_from_db()
+        self.assertEqual(self._bundle(self.site.static_bundle_key)['team'][0]['name'], 'Anna Kowalczyk')
+
+    def test_unpublish_drops_bundle(self):
+        """Sprawdza czy cofnięcie publikacji czyści klucz bundla i planuje usunięcie pliku."""
+        key = self.site.static_bundle_key
+        self.site.is_published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site.save()
+        self.site.refresh_from_db()
+        self.assertIsNone(self.site.static_bundle_key)
+        self.assertEqual(self.delete_async.call_args.kwargs['args'], [key])
+
+        self.assertTrue(site_export.delete_bundle(key))
+        self.assertFalse(default_storage.exists(key))
+
+    def test_replaced_bundle_is_kept_when_it_becomes_current_again(self):
+        """Sprawdza czy opóźnione usuwanie nie kasuje bundla, do którego strona znów wskazuje."""
+        self.assertFalse(site_export.delete_bundle(self.site.static_bundle_key))
+        self.assertTrue(default_storage.exists(self.site.static_bundle_key))
+
+    def test_export_command_backfills_sites_without_bundle(self):
+        """Sprawdza czy komenda export_site_bundles eksportuje strony opublikowane przed włączeniem eksportu."""
+        with override_settings(SITE_EXPORT_ENABLED=False):
+            other = Site.objects.create(owner=self.owner, name="Legacy Site", is_published=True)
+        self.assertIsNone(other.static_bundle_key)
+
+        out = StringIO()
+        call_command('export_site_bundles', stdout=out)
+        other.refresh_from_db()
+        self.assertTrue(other.static_bundle_key)
+        self.assertEqual(self._bundle(other.static_bundle_key)['site_id'], other.id)
+        self.assertIn('exported: 1', out.getvalue())
+
+        with override_settings(SITE_EXPORT_ENABLED=False), self.assertRaises(CommandError):
+            call_command('export_site_bundles', stdout=StringIO())
+
+    def test_public_views_share_payload_builders(self):
+        """Sprawdza czy publiczne endpointy zespołu i wydarzeń zwracają te same dane co bundle."""
+        bundle = self._bundle(self.site.static_bundle_key)
+        team = self.client.get(f'/api/v1/public-sites/{self.site.id}/team/')
+        self.assertEqual(team.json(), bundle['team'])
+        events = self.client.get(f'/api/v1/public-sites/{self.site.identifier}/big-events/')
+        self.assertEqual(events.json()['events'], bundle['events'])
+
+
+# =============================================================================
+# RZADKIE ZESTAWY PÓL (?fields= / ?omit=)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='')
+class SparseFieldsetTests(APITestCase):
+    """
+    Testy mechanizmu ?fields= / ?omit= (SparseFieldsetMixin): przycięcie
+    odpowiedzi oraz zapytania (defer, select_related, prefetch).
+    """
+
+    def setUp(self):
+        """Tworzy dwie strony z dużą konfiguracją, członka zespołu i rezerwację."""
+        cache.clear()
+        self.owner = PlatformUser.objects.create_user(email="owner@example.com", password="pass123", first_name="Owner")
+        self.config = {'pages': [{'id': f'page-{index}', 'body': 'x' * 200} for index in range(20)]}
+        self.site = Site.objects.create(owner=self.owner, name="Alpha", is_published=True, template_config=self.config)
+        Site.objects.create(owner=self.owner, name="Beta", template_config=self.config)
+        self.member = TeamMember.objects.create(
+            site=self.site, name="Jan Kowalski", email="jan@example.com",
+            linked_user=PlatformUser.objects.create_user(email="jan@example.com", password="pass123", first_name="Jan"),
+            invitation_status=TeamMember.InvitationStatus.LINKED,
+        )
+        start = timezone.now() + timedelta(days=1)
+        event = Event.objects.create(
+            site=self.site, creator=self.owner, title="Joga", start_time=start,
+            end_time=start + timedelta(hours=1), capacity=10, assigned_to_owner=self.owner,
+        )
+        Booking.objects.create(site=self.site, event=event, guest_name="Gość", guest_email="guest@example.com", notes="n" * 50)
+        self.client.force_authenticate(user=self.owner)
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_site_picker_skips_config_owner_and_versions(self):
+        """Sprawdza czy ?fields= na liście stron nie czyta template_config, właściciela ani wersji."""
+        response, sql = self._get('/api/v1/sites/?fields=id,name,color_index')
+        self.assertEqual(
+            [site for site in response.json()['owned_sites']],
+            [{'id': site.id, 'name': site.name, 'color_index': 0} for site in Site.objects.filter(owner=self.owner)],
+        )
+        self.assertNotIn('template_config', sql)
+        self.assertNotIn('api_siteversion', sql)
+        self.assertNotIn('"api_platformuser"."preferences"', sql)
+
+    def test_full_site_list_is_unchanged_without_params(self):
+        """Sprawdza czy bez parametrów lista stron zwraca wszystkie pola."""
+        response, sql = self._get('/api/v1/sites/')
+        site = response.json()['owned_sites'][0]
+        self.assertEqual(site['template_config'], self.config)
+        self.assertIn('owner', site)
+        self.assertIn('latest_version', site)
+
+    def test_omit_on_public_site_list(self):
+        """Sprawdza czy ?omit=template_config usuwa konfigurację z odpowiedzi i z zapytania."""
+        self.client.force_authenticate(user=None)
+        response, sql = self._get('/api/v1/public-sites/?omit=template_config,updated_at')
+        entry = response.json()[0]
+        self.assertEqual(set(entry), {'id', 'identifier', 'name', 'subdomain', 'is_published'})
+        self.assertNotIn('template_config', sql)
+
+    def test_trimmed_public_site_list_reads_is_published_once(self):
+        """Sprawdza czy przycięta lista publicznych stron nie doczytuje is_published osobno dla każdej strony."""
+        for index in range(4):
+            Site.objects.create(owner=self.owner, name=f"Strona {index}", is_published=bool(index % 2), template_config=self.config)
+        self.client.force_authenticate(user=None)
+        for query in ('fields=id,name', 'fields=id,template_config', 'omit=is_published'):
+            with self.assertNumQueries(1):
+                response = self.client.get(f'/api/v1/public-sites/?{query}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()), 6)
+        self.assertNotIn('is_published', response.json()[0])
+
+    def test_booking_fields_drop_unused_joins(self):
+        """Sprawdza czy pola metod deklarują swoje relacje: bez event_details nie ma JOIN-a na wydarzenia."""
+        response, sql = self._get(f'/api/v1/bookings/?site={self.site.id}&fields=client_name,client_email')
+        self.assertEqual(response.json()[0], {
+            'id': response.json()[0]['id'], 'client_name': 'Gość', 'client_email': 'guest@example.com',
+        })
+        self.assertNotIn('"api_event"', sql)
+        self.assertNotIn('"api_booking"."notes"', sql)
+
+    def test_team_member_omit_keeps_linked_user_override_consistent(self):
+        """Sprawdza czy pominięte pola awatara nie wracają przez to_representation i nie ładują konta."""
+        response, sql = self._get(f'/api/v1/team-members/?site={self.site.id}&omit=avatar_url,avatar_color,avatar_letter')
+        member = response.json()[0]
+        self.assertNotIn('avatar_url', member)
+        self.assertNotIn('avatar_color', member)
+        self.assertEqual(member['name'], 'Jan Kowalski')
+        self.assertNotIn('"api_platformuser"."avatar_url"', sql)
+
+        response, _ = self._get(f'/api/v1/team-members/?site={self.site.id}&fields=avatar_letter')
+        self.assertEqual(response.json()[0], {'id': self.member.id, 'avatar_letter': 'J'})
+
+    def test_writes_ignore_fieldset_but_trim_response(self):
+        """Sprawdza czy ?fields= przy zapisie nie blokuje pól wejściowych, a tylko skraca odpowiedź."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/v1/sites/{self.site.id}/?fields=id', {'name': 'Gamma'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'id': self.site.id})
+        self.site.refresh_from_db()
+        self.assertEqual(self.site.name, 'Gamma')
+
+    def test_serializer_kwargs_take_precedence(self):
+        """Sprawdza czy argumenty fields=/omit= serializera działają bez żądania HTTP."""
+        data = SiteSerializer(self.site, fields=['name'], omit=['id']).data
+        self.assertEqual(data, {'id': self.site.id, 'name': 'Alpha'})
+
+
+# =============================================================================
+# WSPÓLNY SILNIK LIMITÓW (GCRA / OKNO PRZESUWNE, NAGŁÓWKI RateLimit-*)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='', DDOS_BLOCKLIST_PUBSUB_URL='')
+class RateLimiterTests(TestCase):
+    """
+    Testy silnika limitów (api.rate_limiter) używanego przez DDoSProtectionMiddleware
+    i dekoratory rate_limit: token bucket (GCRA) z blokadą, okno przesuwne,
+    polityki z ustawień oraz nagłówki RateLimit-* i Retry-After.
+    """
+
+    NOW = 1_700_000_000_000
+
+    def setUp(self):
+        cache.clear()
+        ddos_blocklist.clear_local_mirror()
+        self.limiter = get_limiter()
+        self.policy = RatePolicy(
+            name='ddos', scope='ddos', block_duration=60,
+            rates=(Rate(5, 60, burst=2), Rate(100, 3600)),
+        )
+
+    def test_burst_then_block_in_one_step(self):
+        """Sprawdza czy limit + zapas przechodzi, kolejne zapytanie blokuje IP, a następne trafia na blokadę."""
+        decisions = [self.limiter.check('10.0.0.1', self.policy, now_ms=self.NOW) for _ in range(9)]
+        self.assertTrue(all(decision.allowed for decision in decisions[:7]))
+        self.assertEqual(decisions[0].remaining, 6)
+        self.assertEqual(decisions[6].remaining, 0)
+        self.assertTrue(decisions[7].blocked_now)
+        self.assertEqual(decisions[7].retry_after, 60)
+        self.assertEqual(decisions[8].status, rate_limiter.ALREADY_BLOCKED)
+        self.assertTrue(self.limiter.check('10.0.0.2', self.policy, now_ms=self.NOW).allowed)
+
+    def test_token_bucket_refills_at_steady_rate(self):
+        """Sprawdza czy bez blokady odrzucenie podaje czas do odnowienia jednego żetonu (60/limit sekund)."""
+        policy = RatePolicy(name='bucket', rates=(Rate(5, 60, burst=2),))
+        for _ in range(7):
+            self.assertTrue(self.limiter.check('10.0.0.1', policy, now_ms=self.NOW).allowed)
+        rejected = self.limiter.check('10.0.0.1', policy, now_ms=self.NOW)
+        self.assertEqual((rejected.status, rejected.retry_after), (rate_limiter.LIMITED, 12))
+        later = self.limiter.check('10.0.0.1', policy, now_ms=self.NOW + 12_000)
+        self.assertTrue(later.allowed)
+        self.assertEqual(later.remaining, 0)
+
+    def test_tightest_rate_is_reported(self):
+        """Sprawdza czy decyzja opisuje limit najbliższy wyczerpania, a limit godzinowy blokuje niezależnie."""
+        policy = RatePolicy(name='hourly', rates=(Rate(1000, 60), Rate(3, 3600)))
+        decisions = [self.limiter.check('10.0.0.1', policy, now_ms=self.NOW + index * 1000) for index in range(4)]
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, True, False])
+        self.assertEqual(decisions[0].rate, Rate(3, 3600))
+        self.assertEqual(decisions[0].remaining, 2)
+
+    def test_sliding_window_weights_previous_window(self):
+        """Sprawdza czy okno przesuwne liczy część poprzedniego okna i odrzucone zapytania."""
+        policy = RatePolicy(name='window', rates=(Rate(10, 60),), strategy='sliding_window')
+        start = self.NOW - self.NOW % 60_000
+        for _ in range(10):
+            self.assertTrue(self.limiter.check('10.0.0.1', policy, now_ms=start).allowed)
+        rejected = self.limiter.check('10.0.0.1', policy, now_ms=start)
+        self.assertEqual(rejected.status, rate_limiter.LIMITED)
+        self.assertEqual(rejected.retry_after, 60)
+
+        # 15 s into the next window 3/4 of the 11 counted requests still overlap
+        decision = self.limiter.check('10.0.0.1', policy, now_ms=start + 75_000)
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.remaining, 10 - 1 - int(11 * 0.75))
+        self.assertEqual(decision.reset, 45)
+
+    def test_headers(self):
+        """Sprawdza nagłówki RateLimit-* przy zgodzie oraz Retry-After przy odrzuceniu."""
+        decision = self.limiter.check('10.0.0.1', self.policy, now_ms=self.NOW)
+        self.assertEqual(decision.headers(), {
+            'RateLimit-Policy': '5;w=60;burst=2, 100;w=3600',
+            'RateLimit-Limit': '7',
+            'RateLimit-Remaining': '6',
+            'RateLimit-Reset': '12',
+        })
+        for _ in range(7):
+            decision = self.limiter.check('10.0.0.1', self.policy, now_ms=self.NOW)
+        self.assertEqual(decision.headers()['Retry-After'], '60')
+        self.assertEqual(decision.headers()['RateLimit-Remaining'], '0')
+
+    def test_policies_from_settings(self):
+        """Sprawdza parsowanie polityk: skróty, słowniki, nadpisanie per trasa i błędną konfigurację."""
+        self.assertEqual(Rate.parse('100/15m+5'), Rate(100, 900, burst=5))
+        self.assertEqual(Rate.parse('10/60'), Rate(10, 60))
+        policies = {
+            'strict': '10/m',
+            'View.post': {'rates': ['2/s', '50/h'], 'strategy': 'token_bucket', 'block_duration': 30},
+        }
+        with override_settings(RATE_LIMIT_POLICIES=policies, RATE_LIMIT_STRATEGY='sliding_window'):
+            strict = rate_limiter.get_policy('Other.post', 'strict', scope='api:Other.post')
+            self.assertEqual((strict.rates, strict.strategy, strict.key_scope), ((Rate(10, 60),), 'sliding_window', 'api:Other.post'))
+            route = rate_limiter.get_policy('View.post', 'strict')
+            self.assertEqual((route.name, route.strategy, route.block_duration), ('View.post', 'token_bucket', 30))
+            self.assertIsNone(rate_limiter.get_policy('missing'))
+        for broken in ('10/', 'ten/m', {'rates': []}, {'rates': '1/m', 'strategy': 'leaky'}):
+            with self.assertRaises(ImproperlyConfigured):
+                RatePolicy.from_spec('broken', broken)
+
+    @override_settings(DDOS_REQUESTS_PER_MINUTE=2, DDOS_BURST_ALLOWANCE=1, DDOS_WHITELIST=[])
+    def test_middleware_uses_single_check(self):
+        """Sprawdza czy middleware odpowiada 429 z Retry-After po przekroczeniu limitu, a potem zgłasza blokadę IP."""
+        middleware = DDoSProtectionMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        responses = [middleware(factory.get('/api/v1/sites/', REMOTE_ADDR='10.1.1.1')) for _ in range(5)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200, 429, 429])
+        self.assertEqual(responses[0]['RateLimit-Remaining'], '2')
+        self.assertIn('Rate limit exceeded', json.loads(responses[3].content)['error'])
+        self.assertEqual(responses[3]['Retry-After'], '1800')
+        self.assertIn('temporarily blocked', json.loads(responses[4].content)['error'])
+        self.assertTrue(middleware.is_blocked('10.1.1.1'))
+
+    def test_decorator_uses_route_policy_and_headers(self):
+        """Sprawdza czy dekorator bierze politykę trasy z ustawień, dodaje nagłówki i odpowiada 429 z Retry-After."""
+        from rest_framework.views import APIView
+        from .rate_limiting import rate_limit
+
+        class RateLimitedView(APIView):
+            permission_classes = [AllowAny]
+
+            @rate_limit(requests=100, window=60, policy='strict')
+            def post(self, request):
+                return Response({'ok': True})
+
+        view = RateLimitedView.as_view()
+        factory = RequestFactory()
+        # Route keys are the view method's qualified name ('RateLimitedView.post' at module level)
+        policies = {RateLimitedView.post.__qualname__: '2/m'}
+        with override_settings(RATE_LIMIT_POLICIES=policies, RATE_LIMIT_STRATEGY='sliding_window'):
+            responses = [view(factory.post('/limited/', REMOTE_ADDR='10.2.2.2')) for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertEqual(responses[0]['RateLimit-Limit'], '2')
+        self.assertEqual(responses[1]['RateLimit-Remaining'], '0')
+        self.assertEqual(responses[2].data['detail'], 'Maximum 2 requests per 60 seconds allowed')
+        self.assertIn('Retry-After', responses[2])
+        # Without the route entry the 'strict' preset applies, and without that the decorator's own limit
+        self.assertEqual(view(factory.post('/limited/', REMOTE_ADDR='10.2.2.3'))['RateLimit-Limit'], '10')
+        with override_settings(RATE_LIMIT_POLICIES={}):
+            self.assertEqual(view(factory.post('/limited/', REMOTE_ADDR='10.2.2.3'))['RateLimit-Limit'], '100')
+
+    def test_redis_token_bucket_is_one_evalsha(self):
+        """Sprawdza czy w Redis cały krok token bucket to jedno EVALSHA, z EVAL po wyczyszczeniu cache skryptów."""
+        from redis.exceptions import NoScriptError
+
+        limiter = self._redis_limiter()
+        client = limiter.backend._cache.get_client.return_value
+        client.evalsha.return_value = [0, 0, 1, 6, 12000]
+
+        decision = limiter.check('10.0.0.1', self.policy, now_ms=self.NOW)
+        self.assertTrue(decision.allowed)
+        self.assertEqual((decision.rate, decision.remaining, decision.reset), (Rate(5, 60, burst=2), 6, 12))
+        self.assertEqual(len(client.method_calls), 1)
+        sha, numkeys, *rest = client.evalsha.call_args.args
+        self.assertEqual((sha, numkeys), (rate_limiter.TOKEN_BUCKET_SCRIPT_SHA, 3))
+        self.assertEqual(rest[:3], [':1:ddos:blocked:10.0.0.1', ':1:ddos:tb:60:10.0.0.1', ':1:ddos:tb:3600:10.0.0.1'])
+        self.assertEqual(rest[3:], [self.NOW, 60000, 12000, 72000, 36000, 3564000])
+
+        client.evalsha.side_effect = NoScriptError('NOSCRIPT')
+        client.eval.return_value = [2, 60000, 1, 0, 60000]
+        self.assertTrue(limiter.check('10.0.0.1', self.policy).blocked_now)
+        self.assertEqual(client.eval.call_args.args[0], rate_limiter.TOKEN_BUCKET_SCRIPT)
+
+    def test_redis_sliding_window_is_one_pipeline(self):
+        """Sprawdza czy okno przesuwne w Redis wysyła INCR + EXPIRE + GET w jednym pipeline."""
+        limiter = self._redis_limiter()
+        client = limiter.backend._cache.get_client.return_value
+        pipe = client.pipeline.return_value
+        pipe.execute.return_value = [3, True, b'4']
+        policy = RatePolicy(name='window', rates=(Rate(10, 60),), strategy='sliding_window')
+        start = self.NOW - self.NOW % 60_000
+
+        decision = limiter.check('10.0.0.1', policy, now_ms=start + 30_000)
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.remaining, 10 - 3 - 2)
+        client.pipeline.assert_called_once_with(transaction=False)
+        window = start // 60_000
+        pipe.incr.assert_called_once_with(f':1:rl:window:sw:60:{window}:10.0.0.1')
+        pipe.expire.assert_called_once_with(f':1:rl:window:sw:60:{window}:10.0.0.1', 120)
+        pipe.get.assert_called_once_with(f':1:rl:window:sw:60:{window - 1}:10.0.0.1')
+        pipe.execute.assert_called_once_with()
+
+    def test_benchmark_command_runs(self):
+        """Sprawdza czy komenda benchmark_ddos_limiter raportuje narzut wszystkich ścieżek."""
+        out = StringIO()
+        call_command('benchmark_ddos_limiter', requests=50, ips=5, stdout=out)
+        for mode in ('legacy', 'script', 'window', 'blocked'):
+            self.assertIn(f'Added per request ({mode})', out.getvalue())
+
+    def _redis_limiter(self):
+        backend = MagicMock()
+        backend.make_key.side_effect = lambda key: f':1:{key}'
+        limiter = rate_limiter.RateLimiter(backend)
+        limiter.redis = True
+        return limiter
+
+
+# =============================================================================
+# LOKALNE LUSTRO BLOKAD DDoS (CIDR, PUB/SUB)
+# =============================================================================
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DOMAIN_CACHE_PUBSUB_URL='',
+    DDOS_BLOCKLIST_PUBSUB_URL='',
+    DDOS_REQUESTS_PER_MINUTE=2,
+    DDOS_BURST_ALLOWANCE=0,
+    DDOS_WHITELIST=['127.0.0.1', '10.0.0.0/8', '2001:db8::/32'],
+)
+class DDoSBlocklistTests(TestCase):
+    """
+    Testy lustra blokad w pamięci procesu (api.ddos_blocklist): zakresy CIDR,
+    odrzucanie zablokowanych IP bez zapytań do cache, propagacja przez pub/sub
+    i whitelista z zakresami.
+    """
+
+    def setUp(self):
+        cache.clear()
+        ddos_blocklist.clear_local_mirror()
+        self.factory = RequestFactory()
+        self.middleware = DDoSProtectionMiddleware(lambda request: HttpResponse())
+
+    def request(self, ip):
+        return self.middleware(self.factory.get('/api/v1/sites/', REMOTE_ADDR=ip))
+
+    def test_network_set_matches_ranges(self):
+        """Sprawdza dopasowanie adresów i zakresów IPv4/IPv6, adresów IPv4 w IPv6, nazw i wygasania."""
+        networks = NetworkSet(['192.0.2.0/24', '198.51.100.7', '2001:db8:1::/48', 'localhost', ''])
+        self.assertIn('192.0.2.200', networks)
+        self.assertIn('::ffff:192.0.2.1', networks)
+        self.assertIn('198.51.100.7', networks)
+        self.assertNotIn('198.51.100.8', networks)
+        self.assertIn('2001:db8:1:ff::1', networks)
+        self.assertNotIn('2001:db8:2::1', networks)
+        self.assertIn('localhost', networks)
+        self.assertNotIn('not-an-ip', networks)
+        self.assertNotIn(None, networks)
+
+        networks.add('203.0.113.0/25', expires_at=time_module.time() - 1)
+        self.assertNotIn('203.0.113.1', networks)
+        networks.discard('192.0.2.0/24')
+        self.assertNotIn('192.0.2.200', networks)
+
+    def test_whitelist_accepts_cidr(self):
+        """Sprawdza czy adresy z zakresów whitelisty omijają limity."""
+        statuses = {self.request('10.20.30.40').status_code for _ in range(10)}
+        statuses |= {self.request('2001:db8::5').status_code for _ in range(10)}
+        self.assertEqual(statuses, {200})
+
+    def test_mirrored_block_skips_cache(self):
+        """Sprawdza czy zablokowane IP jest odrzucane z lustra, bez żadnego wywołania limitera."""
+        self.middleware.block_ip('192.0.2.10')
+        with patch('api.ddos_middleware.get_limiter') as limiter:
+            responses = [self.request('192.0.2.10') for _ in range(3)]
+        limiter.assert_not_called()
+        self.assertEqual({response.status_code for response in responses}, {429})
+        self.assertEqual(responses[0]['Retry-After'], '1800')
+        self.assertTrue(self.middleware.is_blocked('192.0.2.10'))
+
+    def test_rate_limit_block_is_mirrored(self):
+        """Sprawdza czy blokada z limitera trafia do lustra, także gdy ten proces jej nie widział."""
+        responses = [self.request('192.0.2.20') for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        self.assertGreater(ddos_blocklist.blocked_for('192.0.2.20'), 0)
+
+        ddos_blocklist.clear_local_mirror()
+        self.assertEqual(self.request('192.0.2.20').status_code, 429)
+        self.assertGreater(ddos_blocklist.blocked_for('192.0.2.20'), 0)
+
+    @override_settings(DDOS_BLOCKLIST=['203.0.113.0/24'])
+    def test_static_blocklist(self):
+        """Sprawdza czy zakresy z DDOS_BLOCKLIST są zawsze odrzucane."""
+        middleware = DDoSProtectionMiddleware(lambda request: HttpResponse())
+        response = middleware(self.factory.get('/api/v1/sites/', REMOTE_ADDR='203.0.113.99'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_pubsub_messages_update_mirror(self):
+        """Sprawdza czy wiadomości z kanału blokad dodają i zdejmują zakresy z lustra."""
+        ddos_blocklist._handle_message({'data': json.dumps({'network': '198.51.100.0/24', 'expires_at': time_module.time() + 60})})
+        self.assertEqual(self.request('198.51.100.42').status_code, 429)
+        ddos_blocklist._handle_message({'data': json.dumps({'network': '198.51.100.0/24', 'expires_at': 0})})
+        self.assertEqual(ddos_blocklist.blocked_for('198.51.100.42'), 0)
+        ddos_blocklist._handle_message({'data': b'not json'})
+
+    def test_block_is_broadcast_and_loaded_from_snapshot(self):
+        """Sprawdza czy blokada trafia do zbioru w Redis i na kanał, a nowy proces wczytuje zbiór."""
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+        with patch('api.ddos_blocklist._redis_client', return_value=client):
+            self.assertEqual(ddos_blocklist.block('203.0.113.7/24', 60), '203.0.113.0/24')
+        key, snapshot = pipe.zadd.call_args.args
+        self.assertEqual((key, list(snapshot)), ('ddos:blocklist', ['203.0.113.0/24']))
+        channel, payload = pipe.publish.call_args.args
+        self.assertEqual((channel, json.loads(payload)['network']), (ddos_blocklist.BLOCKLIST_CHANNEL, '203.0.113.0/24'))
+        pipe.execute.assert_called_once_with()
+
+        ddos_blocklist.clear_local_mirror()
+        client.zrangebyscore.return_value = [(b'203.0.113.0/24', time_module.time() + 60)]
+        ddos_blocklist._load_snapshot(client)
+        self.assertGreater(ddos_blocklist.blocked_for('203.0.113.1'), 0)
+
+    def test_ddos_block_command(self):
+        """Sprawdza komendę ddos_block: blokadę zakresu, zdjęcie blokady i błędny adres."""
+        call_command('ddos_block', '192.0.2.0/28', duration=120, stdout=StringIO())
+        self.assertEqual(self.request('192.0.2.5').status_code, 429)
+        call_command('ddos_block', '192.0.2.0/28', unblock=True, stdout=StringIO())
+        self.assertEqual(ddos_blocklist.blocked_for('192.0.2.5'), 0)
+        with self.assertRaises(CommandError):
+            call_command('ddos_block', 'example.com', stdout=StringIO())
+
+    def test_unblock_clears_limiter_flag(self):
+        """Sprawdza czy --unblock zdejmuje też flagę blokady limitera, więc lustro nie odtwarza blokady."""
+        self.middleware.block_ip('192.0.2.30')
+        call_command('ddos_block', '192.0.2.30', unblock=True, stdout=StringIO())
+        self.assertFalse(self.middleware.is_blocked('192.0.2.30'))
+        self.assertEqual(self.request('192.0.2.30').status_code, 200)
+        self.assertEqual(ddos_blocklist.blocked_for('192.0.2.30'), 0)
+
+
+# =============================================================================
+# ŚCIEŻKOWY STOS MIDDLEWARE (JWT API BEZ SESJI)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='', DDOS_BLOCKLIST_PUBSUB_URL='')
+class PathScopedMiddlewareTests(TestCase):
+    """
+    Testy PathScopedMiddleware: sesje, CSRF, uwierzytelnianie sesyjne i
+    komunikaty działają tylko poza /api/v1/ (oraz na ścieżkach allauth API),
+    a ochrona DDoS działa przed nimi.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.seen = {}
+
+        def view(request):
+            self.seen = {'session': hasattr(request, 'session'), 'user': hasattr(request, 'user')}
+            return HttpResponse()
+
+        self.middleware = PathScopedMiddleware(view)
+
+    def test_api_paths_skip_session_middleware(self):
+        """Sprawdza czy ścieżki JWT API nie ładują sesji ani użytkownika sesji."""
+        self.middleware(self.factory.get('/api/v1/health/'))
+        self.assertEqual(self.seen, {'session': False, 'user': False})
+
+    def test_other_and_required_paths_use_session_middleware(self):
+        """Sprawdza czy /admin/ i ścieżki allauth w API dostają sesję i użytkownika."""
+        for path in ('/admin/login/', '/api/v1/auth/google/', '/api/v1/auth/register/'):
+            self.middleware(self.factory.get(path))
+            self.assertEqual(self.seen, {'session': True, 'user': True}, path)
+
+    def test_api_request_with_session_cookie_runs_no_queries(self):
+        """Sprawdza czy ciasteczko sesji nie powoduje zapytań do bazy na endpointach API."""
+        self.client.force_login(PlatformUser.objects.create_user(email='scoped@test.com', password='pass12345'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+
+    def test_admin_keeps_session_and_csrf(self):
+        """Sprawdza czy panel admina nadal ustawia token CSRF i odrzuca POST bez niego."""
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('csrftoken', response.cookies)
+
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.post('/admin/login/', {'username': 'x', 'password': 'y'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_ddos_protection_runs_before_sessions(self):
+        """Sprawdza czy ochrona DDoS stoi w MIDDLEWARE przed grupą sesyjną."""
+        middleware = list(settings.MIDDLEWARE)
+        self.assertLess(
+            middleware.index('api.ddos_middleware.DDoSProtectionMiddleware'),
+            middleware.index('api.middleware.PathScopedMiddleware'),
+        )
+        self.assertNotIn('django.contrib.sessions.middleware.SessionMiddleware', middleware)
+        self.assertIn('django.contrib.sessions.middleware.SessionMiddleware', settings.SESSION_MIDDLEWARE)
+
+    def test_benchmark_middleware_command(self):
+        """Sprawdza czy komenda benchmarku porównuje oba stosy."""
+        out = StringIO()
+        call_command('benchmark_middleware', requests=3, paths=['/api/v1/health/'], stdout=out)
+        self.assertIn('legacy', out.getvalue())
+        self.assertIn('Saved per request', out.getvalue())
+
+
+# =============================================================================
+# JEDNOKROTNE UWIERZYTELNIANIE JWT (CLAIM is_temporary_password)
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES, DOMAIN_CACHE_PUBSUB_URL='', DDOS_BLOCKLIST_PUBSUB_URL='')
+class RequestCachedJWTAuthenticationTests(APITestCase):
+    """
+    Testy współdzielenia wyniku uwierzytelniania JWT między
+    TemporaryPasswordMiddleware a DRF oraz claimu is_temporary_password.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = PlatformUser.objects.create_user(email='jwt@test.com', password='pass12345')
+        self.middleware = TemporaryPasswordMiddleware(lambda request: HttpResponse())
+
+    def bearer(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def test_tokens_carry_temporary_password_claim(self):
+        """Sprawdza czy tokeny z logowania i odświeżenia zawierają claim hasła tymczasowego."""
+        access = PlatformRefreshToken.for_user(self.user).access_token
+        self.assertIs(access[TEMPORARY_PASSWORD_CLAIM], False)
+
+        response = self.client.post('/api/v1/token/', {'email': 'jwt@test.com', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 200)
+        validated = RequestCachedJWTAuthentication().get_validated_token(response.data['access'])
+        self.assertIs(validated[TEMPORARY_PASSWORD_CLAIM], False)
+
+        response = self.client.post('/api/v1/token/refresh/', {'refresh': response.data['refresh']})
+        validated = RequestCachedJWTAuthentication().get_validated_token(response.data['access'])
+        self.assertIs(validated[TEMPORARY_PASSWORD_CLAIM], False)
+
+    def test_gate_runs_no_queries_for_regular_tokens(self):
+        """Sprawdza czy bramka hasła tymczasowego nie pyta bazy, gdy claim jest fałszywy."""
+        token = PlatformRefreshToken.for_user(self.user).access_token
+        request = self.factory.get('/api/v1/sites/', **self.bearer(token))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(self.middleware.process_request(request))
+        self.assertEqual(len(queries), 0)
+
+    def test_gate_blocks_temporary_password(self):
+        """Sprawdza blokadę hasła tymczasowego i przepuszczenie po zmianie hasła mimo starego claimu."""
+        self.user.is_temporary_password = True
+        self.user.save()
+        token = PlatformRefreshToken.for_user(self.user).access_token
+        response = self.middleware.process_request(self.factory.get('/api/v1/sites/', **self.bearer(token)))
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone(self.middleware.process_request(self.factory.get('/api/v1/auth/change-password/', **self.bearer(token))))
+
+        self.user.is_temporary_password = False
+        self.user.save()
+        self.assertIsNone(self.middleware.process_request(self.factory.get('/api/v1/sites/', **self.bearer(token))))
+
+    def test_user_loaded_once_per_request(self):
+        """Sprawdza czy middleware i DRF dzielą jedno dekodowanie tokenu i jedno pobranie użytkownika."""
+        self.user.is_temporary_password = True  # claim True: middleware must load the user
+        self.user.save()
+        token = PlatformRefreshToken.for_user(self.user).access_token
+        self.user.is_temporary_password = False
+        self.user.save()
+
+        get_user = RequestCachedJWTAuthentication.get_user
+        get_validated_token = RequestCachedJWTAuthentication.get_validated_token
+        with patch.object(RequestCachedJWTAuthentication, 'get_user', autospec=True, side_effect=get_user) as user_lookup, \
+                patch.object(RequestCachedJWTAuthentication, 'get_validated_token', autospec=True, side_effect=get_validated_token) as decode:
+            response = self.client.get('/api/v1/sites/', **self.bearer(token))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_lookup.call_count, 1)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_invalid_token_is_rejected_once(self):
+        """Sprawdza czy błędny token przechodzi przez middleware i kończy się 401 w DRF."""
+        response = self.client.get('/api/v1/sites/', **self.bearer('not-a-token'))
+        self.assertEqual(response.status_code, 401)
+
+        request = self.factory.get('/api/v1/sites/', **self.bearer('not-a-token'))
+        self.assertIsNone(self.middleware.process_request(request))
+        with self.assertRaises(AuthenticationFailed):
+            RequestCachedJWTAuthentication().authenticate(request)
+
+
+# =============================================================================
+# BUDŻET ZAPYTAŃ GORĄCYCH ENDPOINTÓW
+# =============================================================================
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(APITestCase):
+    """
+    Testy regresji liczby zapytań i czasu odpowiedzi najczęściej wołanych endpointów.
+    
+    Dane odpowiadają realnemu klientowi (zespół, setki wydarzeń i rezerwacji,
+    opinie, subskrybenci newslettera). Budżety są stałe: jeśli zmiana w widoku
+    doda zapytanie na rekord, test się wysypie i wypisze wykonane SQL-e.
+    """
+
+    EVENTS = 300
+    BOOKINGS_PER_EVENT = 2
+    TESTIMONIALS = 60
+    SUBSCRIBERS = 200
+    # Zapytania na jedno wywołanie, niezależnie od liczby rekordów
+    QUERY_BUDGETS = {
+        'site_list': 4,
+        'calendar_data': 6,
+        'public_site': 2,
+        'public_availability': 2,
+        'public_booking': 20,
+        'booking_list': 3,
+        'testimonials': 3,
+        'newsletter_stats': 9,
+        'attendance_report': 8,
+    }
+    # Sufit czasu jest hojny, żeby nie flakować na wolnym CI; łapie rzędy wielkości
+    MAX_SECONDS = 2.0
+
+    @classmethod
+    def setUpTestData(cls):
+        """Tworzy właściciela z zespołem, wydarzenia z rezerwacjami, opinie i subskrybentów."""
+        from .models import NewsletterSubscription
+        from .slot_engine import rebuild_computed_slots
+
+        cls.owner = PlatformUser.objects.create_user(email="owner@example.com", password="pass123", first_name="Owner")
+        cls.site = Site.objects.create(owner=cls.owner, name="Budget Site")
+        cls.members = [
+            TeamMember.objects.create(
+                site=cls.site,
+                name=f"Instruktor {index}",
+                linked_user=PlatformUser.objects.create_user(email=f"member{index}@example.com", password="pass123"),
+                invitation_status=TeamMember.InvitationStatus.LINKED,
+                permission_role=TeamMember.PermissionRole.MANAGER,
+            )
+            for index in range(3)
+        ]
+        # Druga strona właściciela, żeby lista stron nie była trywialna
+        Site.objects.create(owner=cls.owner, name="Second Site")
+
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        events = []
+        for index in range(cls.EVENTS):
+            start = now + timedelta(days=index % 60 - 30, hours=index % 8)
+            host = {'assigned_to_team_member': cls.members[index % 3]} if index % 2 else {'assigned_to_owner': cls.owner}
+            events.append(Event(
+                site=cls.site,
+                creator=cls.owner,
+                title=f"Zajęcia {index}",
+                start_time=start,
+                end_time=start + timedelta(hours=1),
+                capacity=cls.BOOKINGS_PER_EVENT + 2,
+                event_type=Event.EventType.GROUP,
+                booked_count=cls.BOOKINGS_PER_EVENT,
+                **host
+            ))
+        events = Event.objects.bulk_create(events)
+
+        clients = Client.objects.bulk_create([
+            Client(site=cls.site, email=f"client{index}@example.com", name=f"Klient {index}")
+            for index in range(cls.EVENTS * cls.BOOKINGS_PER_EVENT)
+        ])
+        Booking.objects.bulk_create([
+            Booking(
+                site=cls.site,
+                event=events[index // cls.BOOKINGS_PER_EVENT],
+                client=client,
+                guest_email=client.email,
+                guest_name=client.name,
+            )
+            for index, client in enumerate(clients)
+        ])
+        Event.attendees.through.objects.bulk_create([
+            Event.attendees.through(event_id=events[index // cls.BOOKINGS_PER_EVENT].id, client_id=client.id)
+            for index, client in enumerate(clients)
+        ])
+
+        day = timezone.localdate()
+        AvailabilityBlock.objects.bulk_create([
+            AvailabilityBlock(
+                site=cls.site,
+                creator=cls.owner,
+                date=day + timedelta(days=offset),
+                start_time=time(8, 0),
+                end_time=time(18, 0),
+                meeting_length=60,
+                time_snapping=30,
+                **({'assigned_to_team_member': cls.members[offset % 3]} if offset % 2 else {'assigned_to_owner': cls.owner})
+            )
+            for offset in range(1, 15)
+        ])
+
+        Testimonial.objects.bulk_create([
+            Testimonial(
+                site=cls.site,
+                author_name=f"Autor {index}",
+                author_email=f"author{index}@example.com",
+                rating=index % 5 + 1,
+                content="Świetne zajęcia",
+                is_approved=index % 3 != 0,
+            )
+            for index in range(cls.TESTIMONIALS)
+        ])
+        NewsletterSubscription.objects.bulk_create([
+            NewsletterSubscription(
+                site=cls.site,
+                email=f"reader{index}@example.com",
+                is_confirmed=index % 4 != 0,
+                unsubscribe_token=f"unsubscribe-{index}",
+                emails_sent=10,
+                emails_opened=index % 10,
+                emails_clicked=index % 3,
+            )
+            for index in range(cls.SUBSCRIBERS)
+        ])
+
+        rebuild_computed_slots(cls.site)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.owner)
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_seconds=None):
+        """Sprawdza liczbę zapytań i czas bloku; przy przekroczeniu wypisuje wykonane SQL-e."""
+        max_seconds = max_seconds or self.MAX_SECONDS
+        with CaptureQueriesContext(connection) as captured:
+            started = time_module.perf_counter()
+            yield captured
+            elapsed = time_module.perf_counter() - started
+
+        executed = len(captured.captured_queries)
+        if executed > max_queries:
+            sql = "\n".join(
+                f"{index}. {query['sql']}" for index, query in enumerate(captured.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {max_queries}:\n{sql}")
+        self.assertLessEqual(
+            elapsed, max_seconds,
+            f"Request took {elapsed:.2f}s, ceiling is {max_seconds:.2f}s ({executed} queries)"
+        )
+
+    def _get(self, url, max_queries, **params):
+        with self.assertQueryBudget(max_queries):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content[:500])
+        return response.json()
+
+    def test_site_list(self):
+        """SiteViewSet.list: strony właściciela i strony zespołu."""
+        data = self._get('/api/v1/sites/', self.QUERY_BUDGETS['site_list'])
+        self.assertEqual(len(data['owned_sites']), 2)
+
+    def test_calendar_data(self):
+        """calendar_data z setkami wydarzeń i rezerwacji."""
+        data = self._get(f'/api/v1/sites/{self.site.id}/calendar-data/', self.QUERY_BUDGETS['calendar_data'])
+        self.assertEqual(len(data['events']), self.EVENTS)
+
+    def test_public_site(self):
+        """PublicSiteView (anonimowy odwiedzający)."""
+        self.client.force_authenticate(user=None)
+        data = self._get(f'/api/v1/public-sites/{self.site.identifier}/', self.QUERY_BUDGETS['public_site'])
+        self.assertEqual(data['id'], self.site.id)
+
+    def test_public_availability(self):
+        """PublicAvailabilityView na dwa tygodnie do przodu."""
+        self.client.force_authenticate(user=None)
+        day = timezone.localdate()
+        data = self._get(
+            f'/api/v1/public-sites/{self.site.id}/availability/', self.QUERY_BUDGETS['public_availability'],
+            start_date=(day + timedelta(days=1)).isoformat(),
+            end_date=(day + timedelta(days=14)).isoformat(),
+        )
+        self.assertTrue(data)
+
+    @patch('api.tasks.send_booking_confirmation_emails.delay')
+    def test_public_booking(self, mock_delay):
+        """PublicBookingView: rezerwacja nowego terminu przez gościa."""
+        self.client.force_authenticate(user=None)
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=90)
+        with self.assertQueryBudget(self.QUERY_BUDGETS['public_booking']):
+            response = self.client.post(f'/api/v1/public-sites/{self.site.id}/bookings/', {
+                'start_time': start.isoformat(),
+                'duration': 60,
+                'guest_name': "Nowy Gość",
+                'guest_email': "guest@example.com",
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content[:500])
+        mock_delay.assert_called_once()
+
+    def test_booking_list(self):
+        """BookingViewSet.list ze wszystkimi rezerwacjami strony."""
+        data = self._get('/api/v1/bookings/', self.QUERY_BUDGETS['booking_list'], site=self.site.id)
+        self.assertEqual(len(data), self.EVENTS * self.BOOKINGS_PER_EVENT)
+
+    def test_testimonials(self):
+        """TestimonialViewSet.list dla właściciela strony."""
+        data = self._get('/api/v1/testimonials/', self.QUERY_BUDGETS['testimonials'], site_id=self.site.id)
+        self.assertEqual(len(data), self.TESTIMONIALS)
+
+    def test_newsletter_stats(self):
+        """newsletter_stats z setkami subskrybentów."""
+        data = self._get(f'/api/v1/newsletter/stats/{self.site.id}/', self.QUERY_BUDGETS['newsletter_stats'])
+        self.assertEqual(data['subscribers']['total'], self.SUBSCRIBERS)
+
+    def test_attendance_report(self):
+        """AttendanceReportView (pierwsze wywołanie robi snapshot zakończonych zajęć)."""
+        data = self._get(
+            f'/api/v1/sites/{self.site.id}/attendance-report/', self.QUERY_BUDGETS['attendance_report'],
+            host_type='owner', host_id=self.owner.id, limit='all',
+        )
+        self.assertTrue(data['rows'])
+        self.assertEqual(len(data['rows']), data['total'])
+
+
 # =============================================================================
 # CUSTOM TEST RUNNER Z PODSUMOWANIEM
 # =============================================================================
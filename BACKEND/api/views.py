@@ -27,14 +27,14 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from allauth.socialaccount.providers.google.views import GoogleOAuth2Adapter
 from allauth.socialaccount.providers.oauth2.client import OAuth2Client
 from dj_rest_auth.registration.views import SocialLoginView
 
+from .authentication import PlatformRefreshToken, RequestCachedJWTAuthentication
+
 # Rate limiting decorators
 from .rate_limiting import (
     rate_limit_strict,
@@ -46,7 +46,6 @@ from .rate_limiting import (
 from .models import (
     PlatformUser,
     Site,
-    SiteVersion,
     Client,
     Event,
     Booking,
@@ -68,6 +67,7 @@ from .models import (
     BigEvent,
     GoogleCalendarIntegration,
     GoogleCalendarEvent,
+    latest_version_prefetch,
 )
 from .media_helpers import (
     cleanup_asset_if_unused,
@@ -77,6 +77,17 @@ from .media_helpers import (
 from .media_storage import StorageError, StorageSaveResult, get_media_storage
 from .permissions import IsOwnerOrTeamMember
 from .signals import ensure_initial_terms_exist, ensure_initial_documents_exist
+from . import calendar_cache, calendar_sync, checkpoints, domain_cache, site_config, site_export, site_snapshots, site_versions
+from .json_patch import JsonPatchError
+from .slot_engine import day_window, read_computed_slots
+from .booking_service import (
+    AlreadyBookedError,
+    EventFullError,
+    adjust_booked_count,
+    book_slot,
+    delete_booking,
+    move_booking,
+)
 from .google_calendar_service import google_calendar_service
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
@@ -237,6 +248,13 @@ MEDIA_TYPE_BY_KIND = {
 }
 
 
+def _parse_query_date(value: str | None):
+    """Parse an optional YYYY-MM-DD query parameter (raises ValueError when malformed)."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
 def sanitize_filename(name: str) -> str:
     base = os.path.basename(name or '')
     base = base.strip() or 'asset'
@@ -656,7 +674,7 @@ class VerifyMagicLinkView(APIView):
         magic_link.mark_as_used()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = PlatformRefreshToken.for_user(user)
         
         logger.info("User %s logged in via magic link", user.email)
         
@@ -949,13 +967,38 @@ class PlatformUserViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
 
 
+class SparseFieldsetViewMixin:
+    """Trims the queryset of read requests to the fields picked with ?fields= / ?omit= (see SparseFieldsetMixin)."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        restrict_queryset = getattr(self.get_serializer_class(), 'restrict_queryset', None)
+        if restrict_queryset and self.request.method in permissions.SAFE_METHODS:
+            return restrict_queryset(queryset, self.request)
+        return queryset
+
+    def wants_field(self, name: str, serializer_class=None) -> bool:
+        """Whether the response of this request includes the top-level field `name`."""
+        serializer_class = serializer_class or self.get_serializer_class()
+        kept = getattr(serializer_class(context={'request': self.request}), 'sparse_field_names', None)
+        return kept is None or name in kept
+
+
 @tag_viewset('Sites')
-class SiteViewSet(viewsets.ModelViewSet):
+class SiteViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = SiteSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrTeamMember]
 
+    # Actions that update template_config load it decoded; read-only responses pass the JSON text through
+    content_actions = {'create', 'update', 'partial_update'}
+    raw_content_actions = {'retrieve', 'update_color', 'calendar_roster'}
+
     def get_queryset(self):
         qs = Site.objects.select_related('owner').all()
+        if self.action in self.content_actions:
+            qs = qs.with_content()
+        elif self.action in self.raw_content_actions and self.wants_field('template_config'):
+            qs = qs.with_raw_content()
         if self.request.user.is_staff:
             return qs
         # Return both owned sites and sites where user is a linked team member
@@ -976,15 +1019,28 @@ class SiteViewSet(viewsets.ModelViewSet):
         
         user = request.user
         
-        # Get owned sites
-        owned_sites = Site.objects.filter(owner=user).select_related('owner')
+        # Get owned sites (trimmed to ?fields= / ?omit=, e.g. the dashboard site picker)
+        owned_sites = Site.objects.filter(owner=user).select_related('owner').with_latest_version()
+        if self.wants_field('template_config', SiteSerializer):
+            owned_sites = owned_sites.with_raw_content()
+        owned_sites = SiteSerializer.restrict_queryset(owned_sites, request)
         owned_serializer = SiteSerializer(owned_sites, many=True, context={'request': request})
         
         # Get sites where user is a linked team member
+        viewer_memberships = TeamMember.objects.filter(
+            invitation_status__in=['pending', 'linked'],
+        ).filter(
+            models.Q(linked_user=user) |
+            models.Q(linked_user__isnull=True, email__iexact=user.email)
+        ).select_related('linked_user')
         team_memberships = TeamMember.objects.filter(
             invitation_status='linked',
             linked_user=user
-        ).select_related('site', 'site__owner')
+        ).select_related('site', 'site__owner').prefetch_related(
+            latest_version_prefetch('site__versions'),
+            models.Prefetch('site__team_members', queryset=viewer_memberships, to_attr='viewer_memberships'),
+        )
+        team_memberships = SiteWithTeamSerializer.restrict_queryset(team_memberships, request, prefix='site__')
         
         team_member_sites = [tm.site for tm in team_memberships]
         team_serializer = SiteWithTeamSerializer(
@@ -1011,29 +1067,79 @@ class SiteViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         """Control update permissions based on team member role."""
         site = self.get_object()
+        logger.info(f"[SiteViewSet.perform_update] User {self.request.user.id} ({self.request.user.email}) attempting to update site {site.id}")
+        self._ensure_can_edit(site)
+        serializer.save()
+
+    def _ensure_can_edit(self, site):
+        """Owner, staff and managers may modify the site configuration."""
         user = self.request.user
-        
-        logger.info(f"[SiteViewSet.perform_update] User {user.id} ({user.email}) attempting to update site {site.id}")
-        
+
         # Owner and staff can always update
-        if site.owner == user or user.is_staff:
-            logger.info(f"[SiteViewSet.perform_update] User is owner or staff - allowing update")
-            serializer.save()
+        if site.owner_id == user.id or user.is_staff:
+            logger.info(f"[SiteViewSet] User is owner or staff - allowing update")
             return
         
         # Check team member role
         role, membership = resolve_site_role(user, site)
-        logger.info(f"[SiteViewSet.perform_update] Resolved role: {role}, membership: {membership}")
+        logger.info(f"[SiteViewSet] Resolved role: {role}, membership: {membership}")
         
         # Manager can update site
         if role == TeamMember.PermissionRole.MANAGER:
-            logger.info(f"[SiteViewSet.perform_update] User is manager - allowing update")
-            serializer.save()
+            logger.info(f"[SiteViewSet] User is manager - allowing update")
             return
         
         # Contributor and Viewer cannot update site configuration
-        logger.warning(f"[SiteViewSet.perform_update] User role {role} cannot update site configuration")
+        logger.warning(f"[SiteViewSet] User role {role} cannot update site configuration")
         raise PermissionDenied('Only site owner and managers can modify site configuration.')
+
+    @action(detail=True, methods=['patch'], url_path='config')
+    def patch_config(self, request, pk=None):
+        """
+        Apply an incremental edit to template_config.
+
+        Body: {"revision": <config_revision>, "patch": [RFC 6902 operations]}
+        or {"revision": ..., "merge_patch": {RFC 7396 object}}, optionally with
+        "version": {"notes", "change_summary"} to also save a SiteVersion.
+        Returns 409 with the current revision when the config changed meanwhile.
+        """
+        site = self.get_object()
+        self._ensure_can_edit(site)
+
+        revision = request.data.get('revision')
+        patch = request.data.get('patch')
+        merge_patch = request.data.get('merge_patch')
+        version = request.data.get('version')
+        if isinstance(revision, bool) or not isinstance(revision, int):
+            return Response({'error': 'revision must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if (patch is None) == (merge_patch is None):
+            return Response({'error': 'Provide exactly one of patch or merge_patch'}, status=status.HTTP_400_BAD_REQUEST)
+        if version is not None and not isinstance(version, dict):
+            return Response({'error': 'version must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = site_config.patch_site_config(
+                site.pk,
+                revision,
+                patch=patch,
+                merge_patch=merge_patch,
+                version=version,
+                created_by=request.user if isinstance(request.user, PlatformUser) else None,
+            )
+        except site_config.ConfigRevisionConflict as exc:
+            return Response(
+                {'error': 'Config was modified by another request', 'config_revision': exc.current_revision},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except JsonPatchError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'id': site.pk,
+            'config_revision': result.revision,
+            'applied': len(result.operations),
+            'version': SiteVersionSerializer(result.version).data if result.version else None,
+        })
     
     def perform_destroy(self, instance):
         """Only owner can delete site. Protects showcase site."""
@@ -1081,6 +1187,11 @@ class SiteViewSet(viewsets.ModelViewSet):
         Optional query params:
         - start_date: Filter events/blocks from this date (YYYY-MM-DD)
         - end_date: Filter events/blocks to this date (YYYY-MM-DD)
+        - since: Cursor from a previous response; only rows changed since then
+          are returned, plus ids deleted since then under `deleted`
+
+        Every response carries a `cursor` for the next delta request. `full` is
+        True when the payload is a complete snapshot (no or expired cursor).
         """
         site = self.get_object()
         
@@ -1088,38 +1199,71 @@ class SiteViewSet(viewsets.ModelViewSet):
         # Public sites need to show all events and availability blocks
 
         # Get query params for date filtering
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+        try:
+            start_date = _parse_query_date(request.query_params.get('start_date'))
+            end_date = _parse_query_date(request.query_params.get('end_date'))
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch events for this site
-        events_qs = Event.objects.filter(site=site).select_related(
-            'site', 'site__owner', 'creator'
-        ).prefetch_related('bookings', 'bookings__client')
-        
+        since_cursor = request.query_params.get('since')
+        if since_cursor:
+            try:
+                since = calendar_sync.sync_window_start(since_cursor)
+            except calendar_sync.InvalidCursor:
+                return Response({'error': 'Invalid since cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            # Tombstones older than the retention window may be gone - fall back to a full snapshot
+            if not calendar_sync.cursor_expired(since):
+                return Response(self._build_calendar_data(request, site, start_date, end_date, since=since))
+
+        data, cache_status = calendar_cache.get_or_build(
+            'calendar_data',
+            site.pk,
+            {'start_date': start_date, 'end_date': end_date},
+            lambda: self._build_calendar_data(request, site, start_date, end_date),
+        )
+        response = Response(data)
+        response['X-Cache'] = cache_status
+        return response
+
+    def _build_calendar_data(self, request, site, start_date, end_date, since=None):
+        # Taken before querying, so rows changed while we read are re-sent next time
+        cursor = calendar_sync.encode_cursor(timezone.now())
+
+        # Fetch events for this site (relations declared by the serializer)
+        events_qs = EventSerializer.setup_eager_loading(Event.objects.filter(site=site))
+        if since is not None:
+            events_qs = events_qs.filter(updated_at__gte=since)
+        
+        # Half-open window on the bare column, so the (site, start_time) index applies
         if start_date:
-            events_qs = events_qs.filter(date__gte=start_date)
+            events_qs = events_qs.filter(start_time__gte=day_window(start_date, start_date)[0])
         if end_date:
-            events_qs = events_qs.filter(date__lte=end_date)
+            events_qs = events_qs.filter(start_time__lt=day_window(end_date, end_date)[1])
         
         # Fetch availability blocks for this site
-        blocks_qs = AvailabilityBlock.objects.filter(site=site).select_related(
-            'site', 'site__owner', 'creator'
-        )
+        blocks_qs = AvailabilityBlockSerializer.setup_eager_loading(AvailabilityBlock.objects.filter(site=site))
+        if since is not None:
+            blocks_qs = blocks_qs.filter(updated_at__gte=since)
         
         if start_date:
             blocks_qs = blocks_qs.filter(date__gte=start_date)
         if end_date:
             blocks_qs = blocks_qs.filter(date__lte=end_date)
 
-        # Serialize the data
+        # Serialize the data (plain lists, so the cached value does not hold the serializer)
         events_data = EventSerializer(events_qs, many=True, context={'request': request}).data
         blocks_data = AvailabilityBlockSerializer(blocks_qs, many=True, context={'request': request}).data
 
-        return Response({
+        data = {
             'site_id': site.id,
-            'events': events_data,
-            'availability_blocks': blocks_data,
-        })
+            'events': list(events_data),
+            'availability_blocks': list(blocks_data),
+            'cursor': cursor,
+            'full': since is None,
+        }
+        if since is not None:
+            data['deleted'] = calendar_sync.deleted_since(site.id, since)
+        return data
 
     def perform_create(self, serializer):
         """
@@ -1186,8 +1330,7 @@ class SiteViewSet(viewsets.ModelViewSet):
     def versions(self, request, pk=None):
         """Return the list of saved versions for the site."""
         site = self.get_object()
-        versions = site.versions.order_by('-version_number')
-        serializer = SiteVersionSerializer(versions, many=True)
+        serializer = SiteVersionSerializer(site_versions.list_versions(site), many=True)
         return Response(serializer.data)
 
     @versions.mapping.post
@@ -1201,27 +1344,24 @@ class SiteViewSet(viewsets.ModelViewSet):
         notes = request.data.get('notes', '')
         change_summary = request.data.get('change_summary', '')
 
-        with transaction.atomic():
-            last_version = site.versions.order_by('-version_number').first()
-            next_number = (last_version.version_number + 1) if last_version else 1
-            created_by = request.user if isinstance(request.user, PlatformUser) else None
+        version = site_versions.create_version(
+            site,
+            template_config,
+            notes=notes,
+            change_summary=change_summary,
+            created_by=request.user if isinstance(request.user, PlatformUser) else None,
+        )
+        serializer = SiteVersionSerializer(version)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-            version = SiteVersion.objects.create(
-                site=site,
-                version_number=next_number,
-                template_config=template_config,
-                notes=notes,
-                change_summary=change_summary,
-                created_by=created_by,
-            )
 
-            # enforce retention: keep latest 10 versions
-            version_ids = list(site.versions.order_by('-version_number').values_list('id', flat=True))
-            if len(version_ids) > 10:
-                site.versions.filter(id__in=version_ids[10:]).delete()
+class EagerLoadingViewMixin:
+    """Applies the serializer's declared select/prefetch requirements to every queryset the view reads."""
 
-        serializer = SiteVersionSerializer(version)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        setup_eager_loading = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        return setup_eager_loading(queryset) if setup_eager_loading else queryset
 
 
 class SiteScopedMixin:
@@ -1343,7 +1483,7 @@ class ClientViewSet(SiteScopedMixin, viewsets.ModelViewSet):
 
 
 @tag_viewset('Events')
-class EventViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+class EventViewSet(EagerLoadingViewMixin, SiteScopedMixin, viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [IsAuthenticated]
     
@@ -1390,7 +1530,8 @@ class EventViewSet(SiteScopedMixin, viewsets.ModelViewSet):
         return role_map, membership_map
 
     def get_queryset(self):
-        qs = Event.objects.select_related('site', 'site__owner', 'creator').prefetch_related('bookings', 'bookings__client')
+        # Serializer relations are added by EagerLoadingViewMixin
+        qs = Event.objects.select_related('site', 'site__owner', 'creator')
         user = self.request.user
         if user.is_staff:
             return self._filter_by_site_param(qs)
@@ -1493,7 +1634,7 @@ class EventViewSet(SiteScopedMixin, viewsets.ModelViewSet):
 
 
 @tag_viewset('Bookings')
-class BookingViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+class BookingViewSet(SparseFieldsetViewMixin, EagerLoadingViewMixin, SiteScopedMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
 
@@ -1522,18 +1663,23 @@ class BookingViewSet(SiteScopedMixin, viewsets.ModelViewSet):
     def perform_create(self, serializer):
         site = serializer.validated_data['site']
         self._ensure_site_access(site)
-        booking = serializer.save()
+        with transaction.atomic():
+            booking = serializer.save()
+            adjust_booked_count(booking.event_id, 1)
         self._sync_attendance(booking)
 
     def perform_update(self, serializer):
         site = serializer.validated_data.get('site', serializer.instance.site)
         self._ensure_site_access(site)
-        booking = serializer.save()
+        previous_event_id = serializer.instance.event_id
+        with transaction.atomic():
+            booking = serializer.save()
+            move_booking(booking, previous_event_id)
         self._sync_attendance(booking)
 
     def perform_destroy(self, instance):
         self._ensure_site_access(instance.site)
-        instance.delete()
+        delete_booking(instance)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -1577,8 +1723,8 @@ class BookingViewSet(SiteScopedMixin, viewsets.ModelViewSet):
             attachment_mimetype='text/calendar; method=CANCEL; charset=UTF-8'
         )
         
-        # Delete the booking
-        booking.delete()
+        # Delete the booking and release its spot
+        delete_booking(booking)
         
         return Response({'message': 'Spotkanie zostało odwołane, klient otrzymał powiadomienie email'})
 
@@ -1670,8 +1816,8 @@ class BookingViewSet(SiteScopedMixin, viewsets.ModelViewSet):
             attachment_mimetype='text/calendar; method=CANCEL; charset=UTF-8'
         )
         
-        # Delete the booking
-        booking.delete()
+        # Delete the booking and release its spot
+        delete_booking(booking)
         
         return Response({'message': 'Rezerwacja została odwołana'})
 
@@ -1725,7 +1871,7 @@ class BookingViewSet(SiteScopedMixin, viewsets.ModelViewSet):
 
 
 @tag_viewset('Availability')
-class AvailabilityBlockViewSet(SiteScopedMixin, viewsets.ModelViewSet):
+class AvailabilityBlockViewSet(EagerLoadingViewMixin, SiteScopedMixin, viewsets.ModelViewSet):
     serializer_class = AvailabilityBlockSerializer
     permission_classes = [IsAuthenticated]
     
@@ -1857,11 +2003,15 @@ class TemplateViewSet(viewsets.ModelViewSet):
 
 
 @extend_schema(tags=['Public Sites'])
-class PublicSiteListView(generics.ListAPIView):
-    queryset = Site.objects.select_related('owner').order_by('name')
+class PublicSiteListView(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = PublicSiteSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = Site.objects.select_related('owner').order_by('name')
+        # ?omit=template_config (site pickers) skips the large column entirely
+        return queryset.with_raw_content() if self.wants_field('template_config') else queryset
+
 
 @extend_schema(tags=['Public Sites'])
 class PublicSiteView(generics.RetrieveAPIView):
@@ -1874,49 +2024,30 @@ class PublicSiteView(generics.RetrieveAPIView):
        - Used when a custom domain proxies to a site via Cloudflare Worker
        - Checks DomainOrder for active domain with matching domain_name
     """
-    queryset = Site.objects.select_related('owner')
+    queryset = Site.objects.select_related('owner').with_raw_content()
     serializer_class = PublicSiteSerializer
     permission_classes = [AllowAny]
     lookup_field = 'identifier'
 
+    def retrieve(self, request, *args, **kwargs):
+        # Pre-encoded snapshot (see api/site_snapshots.py): no ORM access on a hit, 304 on a matching ETag
+        cached = site_snapshots.serve_snapshot(request, identifier=self.kwargs.get('identifier'))
+        if cached is not None:
+            return cached
+        return site_snapshots.snapshot_response(request, site_snapshots.snapshot_for_site(self.get_object()))
+
     def get_object(self):
         identifier = self.kwargs.get('identifier')
         
-        # First, try standard lookup by identifier
-        site = Site.objects.filter(identifier=identifier).select_related('owner').first()
+        # Lookup by site identifier, with fallback to a custom domain name. This happens when a
+        # custom domain (e.g. bohdanpage.eu) proxies to a site via the Cloudflare Worker and the
+        # frontend extracts the hostname as identifier. Resolutions (including misses) are cached
+        # in api/domain_cache.py, so unknown names do not reach the database.
+        site_id = domain_cache.resolve_site_id(identifier)
+        site = Site.objects.filter(pk=site_id).select_related('owner').with_raw_content().first() if site_id else None
         if site:
             return site
         
-        # Fallback: Check if identifier is a custom domain name
-        # This happens when a custom domain (e.g., bohdanpage.eu) proxies to a site
-        # and the frontend extracts the hostname as identifier
-        domain_order = DomainOrder.objects.filter(
-            domain_name=identifier,
-            status=DomainOrder.OrderStatus.ACTIVE
-        ).select_related('site').first()
-        
-        if domain_order:
-            # Case 1: Domain has a linked site
-            if domain_order.site:
-                logger.info(f"[PublicSiteView] Fallback: Found site via domain '{identifier}' -> site '{domain_order.site.identifier}'")
-                return domain_order.site
-            
-            # Case 2: Domain has no linked site but has a target URL
-            # Extract site identifier from target (e.g., "1-pokazowa.youreasysite.pl" -> "1-pokazowa")
-            if domain_order.target:
-                target = domain_order.target
-                # Normalize target: remove protocol and trailing slash
-                # e.g., "https://1-pokazowa.youreasysite.pl/" -> "1-pokazowa.youreasysite.pl"
-                target = target.replace('https://', '').replace('http://', '').rstrip('/')
-                
-                # Check if target is a youreasysite.pl subdomain
-                if target.endswith('.youreasysite.pl'):
-                    target_identifier = target.replace('.youreasysite.pl', '')
-                    site = Site.objects.filter(identifier=target_identifier).select_related('owner').first()
-                    if site:
-                        logger.info(f"[PublicSiteView] Fallback: Found site via domain target '{identifier}' -> '{target}' -> site '{site.identifier}'")
-                        return site
-        
         # If still not found, raise 404 using DRF's Http404
         from rest_framework.exceptions import NotFound
         raise NotFound(detail=f"Site with identifier '{identifier}' not found")
@@ -1924,12 +2055,18 @@ class PublicSiteView(generics.RetrieveAPIView):
 
 @extend_schema(tags=['Public Sites'])
 class PublicSiteByIdView(generics.RetrieveAPIView):
-    queryset = Site.objects.select_related('owner')
+    queryset = Site.objects.select_related('owner').with_raw_content()
     serializer_class = PublicSiteSerializer
     permission_classes = [AllowAny]
     lookup_field = 'pk'
     lookup_url_kwarg = 'site_id'
 
+    def retrieve(self, request, *args, **kwargs):
+        cached = site_snapshots.serve_snapshot(request, site_id=self.kwargs.get('site_id'))
+        if cached is not None:
+            return cached
+        return site_snapshots.snapshot_response(request, site_snapshots.snapshot_for_site(self.get_object()))
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -1963,7 +2100,7 @@ def demo_config_view(request):
 class FileUploadView(APIView):
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]  # Only JWT auth, no session auth = no CSRF needed
+    authentication_classes = [RequestCachedJWTAuthentication]  # Only JWT auth, no session auth = no CSRF needed
 
     @extend_schema(
         tags=['Media'],
@@ -2375,6 +2512,8 @@ def publish_site(request, site_id):
         'subdomain': site.subdomain,
         'is_published': site.is_published,
         'published_at': site.published_at,
+        # Filled in by tasks.export_site_bundle shortly after publishing (api/site_export.py)
+        'static_bundle_url': site.static_bundle_url,
     })
 
 
@@ -3103,7 +3242,7 @@ class AdminSitesListView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        sites = Site.objects.select_related('owner').all().order_by('-created_at')
+        sites = Site.objects.select_related('owner').with_raw_content().order_by('-created_at')
         serializer = SiteSerializer(sites, many=True)
         return Response(serializer.data)
 
@@ -3116,7 +3255,7 @@ from datetime import datetime, time, timedelta
 @extend_schema(
     tags=['Public Calendar'],
     summary='Get available booking slots for a site',
-    description='Returns computed time slots based on availability blocks and existing events. Uses the unified calendar-data endpoint internally.',
+    description='Returns precomputed time slots based on availability blocks and existing events, read from the materialized slot table.',
     parameters=[
         OpenApiParameter('site_id', OpenApiTypes.INT, location=OpenApiParameter.PATH, description='ID of the site'),
         OpenApiParameter('start_date', OpenApiTypes.DATE, location=OpenApiParameter.QUERY, description='Start date (YYYY-MM-DD)'),
@@ -3127,36 +3266,6 @@ from datetime import datetime, time, timedelta
 class PublicAvailabilityView(APIView):
     permission_classes = [AllowAny]
 
-    def _get_assignee_info(self, obj):
-        """Helper method to extract assignee information from Event or AvailabilityBlock"""
-        if hasattr(obj, 'assigned_to_team_member') and obj.assigned_to_team_member:
-            member = obj.assigned_to_team_member
-            # TeamMember doesn't have first_name/last_name, use name or linked_user
-            if member.linked_user:
-                name = member.linked_user.get_full_name() or member.linked_user.email
-            else:
-                name = member.name or member.email or 'Członek zespołu'
-            return {
-                'type': 'team_member',
-                'id': member.id,
-                'name': name
-            }
-        elif hasattr(obj, 'assigned_to_owner') and obj.assigned_to_owner:
-            owner = obj.assigned_to_owner
-            return {
-                'type': 'owner',
-                'id': owner.id,
-                'name': owner.get_full_name() or owner.email
-            }
-        else:
-            # Fallback to creator or site owner
-            creator = getattr(obj, 'creator', None) or getattr(obj, 'site', None).owner
-            return {
-                'type': 'owner',
-                'id': creator.id if creator else None,
-                'name': creator.get_full_name() if creator else 'Instruktor'
-            }
-
     def get(self, request, site_id, *args, **kwargs):
         try:
             site = Site.objects.get(pk=site_id)
@@ -3175,179 +3284,17 @@ class PublicAvailabilityView(APIView):
         except ValueError:
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fetch data using the unified calendar-data endpoint logic
-        # This ensures consistent data source across Studio and public calendars
-        events_qs = Event.objects.filter(
-            site=site,
-            start_time__date__gte=start_date,
-            start_time__date__lte=end_date
-        ).select_related('site', 'site__owner', 'creator').prefetch_related('bookings', 'bookings__client')
-        
-        blocks_qs = AvailabilityBlock.objects.filter(
-            site=site,
-            date__gte=start_date,
-            date__lte=end_date
-        ).select_related('site', 'site__owner', 'creator')
-        
-        availability_blocks = list(blocks_qs)
-        existing_events = list(events_qs)
-
-        booked_slots = set()
-        for event in existing_events:
-            # Sprawdź, czy wydarzenie jest w pełni zarezerwowane
-            if event.bookings.count() >= event.capacity:
-                booked_slots.add(event.start_time)
-
-        slot_map = {}
-        
-        # Generuj sloty na podstawie bloków dostępności
-        for block in availability_blocks:
-            meeting_length = block.meeting_length or 0
-            if meeting_length <= 0:
-                logger.warning(
-                    "Skipping availability block %s (site=%s) due to invalid meeting_length=%s",
-                    block.id,
-                    site.id,
-                    meeting_length,
-                )
-                continue
-
-            snapping_interval = block.time_snapping or 0
-            if snapping_interval <= 0:
-                logger.warning(
-                    "Falling back to meeting_length for time_snapping in block %s (site=%s); time_snapping=%s",
-                    block.id,
-                    site.id,
-                    block.time_snapping,
-                )
-                snapping_interval = meeting_length
-
-            tz = timezone.get_current_timezone()
-            block_start = datetime.combine(block.date, block.start_time)
-            block_end = datetime.combine(block.date, block.end_time)
-            current_time = timezone.make_aware(block_start, tz)
-            end_time = timezone.make_aware(block_end, tz)
-
-            assignee_info = self._get_assignee_info(block)
-            iterations = 0
-            max_iterations = 1440  # safety guard (max minutes per day)
-
-            while current_time + timedelta(minutes=meeting_length) <= end_time:
-                iterations += 1
-                if iterations > max_iterations:
-                    logger.warning(
-                        "Breaking availability block %s (site=%s) due to iteration guard",
-                        block.id,
-                        site.id,
-                    )
-                    break
-                slot_start = current_time
-                slot_end = slot_start + timedelta(minutes=meeting_length)
-                
-                # Include assignee in slot key to support multiple events at same time for different assignees
-                assignee_key = f"{assignee_info['type']}:{assignee_info['id']}"
-                slot_key = f"{slot_start.isoformat()}|{assignee_key}"
-
-                # Znajdź istniejące wydarzenie dla tego slotu (jeśli istnieje)
-                matching_event = next(
-                    (e for e in existing_events if e.start_time == slot_start and e.end_time == slot_end),
-                    None
-                )
-                
-                # Sprawdź, czy slot nie jest już zajęty
-                if slot_start not in booked_slots:
-                    is_conflicting = any(
-                        (e.start_time < slot_end and e.end_time > slot_start)
-                        for e in existing_events if e.bookings.count() >= e.capacity
-                    )
-                    if not is_conflicting:
-                        if matching_event:
-                            capacity = matching_event.capacity
-                            booked_count = matching_event.bookings.count()
-                            available_spots = max(capacity - booked_count, 0)
-                            event_type = matching_event.event_type
-                            event_id = matching_event.id
-                        else:
-                            capacity = 1
-                            available_spots = 1
-                            event_type = 'individual'
-                            event_id = None
-
-                        if slot_key not in slot_map:
-                            event_assignee_info = self._get_assignee_info(matching_event) if matching_event else assignee_info
-                            slot_map[slot_key] = {
-                                'start': slot_start.isoformat(),
-                                'end': slot_end.isoformat(),
-                                'duration': meeting_length,
-                                'capacity': capacity,
-                                'available_spots': available_spots,
-                                'event_type': event_type,
-                                'event_id': event_id,
-                                'assignee_type': event_assignee_info['type'],
-                                'assignee_id': event_assignee_info['id'],
-                                'assignee_name': event_assignee_info['name']
-                            }
-
-                current_time += timedelta(minutes=snapping_interval)
-
-        # Dodaj istniejące wydarzenia, które nie były objęte blokami dostępności
-        for event in existing_events:
-            event_assignee_info = self._get_assignee_info(event)
-            assignee_key = f"{event_assignee_info['type']}:{event_assignee_info['id']}"
-            slot_key = f"{event.start_time.isoformat()}|{assignee_key}"
-            
-            booked_count = event.bookings.count()
-            capacity = event.capacity
-            available_spots = max(capacity - booked_count, 0)
-
-            if available_spots <= 0:
-                continue
-
-            if slot_key not in slot_map:
-                slot_map[slot_key] = {
-                    'start': event.start_time.isoformat(),
-                    'end': event.end_time.isoformat(),
-                    'duration': int((event.end_time - event.start_time).total_seconds() // 60),
-                    'capacity': capacity,
-                    'available_spots': available_spots,
-                    'event_type': event.event_type,
-                    'event_id': event.id,
-                    'assignee_type': event_assignee_info['type'],
-                    'assignee_id': event_assignee_info['id'],
-                    'assignee_name': event_assignee_info['name']
-                }
-            else:
-                # Upewnij się, że dane eventu mają pierwszeństwo (np. większa pojemność)
-                existing_slot = slot_map[slot_key]
-                existing_slot['capacity'] = max(existing_slot['capacity'], event.capacity)
-                existing_slot['available_spots'] = available_spots
-                existing_slot['event_type'] = event.event_type
-                existing_slot['event_id'] = event.id
-                existing_slot['assignee_type'] = event_assignee_info['type']
-                existing_slot['assignee_id'] = event_assignee_info['id']
-                existing_slot['assignee_name'] = event_assignee_info['name']
-
-        # Filter out slots that have already ended
-        now = timezone.now()
-        filtered_slots = []
-        for slot in slot_map.values():
-            end_str = slot['end']
-            # Handle both 'Z' suffix and '+00:00' timezone formats
-            if end_str.endswith('Z'):
-                end_str = end_str[:-1] + '+00:00'
-            try:
-                slot_end = datetime.fromisoformat(end_str)
-                if timezone.is_naive(slot_end):
-                    slot_end = timezone.make_aware(slot_end)
-                if slot_end > now:
-                    filtered_slots.append(slot)
-            except (ValueError, TypeError):
-                # If parsing fails, include the slot to be safe
-                filtered_slots.append(slot)
-        
-        sorted_slots = sorted(filtered_slots, key=lambda x: x['start'])
-
-        return Response(sorted_slots)
+        # Slots are materialized by signals (see slot_engine.refresh_computed_slots);
+        # responses are cached per calendar version, which every write bumps
+        slots, cache_status = calendar_cache.get_or_build(
+            'availability',
+            site.pk,
+            {'start_date': start_date, 'end_date': end_date},
+            lambda: read_computed_slots(site, start_date, end_date),
+        )
+        response = Response(slots)
+        response['X-Cache'] = cache_status
+        return response
 
 
 @extend_schema(
@@ -3435,58 +3382,38 @@ class PublicBookingView(APIView):
         elif assigned_to_owner is None:
             assigned_to_owner = site.owner
 
-        # Sprawdź, czy istnieje już wydarzenie grupowe na ten slot, które ma wolne miejsca
         # Zgodnie z sugestią, traktujemy wszystkie wydarzenia jako grupowe. Indywidualne mają po prostu `capacity=1`.
-        event_lookup = {
-            'site': site,
-            'start_time': start_time,
-            'end_time': end_time,
-            'assigned_to_team_member': assigned_to_team_member,
-            'assigned_to_owner': assigned_to_owner,
-        }
-
         event_defaults = {
             'creator': site.owner,
             'title': f'Sesja z {guest_name}',
             'capacity': 1,  # Domyślnie sesja indywidualna. Można to pobrać z konfiguracji modułu w przyszłości.
             'event_type': 'individual',  # lub 'group'
         }
-        if assigned_to_team_member is not None:
-            event_defaults['assigned_to_team_member'] = assigned_to_team_member
-            event_defaults['assigned_to_owner'] = None
-        else:
-            event_defaults['assigned_to_owner'] = assigned_to_owner
-            event_defaults['assigned_to_team_member'] = None
-
-        event, created = Event.objects.get_or_create(
-            defaults=event_defaults,
-            **event_lookup
-        )
 
-        # Sprawdź, czy użytkownik już jest zapisany na to wydarzenie
-        existing_booking = Booking.objects.filter(
-            event=event,
-            guest_email=guest_email
-        ).first()
-        
-        if existing_booking:
+        # Slot jest blokowany na czas transakcji: wydarzenie powstaje raz, a miejsca nie są przekraczane
+        try:
+            booking = book_slot(
+                site,
+                start_time=start_time,
+                end_time=end_time,
+                assigned_to_owner=assigned_to_owner,
+                assigned_to_team_member=assigned_to_team_member,
+                event_defaults=event_defaults,
+                client=client,
+                guest_name=guest_name,
+                guest_email=guest_email
+            )
+        except AlreadyBookedError as exc:
             return Response({
                 'error': 'You are already registered for this event',
-                'booking_id': existing_booking.id
+                'code': 'already_booked',
+                'booking_id': exc.booking.id
+            }, status=status.HTTP_409_CONFLICT)
+        except EventFullError:
+            return Response({
+                'error': 'This time slot is no longer available',
+                'code': 'slot_full'
             }, status=status.HTTP_409_CONFLICT)
-
-        # Sprawdź, czy są wolne miejsca
-        if event.bookings.count() >= event.capacity:
-            return Response({'error': 'This time slot is no longer available'}, status=status.HTTP_409_CONFLICT)
-
-        # Stwórz rezerwację
-        booking = Booking.objects.create(
-            site=site,
-            event=event,
-            client=client,
-            guest_name=guest_name,
-            guest_email=guest_email
-        )
 
         # Uruchom zadanie wysyłania e-maili
         from .tasks import send_booking_confirmation_emails
@@ -3511,39 +3438,18 @@ class PublicTeamView(APIView):
 
     def get(self, request, site_id, *args, **kwargs):
         try:
-            site = Site.objects.get(pk=site_id)
+            site = Site.objects.select_related('owner').get(pk=site_id)
         except Site.DoesNotExist:
             return Response({'error': 'Site not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get all active team members (including mock, invited, pending, and linked)
-        # This allows displaying team members on the public site even if they haven't accepted invitations
-        team_members = TeamMember.objects.filter(
-            site=site,
-            is_active=True
-        ).order_by('created_at')
-        
-        members_data = list(PublicTeamMemberSerializer(team_members, many=True).data)
-        
-        # Add site owner as the first team member
-        owner = site.owner
-        owner_data = {
-            'id': f'owner-{owner.id}',
-            'name': f'{owner.first_name} {owner.last_name}' if owner.first_name or owner.last_name else owner.email,
-            'first_name': owner.first_name or '',
-            'last_name': owner.last_name or '',
-            'role': owner.role_description or 'Właściciel',
-            'image': owner.public_image_url or owner.avatar_url or '',
-            'is_owner': True
-        }
-        
-        # Insert owner at the beginning
-        members_data.insert(0, owner_data)
+        # Shared with the static site bundle (api/site_export.py)
+        members_data = site_export.public_team_payload(site)
         
         return Response(members_data)
 
 
 # Team Member Views
-class TeamMemberViewSet(viewsets.ModelViewSet):
+class TeamMemberViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for managing team members (Owner only)."""
     serializer_class = TeamMemberSerializer
     permission_classes = [IsAuthenticated]
@@ -4027,7 +3933,7 @@ class AttendanceReportView(APIView):
         if host_member:
             queryset = queryset.filter(host_team_member=host_member)
 
-        queryset = queryset.order_by('-start_time')
+        queryset = AttendedSessionSerializer.setup_eager_loading(queryset.order_by('-start_time'))
         total = queryset.count()
         if limit is not None:
             queryset = queryset[:limit]
@@ -5860,35 +5766,24 @@ def resolve_domain(request, domain):
     Response: {"target": "youtube.com"} or {"target": "1234-mysite.youreasysite.pl"}
     """
     try:
-        # Find active domain order
-        domain_order = DomainOrder.objects.filter(
-            domain_name=domain,
-            status=DomainOrder.OrderStatus.ACTIVE
-        ).first()
+        # Active domain orders are cached in two tiers (api/domain_cache.py), misses included
+        resolution = domain_cache.resolve_host(domain)
         
-        if not domain_order:
+        if not resolution:
             logger.warning(f"[Domain Resolve] Domain not found or not active: {domain}")
             return Response(
                 {'error': 'Domain not configured'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get target URL - if not set, use site subdomain
-        target = domain_order.target
-        if not target:
-            # Default to site subdomain
-            site = domain_order.site
-            target = f"{site.identifier}.youreasysite.pl"
-            logger.info(f"[Domain Resolve] No target set, using default: {target}")
-        
-        logger.info(f"[Domain Resolve] {domain} -> {target}")
+        logger.info(f"[Domain Resolve] {domain} -> {resolution.target}")
         
         return Response({
-            'target': target,
-            'proxy_mode': domain_order.proxy_mode,
+            'target': resolution.target,
+            'proxy_mode': resolution.proxy_mode,
             'domain': domain,
-            'site_id': domain_order.site.id,
-            'site_name': domain_order.site.name
+            'site_id': resolution.site_id,
+            'site_name': resolution.site_name
         })
         
     except Exception as e:
@@ -6493,43 +6388,17 @@ class BigEventViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         """Create checkpoint before updating event (for AI undo/redo)."""
-        import uuid
-        
         event = self.get_object()
         
         # Create checkpoint of current state
-        checkpoint_id = str(uuid.uuid4())
-        checkpoint = {
-            'id': checkpoint_id,
-            'timestamp': timezone.now().isoformat(),
-            'data': {
-                'title': event.title,
-                'description': event.description,
-                'location': event.location,
-                'start_date': event.start_date.isoformat() if event.start_date else None,
-                'end_date': event.end_date.isoformat() if event.end_date else None,
-                'max_participants': event.max_participants,
-                'price': str(event.price),
-                'image_url': event.image_url,
-                'details': event.details
-            },
-            'message': f'Przed zmianą (API update)'
-        }
-        
-        # Get existing checkpoints
-        checkpoints = event.ai_checkpoints or []
-        
-        # Add new checkpoint at the beginning
-        checkpoints.insert(0, checkpoint)
-        
-        # Keep only last 20 checkpoints
-        checkpoints = checkpoints[:20]
-        
-        # Update checkpoints before saving
-        event.ai_checkpoints = checkpoints
-        event.save(update_fields=['ai_checkpoints'])
+        checkpoint = checkpoints.create_checkpoint(
+            event.site,
+            checkpoints.big_event_state(event),
+            'Przed zmianą (API update)',
+            big_event=event,
+        )
         
-        logger.info(f"[BigEvent] Created checkpoint {checkpoint_id} before update for event {event.id}")
+        logger.info(f"[BigEvent] Created checkpoint {checkpoint.checkpoint_id} before update for event {event.id}")
         
         # Perform actual update
         serializer.save()
@@ -6587,44 +6456,14 @@ class BigEventViewSet(viewsets.ModelViewSet):
 @permission_classes([AllowAny])
 def public_big_events(request, identifier):
     """Return published big events for the public site view."""
-    from .models import Site, BigEvent
+    from .models import Site
 
     try:
         site = Site.objects.get(identifier=identifier)
     except Site.DoesNotExist:
         return Response({'error': 'Strona nie istnieje'}, status=status.HTTP_404_NOT_FOUND)
 
-    events = BigEvent.objects.filter(
-        site=site,
-        status=BigEvent.Status.PUBLISHED
-    ).order_by('start_date', '-created_at')
-
-    payload = []
-    for event in events:
-        details = event.details or {}
-        gallery = details.get('images') or []
-        if event.image_url and event.image_url not in gallery:
-            gallery = [*gallery, event.image_url]
-
-        payload.append({
-            'id': event.id,
-            'title': event.title,
-            'summary': details.get('summary') or event.description,
-            'description': event.description,
-            'location': event.location,
-            'start_date': event.start_date,
-            'end_date': event.end_date,
-            'tag': details.get('tag') or details.get('category'),
-            'price': str(event.price),
-            'image_url': event.image_url,
-            'gallery': gallery,
-            'full_description': details.get('full_description') or event.description,
-            'cta_label': details.get('cta_label'),
-            'cta_url': details.get('cta_url'),
-            'max_participants': event.max_participants,
-            'current_participants': event.current_participants,
-            'published_at': event.published_at,
-        })
+    payload = site_export.public_events_payload(site)
 
     return Response({
         'site': {
@@ -6778,7 +6617,8 @@ def pexels_search_images(request, site_id):
     from datetime import date
     
     # Attempt optional JWT authentication so expired tokens don't block public access
-    jwt_auth = JWTAuthentication()
+    # (reuses the token TemporaryPasswordMiddleware already decoded)
+    jwt_auth = RequestCachedJWTAuthentication()
     try:
         user_auth = jwt_auth.authenticate(request)
         if user_auth is not None:
@@ -7185,10 +7025,8 @@ def pexels_quota(request, site_id):
 @permission_classes([IsAuthenticated])
 def create_checkpoint(request, site_id):
     """Create a checkpoint of current site state before AI changes."""
-    import uuid
-    
     try:
-        site = Site.objects.get(id=site_id, owner=request.user)
+        site = Site.objects.with_content().get(id=site_id, owner=request.user)
     except Site.DoesNotExist:
         return Response(
             {'error': 'Site not found or access denied'},
@@ -7197,31 +7035,13 @@ def create_checkpoint(request, site_id):
     
     message = request.data.get('message', 'AI checkpoint')
     
-    # Create checkpoint
-    checkpoint_id = str(uuid.uuid4())
-    checkpoint = {
-        'id': checkpoint_id,
-        'timestamp': timezone.now().isoformat(),
-        'config': site.template_config,
-        'message': message
-    }
-    
-    # Get existing checkpoints
-    checkpoints = site.ai_checkpoints or []
-    
-    # Add new checkpoint at the beginning
-    checkpoints.insert(0, checkpoint)
+    # Stored as a delta against the latest base (see api/checkpoints.py)
+    checkpoint = checkpoints.create_checkpoint(site, site.template_config, message)
     
-    # Keep only last 20 checkpoints
-    checkpoints = checkpoints[:20]
-    
-    site.ai_checkpoints = checkpoints
-    site.save(update_fields=['ai_checkpoints'])
-    
-    logger.info(f"[Checkpoint] Created checkpoint {checkpoint_id} for site {site_id}")
+    logger.info(f"[Checkpoint] Created checkpoint {checkpoint.checkpoint_id} for site {site_id}")
     
     return Response({
-        'checkpoint_id': checkpoint_id,
+        'checkpoint_id': checkpoint.checkpoint_id,
         'message': 'Checkpoint created successfully'
     }, status=status.HTTP_201_CREATED)
 
@@ -7230,36 +7050,38 @@ def create_checkpoint(request, site_id):
 @permission_classes([IsAuthenticated])
 def restore_checkpoint(request, site_id, checkpoint_id):
     """Restore site to a previous checkpoint state."""
-    try:
-        site = Site.objects.get(id=site_id, owner=request.user)
-    except Site.DoesNotExist:
-        return Response(
-            {'error': 'Site not found or access denied'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    checkpoints = site.ai_checkpoints or []
-    
-    # Find checkpoint
-    checkpoint = next((c for c in checkpoints if c['id'] == checkpoint_id), None)
-    
-    if not checkpoint:
-        return Response(
-            {'error': 'Checkpoint not found'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    # Restore config
-    site.template_config = checkpoint['config']
-    site.save(update_fields=['template_config'])
-    
+    with transaction.atomic():
+        # Lock the row like site_config.patch_site_config so a concurrent edit is not lost
+        try:
+            site = Site.objects.select_for_update().get(id=site_id, owner=request.user)
+        except Site.DoesNotExist:
+            return Response(
+                {'error': 'Site not found or access denied'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        config = checkpoints.checkpoint_config(site, checkpoint_id)
+
+        if config is None:
+            return Response(
+                {'error': 'Checkpoint not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Restore config
+        site.template_config = config
+        site.config_revision = F('config_revision') + 1
+        site.save(update_fields=['template_config', 'config_revision'])
+        site.refresh_from_db(fields=['config_revision'])
+
     logger.info(f"[Checkpoint] Restored checkpoint {checkpoint_id} for site {site_id}")
     
     return Response({
         'message': 'Checkpoint restored successfully',
         'site': {
             'id': site.id,
-            'template_config': site.template_config
+            'template_config': site.template_config,
+            'config_revision': site.config_revision,
         }
     }, status=status.HTTP_200_OK)
 
@@ -7276,20 +7098,9 @@ def list_checkpoints(request, site_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    checkpoints = site.ai_checkpoints or []
-    
     # Return only metadata, not full config
-    checkpoint_list = [
-        {
-            'id': c['id'],
-            'timestamp': c['timestamp'],
-            'message': c['message']
-        }
-        for c in checkpoints
-    ]
-    
     return Response({
-        'checkpoints': checkpoint_list
+        'checkpoints': checkpoints.list_checkpoints(site)
     }, status=status.HTTP_200_OK)
 
 
@@ -7297,10 +7108,8 @@ def list_checkpoints(request, site_id):
 @permission_classes([IsAuthenticated])
 def create_event_checkpoint(request, event_id):
     """Create a checkpoint of current BigEvent state before AI changes."""
-    import uuid
-    
     try:
-        event = BigEvent.objects.get(id=event_id, creator=request.user)
+        event = BigEvent.objects.select_related('site').get(id=event_id, creator=request.user)
     except BigEvent.DoesNotExist:
         return Response(
             {'error': 'Event not found or access denied'},
@@ -7310,40 +7119,14 @@ def create_event_checkpoint(request, event_id):
     message = request.data.get('message', 'AI checkpoint')
     
     # Create checkpoint of event data
-    checkpoint_id = str(uuid.uuid4())
-    checkpoint = {
-        'id': checkpoint_id,
-        'timestamp': timezone.now().isoformat(),
-        'data': {
-            'title': event.title,
-            'description': event.description,
-            'location': event.location,
-            'start_date': event.start_date.isoformat() if event.start_date else None,
-            'end_date': event.end_date.isoformat() if event.end_date else None,
-            'max_participants': event.max_participants,
-            'price': str(event.price),
-            'image_url': event.image_url,
-            'details': event.details
-        },
-        'message': message
-    }
-    
-    # Get existing checkpoints
-    checkpoints = event.ai_checkpoints or []
-    
-    # Add new checkpoint at the beginning
-    checkpoints.insert(0, checkpoint)
-    
-    # Keep only last 20 checkpoints
-    checkpoints = checkpoints[:20]
-    
-    event.ai_checkpoints = checkpoints
-    event.save(update_fields=['ai_checkpoints'])
+    checkpoint = checkpoints.create_checkpoint(
+        event.site, checkpoints.big_event_state(event), message, big_event=event
+    )
     
-    logger.info(f"[Checkpoint] Created checkpoint {checkpoint_id} for event {event_id}")
+    logger.info(f"[Checkpoint] Created checkpoint {checkpoint.checkpoint_id} for event {event_id}")
     
     return Response({
-        'checkpoint_id': checkpoint_id,
+        'checkpoint_id': checkpoint.checkpoint_id,
         'message': 'Checkpoint created successfully'
     }, status=status.HTTP_201_CREATED)
 
@@ -7352,44 +7135,25 @@ def create_event_checkpoint(request, event_id):
 @permission_classes([IsAuthenticated])
 def restore_event_checkpoint(request, event_id, checkpoint_id):
     """Restore BigEvent to a previous checkpoint state."""
-    from decimal import Decimal
-    from datetime import date
-    
     try:
-        event = BigEvent.objects.get(id=event_id, creator=request.user)
+        event = BigEvent.objects.select_related('site').get(id=event_id, creator=request.user)
     except BigEvent.DoesNotExist:
         return Response(
             {'error': 'Event not found or access denied'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    checkpoints = event.ai_checkpoints or []
-    
-    # Find checkpoint
-    checkpoint = next((c for c in checkpoints if c['id'] == checkpoint_id), None)
+    data = checkpoints.checkpoint_config(event.site, checkpoint_id, big_event=event)
     
-    if not checkpoint:
+    if data is None:
         return Response(
             {'error': 'Checkpoint not found'},
             status=status.HTTP_404_NOT_FOUND
         )
     
     # Restore event data
-    data = checkpoint['data']
-    event.title = data['title']
-    event.description = data['description']
-    event.location = data['location']
-    event.start_date = date.fromisoformat(data['start_date']) if data['start_date'] else None
-    event.end_date = date.fromisoformat(data['end_date']) if data['end_date'] else None
-    event.max_participants = data['max_participants']
-    event.price = Decimal(data['price'])
-    event.image_url = data['image_url']
-    event.details = data['details']
-    
-    event.save(update_fields=[
-        'title', 'description', 'location', 'start_date', 'end_date',
-        'max_participants', 'price', 'image_url', 'details'
-    ])
+    checkpoints.apply_big_event_state(event, data)
+    event.save(update_fields=list(checkpoints.BIG_EVENT_FIELDS))
     
     logger.info(f"[Checkpoint] Restored checkpoint {checkpoint_id} for event {event_id}")
     
@@ -7404,27 +7168,16 @@ def restore_event_checkpoint(request, event_id, checkpoint_id):
 def list_event_checkpoints(request, event_id):
     """List all checkpoints for a BigEvent."""
     try:
-        event = BigEvent.objects.get(id=event_id, creator=request.user)
+        event = BigEvent.objects.select_related('site').get(id=event_id, creator=request.user)
     except BigEvent.DoesNotExist:
         return Response(
             {'error': 'Event not found or access denied'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    checkpoints = event.ai_checkpoints or []
-    
     # Return only metadata, not full data
-    checkpoint_list = [
-        {
-            'id': c['id'],
-            'timestamp': c['timestamp'],
-            'message': c['message']
-        }
-        for c in checkpoints
-    ]
-    
     return Response({
-        'checkpoints': checkpoint_list
+        'checkpoints': checkpoints.list_checkpoints(event.site, big_event=event)
     }, status=status.HTTP_200_OK)
 
 
@@ -35,6 +35,9 @@ CLOUDFLARE_API_TOKEN = os.environ.get('CLOUDFLARE_API_TOKEN')
 CLOUDFLARE_ACCOUNT_ID = os.environ.get('CLOUDFLARE_ACCOUNT_ID')
 CLOUDFLARE_ZONE_ID = os.environ.get('CLOUDFLARE_ZONE_ID')  # Zone ID for cache purging
 CLOUDFLARE_WORKER_NAME = os.environ.get('CLOUDFLARE_WORKER_NAME', 'youreasysite-domain-proxy')
+# Signed purge endpoint of the worker's domain config cache (see api/domain_cache.py)
+CLOUDFLARE_WORKER_PURGE_URL = os.environ.get('CLOUDFLARE_WORKER_PURGE_URL', '')  # e.g. https://<worker>.workers.dev/__domain-cache/purge
+CLOUDFLARE_WORKER_PURGE_SECRET = os.environ.get('CLOUDFLARE_WORKER_PURGE_SECRET', '')
 
 # --- Google Cloud Target (where domains should point) ---
 GOOGLE_CLOUD_IP = os.environ.get('GOOGLE_CLOUD_IP')  # Static IP from Load Balancer
@@ -157,18 +160,31 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'corsheaders.middleware.CorsMiddleware',
+    'corsheaders.middleware.CorsMiddleware',  # Before DDoS protection, so browsers can read its 429s
+    'api.ddos_middleware.DDoSProtectionMiddleware',  # DDoS protection, before any session or DB work
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.PathScopedMiddleware',  # SESSION_MIDDLEWARE, skipped for the JWT API (see api/middleware.py)
     'api.middleware.TemporaryPasswordMiddleware',  # Custom middleware for temporary password check
-    'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware',
-    'api.ddos_middleware.DDoSProtectionMiddleware',  # DDoS protection
+    'allauth.account.middleware.AccountMiddleware',  # allauth requires it here; no session or DB work per request
     'axes.middleware.AxesMiddleware',  # Brute-force protection (must be last)
 ]
+# Session-based middleware for the admin and allauth pages, run in this order by PathScopedMiddleware
+SESSION_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+SESSION_MIDDLEWARE_EXEMPT_PATHS = ['/api/v1/']  # JWT only
+SESSION_MIDDLEWARE_REQUIRED_PATHS = [  # API views running allauth flows (session + messages)
+    '/api/v1/auth/register/',
+    '/api/v1/auth/resend-verification/',
+    '/api/v1/auth/confirm-email/',
+    '/api/v1/auth/google/',
+]
+# The admin's middleware checks only look at MIDDLEWARE; SESSION_MIDDLEWARE covers /admin/
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 # --- Baza Danych ---
 DATABASES = {
@@ -252,6 +268,8 @@ CORS_ALLOWED_ORIGIN_REGEXES = [
     r"^https?://[a-zA-Z0-9][-a-zA-Z0-9]*\.[a-zA-Z0-9][-a-zA-Z0-9]*\.[a-zA-Z]{2,}$",  # Allow subdomains of custom domains
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Let browser clients read the rate limit headers and back off (api/rate_limiter.py)
+CORS_EXPOSE_HEADERS = ['RateLimit-Limit', 'RateLimit-Remaining', 'RateLimit-Reset', 'RateLimit-Policy', 'Retry-After']
 
 CSRF_TRUSTED_ORIGINS = [
     origin for origin in CORS_ALLOWED_ORIGINS
@@ -260,11 +278,13 @@ CSRF_TRUSTED_ORIGINS = [
 
 # --- REST Framework & JWT ---
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    # JWT decoded and user loaded once per request, shared with TemporaryPasswordMiddleware (api/authentication.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': ('api.authentication.RequestCachedJWTAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson when installed, raw template_config passthrough (see api/renderers.py)
+        'api.renderers.FastJSONRenderer',
     ],
 }
 SIMPLE_JWT = {
@@ -272,6 +292,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Adds the is_temporary_password claim (api/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.PlatformTokenObtainPairSerializer',
 }
 
 # --- Autentykacja (dj-rest-auth & allauth) ---
@@ -284,6 +306,7 @@ REST_AUTH = {
     'USE_JWT': True,
     'JWT_AUTH_HTTPONLY': False,
     'REGISTER_SERIALIZER': 'api.serializers.CustomRegisterSerializer',
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'api.authentication.PlatformTokenObtainPairSerializer',
     'TOKEN_MODEL': None,
 }
 ACCOUNT_ADAPTER = 'api.adapters.CustomAccountAdapter'
@@ -445,6 +468,10 @@ CELERY_TASK_ROUTES = {
 from celery.schedules import crontab
 CELERY_BEAT_SCHEDULE = {
     # Newsletter tasks removed - newsletters are now sent manually via button
+    'cleanup-calendar-tombstones': {
+        'task': 'api.tasks.cleanup_calendar_tombstones',
+        'schedule': crontab(hour=3, minute=30),
+    },
 }
 
 # --- Konfiguracja Django Cache (Redis) ---
@@ -455,6 +482,32 @@ CACHES = {
     }
 }
 
+# Public calendar responses are cached per site "calendar version" (see api/calendar_cache.py)
+CALENDAR_CACHE_TTL = int(os.environ.get('CALENDAR_CACHE_TTL', 60))  # seconds
+# Delta sync of the Studio calendar (see api/calendar_sync.py)
+CALENDAR_SYNC_OVERLAP_SECONDS = int(os.environ.get('CALENDAR_SYNC_OVERLAP_SECONDS', 5))
+CALENDAR_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('CALENDAR_TOMBSTONE_RETENTION_DAYS', 30))
+# Pre-encoded public site payloads (see api/site_snapshots.py)
+SITE_SNAPSHOT_TTL = int(os.environ.get('SITE_SNAPSHOT_TTL', 7 * 24 * 3600))  # seconds
+# Static export of published sites to object storage (see api/site_export.py)
+SITE_EXPORT_ENABLED = os.environ.get('SITE_EXPORT_ENABLED', 'False').lower() in ['true', '1', 't', 'yes']
+SITE_EXPORT_SECTION_TTL = int(os.environ.get('SITE_EXPORT_SECTION_TTL', 7 * 24 * 3600))  # seconds
+SITE_EXPORT_RETENTION = int(os.environ.get('SITE_EXPORT_RETENTION', 3600))  # seconds a replaced bundle stays readable
+# AI undo checkpoints stored as deltas (see api/checkpoints.py)
+CONFIG_CHECKPOINT_LIMIT = int(os.environ.get('CONFIG_CHECKPOINT_LIMIT', 20))  # per site / BigEvent
+CONFIG_CHECKPOINT_BASE_INTERVAL = int(os.environ.get('CONFIG_CHECKPOINT_BASE_INTERVAL', 10))  # deltas per full base
+# Site version history keyframes (see api/site_versions.py)
+SITE_VERSION_KEYFRAME_INTERVAL = int(os.environ.get('SITE_VERSION_KEYFRAME_INTERVAL', 5))  # versions per full copy
+# Custom domain / identifier resolution cache (see api/domain_cache.py)
+DOMAIN_CACHE_TTL = int(os.environ.get('DOMAIN_CACHE_TTL', 3600))  # seconds
+DOMAIN_CACHE_NEGATIVE_TTL = int(os.environ.get('DOMAIN_CACHE_NEGATIVE_TTL', 60))  # unknown hostnames
+DOMAIN_CACHE_LOCAL_TTL = int(os.environ.get('DOMAIN_CACHE_LOCAL_TTL', 30))  # in-process LRU
+DOMAIN_CACHE_LOCAL_SIZE = int(os.environ.get('DOMAIN_CACHE_LOCAL_SIZE', 10000))
+DOMAIN_CACHE_PUBSUB_URL = os.environ.get(
+    'DOMAIN_CACHE_PUBSUB_URL',
+    f"redis://{os.environ.get('REDIS_HOST', '127.0.0.1')}:{os.environ.get('REDIS_PORT', 6379)}/1",
+)
+
 # --- Konfiguracja Django Channels ---
 CHANNEL_LAYERS = {
     "default": {
@@ -471,12 +524,28 @@ DDOS_REQUESTS_PER_MINUTE = int(os.environ.get('DDOS_REQUESTS_PER_MINUTE', 120))
 DDOS_REQUESTS_PER_HOUR = int(os.environ.get('DDOS_REQUESTS_PER_HOUR', 2000))
 DDOS_BLOCK_DURATION = int(os.environ.get('DDOS_BLOCK_DURATION', 1800))  # 30 min instead of 1 hour
 DDOS_SUSPICIOUS_THRESHOLD = int(os.environ.get('DDOS_SUSPICIOUS_THRESHOLD', 100))
-DDOS_BURST_ALLOWANCE = int(os.environ.get('DDOS_BURST_ALLOWANCE', 30))  # Allow short bursts up to 30 extra req
-DDOS_BURST_WINDOW = int(os.environ.get('DDOS_BURST_WINDOW', 10))  # Within 10 seconds
-DDOS_WHITELIST = [
+DDOS_BURST_ALLOWANCE = int(os.environ.get('DDOS_BURST_ALLOWANCE', 30))  # Extra req above the minute limit (see api/rate_limiter.py)
+DDOS_WHITELIST = [  # addresses or CIDR ranges
     '127.0.0.1',
     'localhost',
 ]
+DDOS_BLOCKLIST = []  # addresses or CIDR ranges that are always rejected
+# Blocks are mirrored into every web worker through this Redis pub/sub channel (see api/ddos_blocklist.py)
+DDOS_BLOCKLIST_PUBSUB_URL = os.environ.get('DDOS_BLOCKLIST_PUBSUB_URL', DOMAIN_CACHE_PUBSUB_URL)
+
+# --- API rate limit policies (api/rate_limiter.py, decorators in api/rate_limiting.py) ---
+# Rates are '<limit>/<window>[+<burst>]' with the window in seconds or s/m/h/d, or a dict with
+# 'rates', 'strategy' (token_bucket | sliding_window), 'block_duration' (s) and 'scope'.
+# A key naming a view method (e.g. 'RequestMagicLinkView.post') overrides the policy of that route.
+RATE_LIMIT_STRATEGY = os.environ.get('RATE_LIMIT_STRATEGY', 'sliding_window')
+RATE_LIMIT_POLICIES = {
+    'strict': '10/m',
+    'moderate': '30/m',
+    'relaxed': '120/m',
+    'auth_strict': '20/m',
+    'auth_moderate': '60/m',
+    'auth_relaxed': '240/m',
+}
 
 # --- Django Axes (Brute-force protection) Settings ---
 AXES_FAILURE_LIMIT = int(os.environ.get('AXES_FAILURE_LIMIT', 7))  # Lock after 7 failed attempts
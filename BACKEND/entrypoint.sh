@@ -28,6 +28,10 @@ echo "--- Entrypoint: Creating mock sites for superuser..."
 python manage.py create_mock_sites
 echo "--- Entrypoint: Mock sites creation complete."
 
+echo "--- Entrypoint: Rebuilding materialized availability slots..."
+python manage.py rebuild_computed_slots --all
+echo "--- Entrypoint: Availability slots rebuilt."
+
 echo "--- Entrypoint: Initializing default email templates..."
 python manage.py init_email_templates
 echo "--- Entrypoint: Email templates initialization complete."
@@ -0,0 +1,214 @@
+/**
+ * Local harness for the domain config cache (node --test, no Cloudflare account needed).
+ *
+ * The Workers runtime is stubbed: KV is an in-memory map, the backend is a
+ * fetch stub counting calls and the clock is controlled through Date.now.
+ */
+
+import { afterEach, beforeEach, test } from 'node:test';
+import assert from 'node:assert/strict';
+import { createHmac } from 'node:crypto';
+
+import worker from '../worker.js';
+
+const BACKEND_API = 'https://backend.test/api/v1/domains/resolve/';
+const PURGE_SECRET = 'test-secret';
+const PURGE_URL = 'https://domain-proxy.example.workers.dev/__domain-cache/purge';
+
+class MemoryKV {
+  constructor() {
+    this.entries = new Map();
+  }
+  async get(key, options) {
+    const value = this.entries.get(key);
+    if (value === undefined) return null;
+    return options && options.type === 'json' ? JSON.parse(value) : value;
+  }
+  async put(key, value) {
+    this.entries.set(key, value);
+  }
+  async delete(key) {
+    this.entries.delete(key);
+  }
+}
+
+class Backend {
+  constructor() {
+    this.domains = {};
+    this.calls = 0;
+    this.down = false;
+  }
+  async fetch(input) {
+    const url = String(input);
+    if (!url.startsWith(BACKEND_API)) {
+      throw new Error(`Unexpected fetch: ${url}`);
+    }
+    this.calls += 1;
+    if (this.down) {
+      throw new TypeError('fetch failed');
+    }
+    const hostname = url.slice(BACKEND_API.length);
+    const config = this.domains[hostname];
+    if (!config) {
+      return new Response(JSON.stringify({ error: 'Domain not found' }), { status: 404 });
+    }
+    return Response.json({ domain: hostname, ...config });
+  }
+}
+
+let backend;
+let env;
+let now;
+const realFetch = globalThis.fetch;
+const realNow = Date.now;
+const realLog = console.log;
+const realError = console.error;
+
+beforeEach(() => {
+  backend = new Backend();
+  env = { BACKEND_API, PURGE_SECRET, DOMAIN_CONFIG: new MemoryKV() };
+  now = 1_700_000_000_000;
+  globalThis.fetch = (input, init) => backend.fetch(input, init);
+  Date.now = () => now;
+  console.log = () => {};
+  console.error = () => {};
+});
+
+afterEach(() => {
+  globalThis.fetch = realFetch;
+  Date.now = realNow;
+  console.log = realLog;
+  console.error = realError;
+});
+
+async function visit(hostname) {
+  const pending = [];
+  const ctx = { waitUntil: (promise) => pending.push(promise) };
+  const response = await worker.fetch(new Request(`https://${hostname}/offer?x=1`), env, ctx);
+  await Promise.all(pending);
+  return response;
+}
+
+function purgeRequest(hostnames, { secret = PURGE_SECRET, timestamp = Math.floor(now / 1000) } = {}) {
+  const body = JSON.stringify({ hostnames, timestamp });
+  const signature = createHmac('sha256', secret).update(body).digest('hex');
+  return new Request(PURGE_URL, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'X-Purge-Signature': signature },
+    body,
+  });
+}
+
+async function purge(hostnames, options) {
+  return worker.fetch(purgeRequest(hostnames, options), env, { waitUntil() {} });
+}
+
+test('repeated requests are served from the cache', async () => {
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+
+  for (let i = 0; i < 100; i++) {
+    const response = await visit('shop.test');
+    assert.equal(response.status, 301);
+    assert.equal(response.headers.get('location'), 'https://one.youreasysite.pl/offer?x=1');
+  }
+
+  assert.equal(backend.calls, 1, 'hit rate should be 99/100');
+});
+
+test('config is refreshed after CONFIG_TTL', async () => {
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+  await visit('shop.test');
+
+  backend.domains['shop.test'] = { target: 'two.youreasysite.pl', proxy_mode: false };
+  now += 299 * 1000;
+  assert.equal((await visit('shop.test')).headers.get('location'), 'https://one.youreasysite.pl/offer?x=1');
+
+  now += 2 * 1000;
+  assert.equal((await visit('shop.test')).headers.get('location'), 'https://two.youreasysite.pl/offer?x=1');
+  assert.equal(backend.calls, 2);
+});
+
+test('signed purge propagates the new target immediately', async () => {
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+  await visit('shop.test');
+  backend.domains['shop.test'] = { target: 'two.youreasysite.pl', proxy_mode: false };
+
+  const response = await purge(['shop.test']);
+  assert.equal(response.status, 200);
+  assert.deepEqual(await response.json(), { purged: ['shop.test'] });
+
+  assert.equal((await visit('shop.test')).headers.get('location'), 'https://two.youreasysite.pl/offer?x=1');
+  assert.equal(backend.calls, 2);
+});
+
+test('purge with a bad signature or an old timestamp is rejected', async () => {
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+  await visit('shop.test');
+
+  assert.equal((await purge(['shop.test'], { secret: 'wrong' })).status, 401);
+  assert.equal((await purge(['shop.test'], { timestamp: Math.floor(now / 1000) - 600 })).status, 401);
+
+  const unsigned = new Request(PURGE_URL, { method: 'POST', body: JSON.stringify({ hostnames: ['shop.test'] }) });
+  assert.equal((await worker.fetch(unsigned, env, { waitUntil() {} })).status, 401);
+
+  await visit('shop.test');
+  assert.equal(backend.calls, 1, 'cache entry must survive rejected purges');
+});
+
+test('stale config is served while the backend is down', async () => {
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+  await visit('shop.test');
+
+  backend.down = true;
+  now += 3600 * 1000;
+  const response = await visit('shop.test');
+  assert.equal(response.status, 301);
+  assert.equal(response.headers.get('location'), 'https://one.youreasysite.pl/offer?x=1');
+
+  now += 24 * 3600 * 1000;
+  assert.equal((await visit('shop.test')).status, 503, 'stale window is bounded by STALE_TTL');
+});
+
+test('unknown domains are cached negatively', async () => {
+  for (let i = 0; i < 10; i++) {
+    assert.equal((await visit('unknown.test')).status, 404);
+  }
+  assert.equal(backend.calls, 1);
+
+  backend.domains['unknown.test'] = { target: 'new.youreasysite.pl', proxy_mode: false };
+  now += 61 * 1000;
+  assert.equal((await visit('unknown.test')).status, 301);
+});
+
+test('Cache API is used when no KV namespace is bound', async () => {
+  const entries = new Map();
+  globalThis.caches = {
+    default: {
+      async match(request) {
+        const cached = entries.get(request.url);
+        return cached ? cached.clone() : undefined;
+      },
+      async put(request, response) {
+        entries.set(request.url, response);
+      },
+      async delete(request) {
+        return entries.delete(request.url);
+      },
+    },
+  };
+  delete env.DOMAIN_CONFIG;
+  backend.domains['shop.test'] = { target: 'one.youreasysite.pl', proxy_mode: false };
+
+  try {
+    for (let i = 0; i < 20; i++) {
+      await visit('shop.test');
+    }
+    assert.equal(backend.calls, 1);
+
+    await purge(['shop.test']);
+    await visit('shop.test');
+    assert.equal(backend.calls, 2);
+  } finally {
+    delete globalThis.caches;
+  }
+});
@@ -1,67 +1,243 @@
 /**
  * Cloudflare Worker - Domain Proxy for YourEasySite
- * 
+ *
  * This worker handles all custom domains purchased by users.
  * It provides automatic SSL, CDN, and redirects to user sites.
- * 
+ *
  * Architecture:
  * - User domain (e.g., dronecomponentsfpv.online) → OVH DNS A record → Cloudflare Worker IP
- * - Worker checks domain in backend API
+ * - Worker checks domain in backend API (cached at the edge, see "Domain config cache")
  * - Worker redirects to target (e.g., youtube.com for tests, or user site subdomain)
  */
 
+// ============================================================================
+// Domain config cache
+// ============================================================================
+//
+// Resolved configs are kept in Workers KV (binding DOMAIN_CONFIG) or, when no
+// namespace is bound, in the Cache API of the current data center. An entry is
+// fresh for CONFIG_TTL seconds; after that the backend is asked again, but the
+// old entry is kept for STALE_TTL seconds and served while the backend is down.
+// The backend evicts a hostname through the signed purge endpoint whenever its
+// target, proxy mode or status changes, so CONFIG_TTL only bounds staleness
+// when a purge is lost.
+
+const DEFAULT_CONFIG_TTL = 300;        // seconds
+const DEFAULT_NEGATIVE_TTL = 60;       // unknown / inactive domains
+const DEFAULT_STALE_TTL = 24 * 3600;   // how long a config may be served while the backend is down
+const PURGE_PATH = '/__domain-cache/purge';
+const PURGE_MAX_SKEW = 300;            // seconds; older purge requests are rejected (replays)
+const CACHE_API_PREFIX = 'https://domain-config.internal/';
+
+function seconds(value, fallback) {
+  const parsed = parseInt(value, 10);
+  return Number.isFinite(parsed) && parsed >= 0 ? parsed : fallback;
+}
+
+function cacheKey(hostname) {
+  return `domain:${hostname.toLowerCase()}`;
+}
+
+function configStore(env) {
+  if (env.DOMAIN_CONFIG) {
+    return {
+      async get(hostname) {
+        return env.DOMAIN_CONFIG.get(cacheKey(hostname), { type: 'json' });
+      },
+      async put(hostname, entry, ttl) {
+        // KV requires expirationTtl >= 60
+        await env.DOMAIN_CONFIG.put(cacheKey(hostname), JSON.stringify(entry), { expirationTtl: Math.max(ttl, 60) });
+      },
+      async delete(hostname) {
+        await env.DOMAIN_CONFIG.delete(cacheKey(hostname));
+      },
+    };
+  }
+
+  // Cache API fallback: per data center, so a purge only reaches the colo that received it
+  const cache = caches.default;
+  const keyFor = (hostname) => new Request(CACHE_API_PREFIX + encodeURIComponent(cacheKey(hostname)));
+  return {
+    async get(hostname) {
+      const cached = await cache.match(keyFor(hostname));
+      return cached ? cached.json() : null;
+    },
+    async put(hostname, entry, ttl) {
+      await cache.put(keyFor(hostname), new Response(JSON.stringify(entry), {
+        headers: { 'Content-Type': 'application/json', 'Cache-Control': `max-age=${ttl}` },
+      }));
+    },
+    async delete(hostname) {
+      await cache.delete(keyFor(hostname));
+    },
+  };
+}
+
+async function fetchConfig(env, hostname) {
+  // Query backend API for domain configuration
+  const apiUrl = `${env.BACKEND_API}${hostname}`;
+  console.log(`[Worker] Querying API: ${apiUrl}`);
+
+  const apiResponse = await fetch(apiUrl, {
+    headers: {
+      'Accept': 'application/json',
+    },
+  });
+
+  if (apiResponse.status === 404) {
+    return { config: null };
+  }
+  if (!apiResponse.ok) {
+    throw new Error(`API error: ${apiResponse.status}`);
+  }
+  return { config: await apiResponse.json() };
+}
+
+/**
+ * Config for a hostname ({ config, source }); `config` is null for unknown domains.
+ * Throws only when the backend is unreachable and nothing is cached.
+ */
+async function resolveConfig(env, ctx, hostname) {
+  const store = configStore(env);
+  const now = Date.now();
+  const configTtl = seconds(env.CONFIG_TTL, DEFAULT_CONFIG_TTL);
+  const negativeTtl = seconds(env.NEGATIVE_TTL, DEFAULT_NEGATIVE_TTL);
+  const staleTtl = seconds(env.STALE_TTL, DEFAULT_STALE_TTL);
+
+  let cached = null;
+  try {
+    cached = await store.get(hostname);
+  } catch (error) {
+    console.error(`[Worker] Config cache unavailable:`, error);
+  }
+
+  if (cached) {
+    const ttl = cached.config ? configTtl : negativeTtl;
+    if (now - cached.fetchedAt < ttl * 1000) {
+      return { config: cached.config, source: 'cache' };
+    }
+  }
+
+  let fresh;
+  try {
+    fresh = await fetchConfig(env, hostname);
+  } catch (error) {
+    if (cached && cached.config && now - cached.fetchedAt < staleTtl * 1000) {
+      console.error(`[Worker] Backend unavailable, serving stale config for ${hostname}:`, error);
+      return { config: cached.config, source: 'stale' };
+    }
+    throw error;
+  }
+
+  const entry = { config: fresh.config, fetchedAt: now };
+  // Keep positive entries around for stale serving; negative ones only for their TTL
+  const storeTtl = fresh.config ? staleTtl : negativeTtl;
+  ctx.waitUntil(store.put(hostname, entry, storeTtl).catch((error) => {
+    console.error(`[Worker] Could not cache config for ${hostname}:`, error);
+  }));
+  return { config: fresh.config, source: 'backend' };
+}
+
+// ============================================================================
+// Signed purge endpoint (called by the backend Celery task)
+// ============================================================================
+
+function hexToBytes(hex) {
+  if (!/^([0-9a-f]{2})+$/i.test(hex)) {
+    return null;
+  }
+  const bytes = new Uint8Array(hex.length / 2);
+  for (let i = 0; i < bytes.length; i++) {
+    bytes[i] = parseInt(hex.substr(i * 2, 2), 16);
+  }
+  return bytes;
+}
+
+async function verifySignature(secret, body, signatureHex) {
+  const signature = hexToBytes(signatureHex || '');
+  if (!secret || !signature) {
+    return false;
+  }
+  const encoder = new TextEncoder();
+  const key = await crypto.subtle.importKey(
+    'raw', encoder.encode(secret), { name: 'HMAC', hash: 'SHA-256' }, false, ['verify']
+  );
+  // subtle.verify compares in constant time
+  return crypto.subtle.verify('HMAC', key, signature, encoder.encode(body));
+}
+
+async function handlePurge(request, env) {
+  if (request.method !== 'POST') {
+    return new Response('Method not allowed', { status: 405 });
+  }
+
+  const body = await request.text();
+  if (!await verifySignature(env.PURGE_SECRET, body, request.headers.get('X-Purge-Signature'))) {
+    return new Response('Invalid signature', { status: 401 });
+  }
+
+  let payload;
+  try {
+    payload = JSON.parse(body);
+  } catch (error) {
+    return new Response('Invalid payload', { status: 400 });
+  }
+  const hostnames = Array.isArray(payload.hostnames) ? payload.hostnames : [];
+  if (typeof payload.timestamp !== 'number' || Math.abs(Date.now() / 1000 - payload.timestamp) > PURGE_MAX_SKEW) {
+    return new Response('Purge request expired', { status: 401 });
+  }
+
+  const store = configStore(env);
+  await Promise.all(hostnames.map((hostname) => store.delete(String(hostname))));
+  console.log(`[Worker] Purged domain config: ${hostnames.join(', ')}`);
+  return Response.json({ purged: hostnames });
+}
+
 export default {
-  async fetch(request, env) {
+  async fetch(request, env, ctx) {
     const url = new URL(request.url);
     const hostname = url.hostname;
-    
+
     console.log(`[Worker] Request from: ${hostname}`);
-    
+
     // Skip if accessing worker directly (not via custom domain)
     if (hostname.includes('workers.dev')) {
+      if (url.pathname === PURGE_PATH) {
+        return handlePurge(request, env);
+      }
       return new Response('YourEasySite Domain Proxy - OK', { status: 200 });
     }
-    
+
     try {
-      // Query backend API for domain configuration
-      const apiUrl = `${BACKEND_API}${hostname}`;
-      console.log(`[Worker] Querying API: ${apiUrl}`);
-      
-      const apiResponse = await fetch(apiUrl, {
-        headers: {
-          'Accept': 'application/json',
-        },
-        // TEMPORARY: Disable cache for testing
-        // TODO: Re-enable with cache purging when target/proxy_mode changes
-        // cf: {
-        //   cacheTtl: 300,
-        //   cacheEverything: true,
-        // }
-      });
-      
-      if (!apiResponse.ok) {
-        console.error(`[Worker] API error: ${apiResponse.status}`);
+      let resolved;
+      try {
+        resolved = await resolveConfig(env, ctx, hostname);
+      } catch (apiError) {
+        console.error(`[Worker] API error:`, apiError);
+        return new Response('Domain configuration unavailable', { status: 503 });
+      }
+
+      const config = resolved.config;
+      if (!config) {
         return new Response('Domain not configured', { status: 404 });
       }
-      
-      const config = await apiResponse.json();
-      console.log(`[Worker] Config for ${hostname}:`, config);
-      
+      console.log(`[Worker] Config for ${hostname} (${resolved.source}):`, config);
+
       // Get target and proxy mode from config
       const target = config.target;
       const proxyMode = config.proxy_mode || false;
-      
+
       if (!target) {
         return new Response('Domain target not configured', { status: 500 });
       }
-      
+
       // Build target URL
       const targetUrl = new URL(url.pathname + url.search, `https://${target}`);
-      
+
       if (proxyMode) {
         // PROXY MODE: Fetch content and serve under original domain
         console.log(`[Worker] Proxying ${hostname} → ${targetUrl.toString()}`);
-        
+
         try {
           const targetResponse = await fetch(targetUrl.toString(), {
             method: request.method,
@@ -69,35 +245,35 @@ export default {
             body: request.body,
             redirect: 'manual'
           });
-          
+
           // Create new headers, rewriting any absolute URLs to preserve original domain
           const newHeaders = new Headers(targetResponse.headers);
-          
+
           // Remove headers that would break the proxy
           newHeaders.delete('content-security-policy');
           newHeaders.delete('x-frame-options');
           newHeaders.delete('strict-transport-security');
-          
+
           // Add CORS if needed
           newHeaders.set('access-control-allow-origin', '*');
-          
+
           return new Response(targetResponse.body, {
             status: targetResponse.status,
             statusText: targetResponse.statusText,
             headers: newHeaders
           });
-          
+
         } catch (proxyError) {
           console.error(`[Worker] Proxy error:`, proxyError);
           return new Response('Proxy error: Unable to fetch target', { status: 502 });
         }
-        
+
       } else {
         // REDIRECT MODE: 301 redirect (changes URL in browser)
         console.log(`[Worker] Redirecting ${hostname} → ${targetUrl.toString()}`);
         return Response.redirect(targetUrl.toString(), 301);
       }
-      
+
     } catch (error) {
       console.error(`[Worker] Error:`, error);
       return new Response('Internal Server Error', { status: 500 });